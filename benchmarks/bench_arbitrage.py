@@ -0,0 +1,57 @@
+import argparse
+import random
+import sys
+import timeit
+
+from uniswap import arbitrage
+from uniswap.reader import Pool
+
+'''
+Scan pools of the same tokens in several factories for arbitrage:
+
+# python -m benchmarks.bench_arbitrage --tokens 2000 --factories 3
+
+pools() lists every token once per factory with wei-sized reserves whose
+prices differ by up to --spread between factories, as deployments that are
+not arbitraged against each other drift apart. Each token yields
+factories * (factories - 1) ordered pairs; scan() screens them all and sizes
+the profitable ones exactly.
+'''
+
+TOKENS = 2000
+FACTORIES = 3
+SPREAD = 0.02
+REPEAT = 5
+
+
+def pools(tokens, factories, spread, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for t in range(tokens):
+        price = rng.uniform(1, 10**4)
+        for f in range(factories):
+            eth = rng.randrange(10**19, 10**22)
+            token_reserve = int(eth * price * rng.uniform(1 - spread / 2, 1 + spread / 2))
+            rows.append(Pool('0x%040x' % t, '0x%08x%032x' % (f, t), eth, token_reserve, eth))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pairs per second scanned by uniswap.arbitrage.')
+    parser.add_argument('--tokens', type=int, default=TOKENS)
+    parser.add_argument('--factories', type=int, default=FACTORIES)
+    parser.add_argument('--spread', type=float, default=SPREAD, help='largest price difference between factories')
+    args = parser.parse_args(argv)
+    rows = pools(args.tokens, args.factories, args.spread)
+    count = args.tokens * args.factories * (args.factories - 1)
+    seconds = min(timeit.repeat(lambda: arbitrage.scan(rows), number=1, repeat=REPEAT))
+    opportunities = arbitrage.scan(rows)
+    print('%d pairs (numpy %s): %.1f ms per scan, %d opportunities' % (
+        count, 'on' if arbitrage.numpy is not None else 'off', seconds * 1000, len(opportunities)))
+    for o in opportunities[:5]:
+        print('  %s  sell %.4f ETH  profit %.6f ETH' % (o.token, o.eth_sold / 1e18, o.profit / 1e18))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
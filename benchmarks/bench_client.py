@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from web3 import Web3
+
+from uniswap import artifacts, genesis, rpc
+from uniswap.client import Client
+
+'''
+Quote every exchange of a factory through a local uniswap.rpc node:
+
+# python -m benchmarks.bench_client --pools 1000 --latency 20
+
+one by one with web3's HTTPProvider (as ConciseContract does), then with
+uniswap.client one request per round trip over a connection pool, then with
+uniswap.client batching. The node runs one call at a time, so what the
+client can save is the round trips: the injected latency (milliseconds per
+HTTP request) and the per-request overhead.
+'''
+
+POOLS = 200
+LATENCY = 20.0
+AMOUNT = 10**17
+
+
+def scenario(pools):
+    return {
+        'tokens': [{'symbol': 'T%d' % i} for i in range(pools)],
+        'pools': [{'token': 'T%d' % i, 'eth_reserve': 10**20, 'token_reserve': (i + 1) * 10**20}
+                  for i in range(pools)],
+    }
+
+
+def sequential(url, exchanges):
+    w3 = Web3(Web3.HTTPProvider(url))
+    abi = artifacts.load(genesis.EXCHANGE).abi
+    contracts = [w3.eth.contract(address=address, abi=abi) for address in exchanges]
+    return [c.functions.getEthToTokenInputPrice(AMOUNT).call({'gas': 10**6}) for c in contracts], len(contracts)
+
+
+def concurrent(url, exchanges, batch_size, max_connections):
+    loop = asyncio.get_event_loop()
+
+    async def quote():
+        async with Client(url, max_connections=max_connections, batch_size=batch_size) as client:
+            prices = await asyncio.gather(*[client.exchange(address).getEthToTokenInputPrice(AMOUNT)
+                                            for address in exchanges])
+            return prices, client.round_trips
+    return loop.run_until_complete(quote())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fan-out quotes: sequential web3 against uniswap.client.')
+    parser.add_argument('--pools', type=int, default=POOLS)
+    parser.add_argument('--latency', type=float, default=LATENCY, help='milliseconds per HTTP request')
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args(argv)
+    world = genesis.World(genesis.cached(scenario(args.pools)))
+    exchanges = list(world.addresses['exchanges'].values())
+    runs = [
+        ('web3, sequential', lambda url: sequential(url, exchanges)),
+        ('client, unbatched', lambda url: concurrent(url, exchanges, 1, args.connections)),
+        ('client, batched', lambda url: concurrent(url, exchanges, args.batch_size, args.connections)),
+    ]
+    print('%d exchanges, %.0f ms per request' % (len(exchanges), args.latency))
+    print('%-20s %10s %12s %10s' % ('', 'seconds', 'round trips', 'quotes/s'))
+    expected = None
+    with rpc.Server(world.tester, latency=args.latency / 1000) as server:
+        for name, run in runs:
+            start = time.perf_counter()
+            prices, round_trips = run(server.url)
+            elapsed = time.perf_counter() - start
+            expected = expected or prices
+            assert prices == expected
+            print('%-20s %10.2f %12d %10.1f' % (name, elapsed, round_trips, len(prices) / elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import argparse
+import sys
+import time
+from collections import OrderedDict
+
+from web3 import Web3
+
+from uniswap import artifacts, factory
+from uniswap.world import World
+
+'''
+Build and list a factory of many exchanges, one item at a time against the
+bulk entry points uniswap.factory uses:
+
+# python -m benchmarks.bench_factory --exchanges 10000
+
+Two factories of the same template are built for the same placeholder
+tokens: one with a createExchange transaction per token, the other with
+createExchanges. Each is then listed both ways, tokenCount plus getTokenWithId
+and getExchange per id against getExchangesWithIds pages, and the listings
+are checked to agree. Gas is from the receipts, time is wall-clock on
+py-evm, and both paths give every transaction and call a fixed gas limit so
+neither pays for eth_estimateGas.
+'''
+
+EXCHANGES = 1000
+
+
+def _tokens(count):
+    return [Web3.toChecksumAddress('0x%040x' % (0xf00d << 128 | i)) for i in range(1, count + 1)]
+
+
+def _gas_since(w3, block):
+    return sum(w3.eth.getBlock(n).gasUsed for n in range(block + 1, w3.eth.blockNumber + 1))
+
+
+def _per_item_pairs(contract):
+    call = {'gas': factory.CALL_GAS}
+    token_count = contract.functions.tokenCount().call(call)
+    result = []
+    for token_id in range(1, token_count + 1):
+        token = contract.functions.getTokenWithId(token_id).call(call)
+        result.append((token, contract.functions.getExchange(token).call(call)))
+    return result, 1 + 2 * token_count
+
+
+def measure(count=EXCHANGES, world=None):
+    """ {row: (per item, bulk)} for count exchanges: gas, seconds and calls. """
+    if world is None:
+        world = World()
+    w3 = world.w3
+    abi = artifacts.load(factory.FACTORY).abi
+    tokens = _tokens(count)
+    rows = OrderedDict()
+
+    single = w3.eth.contract(address=factory.deploy(w3, world.exchange_template.address), abi=abi)
+    block = w3.eth.blockNumber
+    start = time.perf_counter()
+    for token in tokens:
+        single.functions.createExchange(token).transact({'gas': factory.CREATE_BASE_GAS + factory.CREATE_GAS})
+    single_seconds = time.perf_counter() - start
+    single_gas = _gas_since(w3, block)
+
+    bulk = w3.eth.contract(address=factory.deploy(w3, world.exchange_template.address), abi=abi)
+    block = w3.eth.blockNumber
+    start = time.perf_counter()
+    factory.create_exchanges(bulk, tokens)
+    bulk_seconds = time.perf_counter() - start
+    bulk_gas = _gas_since(w3, block)
+
+    rows['create: transactions'] = (count, -(-count // factory.CREATE_BATCH))
+    rows['create: gas per exchange'] = (single_gas // count, bulk_gas // count)
+    rows['create: ms per exchange'] = (single_seconds * 1000 / count, bulk_seconds * 1000 / count)
+
+    start = time.perf_counter()
+    listed, calls = _per_item_pairs(single)
+    single_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    paged = list(factory.pairs(single))
+    bulk_seconds = time.perf_counter() - start
+    assert [t for t, _ in listed] == [t for t, _ in paged] == tokens and listed == paged
+    assert [t for t, _ in factory.pairs(bulk)] == tokens
+    rows['list: calls'] = (calls, 2 + -(-count // factory.PAGE_SIZE))
+    rows['list: ms'] = (single_seconds * 1000, bulk_seconds * 1000)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Building and listing a factory one item at a time and in bulk.')
+    parser.add_argument('--exchanges', type=int, default=EXCHANGES)
+    args = parser.parse_args(argv)
+    rows = measure(args.exchanges)
+    print('%d exchanges' % args.exchanges)
+    print('%-26s %12s %12s %8s' % ('', 'per item', 'bulk', 'ratio'))
+    for name, (single, bulk) in rows.items():
+        number = '%12.1f' if isinstance(single, float) else '%12d'
+        print(('%-26s ' + number + ' ' + number + ' %7.1fx') % (name, single, bulk, single / bulk))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
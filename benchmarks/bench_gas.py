@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import sys
+from collections import OrderedDict
+
+from web3 import Web3
+
+from uniswap import artifacts
+from uniswap.world import DEADLINE, EXCHANGES, World, deploy_contract
+
+'''
+Gas used by every state-changing entry point of the exchange and factory.
+
+Each case starts from the same chain snapshot (HAY and DEN exchanges seeded as
+in the tests), runs its setup transactions and records gasUsed from the
+receipt of the measured one.
+
+# compare with the baseline:  python -m benchmarks.bench_gas
+# rewrite the baseline:       python -m benchmarks.bench_gas --update
+# another exchange template:  python -m benchmarks.bench_gas --exchange contracts/uniswap_exchange_lean.vy
+
+Exits with status 1 if any case uses more than baseline * (1 + threshold).
+The baseline is uniswap_exchange.vy's, so --exchange prints another template
+side by side with it.
+'''
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'gas_baseline.json')
+THRESHOLD = 0.01
+
+CASES = OrderedDict()
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def _new_exchange(world):
+    token = deploy_contract(world.w3, 'contracts/test_contracts/ERC20.vy', b'NEW Token', b'NEW', 18, 100000*10**18)
+    world.factory.createExchange(token.address, transact={})
+    exchange = world.w3.eth.contract(address=world.factory.getExchange(token.address),
+                                     abi=artifacts.load('contracts/uniswap_exchange.vy').abi)
+    token.approve(exchange.address, 10**18, transact={})
+    return exchange
+
+
+def _fund_tokens(world, a1):
+    world.HAY_token.transfer(a1, 10*10**18, transact={})
+    world.HAY_token.approve(world.HAY_exchange.address, 10*10**18, transact={'from': a1})
+
+
+def _swap_to_den(world):
+    # uniswap_exchange_lean.vy stores DEN's exchange on the first swap to DEN; measure a later one
+    world.HAY_token.approve(world.HAY_exchange.address, 10**15, transact={})
+    world.HAY_exchange.tokenToTokenSwapInput(10**15, 1, 1, DEADLINE, world.DEN_token.address, transact={})
+
+
+@case('factory.initializeFactory')
+def _(world, a0, a1, a2):
+    factory = deploy_contract(world.w3, 'contracts/uniswap_factory.vy')
+    return factory.initializeFactory(world.exchange_template.address, transact={})
+
+
+@case('factory.createExchange')
+def _(world, a0, a1, a2):
+    token = deploy_contract(world.w3, 'contracts/test_contracts/ERC20.vy', b'NEW Token', b'NEW', 18, 100000*10**18)
+    return world.factory.createExchange(token.address, transact={})
+
+
+@case('factory.createExchanges (20 tokens)')
+def _(world, a0, a1, a2):
+    tokens = [Web3.toChecksumAddress('0x%040x' % (0xf00d << 128 | i)) for i in range(1, 21)]
+    return world.factory.createExchanges(tokens, transact={})
+
+
+@case('exchange.addLiquidity (first provider)')
+def _(world, a0, a1, a2):
+    exchange = _new_exchange(world)
+    return exchange.functions.addLiquidity(0, 10**18, DEADLINE).transact({'value': 10**18})
+
+
+@case('exchange.addLiquidity')
+def _(world, a0, a1, a2):
+    world.HAY_token.approve(world.HAY_exchange.address, 10*10**18, transact={})
+    return world.HAY_exchange.addLiquidity(1, 10*10**18, DEADLINE, transact={'value': 10**18})
+
+
+@case('exchange.removeLiquidity')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.removeLiquidity(10**18, 1, 1, DEADLINE, transact={})
+
+
+@case('exchange.__default__')
+def _(world, a0, a1, a2):
+    return world.w3.eth.sendTransaction({'to': world.HAY_exchange.address, 'value': 10**18, 'from': a1})
+
+
+@case('exchange.ethToTokenSwapInput')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+
+
+@case('exchange.ethToTokenTransferInput')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.ethToTokenTransferInput(1, DEADLINE, a2, transact={'value': 10**18, 'from': a1})
+
+
+@case('exchange.ethToTokenSwapOutput')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.ethToTokenSwapOutput(10**18, DEADLINE, transact={'value': 10**18, 'from': a1})
+
+
+@case('exchange.ethToTokenTransferOutput')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.ethToTokenTransferOutput(10**18, DEADLINE, a2, transact={'value': 10**18, 'from': a1})
+
+
+@case('exchange.tokenToEthSwapInput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToEthSwapInput(2*10**18, 1, DEADLINE, transact={'from': a1})
+
+
+@case('exchange.tokenToEthTransferInput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToEthTransferInput(2*10**18, 1, DEADLINE, a2, transact={'from': a1})
+
+
+@case('exchange.tokenToEthSwapOutput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToEthSwapOutput(10**18, 10*10**18, DEADLINE, transact={'from': a1})
+
+
+@case('exchange.tokenToEthTransferOutput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToEthTransferOutput(10**18, 10*10**18, DEADLINE, a2, transact={'from': a1})
+
+
+@case('exchange.tokenToTokenSwapInput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    _swap_to_den(world)
+    return world.HAY_exchange.tokenToTokenSwapInput(2*10**18, 1, 1, DEADLINE, world.DEN_token.address,
+                                                    transact={'from': a1})
+
+
+@case('exchange.tokenToTokenSwapInput (first to DEN)')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToTokenSwapInput(2*10**18, 1, 1, DEADLINE, world.DEN_token.address,
+                                                    transact={'from': a1})
+
+
+@case('exchange.tokenToTokenTransferInput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    _swap_to_den(world)
+    return world.HAY_exchange.tokenToTokenTransferInput(2*10**18, 1, 1, DEADLINE, a2, world.DEN_token.address,
+                                                        transact={'from': a1})
+
+
+@case('exchange.tokenToTokenSwapOutput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    _swap_to_den(world)
+    return world.HAY_exchange.tokenToTokenSwapOutput(10**18, 10*10**18, 10*10**18, DEADLINE, world.DEN_token.address,
+                                                     transact={'from': a1})
+
+
+@case('exchange.tokenToTokenTransferOutput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    _swap_to_den(world)
+    return world.HAY_exchange.tokenToTokenTransferOutput(10**18, 10*10**18, 10*10**18, DEADLINE, a2,
+                                                         world.DEN_token.address, transact={'from': a1})
+
+
+@case('exchange.tokenToExchangeSwapInput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToExchangeSwapInput(2*10**18, 1, 1, DEADLINE, world.DEN_exchange.address,
+                                                       transact={'from': a1})
+
+
+@case('exchange.tokenToExchangeTransferInput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToExchangeTransferInput(2*10**18, 1, 1, DEADLINE, a2, world.DEN_exchange.address,
+                                                           transact={'from': a1})
+
+
+@case('exchange.tokenToExchangeSwapOutput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToExchangeSwapOutput(10**18, 10*10**18, 10*10**18, DEADLINE,
+                                                        world.DEN_exchange.address, transact={'from': a1})
+
+
+@case('exchange.tokenToExchangeTransferOutput')
+def _(world, a0, a1, a2):
+    _fund_tokens(world, a1)
+    return world.HAY_exchange.tokenToExchangeTransferOutput(10**18, 10*10**18, 10*10**18, DEADLINE, a2,
+                                                            world.DEN_exchange.address, transact={'from': a1})
+
+
+@case('exchange.transfer')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.transfer(a1, 10**18, transact={})
+
+
+@case('exchange.approve')
+def _(world, a0, a1, a2):
+    return world.HAY_exchange.approve(a1, 10**18, transact={})
+
+
+@case('exchange.transferFrom')
+def _(world, a0, a1, a2):
+    world.HAY_exchange.approve(a1, 10**18, transact={})
+    return world.HAY_exchange.transferFrom(a0, a2, 10**18, transact={'from': a1})
+
+
+def measure(world=None, exchange=EXCHANGES[0]):
+    """ Return {case name: gasUsed}, running every case from the seeded snapshot. """
+    if world is None:
+        world = World(exchange)
+    a0, a1, a2 = world.w3.eth.accounts[:3]
+    gas = OrderedDict()
+    for name, fn in CASES.items():
+        world.tester.revert_to_snapshot(world.snapshots['DEN_exchange'])
+        gas[name] = world.w3.eth.getTransactionReceipt(fn(world, a0, a1, a2)).gasUsed
+    return gas
+
+
+def load_baseline(path=BASELINE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(gas, path=BASELINE):
+    with open(path, 'w') as f:
+        json.dump({'vyper': artifacts.vyper_version(), 'gas': gas}, f, indent=2)
+        f.write('\n')
+
+
+def regressions(gas, baseline, threshold=THRESHOLD):
+    """ Names of the cases that use more than baseline * (1 + threshold). """
+    return [name for name, used in gas.items()
+            if name in baseline and used > baseline[name] * (1 + threshold)]
+
+
+def table(gas, baseline, threshold=THRESHOLD):
+    regressed = set(regressions(gas, baseline, threshold))
+    lines = ['%-44s %10s %10s %8s' % ('function', 'baseline', 'gas', 'change')]
+    for name, used in gas.items():
+        if name in baseline:
+            change = '%+.2f%%' % ((used - baseline[name]) * 100.0 / baseline[name])
+            lines.append('%-44s %10d %10d %8s%s' % (name, baseline[name], used, change, ' !' if name in regressed else ''))
+        else:
+            lines.append('%-44s %10s %10d %8s' % (name, '-', used, 'new'))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gas used by the exchange and factory entry points.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed relative increase over the baseline (default %(default)s)')
+    parser.add_argument('--update', action='store_true', help='write the measured gas to the baseline file')
+    parser.add_argument('--exchange', choices=EXCHANGES, default=EXCHANGES[0], help='exchange template to measure')
+    args = parser.parse_args(argv)
+    if args.update and args.exchange != EXCHANGES[0]:
+        parser.error('the baseline is that of %s' % EXCHANGES[0])
+    gas = measure(exchange=args.exchange)
+    if args.update:
+        save_baseline(gas, args.baseline)
+    baseline = load_baseline(args.baseline)
+    print('%s, vyper %s (baseline: %s, vyper %s)' % (
+        os.path.basename(args.exchange), artifacts.vyper_version(), os.path.basename(EXCHANGES[0]), baseline['vyper']))
+    print(table(gas, baseline['gas'], args.threshold))
+    if regressions(gas, baseline['gas'], args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
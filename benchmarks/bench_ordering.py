@@ -0,0 +1,100 @@
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+from uniswap import genesis, ordering
+from uniswap.fuzz import FAR, Op
+from uniswap.ordering import Simulator
+
+'''
+Orderings per second of uniswap.ordering on the model and on py-evm, and the
+report it gives for one swap among random pending ones:
+
+# python -m benchmarks.bench_ordering --pending 6 --samples 5000 --processes 4
+
+The pending swaps are drawn from --seed over two pools, every kind of swap by
+a few accounts, each trading up to a fifth of a reserve; ours buys HAY with
+1 ETH. The model rate counts every ordering evaluate() covers, each distinct
+prefix before ours run once; the py-evm rate is confirm(), which runs one
+whole ordering on py-evm and on the model and compares them.
+'''
+
+PENDING = 6
+SAMPLES = 5000
+RESERVES = {'HAY': (10 * 10**18, 20 * 10**18), 'DEN': (5 * 10**18, 50 * 10**18)}
+OURS = Op('ethToTokenSwapInput', 'HAY', 0, (1, FAR), 10**18)
+FRACTIONS = (0.5, 0.9, 0.99, 1.0)
+
+
+def pending(count, seed=0):
+    """ count random swaps on RESERVES' pools by accounts 1 to 3. """
+    rng = random.Random(seed)
+    ops = []
+    for _ in range(count):
+        symbol, other = rng.sample(sorted(RESERVES), 2)
+        eth, tokens = RESERVES[symbol]
+        size = 10 ** rng.uniform(-3, 0) / 5
+        sender = rng.randrange(1, ordering.ACCOUNTS)
+        method = rng.choice(['ethToTokenSwapInput', 'ethToTokenSwapOutput', 'tokenToEthSwapInput',
+                             'tokenToEthSwapOutput', 'tokenToTokenSwapInput'])
+        if method == 'ethToTokenSwapInput':
+            ops.append(Op(method, symbol, sender, (1, FAR), int(eth * size)))
+        elif method == 'ethToTokenSwapOutput':
+            ops.append(Op(method, symbol, sender, (int(tokens * size), FAR), eth))
+        elif method == 'tokenToEthSwapInput':
+            ops.append(Op(method, symbol, sender, (int(tokens * size), 1, FAR), 0))
+        elif method == 'tokenToEthSwapOutput':
+            ops.append(Op(method, symbol, sender, (int(eth * size), tokens, FAR), 0))
+        else:
+            ops.append(Op(method, symbol, sender, (int(tokens * size), 1, 1, FAR, ('token', other)), 0))
+    return ops
+
+
+def measure(count=PENDING, samples=SAMPLES, processes=None, seed=0):
+    """ (model orderings/s, py-evm orderings/s, simulate() orderings/s, Report). """
+    scenario = ordering.fork(RESERVES)
+    ops = pending(count, seed)
+    cache_dir = tempfile.mkdtemp()
+    world = genesis.World(genesis.cached(scenario, cache_dir))
+    simulator = Simulator(world.tester, world.addresses, scenario)
+    orders = ordering.orders(count, samples, seed)
+
+    start = time.perf_counter()
+    simulator.evaluate(OURS, ops, orders)
+    model_rate = len(orders) / (time.perf_counter() - start)
+    confirmed = orders[:20]
+    start = time.perf_counter()
+    for order in confirmed:
+        simulator.confirm(OURS, ops, order)
+    evm_rate = len(confirmed) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    report = ordering.simulate(scenario, OURS, ops, samples, seed, processes=processes, cache_dir=cache_dir)
+    parallel_rate = len(report.outcomes) / (time.perf_counter() - start)
+    return model_rate, evm_rate, parallel_rate, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Orderings per second and the report for one swap among pending ones.')
+    parser.add_argument('--pending', type=int, default=PENDING)
+    parser.add_argument('--samples', type=int, default=SAMPLES)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    model_rate, evm_rate, parallel_rate, report = measure(args.pending, args.samples, args.processes, args.seed)
+    print('%d pending swaps, %d orderings' % (args.pending, len(report.outcomes)))
+    print('%-34s %12.0f' % ('model orderings/s', model_rate))
+    print('%-34s %12.1f' % ('py-evm orderings/s (confirm)', evm_rate))
+    print('%-34s %12.0f' % ('simulate() orderings/s, end to end', parallel_rate))
+    print('%-34s %12d' % ('ours alone buys', report.baseline))
+    print('%-34s %12d  %r' % ('worst ordering buys', report.worst.quote, report.worst.order))
+    print('%-34s %11.2f%%' % ('worst slippage', report.slippage * 100))
+    for fraction in FRACTIONS:
+        print('%-34s %12d' % ('min_tokens filling %g%%' % (fraction * 100), ordering.limit(report, fraction)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
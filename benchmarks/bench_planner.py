@@ -0,0 +1,60 @@
+import argparse
+import random
+import sys
+import time
+
+from uniswap.planner import Planner, Refill
+
+'''
+Plans per second from uniswap.planner, and what each strategy gets:
+
+# python -m benchmarks.bench_planner --orders 2000 --horizon 10
+
+Each order sells between 1% and 30% of a random exchange's ETH reserve
+(or, with --token-to-token, of its token reserve into a second exchange)
+over --horizon blocks with --refill of the displacement undone per block.
+The output of twap and vwap is reported relative to optimal.
+'''
+
+ORDERS = 2000
+HORIZON = 10
+REFILL = 0.3
+
+
+def orders(count, token_to_token, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        eth = rng.randrange(10**20, 10**22)
+        reserves = [(eth, eth * rng.randrange(10, 10**4))]
+        size = eth * rng.randrange(1, 30) // 100
+        if token_to_token:
+            other = rng.randrange(10**20, 10**22)
+            reserves.append((other, other * rng.randrange(10, 10**4)))
+            size = reserves[0][1] * rng.randrange(1, 30) // 100
+        yield reserves, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Order-splitting plans per second.')
+    parser.add_argument('--orders', type=int, default=ORDERS)
+    parser.add_argument('--horizon', type=int, default=HORIZON)
+    parser.add_argument('--refill', type=float, default=REFILL, help='fraction of the displacement undone per block')
+    parser.add_argument('--token-to-token', action='store_true')
+    args = parser.parse_args(argv)
+    refill = Refill(args.refill)
+    work = list(orders(args.orders, args.token_to_token))
+    start = time.perf_counter()
+    plans = [Planner(reserves, refill=refill).optimal(size, args.horizon) for reserves, size in work]
+    elapsed = time.perf_counter() - start
+    print('optimal: %d orders in %.2f s, %.0f plans/s, %.0f child orders/s' % (
+        len(plans), elapsed, len(plans) / elapsed, sum(len(p.children) for p in plans) / elapsed))
+    for strategy in ('twap', 'vwap'):
+        shortfall = [1 - getattr(Planner(reserves, refill=refill), strategy)(size, args.horizon).output / p.output
+                     for (reserves, size), p in zip(work, plans)]
+        print('%s: %.4f%% less output than optimal on average, %.4f%% at most' % (
+            strategy, 100 * sum(shortfall) / len(shortfall), 100 * max(shortfall)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import random
+import timeit
+
+from uniswap import model
+from uniswap import quote
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+Compare quoting a batch of swaps one by one with uniswap.quote:
+
+# python -m benchmarks.bench_quote
+
+Rows come in three sizes: uint64-sized, wei-sized (reserves from 1e18 to
+1e24, as lists and as NumPy object arrays), and wei-sized within 64 bits
+(uint64 arrays whose products overflow, so their rows take the wide path).
+'''
+
+ROWS = 100000
+REPEAT = 5
+
+
+def report(name, seconds, rows):
+    print('%-36s %10.1f ns/row' % (name, seconds / rows * 1e9))
+
+
+def best(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT))
+
+
+def main():
+    random.seed(0)
+    # uint64-sized reserves, as for tokens with few decimals or small pools
+    amounts = [random.randrange(1, 10**6) for _ in range(ROWS)]
+    input_reserves = [random.randrange(10**6, 10**8) for _ in range(ROWS)]
+    output_reserves = [random.randrange(10**6, 10**8) for _ in range(ROWS)]
+    # wei-sized: amounts up to 1e21, reserves from 1e18 to 1e24
+    wei = ([random.randrange(10**15, 10**21) for _ in range(ROWS)],
+           [random.randrange(10**18, 10**24) for _ in range(ROWS)],
+           [random.randrange(10**18, 10**24) for _ in range(ROWS)])
+    # wei-sized but within uint64: reserves up to 18 ETH
+    small_wei = ([random.randrange(10**15, 10**18) for _ in range(ROWS)],
+                 [random.randrange(10**18, 10**19) for _ in range(ROWS)],
+                 [random.randrange(10**18, 10**19) for _ in range(ROWS)])
+
+    report('model.get_input_price per row', best(lambda: [
+        model.get_input_price(a, i, o) for a, i, o in zip(amounts, input_reserves, output_reserves)]), ROWS)
+    report('quote.input_prices (lists)', best(lambda: quote.input_prices(amounts, input_reserves, output_reserves)), ROWS)
+    report('quote.output_prices (lists)', best(lambda: quote.output_prices(amounts, input_reserves, output_reserves)), ROWS)
+    report('model.get_input_price per row (wei)', best(lambda: [
+        model.get_input_price(a, i, o) for a, i, o in zip(*wei)]), ROWS)
+    report('quote.input_prices (wei lists)', best(lambda: quote.input_prices(*wei)), ROWS)
+    report('quote.output_prices (wei lists)', best(lambda: quote.output_prices(*wei)), ROWS)
+    if numpy is None:
+        print('numpy not installed, skipping the vectorized path')
+        return
+    columns = [numpy.array(c, dtype=numpy.uint64) for c in (amounts, input_reserves, output_reserves)]
+    report('quote.input_prices (numpy)', best(lambda: quote.input_prices(*columns)), ROWS)
+    report('quote.output_prices (numpy)', best(lambda: quote.output_prices(*columns)), ROWS)
+    wide = [numpy.array(c, dtype=object) for c in wei]
+    report('quote.input_prices (wei, numpy object)', best(lambda: quote.input_prices(*wide)), ROWS)
+    report('quote.output_prices (wei, numpy object)', best(lambda: quote.output_prices(*wide)), ROWS)
+    report('quote.input_prices (small wei lists)', best(lambda: quote.input_prices(*small_wei)), ROWS)
+    columns = [numpy.array(c, dtype=numpy.uint64) for c in small_wei]
+    report('quote.input_prices (small wei, numpy)', best(lambda: quote.input_prices(*columns)), ROWS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from web3 import Web3
+
+from uniswap import artifacts, factory
+from uniswap.registry import Registry
+from uniswap.world import World
+
+'''
+Resolve the exchanges of a factory through uniswap.registry against asking
+the factory:
+
+# python -m benchmarks.bench_registry --exchanges 2000 --lookups 1000
+
+A factory of placeholder tokens is built with createExchanges. Startup is a
+cold bootstrap (every NewExchange log from block 0) against a restart (open
+the file, sync the blocks since), both also set against listing the factory
+with getExchangesWithIds pages, the cheapest scan it offers. Lookups resolve
+the same tokens with Registry.exchange_of and with a getExchange eth_call
+each, given its gas so it is not estimated first, and check they agree.
+Time is wall-clock on py-evm; a node over the network adds a round trip to
+every call and none to a registry lookup.
+'''
+
+EXCHANGES = 1000
+LOOKUPS = 200
+
+
+def _tokens(count):
+    return [Web3.toChecksumAddress('0x%040x' % (0xbeef << 128 | i)) for i in range(1, count + 1)]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def measure(count=EXCHANGES, lookups=LOOKUPS, world=None):
+    """ {row: (factory, registry)} for count exchanges: ms for startup and per lookup, lookups per second. """
+    if world is None:
+        world = World()
+    w3 = world.w3
+    contract = w3.eth.contract(address=factory.deploy(w3, world.exchange_template.address),
+                               abi=artifacts.load(factory.FACTORY).abi)
+    tokens = _tokens(count)
+    factory.create_exchanges(contract, tokens)
+    rows = OrderedDict()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'registry.sqlite')
+        registry = Registry(w3, contract.address, path)
+        _, bootstrap = _timed(registry.sync)
+        registry.close()
+        def restart():
+            registry = Registry(w3, contract.address, path)
+            registry.sync()
+            return registry
+        registry, restarted = _timed(restart)
+        listed, scan = _timed(lambda: list(factory.pairs(contract)))
+        assert len(registry) == len(listed) == count
+
+        sample = [tokens[i * count // lookups] for i in range(lookups)]
+        call = {'gas': factory.CALL_GAS}
+        called, calls = _timed(lambda: [contract.functions.getExchange(t).call(call) for t in sample])
+        resolved, local = _timed(lambda: [registry.exchange_of(t) for t in sample])
+        assert called == resolved
+        registry.close()
+    finally:
+        shutil.rmtree(directory)
+
+    rows['startup: cold ms'] = (scan * 1000, bootstrap * 1000)
+    rows['startup: restart ms'] = (scan * 1000, restarted * 1000)
+    rows['lookup: ms'] = (calls * 1000 / lookups, local * 1000 / lookups)
+    rows['lookup: per second'] = (lookups / calls, lookups / local)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exchange lookups through a local registry and through the factory.')
+    parser.add_argument('--exchanges', type=int, default=EXCHANGES)
+    parser.add_argument('--lookups', type=int, default=LOOKUPS)
+    args = parser.parse_args(argv)
+    rows = measure(args.exchanges, args.lookups)
+    print('%d exchanges, %d lookups' % (args.exchanges, args.lookups))
+    print('%-22s %14s %14s' % ('', 'factory', 'registry'))
+    for name, (called, local) in rows.items():
+        print('%-22s %14.3f %14.3f' % (name, called, local))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
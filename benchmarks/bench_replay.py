@@ -0,0 +1,55 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from uniswap import synthetic
+from uniswap.indexer import Indexer
+from uniswap.replay import Replay
+
+'''
+Replay speed of uniswap.replay over a synthetic history:
+
+# python -m benchmarks.bench_replay --events 1000000
+
+uniswap.synthetic writes the rows the indexer would have stored for random
+swaps and liquidity changes on uniswap.model exchanges, one block per action,
+into a temporary indexer database; the benchmark times a full replay (events
+per second), then at() lookups at random blocks.
+'''
+
+EVENTS_DEFAULT = 200000
+LOOKUPS = 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Events per second replayed by uniswap.replay.')
+    parser.add_argument('--events', type=int, default=EVENTS_DEFAULT)
+    parser.add_argument('--pools', type=int, default=synthetic.POOLS)
+    parser.add_argument('--interval', type=int, default=1000, help='events per exchange between checkpoints')
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as directory:
+        indexer = Indexer(None, '0x' + '00' * 20, os.path.join(directory, 'history.sqlite'))
+        start = time.perf_counter()
+        last = synthetic.write(indexer, args.pools, args.events)
+        print('%d events in %d blocks, written in %.1f s' % (args.events, last, time.perf_counter() - start))
+        replay = Replay(indexer, args.interval)
+        start = time.perf_counter()
+        events, inexact = replay.run()
+        elapsed = time.perf_counter() - start
+        print('replay    %10.1f s  %10.0f events/s  (%d inexact)' % (elapsed, events / elapsed, inexact))
+        rng = random.Random(1)
+        exchanges = [e.exchange for e in indexer.exchanges()]
+        start = time.perf_counter()
+        for _ in range(LOOKUPS):
+            replay.at(rng.choice(exchanges), rng.randrange(1, last + 1))
+        elapsed = time.perf_counter() - start
+        print('at()      %10.2f ms per lookup' % (elapsed / LOOKUPS * 1000))
+        indexer.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import argparse
+import sys
+from collections import namedtuple
+
+from uniswap import artifacts, router
+from uniswap.router import BatchBuilder
+from uniswap.world import DEADLINE, World
+
+'''
+Gas and blocks per rebalancing cycle, one transaction per swap against one
+batchSwap through uniswap_router.vy:
+
+# python -m benchmarks.bench_router --cycles 3
+
+Both run the same six legs, every kind once, on the HAY and DEN exchanges of
+the uniswap.world World, from the same snapshot: one account sends the swaps
+with its approvals of both exchanges already given, the other is a router
+holding a deposit of ETH and both tokens. The router's first cycle also pays
+for looking up and approving the exchanges; later cycles are what a rebalancer
+pays from then on.
+'''
+
+CYCLES = 3
+ALLOWANCE = 10**30
+DEPOSIT = 10**20
+MAX_ETH = 10**30
+
+# (builder method, token, target, amount)
+CYCLE = [
+    ('token_to_eth', 'HAY', None, 2 * 10**18),
+    ('eth_to_token', 'DEN', None, 10**18),
+    ('token_to_token_output', 'HAY', 'DEN', 10**18),
+    ('eth_to_token_output', 'HAY', None, 10**17),
+    ('token_to_eth_output', 'DEN', None, 10**17),
+    ('token_to_token', 'DEN', 'HAY', 3 * 10**18),
+]
+
+Cycle = namedtuple('Cycle', ['gas', 'transactions'])
+
+
+def _builder(world):
+    w3 = world.w3
+    reserves = {}
+    for name in ('HAY', 'DEN'):
+        exchange = getattr(world, name + '_exchange')
+        reserves[getattr(world, name + '_token').address] = (
+            w3.eth.getBalance(exchange.address), getattr(world, name + '_token').balanceOf(exchange.address))
+    return BatchBuilder(reserves)
+
+
+def _separate(world, method, token, target, amount):
+    # quote the leg on the reserves it will find and send it to the exchange itself
+    builder = _builder(world)
+    getattr(builder, method)(*[getattr(world, t + '_token').address for t in (token, target) if t] + [amount])
+    return router.send(world.w3, getattr(world, token + '_exchange').address, builder.legs[0], DEADLINE, MAX_ETH)
+
+
+def measure(world=None, cycles=CYCLES):
+    """ Return ([Cycle] sending each swap alone, [Cycle] batched), cycles of each from the seeded snapshot. """
+    if world is None:
+        world = World()
+    w3 = world.w3
+    tokens = (world.HAY_token, world.DEN_token)
+    receipt = w3.eth.getTransactionReceipt
+
+    world.tester.revert_to_snapshot(world.snapshots['DEN_exchange'])
+    for token in tokens:
+        for exchange in (world.HAY_exchange, world.DEN_exchange):
+            token.approve(exchange.address, ALLOWANCE, transact={})
+    separate = []
+    for _ in range(cycles):
+        hashes = [_separate(world, *leg) for leg in CYCLE]
+        separate.append(Cycle(sum(receipt(h).gasUsed for h in hashes), len(hashes)))
+
+    world.tester.revert_to_snapshot(world.snapshots['DEN_exchange'])
+    contract = w3.eth.contract(address=router.deploy(w3, world.factory.address), abi=artifacts.load(router.ROUTER).abi)
+    for token in tokens:
+        token.transfer(contract.address, DEPOSIT, transact={})
+    w3.eth.sendTransaction({'to': contract.address, 'value': DEPOSIT})
+    batched = []
+    for _ in range(cycles):
+        builder = _builder(world)
+        for method, token, target, amount in CYCLE:
+            getattr(builder, method)(*[getattr(world, t + '_token').address for t in (token, target) if t] + [amount])
+        batch = builder.build(DEADLINE)
+        tx_hash = contract.functions.batchSwap(*batch.args).transact()
+        batched.append(Cycle(receipt(tx_hash).gasUsed, 1))
+    return separate, batched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gas per rebalancing cycle with and without uniswap_router.vy.')
+    parser.add_argument('--cycles', type=int, default=CYCLES)
+    args = parser.parse_args(argv)
+    separate, batched = measure(cycles=args.cycles)
+    print('%d legs per cycle' % len(CYCLE))
+    print('%-6s %22s %22s %8s' % ('cycle', 'separate gas (txs)', 'batched gas (txs)', 'saved'))
+    for i, (alone, batch) in enumerate(zip(separate, batched)):
+        print('%-6d %14d (%5d) %14d (%5d) %7.1f%%' % (
+            i + 1, alone.gas, alone.transactions, batch.gas, batch.transactions,
+            (alone.gas - batch.gas) * 100.0 / alone.gas))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
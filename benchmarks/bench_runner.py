@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+from uniswap.runner import Runner
+from uniswap.world import DEADLINE
+
+'''
+Throughput of uniswap.runner as the number of worker processes grows.
+
+# default (1, 2, 4, ... cores):  python -m benchmarks.bench_runner
+# explicit:                       python -m benchmarks.bench_runner --processes 1 8 --simulations 400
+
+Each simulation is a short backtest: a seeded sequence of swaps in both
+directions across the scenario's exchanges, with explicit gas so no
+eth_estimateGas runs. Workers start and warm up before the clock starts.
+'''
+
+POOLS = 10
+SIMULATIONS = 200
+SWAPS = 5
+
+SCENARIO = {
+    'tokens': [{'symbol': 'T%d' % i, 'balances': {0: 10**24}, 'allowances': {0: 10**24}} for i in range(POOLS)],
+    'pools': [{'token': 'T%d' % i, 'eth_reserve': 100*10**18, 'token_reserve': 200*10**18} for i in range(POOLS)],
+}
+
+
+def simulate(world, seed):
+    rng = random.Random(seed)
+    for _ in range(SWAPS):
+        exchange = world.exchange('T%d' % rng.randrange(POOLS)).functions
+        amount = rng.randrange(10**16, 10**18)
+        if rng.random() < 0.5:
+            exchange.ethToTokenSwapInput(1, DEADLINE).transact({'value': amount, 'gas': 10**6})
+        else:
+            exchange.tokenToEthSwapInput(amount, 1, DEADLINE).transact({'gas': 10**6})
+    return seed
+
+
+def warmup(world):
+    simulate(world, -1)
+
+
+def throughput(processes, simulations):
+    """ Simulations per second with processes workers. """
+    with Runner(simulate, SCENARIO, processes=processes, warmup=warmup) as runner:
+        # a first round, untimed, so the workers have started and warmed up
+        list(runner.run(range(2 * processes)))
+        start = time.perf_counter()
+        results = list(runner.run(range(simulations)))
+        elapsed = time.perf_counter() - start
+    errors = [r for r in results if r.error]
+    if errors:
+        raise RuntimeError(errors[0].error)
+    return simulations / elapsed
+
+
+def main(argv=None):
+    cores = os.cpu_count()
+    default = sorted({1, cores} | {2**i for i in range(1, cores.bit_length()) if 2**i <= cores})
+    parser = argparse.ArgumentParser(description='Simulations per second of uniswap.runner by process count.')
+    parser.add_argument('--processes', type=int, nargs='+', default=default)
+    parser.add_argument('--simulations', type=int, default=SIMULATIONS)
+    args = parser.parse_args(argv)
+    print('%d cores' % cores)
+    print('%10s %12s %8s' % ('processes', 'sims/s', 'speedup'))
+    base = None
+    for processes in args.processes:
+        rate = throughput(processes, args.simulations)
+        base = base or rate
+        print('%10d %12.1f %7.2fx' % (processes, rate, rate / base))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from web3 import Web3
+
+from uniswap import artifacts, genesis
+from uniswap.factory import CALL_GAS, CREATE_BATCH, PAGE_SIZE, create_exchanges
+from uniswap.world import DEADLINE, HAY_RESERVE, World, deploy_contract, deploy_exchange, deploy_factory
+
+'''
+Wall-clock time of the Python stack the tests and simulations run on.
+
+# run and save:            python -m benchmarks.bench_wall --output wall.json
+# compare two runs:        python -m benchmarks.bench_wall --compare old.json new.json
+# quick run:               python -m benchmarks.bench_wall --repeat 5 --exchanges 2 10
+
+Each entry is timed repeat times and reported as percentiles in milliseconds,
+then run once more under tracemalloc for the number of blocks allocated and
+the peak traced memory. Imports are timed in fresh interpreters.
+
+Swaps go through ConciseContract with transact={} as the tests do, so their
+latency includes eth_estimateGas. Scaling entries create exchanges for
+placeholder token addresses with a fixed gas limit, and build each factory
+with uniswap.factory.create_exchanges, 20 exchanges per transaction; a page
+of getExchangesWithIds is called with uniswap.factory.CALL_GAS, as the
+helpers call it. Genesis entries build a uniswap.genesis image of the same
+size once, then time reading it from disk and loading it into a fresh
+EthereumTester.
+'''
+
+REPEAT = 20
+EXCHANGES = (2, 10, 100, 1000)
+CREATE_GAS = 300000
+
+IMPORTS = OrderedDict([
+    ('import vyper.compiler', 'import vyper.compiler'),
+    ('import web3', 'import web3'),
+    ('import eth_tester', 'from eth_tester import EthereumTester, PyEVMBackend'),
+])
+
+
+def percentile(samples, q):
+    """ Nearest-rank percentile of samples, q in [0, 100]. """
+    ordered = sorted(samples)
+    return ordered[max(1, int(math.ceil(q / 100.0 * len(ordered)))) - 1]
+
+
+def summarize(samples):
+    ms = [s * 1000 for s in samples]
+    return OrderedDict([
+        ('n', len(ms)),
+        ('min', min(ms)),
+        ('p50', percentile(ms, 50)),
+        ('p90', percentile(ms, 90)),
+        ('p99', percentile(ms, 99)),
+        ('max', max(ms)),
+        ('mean', sum(ms) / len(ms)),
+    ])
+
+
+def allocations(fn, setup=None):
+    """ Blocks allocated and peak traced KiB for one call of fn. """
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        fn()
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return OrderedDict([('alloc_blocks', blocks), ('peak_kib', peak / 1024.0)])
+
+
+def bench(fn, repeat=REPEAT, setup=None, trace=True):
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    result = summarize(samples)
+    if trace:
+        result.update(allocations(fn, setup))
+    return result
+
+
+def time_import(statement):
+    script = 'import time; t = time.perf_counter(); %s; print(time.perf_counter() - t)' % statement
+    return float(subprocess.check_output([sys.executable, '-c', script]).decode().split()[-1])
+
+
+def bench_imports(results, repeat):
+    for name, statement in IMPORTS.items():
+        samples = [time_import(statement) for _ in range(repeat)]
+        results[name] = summarize(samples)
+
+
+def bench_compile(results, repeat):
+    for path in ('contracts/uniswap_exchange.vy', 'contracts/uniswap_factory.vy', 'contracts/test_contracts/ERC20.vy'):
+        source = artifacts._read(path)
+        results['compile %s' % path] = bench(lambda: artifacts._compile(source), repeat)
+
+
+def bench_fixtures(results, repeat):
+    from eth_tester import EthereumTester, PyEVMBackend
+    results['EthereumTester()'] = bench(lambda: EthereumTester(backend=PyEVMBackend()), repeat)
+    world = World()
+    w3 = world.w3
+    revert = lambda: world.tester.revert_to_snapshot(world.snapshots['contracts'])
+    results['deploy exchange_template'] = bench(lambda: deploy_contract(w3, 'contracts/uniswap_exchange.vy'), repeat, revert)
+    results['deploy factory'] = bench(lambda: deploy_factory(w3, world.exchange_template), repeat, revert)
+    results['deploy HAY_token'] = bench(
+        lambda: deploy_contract(w3, 'contracts/test_contracts/ERC20.vy', b'HAY Token', b'HAY', 18, 100000*10**18),
+        repeat, revert)
+    results['deploy HAY_exchange'] = bench(
+        lambda: deploy_exchange(w3, world.factory, world.HAY_token, HAY_RESERVE), repeat, revert)
+    results['World()'] = bench(World, max(1, repeat // 4))
+
+
+def swaps(world, a1, a2):
+    HAY, DEN = world.HAY_exchange, world.DEN_exchange
+    return OrderedDict([
+        ('ethToTokenSwapInput', lambda: HAY.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})),
+        ('ethToTokenTransferOutput', lambda: HAY.ethToTokenTransferOutput(
+            10**17, DEADLINE, a2, transact={'value': 10**18, 'from': a1})),
+        ('tokenToEthSwapInput', lambda: HAY.tokenToEthSwapInput(10**18, 1, DEADLINE, transact={'from': a1})),
+        ('tokenToEthTransferOutput', lambda: HAY.tokenToEthTransferOutput(
+            10**17, 10**19, DEADLINE, a2, transact={'from': a1})),
+        ('tokenToTokenSwapInput', lambda: HAY.tokenToTokenSwapInput(
+            10**18, 1, 1, DEADLINE, world.DEN_token.address, transact={'from': a1})),
+        ('tokenToExchangeTransferOutput', lambda: HAY.tokenToExchangeTransferOutput(
+            10**17, 10**19, 10**19, DEADLINE, a2, DEN.address, transact={'from': a1})),
+        ('getEthToTokenInputPrice (call)', lambda: HAY.getEthToTokenInputPrice(10**18)),
+    ])
+
+
+def _funded(world):
+    """ Give a1 HAY and approve the HAY exchange, and snapshot that state. """
+    a1 = world.w3.eth.accounts[1]
+    world.tester.revert_to_snapshot(world.snapshots['DEN_exchange'])
+    world.HAY_token.transfer(a1, 100*10**18, transact={})
+    world.HAY_token.approve(world.HAY_exchange.address, 100*10**18, transact={'from': a1})
+    world.snapshot('funded')
+
+
+def bench_swaps(results, repeat):
+    world = World()
+    _funded(world)
+    a1, a2 = world.w3.eth.accounts[1:3]
+    revert = lambda: world.tester.revert_to_snapshot(world.snapshots['funded'])
+    for name, fn in swaps(world, a1, a2).items():
+        results['swap %s' % name] = bench(fn, repeat, revert)
+
+
+def bench_scaling(results, repeat, sizes):
+    world = World()
+    _funded(world)
+    w3 = world.w3
+    factory = world.w3.eth.contract(address=world.factory.address,
+                                    abi=artifacts.load('contracts/uniswap_factory.vy').abi)
+    a1 = w3.eth.accounts[1]
+    count = factory.functions.tokenCount().call()
+    for size in sorted(sizes):
+        if count < size:
+            create_exchanges(factory, [Web3.toChecksumAddress('0x%040x' % (0xf00d << 128 | i))
+                                       for i in range(count + 1, size + 1)])
+            count = size
+        world.snapshot('scaling')
+        revert = lambda: world.tester.revert_to_snapshot(world.snapshots['scaling'])
+        last = factory.functions.getTokenWithId(count).call()
+        next_tokens = [Web3.toChecksumAddress('0x%040x' % (0xbeef << 128 | count + i)) for i in range(CREATE_BATCH)]
+        results['%d exchanges: createExchange' % size] = bench(
+            lambda: factory.functions.createExchange(next_tokens[0]).transact({'gas': CREATE_GAS}), repeat, revert, trace=False)
+        results['%d exchanges: createExchanges (%d)' % (size, CREATE_BATCH)] = bench(
+            lambda: factory.functions.createExchanges(next_tokens).transact({'gas': CREATE_GAS * CREATE_BATCH}),
+            repeat, revert, trace=False)
+        results['%d exchanges: getExchange (call)' % size] = bench(
+            lambda: factory.functions.getExchange(last).call(), repeat, trace=False)
+        results['%d exchanges: getExchangesWithIds (call)' % size] = bench(
+            lambda: factory.functions.getExchangesWithIds(max(count - PAGE_SIZE, 0) + 1, PAGE_SIZE).call({'gas': CALL_GAS}),
+            repeat, trace=False)
+        results['%d exchanges: ethToTokenSwapInput' % size] = bench(
+            lambda: world.HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1}),
+            repeat, revert, trace=False)
+
+
+def bench_genesis(results, repeat, sizes):
+    path = os.path.join(tempfile.gettempdir(), 'bench_wall_genesis.%d.img' % os.getpid())
+    for size in sorted(sizes):
+        scenario = {
+            'tokens': [{'symbol': 'T%d' % i, 'balances': {1: 10**21}, 'allowances': {1: 10**21}} for i in range(size)],
+            'pools': [{'token': 'T%d' % i, 'eth_reserve': 5*10**18, 'token_reserve': 10*10**18} for i in range(size)],
+        }
+        start = time.perf_counter()
+        genesis.Image.build(scenario).save(path)
+        results['%d exchanges: genesis build' % size] = summarize([time.perf_counter() - start])
+        results['%d exchanges: genesis read' % size] = bench(lambda: genesis.Image.read(path), repeat, trace=False)
+        image = genesis.Image.read(path)
+        results['%d exchanges: genesis load' % size] = bench(image.load, repeat, trace=False)
+    os.remove(path)
+
+
+def run(repeat=REPEAT, sizes=EXCHANGES, sections=None):
+    results = OrderedDict()
+    benches = OrderedDict([
+        ('imports', lambda: bench_imports(results, max(1, repeat // 4))),
+        ('compile', lambda: bench_compile(results, max(1, repeat // 4))),
+        ('fixtures', lambda: bench_fixtures(results, repeat)),
+        ('swaps', lambda: bench_swaps(results, repeat)),
+        ('scaling', lambda: bench_scaling(results, repeat, sizes)),
+        ('genesis', lambda: bench_genesis(results, repeat, sizes)),
+    ])
+    for name, fn in benches.items():
+        if sections is None or name in sections:
+            fn()
+    import eth_tester
+    import vyper
+    import web3
+    return OrderedDict([
+        ('python', platform.python_version()),
+        ('vyper', vyper.__version__),
+        ('web3', web3.__version__),
+        ('eth_tester', eth_tester.__version__),
+        ('results', results),
+    ])
+
+
+def table(results):
+    lines = ['%-48s %6s %9s %9s %9s %12s' % ('ms', 'n', 'p50', 'p90', 'p99', 'alloc blocks')]
+    for name, r in results.items():
+        lines.append('%-48s %6d %9.2f %9.2f %9.2f %12s' % (
+            name, r['n'], r['p50'], r['p90'], r['p99'], r.get('alloc_blocks', '-')))
+    return '\n'.join(lines)
+
+
+def compare(old, new):
+    lines = ['%-48s %9s %9s %8s' % ('p50 ms', 'old', 'new', 'ratio')]
+    for name, r in new.items():
+        if name in old:
+            lines.append('%-48s %9.2f %9.2f %7.2fx' % (name, old[name]['p50'], r['p50'], r['p50'] / old[name]['p50']))
+        else:
+            lines.append('%-48s %9s %9.2f %8s' % (name, '-', r['p50'], 'new'))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Wall-clock benchmarks of the Python test and simulation stack.')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--exchanges', type=int, nargs='+', default=list(EXCHANGES),
+                        help='factory sizes for the scaling entries')
+    parser.add_argument('--only', nargs='+', choices=['imports', 'compile', 'fixtures', 'swaps', 'scaling', 'genesis'])
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved runs')
+    args = parser.parse_args(argv)
+    if args.compare:
+        old, new = [json.load(open(path))['results'] for path in args.compare]
+        print(compare(old, new))
+        return 0
+    report = run(args.repeat, args.exchanges, args.only)
+    print(table(report['results']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
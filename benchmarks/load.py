@@ -0,0 +1,286 @@
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter, OrderedDict
+
+from eth_utils import encode_hex
+from web3 import Web3
+
+from uniswap import genesis, rpc
+from uniswap.world import DEADLINE
+
+from benchmarks.bench_wall import percentile
+
+'''
+Mixed traffic from many traders and liquidity providers against one factory.
+
+# in-process tester:        python -m benchmarks.load --accounts 100 --pools 10 --blocks 20 --per-block 50
+# through JSON-RPC:         python -m benchmarks.load --rpc
+# custom mix:               python -m benchmarks.load --mix eth_to_token=5 token_to_token=1 transfer=1
+
+The world is a uniswap.genesis scenario: every account holds each test
+ERC20.vy token, has approved every exchange and owns some UNI of every pool.
+Each block gets per-block transactions, drawn from the mix with a seeded RNG
+(an action, a random account, exchange and amount), then is mined; the
+transactions are built before the clock starts.
+
+In-process, transactions go straight to the py-evm backend, so each one runs
+once, into the pending block (with automatic mining off, EthereumTester would
+run each one a second time when mining). With --rpc the same traffic goes to
+a uniswap.rpc server on localhost over HTTP: miner_stop, eth_sendTransaction
+per transaction, evm_mine per block.
+
+Reported: transactions per second over the send and mine time, gas used and
+transactions per block, and failures by action and reason (reverted, out of
+gas, or the error the endpoint raised when sending).
+'''
+
+MIX = OrderedDict([
+    ('eth_to_token', 30),
+    ('token_to_eth', 30),
+    ('token_to_token', 20),
+    ('add_liquidity', 5),
+    ('remove_liquidity', 5),
+    ('transfer', 10),
+])
+ACCOUNTS = 100
+POOLS = 10
+BLOCKS = 20
+PER_BLOCK = 50
+GAS = 500000
+
+TOKEN_BALANCE = 10**24
+ETH_RESERVE = 1000*10**18
+TOKEN_RESERVE = 2000*10**18
+
+
+def scenario(accounts=ACCOUNTS, pools=POOLS):
+    funded = {i: TOKEN_BALANCE for i in range(accounts)}
+    return {
+        'accounts': accounts,
+        'tokens': [{'symbol': 'T%d' % i, 'balances': funded, 'allowances': funded} for i in range(pools)],
+        'pools': [{'token': 'T%d' % i, 'eth_reserve': ETH_RESERVE, 'token_reserve': TOKEN_RESERVE,
+                   'liquidity': {a: ETH_RESERVE // accounts for a in range(accounts)}} for i in range(pools)],
+    }
+
+
+class Traffic(object):
+    """ Random transactions drawn from a mix of actions. """
+
+    def __init__(self, world, mix=MIX, seed=0):
+        self.rng = random.Random(seed)
+        self.accounts = world.w3.eth.accounts
+        self.symbols = list(world.addresses['exchanges'])
+        self.exchanges = {symbol: world.exchange(symbol) for symbol in self.symbols}
+        self.tokens = world.addresses['tokens']
+        self.actions = [action for action, weight in mix.items() if weight > 0]
+        self.weights = [mix[action] for action in self.actions]
+
+    def _amount(self, reserve):
+        # up to 0.1% of the reserve, so most swaps succeed
+        return self.rng.randrange(reserve // 10**6, reserve // 10**3)
+
+    def next(self):
+        action = self.rng.choices(self.actions, self.weights)[0]
+        account = self.rng.choice(self.accounts)
+        symbol = self.rng.choice(self.symbols)
+        exchange = self.exchanges[symbol]
+        value = 0
+        if action == 'eth_to_token':
+            value = self._amount(ETH_RESERVE)
+            data = exchange.encodeABI('ethToTokenSwapInput', [1, DEADLINE])
+        elif action == 'token_to_eth':
+            data = exchange.encodeABI('tokenToEthSwapInput', [self._amount(TOKEN_RESERVE), 1, DEADLINE])
+        elif action == 'token_to_token':
+            other = self.rng.choice([s for s in self.symbols if s != symbol] or self.symbols)
+            data = exchange.encodeABI('tokenToTokenSwapInput',
+                                      [self._amount(TOKEN_RESERVE), 1, 1, DEADLINE, self.tokens[other]])
+        elif action == 'add_liquidity':
+            value = self._amount(ETH_RESERVE)
+            data = exchange.encodeABI('addLiquidity', [1, TOKEN_BALANCE, DEADLINE])
+        elif action == 'remove_liquidity':
+            data = exchange.encodeABI('removeLiquidity', [self._amount(ETH_RESERVE), 1, 1, DEADLINE])
+        else:
+            data = exchange.encodeABI('transfer', [self.rng.choice(self.accounts), self._amount(ETH_RESERVE)])
+        return action, {'from': account, 'to': exchange.address, 'data': data, 'value': value,
+                        'gas': GAS, 'gasPrice': 0}
+
+
+class InProcess(object):
+    """ Transactions applied by the py-evm backend to its pending block, mined explicitly. """
+
+    name = 'in-process'
+
+    def __init__(self, world):
+        self.tester = world.tester
+
+    def nonce(self, account):
+        return self.tester.get_nonce(account)
+
+    def send(self, transaction):
+        # eth-tester's own transaction format, which names the gas price gas_price
+        raw = self.tester.normalizer.normalize_inbound_transaction({
+            'from': transaction['from'], 'to': transaction['to'], 'data': transaction['data'],
+            'value': transaction['value'], 'gas': transaction['gas'], 'gas_price': transaction['gasPrice'],
+            'nonce': transaction['nonce'],
+        })
+        return encode_hex(self.tester.backend.send_transaction(raw))
+
+    def mine(self):
+        self.tester.mine_blocks()
+        block = self.tester.get_block_by_number('latest')
+        return block['gas_used'], len(block['transactions'])
+
+    def receipt(self, transaction_hash):
+        receipt = self.tester.get_transaction_receipt(transaction_hash)
+        return receipt['status'], receipt['gas_used']
+
+    def close(self):
+        pass
+
+
+class Rpc(object):
+    """ The same traffic over HTTP JSON-RPC to a uniswap.rpc server. """
+
+    name = 'rpc'
+
+    def __init__(self, world):
+        self.server = rpc.Server(world.tester).start()
+        self.w3 = Web3(Web3.HTTPProvider(self.server.url))
+        self.w3.manager.request_blocking('miner_stop', [])
+
+    def nonce(self, account):
+        return self.w3.eth.getTransactionCount(account)
+
+    def send(self, transaction):
+        return self.w3.eth.sendTransaction(transaction)
+
+    def mine(self):
+        self.w3.manager.request_blocking('evm_mine', [])
+        block = self.w3.eth.getBlock('latest')
+        return block.gasUsed, len(block.transactions)
+
+    def receipt(self, transaction_hash):
+        receipt = self.w3.eth.getTransactionReceipt(transaction_hash)
+        return receipt.status, receipt.gasUsed
+
+    def close(self):
+        self.w3.manager.request_blocking('miner_start', [])
+        self.server.stop()
+
+
+def _distribution(values):
+    return OrderedDict([
+        ('min', min(values)),
+        ('p50', percentile(values, 50)),
+        ('p90', percentile(values, 90)),
+        ('p99', percentile(values, 99)),
+        ('max', max(values)),
+        ('mean', sum(values) / len(values)),
+    ])
+
+
+def run(target, traffic, blocks=BLOCKS, per_block=PER_BLOCK):
+    sent = Counter()
+    failures = Counter()
+    block_gas = []
+    block_transactions = []
+    elapsed = 0.0
+    # The backend takes the account nonce from the last mined block, so transactions
+    # from one account in the same block are numbered here (the server numbers its own)
+    nonces = {}
+    for _ in range(blocks):
+        batch = [traffic.next() for _ in range(per_block)]
+        pending = []
+        start = time.perf_counter()
+        for action, transaction in batch:
+            sent[action] += 1
+            account = transaction['from']
+            if account not in nonces:
+                nonces[account] = target.nonce(account)
+            transaction['nonce'] = nonces[account]
+            try:
+                pending.append((action, target.send(transaction)))
+                nonces[account] += 1
+            except Exception as e:
+                failures[action, '%s: %s' % (type(e).__name__, e)] += 1
+        gas_used, count = target.mine()
+        elapsed += time.perf_counter() - start
+        block_gas.append(gas_used)
+        block_transactions.append(count)
+        for action, transaction_hash in pending:
+            status, gas_used = target.receipt(transaction_hash)
+            if not status:
+                failures[action, 'out of gas' if gas_used == GAS else 'reverted'] += 1
+    transactions = sum(sent.values())
+    report = OrderedDict([
+        ('target', target.name),
+        ('blocks', blocks),
+        ('transactions', transactions),
+        ('seconds', elapsed),
+        ('tps', transactions / elapsed),
+        ('gas_per_block', _distribution(block_gas)),
+        ('transactions_per_block', _distribution(block_transactions)),
+        ('sent', OrderedDict(sorted(sent.items()))),
+        ('failures', OrderedDict()),
+    ])
+    for (action, reason), count in sorted(failures.items()):
+        report['failures'].setdefault(action, OrderedDict())[reason] = count
+    return report
+
+
+def text(report):
+    lines = ['%s: %d transactions in %d blocks, %.2f s, %.1f tx/s' % (
+        report['target'], report['transactions'], report['blocks'], report['seconds'], report['tps'])]
+    for name in ('gas_per_block', 'transactions_per_block'):
+        d = report[name]
+        lines.append('%-24s min %d  p50 %d  p90 %d  p99 %d  max %d' % (
+            name.replace('_', ' '), d['min'], d['p50'], d['p90'], d['p99'], d['max']))
+    lines.append('%-24s %s' % ('sent', ', '.join('%s %d' % item for item in report['sent'].items())))
+    for action, reasons in report['failures'].items():
+        for reason, count in reasons.items():
+            lines.append('%-24s %s %d' % ('failed %s' % action, reason, count))
+    return '\n'.join(lines)
+
+
+def parse_mix(items):
+    mix = OrderedDict((action, 0) for action in MIX)
+    for item in items:
+        action, _, weight = item.partition('=')
+        if action not in mix:
+            raise argparse.ArgumentTypeError('unknown action %s (one of %s)' % (action, ', '.join(MIX)))
+        mix[action] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mixed swap and liquidity load against one factory.')
+    parser.add_argument('--accounts', type=int, default=ACCOUNTS)
+    parser.add_argument('--pools', type=int, default=POOLS)
+    parser.add_argument('--blocks', type=int, default=BLOCKS)
+    parser.add_argument('--per-block', type=int, default=PER_BLOCK, help='transactions per mined block')
+    parser.add_argument('--mix', nargs='+', metavar='ACTION=WEIGHT',
+                        help='traffic weights (default %s)' % ' '.join('%s=%s' % item for item in MIX.items()))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rpc', action='store_true', help='send through a local JSON-RPC server')
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix) if args.mix else MIX
+    world = genesis.World(genesis.cached(scenario(args.accounts, args.pools)))
+    target = (Rpc if args.rpc else InProcess)(world)
+    try:
+        report = run(target, Traffic(world, mix, args.seed), args.blocks, args.per_block)
+    finally:
+        target.close()
+    print(text(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import argparse
+import sys
+
+from uniswap.profiler import Profiler
+from uniswap.world import EXCHANGES, World
+
+from benchmarks.bench_gas import CASES
+
+'''
+Profile one gas benchmark case by contract source line:
+
+# python -m benchmarks.profile_gas exchange.tokenToTokenSwapInput
+# python -m benchmarks.profile_gas exchange.tokenToTokenSwapInput --exchange contracts/uniswap_exchange_lean.vy
+# python -m benchmarks.profile_gas exchange.tokenToTokenSwapInput --folded t2t.folded
+# flamegraph.pl --countname gas t2t.folded > t2t.svg
+'''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gas profile of one benchmarks.bench_gas case.')
+    parser.add_argument('case', choices=list(CASES))
+    parser.add_argument('--folded', help='write folded stacks for a flamegraph to this file')
+    parser.add_argument('--min-gas', type=int, default=100, help='hide tree rows below this much gas')
+    parser.add_argument('--exchange', choices=EXCHANGES, default=EXCHANGES[0], help='exchange template to profile')
+    args = parser.parse_args(argv)
+    world = World(args.exchange)
+    names = {
+        world.factory.address: 'factory',
+        world.HAY_token.address: 'HAY_token',
+        world.DEN_token.address: 'DEN_token',
+        world.HAY_exchange.address: 'HAY_exchange',
+        world.DEN_exchange.address: 'DEN_exchange',
+    }
+    a0, a1, a2 = world.w3.eth.accounts[:3]
+    world.tester.revert_to_snapshot(world.snapshots['DEN_exchange'])
+    # The measured transaction is the last top-level message of the case
+    with Profiler(names=names) as profile:
+        tx_hash = CASES[args.case](world, a0, a1, a2)
+    print('gasUsed %d, of which opcodes %d' % (world.w3.eth.getTransactionReceipt(tx_hash).gasUsed, profile.total()))
+    print(profile.tree(min_gas=args.min_gas))
+    if args.folded:
+        profile.write_folded(args.folded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
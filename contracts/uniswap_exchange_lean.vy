@@ -0,0 +1,542 @@
+# @title Uniswap Exchange Interface V1, gas-lean variant
+# @notice Same ABI, events, rounding and failure conditions as uniswap_exchange.vy
+# @notice Use at your own risk
+# @dev Differences from uniswap_exchange.vy, none of them visible to callers:
+#      - swaps come first, so the dispatcher reaches them after fewer selector comparisons
+#      - the pricing formulas are written out in place instead of called as private functions
+#      - the token address and ETH balance are read once per call and kept in memory
+#      - the exchange of each token bought through tokenToToken* is looked up in the factory once and
+#        kept in storage: the factory never changes an exchange once created, so the first swap to a
+#        token pays one SSTORE and every later one reads it instead of calling the factory
+
+contract Factory():
+    def getExchange(token_addr: address) -> address: constant
+
+contract Exchange():
+    def getEthToTokenOutputPrice(tokens_bought: uint256) -> uint256(wei): constant
+    def ethToTokenTransferInput(min_tokens: uint256, deadline: timestamp, recipient: address) -> uint256: modifying
+    def ethToTokenTransferOutput(tokens_bought: uint256, deadline: timestamp, recipient: address) -> uint256(wei): modifying
+
+contract Token():
+    def balanceOf(_owner: address) -> uint256: constant
+    def transfer(_to: address, _value: uint256) -> bool: modifying
+    def transferFrom(_from: address, _to: address, _value: uint256) -> bool: modifying
+
+TokenPurchase: event({buyer: indexed(address), eth_sold: indexed(uint256(wei)), tokens_bought: indexed(uint256)})
+EthPurchase: event({buyer: indexed(address), tokens_sold: indexed(uint256), eth_bought: indexed(uint256(wei))})
+AddLiquidity: event({provider: indexed(address), eth_amount: indexed(uint256(wei)), token_amount: indexed(uint256)})
+RemoveLiquidity: event({provider: indexed(address), eth_amount: indexed(uint256(wei)), token_amount: indexed(uint256)})
+Transfer: event({_from: indexed(address), _to: indexed(address), _value: uint256})
+Approval: event({_owner: indexed(address), _spender: indexed(address), _value: uint256})
+
+# Storage layout is that of uniswap_exchange.vy, with the exchanges cache after it
+name: public(bytes32)                             # Uniswap V1
+symbol: public(bytes32)                           # UNI-V1
+decimals: public(uint256)                         # 18
+totalSupply: public(uint256)                      # total number of UNI in existence
+balances: uint256[address]                        # UNI balance of an address
+allowances: (uint256[address])[address]           # UNI allowance of one address on another
+token: address(ERC20)                             # address of the ERC20 token traded on this contract
+factory: Factory                                  # interface for the factory that created this contract
+exchanges: address[address]                       # factory exchange of each token bought through tokenToToken*
+
+@private
+def exchangeOf(token_addr: address) -> address:
+    exchange_addr: address = self.exchanges[token_addr]
+    if exchange_addr == ZERO_ADDRESS:
+        exchange_addr = self.factory.getExchange(token_addr)
+        # An unknown token reverts the swap in tokenToTokenInput or tokenToTokenOutput
+        self.exchanges[token_addr] = exchange_addr
+    return exchange_addr
+
+@private
+def ethToTokenInput(eth_sold: uint256(wei), min_tokens: uint256, deadline: timestamp, buyer: address, recipient: address) -> uint256:
+    assert deadline >= block.timestamp and (eth_sold > 0 and min_tokens > 0)
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_balance: uint256(wei) = self.balance
+    eth_reserve: uint256 = as_unitless_number(eth_balance - eth_sold)
+    assert eth_reserve > 0 and token_reserve > 0
+    input_amount_with_fee: uint256 = as_unitless_number(eth_sold) * 997
+    numerator: uint256 = input_amount_with_fee * token_reserve
+    denominator: uint256 = (eth_reserve * 1000) + input_amount_with_fee
+    tokens_bought: uint256 = numerator / denominator
+    assert tokens_bought >= min_tokens
+    assert Token(token_addr).transfer(recipient, tokens_bought)
+    log.TokenPurchase(buyer, eth_sold, tokens_bought)
+    return tokens_bought
+
+@private
+def ethToTokenOutput(tokens_bought: uint256, max_eth: uint256(wei), deadline: timestamp, buyer: address, recipient: address) -> uint256(wei):
+    assert deadline >= block.timestamp and (tokens_bought > 0 and max_eth > 0)
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_balance: uint256(wei) = self.balance
+    eth_reserve: uint256 = as_unitless_number(eth_balance - max_eth)
+    assert eth_reserve > 0 and token_reserve > 0
+    numerator: uint256 = eth_reserve * tokens_bought * 1000
+    denominator: uint256 = (token_reserve - tokens_bought) * 997
+    eth_sold: uint256(wei) = as_wei_value(numerator / denominator + 1, 'wei')
+    # Throws if eth_sold > max_eth
+    eth_refund: uint256(wei) = max_eth - eth_sold
+    if eth_refund > 0:
+        send(buyer, eth_refund)
+    assert Token(token_addr).transfer(recipient, tokens_bought)
+    log.TokenPurchase(buyer, eth_sold, tokens_bought)
+    return eth_sold
+
+@private
+def tokenToEthInput(tokens_sold: uint256, min_eth: uint256(wei), deadline: timestamp, buyer: address, recipient: address) -> uint256(wei):
+    assert deadline >= block.timestamp and (tokens_sold > 0 and min_eth > 0)
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert token_reserve > 0 and eth_reserve > 0
+    input_amount_with_fee: uint256 = tokens_sold * 997
+    numerator: uint256 = input_amount_with_fee * eth_reserve
+    denominator: uint256 = (token_reserve * 1000) + input_amount_with_fee
+    wei_bought: uint256(wei) = as_wei_value(numerator / denominator, 'wei')
+    assert wei_bought >= min_eth
+    send(recipient, wei_bought)
+    assert Token(token_addr).transferFrom(buyer, self, tokens_sold)
+    log.EthPurchase(buyer, tokens_sold, wei_bought)
+    return wei_bought
+
+@private
+def tokenToEthOutput(eth_bought: uint256(wei), max_tokens: uint256, deadline: timestamp, buyer: address, recipient: address) -> uint256:
+    assert deadline >= block.timestamp and eth_bought > 0
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert token_reserve > 0 and eth_reserve > 0
+    numerator: uint256 = token_reserve * as_unitless_number(eth_bought) * 1000
+    denominator: uint256 = (eth_reserve - as_unitless_number(eth_bought)) * 997
+    tokens_sold: uint256 = numerator / denominator + 1
+    # tokens sold is always > 0
+    assert max_tokens >= tokens_sold
+    send(recipient, eth_bought)
+    assert Token(token_addr).transferFrom(buyer, self, tokens_sold)
+    log.EthPurchase(buyer, tokens_sold, eth_bought)
+    return tokens_sold
+
+@private
+def tokenToTokenInput(tokens_sold: uint256, min_tokens_bought: uint256, min_eth_bought: uint256(wei), deadline: timestamp, buyer: address, recipient: address, exchange_addr: address) -> uint256:
+    assert (deadline >= block.timestamp and tokens_sold > 0) and (min_tokens_bought > 0 and min_eth_bought > 0)
+    assert exchange_addr != self and exchange_addr != ZERO_ADDRESS
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert token_reserve > 0 and eth_reserve > 0
+    input_amount_with_fee: uint256 = tokens_sold * 997
+    numerator: uint256 = input_amount_with_fee * eth_reserve
+    denominator: uint256 = (token_reserve * 1000) + input_amount_with_fee
+    wei_bought: uint256(wei) = as_wei_value(numerator / denominator, 'wei')
+    assert wei_bought >= min_eth_bought
+    assert Token(token_addr).transferFrom(buyer, self, tokens_sold)
+    tokens_bought: uint256 = Exchange(exchange_addr).ethToTokenTransferInput(min_tokens_bought, deadline, recipient, value=wei_bought)
+    log.EthPurchase(buyer, tokens_sold, wei_bought)
+    return tokens_bought
+
+@private
+def tokenToTokenOutput(tokens_bought: uint256, max_tokens_sold: uint256, max_eth_sold: uint256(wei), deadline: timestamp, buyer: address, recipient: address, exchange_addr: address) -> uint256:
+    assert deadline >= block.timestamp and (tokens_bought > 0 and max_eth_sold > 0)
+    assert exchange_addr != self and exchange_addr != ZERO_ADDRESS
+    eth_bought: uint256(wei) = Exchange(exchange_addr).getEthToTokenOutputPrice(tokens_bought)
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert token_reserve > 0 and eth_reserve > 0
+    numerator: uint256 = token_reserve * as_unitless_number(eth_bought) * 1000
+    denominator: uint256 = (eth_reserve - as_unitless_number(eth_bought)) * 997
+    tokens_sold: uint256 = numerator / denominator + 1
+    # tokens sold is always > 0
+    assert max_tokens_sold >= tokens_sold and max_eth_sold >= eth_bought
+    assert Token(token_addr).transferFrom(buyer, self, tokens_sold)
+    eth_sold: uint256(wei) = Exchange(exchange_addr).ethToTokenTransferOutput(tokens_bought, deadline, recipient, value=eth_bought)
+    log.EthPurchase(buyer, tokens_sold, eth_bought)
+    return tokens_sold
+
+# @notice Convert ETH to Tokens.
+# @dev User specifies exact input (msg.value) and minimum output.
+# @param min_tokens Minimum Tokens bought.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return Amount of Tokens bought.
+@public
+@payable
+def ethToTokenSwapInput(min_tokens: uint256, deadline: timestamp) -> uint256:
+    return self.ethToTokenInput(msg.value, min_tokens, deadline, msg.sender, msg.sender)
+
+# @notice Convert Tokens to ETH.
+# @dev User specifies exact input and minimum output.
+# @param tokens_sold Amount of Tokens sold.
+# @param min_eth Minimum ETH purchased.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return Amount of ETH bought.
+@public
+def tokenToEthSwapInput(tokens_sold: uint256, min_eth: uint256(wei), deadline: timestamp) -> uint256(wei):
+    return self.tokenToEthInput(tokens_sold, min_eth, deadline, msg.sender, msg.sender)
+
+# @notice Convert ETH to Tokens.
+# @dev User specifies maximum input (msg.value) and exact output.
+# @param tokens_bought Amount of tokens bought.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return Amount of ETH sold.
+@public
+@payable
+def ethToTokenSwapOutput(tokens_bought: uint256, deadline: timestamp) -> uint256(wei):
+    return self.ethToTokenOutput(tokens_bought, msg.value, deadline, msg.sender, msg.sender)
+
+# @notice Convert Tokens to ETH.
+# @dev User specifies maximum input and exact output.
+# @param eth_bought Amount of ETH purchased.
+# @param max_tokens Maximum Tokens sold.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return Amount of Tokens sold.
+@public
+def tokenToEthSwapOutput(eth_bought: uint256(wei), max_tokens: uint256, deadline: timestamp) -> uint256:
+    return self.tokenToEthOutput(eth_bought, max_tokens, deadline, msg.sender, msg.sender)
+
+# @notice Convert Tokens (self.token) to Tokens (token_addr).
+# @dev User specifies exact input and minimum output.
+# @param tokens_sold Amount of Tokens sold.
+# @param min_tokens_bought Minimum Tokens (token_addr) purchased.
+# @param min_eth_bought Minimum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param token_addr The address of the token being purchased.
+# @return Amount of Tokens (token_addr) bought.
+@public
+def tokenToTokenSwapInput(tokens_sold: uint256, min_tokens_bought: uint256, min_eth_bought: uint256(wei), deadline: timestamp, token_addr: address) -> uint256:
+    exchange_addr: address = self.exchangeOf(token_addr)
+    return self.tokenToTokenInput(tokens_sold, min_tokens_bought, min_eth_bought, deadline, msg.sender, msg.sender, exchange_addr)
+
+# @notice Convert Tokens (self.token) to Tokens (token_addr).
+# @dev User specifies maximum input and exact output.
+# @param tokens_bought Amount of Tokens (token_addr) bought.
+# @param max_tokens_sold Maximum Tokens (self.token) sold.
+# @param max_eth_sold Maximum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param token_addr The address of the token being purchased.
+# @return Amount of Tokens (self.token) sold.
+@public
+def tokenToTokenSwapOutput(tokens_bought: uint256, max_tokens_sold: uint256, max_eth_sold: uint256(wei), deadline: timestamp, token_addr: address) -> uint256:
+    exchange_addr: address = self.exchangeOf(token_addr)
+    return self.tokenToTokenOutput(tokens_bought, max_tokens_sold, max_eth_sold, deadline, msg.sender, msg.sender, exchange_addr)
+
+# @notice Convert ETH to Tokens and transfers Tokens to recipient.
+# @dev User specifies exact input (msg.value) and minimum output
+# @param min_tokens Minimum Tokens bought.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output Tokens.
+# @return Amount of Tokens bought.
+@public
+@payable
+def ethToTokenTransferInput(min_tokens: uint256, deadline: timestamp, recipient: address) -> uint256:
+    assert recipient != self and recipient != ZERO_ADDRESS
+    return self.ethToTokenInput(msg.value, min_tokens, deadline, msg.sender, recipient)
+
+# @notice Convert ETH to Tokens and transfers Tokens to recipient.
+# @dev User specifies maximum input (msg.value) and exact output.
+# @param tokens_bought Amount of tokens bought.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output Tokens.
+# @return Amount of ETH sold.
+@public
+@payable
+def ethToTokenTransferOutput(tokens_bought: uint256, deadline: timestamp, recipient: address) -> uint256(wei):
+    assert recipient != self and recipient != ZERO_ADDRESS
+    return self.ethToTokenOutput(tokens_bought, msg.value, deadline, msg.sender, recipient)
+
+# @notice Convert Tokens to ETH and transfers ETH to recipient.
+# @dev User specifies exact input and minimum output.
+# @param tokens_sold Amount of Tokens sold.
+# @param min_eth Minimum ETH purchased.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output ETH.
+# @return Amount of ETH bought.
+@public
+def tokenToEthTransferInput(tokens_sold: uint256, min_eth: uint256(wei), deadline: timestamp, recipient: address) -> uint256(wei):
+    assert recipient != self and recipient != ZERO_ADDRESS
+    return self.tokenToEthInput(tokens_sold, min_eth, deadline, msg.sender, recipient)
+
+# @notice Convert Tokens to ETH and transfers ETH to recipient.
+# @dev User specifies maximum input and exact output.
+# @param eth_bought Amount of ETH purchased.
+# @param max_tokens Maximum Tokens sold.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output ETH.
+# @return Amount of Tokens sold.
+@public
+def tokenToEthTransferOutput(eth_bought: uint256(wei), max_tokens: uint256, deadline: timestamp, recipient: address) -> uint256:
+    assert recipient != self and recipient != ZERO_ADDRESS
+    return self.tokenToEthOutput(eth_bought, max_tokens, deadline, msg.sender, recipient)
+
+# @notice Convert Tokens (self.token) to Tokens (token_addr) and transfers
+#         Tokens (token_addr) to recipient.
+# @dev User specifies exact input and minimum output.
+# @param tokens_sold Amount of Tokens sold.
+# @param min_tokens_bought Minimum Tokens (token_addr) purchased.
+# @param min_eth_bought Minimum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output ETH.
+# @param token_addr The address of the token being purchased.
+# @return Amount of Tokens (token_addr) bought.
+@public
+def tokenToTokenTransferInput(tokens_sold: uint256, min_tokens_bought: uint256, min_eth_bought: uint256(wei), deadline: timestamp, recipient: address, token_addr: address) -> uint256:
+    exchange_addr: address = self.exchangeOf(token_addr)
+    return self.tokenToTokenInput(tokens_sold, min_tokens_bought, min_eth_bought, deadline, msg.sender, recipient, exchange_addr)
+
+# @notice Convert Tokens (self.token) to Tokens (token_addr) and transfers
+#         Tokens (token_addr) to recipient.
+# @dev User specifies maximum input and exact output.
+# @param tokens_bought Amount of Tokens (token_addr) bought.
+# @param max_tokens_sold Maximum Tokens (self.token) sold.
+# @param max_eth_sold Maximum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output ETH.
+# @param token_addr The address of the token being purchased.
+# @return Amount of Tokens (self.token) sold.
+@public
+def tokenToTokenTransferOutput(tokens_bought: uint256, max_tokens_sold: uint256, max_eth_sold: uint256(wei), deadline: timestamp, recipient: address, token_addr: address) -> uint256:
+    exchange_addr: address = self.exchangeOf(token_addr)
+    return self.tokenToTokenOutput(tokens_bought, max_tokens_sold, max_eth_sold, deadline, msg.sender, recipient, exchange_addr)
+
+# @notice Convert Tokens (self.token) to Tokens (exchange_addr.token).
+# @dev Allows trades through contracts that were not deployed from the same factory.
+# @dev User specifies exact input and minimum output.
+# @param tokens_sold Amount of Tokens sold.
+# @param min_tokens_bought Minimum Tokens (token_addr) purchased.
+# @param min_eth_bought Minimum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param exchange_addr The address of the exchange for the token being purchased.
+# @return Amount of Tokens (exchange_addr.token) bought.
+@public
+def tokenToExchangeSwapInput(tokens_sold: uint256, min_tokens_bought: uint256, min_eth_bought: uint256(wei), deadline: timestamp, exchange_addr: address) -> uint256:
+    return self.tokenToTokenInput(tokens_sold, min_tokens_bought, min_eth_bought, deadline, msg.sender, msg.sender, exchange_addr)
+
+# @notice Convert Tokens (self.token) to Tokens (exchange_addr.token).
+# @dev Allows trades through contracts that were not deployed from the same factory.
+# @dev User specifies maximum input and exact output.
+# @param tokens_bought Amount of Tokens (token_addr) bought.
+# @param max_tokens_sold Maximum Tokens (self.token) sold.
+# @param max_eth_sold Maximum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param exchange_addr The address of the exchange for the token being purchased.
+# @return Amount of Tokens (self.token) sold.
+@public
+def tokenToExchangeSwapOutput(tokens_bought: uint256, max_tokens_sold: uint256, max_eth_sold: uint256(wei), deadline: timestamp, exchange_addr: address) -> uint256:
+    return self.tokenToTokenOutput(tokens_bought, max_tokens_sold, max_eth_sold, deadline, msg.sender, msg.sender, exchange_addr)
+
+# @notice Convert Tokens (self.token) to Tokens (exchange_addr.token) and transfers
+#         Tokens (exchange_addr.token) to recipient.
+# @dev Allows trades through contracts that were not deployed from the same factory.
+# @dev User specifies exact input and minimum output.
+# @param tokens_sold Amount of Tokens sold.
+# @param min_tokens_bought Minimum Tokens (token_addr) purchased.
+# @param min_eth_bought Minimum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output ETH.
+# @param exchange_addr The address of the exchange for the token being purchased.
+# @return Amount of Tokens (exchange_addr.token) bought.
+@public
+def tokenToExchangeTransferInput(tokens_sold: uint256, min_tokens_bought: uint256, min_eth_bought: uint256(wei), deadline: timestamp, recipient: address, exchange_addr: address) -> uint256:
+    assert recipient != self
+    return self.tokenToTokenInput(tokens_sold, min_tokens_bought, min_eth_bought, deadline, msg.sender, recipient, exchange_addr)
+
+# @notice Convert Tokens (self.token) to Tokens (exchange_addr.token) and transfers
+#         Tokens (exchange_addr.token) to recipient.
+# @dev Allows trades through contracts that were not deployed from the same factory.
+# @dev User specifies maximum input and exact output.
+# @param tokens_bought Amount of Tokens (token_addr) bought.
+# @param max_tokens_sold Maximum Tokens (self.token) sold.
+# @param max_eth_sold Maximum ETH purchased as intermediary.
+# @param deadline Time after which this transaction can no longer be executed.
+# @param recipient The address that receives output ETH.
+# @param token_addr The address of the token being purchased.
+# @return Amount of Tokens (self.token) sold.
+@public
+def tokenToExchangeTransferOutput(tokens_bought: uint256, max_tokens_sold: uint256, max_eth_sold: uint256(wei), deadline: timestamp, recipient: address, exchange_addr: address) -> uint256:
+    assert recipient != self
+    return self.tokenToTokenOutput(tokens_bought, max_tokens_sold, max_eth_sold, deadline, msg.sender, recipient, exchange_addr)
+
+# @notice Convert ETH to Tokens.
+# @dev User specifies exact input (msg.value).
+# @dev User cannot specify minimum output or deadline.
+@public
+@payable
+def __default__():
+    self.ethToTokenInput(msg.value, 1, block.timestamp, msg.sender, msg.sender)
+
+# @notice Public price function for ETH to Token trades with an exact input.
+# @param eth_sold Amount of ETH sold.
+# @return Amount of Tokens that can be bought with input ETH.
+@public
+@constant
+def getEthToTokenInputPrice(eth_sold: uint256(wei)) -> uint256:
+    assert eth_sold > 0
+    token_reserve: uint256 = self.token.balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert eth_reserve > 0 and token_reserve > 0
+    input_amount_with_fee: uint256 = as_unitless_number(eth_sold) * 997
+    numerator: uint256 = input_amount_with_fee * token_reserve
+    denominator: uint256 = (eth_reserve * 1000) + input_amount_with_fee
+    return numerator / denominator
+
+# @notice Public price function for ETH to Token trades with an exact output.
+# @param tokens_bought Amount of Tokens bought.
+# @return Amount of ETH needed to buy output Tokens.
+@public
+@constant
+def getEthToTokenOutputPrice(tokens_bought: uint256) -> uint256(wei):
+    assert tokens_bought > 0
+    token_reserve: uint256 = self.token.balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert eth_reserve > 0 and token_reserve > 0
+    numerator: uint256 = eth_reserve * tokens_bought * 1000
+    denominator: uint256 = (token_reserve - tokens_bought) * 997
+    return as_wei_value(numerator / denominator + 1, 'wei')
+
+# @notice Public price function for Token to ETH trades with an exact input.
+# @param tokens_sold Amount of Tokens sold.
+# @return Amount of ETH that can be bought with input Tokens.
+@public
+@constant
+def getTokenToEthInputPrice(tokens_sold: uint256) -> uint256(wei):
+    assert tokens_sold > 0
+    token_reserve: uint256 = self.token.balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert token_reserve > 0 and eth_reserve > 0
+    input_amount_with_fee: uint256 = tokens_sold * 997
+    numerator: uint256 = input_amount_with_fee * eth_reserve
+    denominator: uint256 = (token_reserve * 1000) + input_amount_with_fee
+    return as_wei_value(numerator / denominator, 'wei')
+
+# @notice Public price function for Token to ETH trades with an exact output.
+# @param eth_bought Amount of output ETH.
+# @return Amount of Tokens needed to buy output ETH.
+@public
+@constant
+def getTokenToEthOutputPrice(eth_bought: uint256(wei)) -> uint256:
+    assert eth_bought > 0
+    token_reserve: uint256 = self.token.balanceOf(self)
+    eth_reserve: uint256 = as_unitless_number(self.balance)
+    assert token_reserve > 0 and eth_reserve > 0
+    numerator: uint256 = token_reserve * as_unitless_number(eth_bought) * 1000
+    denominator: uint256 = (eth_reserve - as_unitless_number(eth_bought)) * 997
+    return numerator / denominator + 1
+
+# @notice Deposit ETH and Tokens (self.token) at current ratio to mint UNI tokens.
+# @dev min_liquidity does nothing when total UNI supply is 0.
+# @param min_liquidity Minimum number of UNI sender will mint if total UNI supply is greater than 0.
+# @param max_tokens Maximum number of tokens deposited. Deposits max amount if total UNI supply is 0.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return The amount of UNI minted.
+@public
+@payable
+def addLiquidity(min_liquidity: uint256, max_tokens: uint256, deadline: timestamp) -> uint256:
+    assert deadline > block.timestamp and (max_tokens > 0 and msg.value > 0)
+    total_liquidity: uint256 = self.totalSupply
+    token_addr: address = self.token
+    if total_liquidity > 0:
+        assert min_liquidity > 0
+        eth_reserve: uint256(wei) = self.balance - msg.value
+        token_reserve: uint256 = Token(token_addr).balanceOf(self)
+        token_amount: uint256 = msg.value * token_reserve / eth_reserve + 1
+        liquidity_minted: uint256 = msg.value * total_liquidity / eth_reserve
+        assert max_tokens >= token_amount and liquidity_minted >= min_liquidity
+        self.balances[msg.sender] += liquidity_minted
+        self.totalSupply = total_liquidity + liquidity_minted
+        assert Token(token_addr).transferFrom(msg.sender, self, token_amount)
+        log.AddLiquidity(msg.sender, msg.value, token_amount)
+        log.Transfer(ZERO_ADDRESS, msg.sender, liquidity_minted)
+        return liquidity_minted
+    else:
+        assert (self.factory != ZERO_ADDRESS and token_addr != ZERO_ADDRESS) and msg.value >= 1000000000
+        assert self.factory.getExchange(token_addr) == self
+        token_amount: uint256 = max_tokens
+        initial_liquidity: uint256 = as_unitless_number(self.balance)
+        self.totalSupply = initial_liquidity
+        self.balances[msg.sender] = initial_liquidity
+        assert Token(token_addr).transferFrom(msg.sender, self, token_amount)
+        log.AddLiquidity(msg.sender, msg.value, token_amount)
+        log.Transfer(ZERO_ADDRESS, msg.sender, initial_liquidity)
+        return initial_liquidity
+
+# @dev Burn UNI tokens to withdraw ETH and Tokens at current ratio.
+# @param amount Amount of UNI burned.
+# @param min_eth Minimum ETH withdrawn.
+# @param min_tokens Minimum Tokens withdrawn.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return The amount of ETH and Tokens withdrawn.
+@public
+def removeLiquidity(amount: uint256, min_eth: uint256(wei), min_tokens: uint256, deadline: timestamp) -> (uint256(wei), uint256):
+    assert (amount > 0 and deadline > block.timestamp) and (min_eth > 0 and min_tokens > 0)
+    total_liquidity: uint256 = self.totalSupply
+    assert total_liquidity > 0
+    token_addr: address = self.token
+    token_reserve: uint256 = Token(token_addr).balanceOf(self)
+    eth_amount: uint256(wei) = amount * self.balance / total_liquidity
+    token_amount: uint256 = amount * token_reserve / total_liquidity
+    assert eth_amount >= min_eth and token_amount >= min_tokens
+    self.balances[msg.sender] -= amount
+    self.totalSupply = total_liquidity - amount
+    send(msg.sender, eth_amount)
+    assert Token(token_addr).transfer(msg.sender, token_amount)
+    log.RemoveLiquidity(msg.sender, eth_amount, token_amount)
+    log.Transfer(msg.sender, ZERO_ADDRESS, amount)
+    return eth_amount, token_amount
+
+# ERC20 compatibility for exchange liquidity modified from
+# https://github.com/ethereum/vyper/blob/master/examples/tokens/ERC20.vy
+@public
+@constant
+def balanceOf(_owner : address) -> uint256:
+    return self.balances[_owner]
+
+@public
+def transfer(_to : address, _value : uint256) -> bool:
+    self.balances[msg.sender] -= _value
+    self.balances[_to] += _value
+    log.Transfer(msg.sender, _to, _value)
+    return True
+
+@public
+def transferFrom(_from : address, _to : address, _value : uint256) -> bool:
+    self.balances[_from] -= _value
+    self.balances[_to] += _value
+    self.allowances[_from][msg.sender] -= _value
+    log.Transfer(_from, _to, _value)
+    return True
+
+@public
+def approve(_spender : address, _value : uint256) -> bool:
+    self.allowances[msg.sender][_spender] = _value
+    log.Approval(msg.sender, _spender, _value)
+    return True
+
+@public
+@constant
+def allowance(_owner : address, _spender : address) -> uint256:
+    return self.allowances[_owner][_spender]
+
+# @return Address of Token that is sold on this exchange.
+@public
+@constant
+def tokenAddress() -> address:
+    return self.token
+
+# @return Address of factory that created this exchange.
+@public
+@constant
+def factoryAddress() -> address(Factory):
+    return self.factory
+
+# @dev This function acts as a contract constructor which is not currently supported in contracts deployed
+#      using create_with_code_of(). It is called once by the factory during contract creation.
+@public
+def setup(token_addr: address):
+    assert (self.factory == ZERO_ADDRESS and self.token == ZERO_ADDRESS) and token_addr != ZERO_ADDRESS
+    self.factory = msg.sender
+    self.token = token_addr
+    self.name = 0x556e697377617020563100000000000000000000000000000000000000000000
+    self.symbol = 0x554e492d56310000000000000000000000000000000000000000000000000000
+    self.decimals = 18
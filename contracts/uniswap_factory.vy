@@ -44,3 +44,49 @@ def getToken(exchange: address) -> address:
 @constant
 def getTokenWithId(token_id: uint256) -> address:
     return self.id_to_token[token_id]
+
+# @notice Create exchanges for up to 20 tokens in one transaction, all or none.
+# @dev The list ends at the first zero address. tokenCount is written once for the whole list.
+# @param tokens Token addresses, padded with zeros.
+# @return The exchange created for each token, zero past the end of the list.
+@public
+def createExchanges(tokens: address[20]) -> address[20]:
+    assert tokens[0] != ZERO_ADDRESS
+    assert self.exchangeTemplate != ZERO_ADDRESS
+    exchanges: address[20]
+    token_id: uint256 = self.tokenCount
+    for i in range(20):
+        token: address = tokens[i]
+        if token == ZERO_ADDRESS:
+            break
+        assert self.token_to_exchange[token] == ZERO_ADDRESS
+        exchange: address = create_with_code_of(self.exchangeTemplate)
+        Exchange(exchange).setup(token)
+        self.token_to_exchange[token] = exchange
+        self.exchange_to_token[exchange] = token
+        token_id += 1
+        self.id_to_token[token_id] = token
+        log.NewExchange(token, exchange)
+        exchanges[i] = exchange
+    self.tokenCount = token_id
+    return exchanges
+
+# @notice Read the tokens with ids start to start + count - 1 (at most 100) and their exchanges.
+# @dev Pairs past count or tokenCount are left as zeros.
+# @param start First token id to read (token ids start at 1).
+# @param count Number of pairs to read.
+# @return 100 pairs of token and exchange, packed as 200 addresses.
+@public
+@constant
+def getExchangesWithIds(start: uint256, count: uint256) -> address[200]:
+    assert start > 0 and count <= 100
+    pairs: address[200]
+    token_count: uint256 = self.tokenCount
+    for i in range(100):
+        token_id: uint256 = start + convert(i, uint256)
+        if token_id > token_count or convert(i, uint256) >= count:
+            break
+        token: address = self.id_to_token[token_id]
+        pairs[i * 2] = token
+        pairs[i * 2 + 1] = self.token_to_exchange[token]
+    return pairs
@@ -0,0 +1,64 @@
+# @title Uniswap Reserve Reader V1
+# @notice Read-only aggregator that returns the state of many exchanges in one call
+# @notice Use at your own risk
+
+contract Factory():
+    def tokenCount() -> uint256: constant
+    def getTokenWithId(token_id: uint256) -> address: constant
+    def getExchange(token_addr: address) -> address: constant
+
+contract Token():
+    def balanceOf(_owner: address) -> uint256: constant
+
+contract Exchange():
+    def tokenAddress() -> address: constant
+    def totalSupply() -> uint256: constant
+
+# @notice Read count (at most 100) exchanges of a factory, starting at token id start.
+# @dev Vyper cannot return a tuple of lists, so each exchange is packed into 5 consecutive words:
+#      token address, exchange address, ETH reserve, token reserve, UNI total supply.
+#      Rows past count or the factory's tokenCount are left as zeros.
+# @param factory Address of the Uniswap factory.
+# @param start First token id to read (token ids start at 1).
+# @param count Number of exchanges to read.
+# @return 100 rows of 5 words each.
+@public
+@constant
+def getReserves(factory: address, start: uint256, count: uint256) -> uint256[500]:
+    assert start > 0 and count <= 100
+    rows: uint256[500]
+    token_count: uint256 = Factory(factory).tokenCount()
+    for i in range(100):
+        token_id: uint256 = start + convert(i, uint256)
+        if token_id > token_count or convert(i, uint256) >= count:
+            break
+        token: address = Factory(factory).getTokenWithId(token_id)
+        exchange: address = Factory(factory).getExchange(token)
+        row: int128 = i * 5
+        rows[row] = convert(token, uint256)
+        rows[row + 1] = convert(exchange, uint256)
+        rows[row + 2] = as_unitless_number(exchange.balance)
+        rows[row + 3] = Token(token).balanceOf(exchange)
+        rows[row + 4] = Exchange(exchange).totalSupply()
+    return rows
+
+# @notice Read up to 100 exchanges by address.
+# @dev Rows are packed as in getReserves. The list ends at the first zero address.
+# @param exchanges Exchange addresses, padded with zeros.
+# @return 100 rows of 5 words each.
+@public
+@constant
+def getExchangeReserves(exchanges: address[100]) -> uint256[500]:
+    rows: uint256[500]
+    for i in range(100):
+        exchange: address = exchanges[i]
+        if exchange == ZERO_ADDRESS:
+            break
+        token: address = Exchange(exchange).tokenAddress()
+        row: int128 = i * 5
+        rows[row] = convert(token, uint256)
+        rows[row + 1] = convert(exchange, uint256)
+        rows[row + 2] = as_unitless_number(exchange.balance)
+        rows[row + 3] = Token(token).balanceOf(exchange)
+        rows[row + 4] = Exchange(exchange).totalSupply()
+    return rows
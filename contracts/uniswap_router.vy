@@ -0,0 +1,103 @@
+# @title Uniswap Batch Router V1
+# @notice Runs several swaps on the exchanges of one factory in a single transaction
+# @notice Use at your own risk
+# @dev The router trades with what it holds: its owner deposits ETH and tokens, every leg
+#      sells from the router's balances and buys into them, and the owner withdraws whenever.
+#      So each exchange takes its tokens from the router directly, no leg pays for moving
+#      tokens in or out, and exact output legs need no quote. The exchange of each token is
+#      looked up in the factory once, when the router also approves it for MAX_UINT256.
+
+contract Factory():
+    def getExchange(token_addr: address) -> address: constant
+
+contract Exchange():
+    def ethToTokenSwapInput(min_tokens: uint256, deadline: timestamp) -> uint256: modifying
+    def ethToTokenSwapOutput(tokens_bought: uint256, deadline: timestamp) -> uint256(wei): modifying
+    def tokenToEthSwapInput(tokens_sold: uint256, min_eth: uint256(wei), deadline: timestamp) -> uint256(wei): modifying
+    def tokenToEthSwapOutput(eth_bought: uint256(wei), max_tokens: uint256, deadline: timestamp) -> uint256: modifying
+    def tokenToExchangeSwapInput(tokens_sold: uint256, min_tokens_bought: uint256, min_eth_bought: uint256(wei), deadline: timestamp, exchange_addr: address) -> uint256: modifying
+    def tokenToExchangeSwapOutput(tokens_bought: uint256, max_tokens_sold: uint256, max_eth_sold: uint256(wei), deadline: timestamp, exchange_addr: address) -> uint256: modifying
+
+contract Token():
+    def approve(_spender: address, _value: uint256) -> bool: modifying
+    def transfer(_to: address, _value: uint256) -> bool: modifying
+
+factory: public(address)                          # the factory whose exchanges the router trades on
+owner: public(address)                            # the only account that can swap and withdraw
+exchanges: address[address]                       # token -> its exchange, approved for MAX_UINT256
+
+@public
+def __init__(factory_addr: address):
+    assert factory_addr != ZERO_ADDRESS
+    self.factory = factory_addr
+    self.owner = msg.sender
+
+# @dev Receives deposits, ETH bought and the change of ETH -> token output legs.
+@public
+@payable
+def __default__():
+    pass
+
+@private
+def exchangeOf(token: address) -> address:
+    exchange: address = self.exchanges[token]
+    if exchange == ZERO_ADDRESS:
+        exchange = Factory(self.factory).getExchange(token)
+        assert exchange != ZERO_ADDRESS
+        assert Token(token).approve(exchange, MAX_UINT256)
+        self.exchanges[token] = exchange
+    return exchange
+
+# @notice Run up to 8 swap legs in order, all or none.
+# @dev Leg i is (kinds[i], tokens[i], targets[i], amounts[i], limits[i]); the legs end at the first
+#      zero token. tokens[i] is the token of the exchange the leg trades on, targets[i] the token
+#      bought by a token -> token leg. amounts and limits mean, by kind:
+#        0  ETH -> token, exact input:     ETH sold,       minimum tokens bought
+#        1  ETH -> token, exact output:    tokens bought,  maximum ETH sold
+#        2  token -> ETH, exact input:     tokens sold,    minimum ETH bought
+#        3  token -> ETH, exact output:    ETH bought,     maximum tokens sold
+#        4  token -> token, exact input:   tokens sold,    minimum target tokens bought
+#        5  token -> token, exact output:  target tokens bought, maximum tokens sold
+#      Legs spend the router's balances, msg.value included, and what earlier legs bought.
+# @param deadline Time after which this transaction can no longer be executed.
+# @return What each leg's exchange call returned: the amount bought for exact input legs, sold for exact output legs.
+@public
+@payable
+def batchSwap(kinds: uint256[8], tokens: address[8], targets: address[8], amounts: uint256[8], limits: uint256[8], deadline: timestamp) -> uint256[8]:
+    assert msg.sender == self.owner
+    assert tokens[0] != ZERO_ADDRESS
+    results: uint256[8]
+    for i in range(8):
+        token: address = tokens[i]
+        if token == ZERO_ADDRESS:
+            break
+        kind: uint256 = kinds[i]
+        amount: uint256 = amounts[i]
+        limit: uint256 = limits[i]
+        exchange: address = self.exchangeOf(token)
+        if kind == 0:
+            results[i] = Exchange(exchange).ethToTokenSwapInput(limit, deadline, value=as_wei_value(amount, 'wei'))
+        elif kind == 1:
+            results[i] = as_unitless_number(Exchange(exchange).ethToTokenSwapOutput(amount, deadline, value=as_wei_value(limit, 'wei')))
+        elif kind == 2:
+            results[i] = as_unitless_number(Exchange(exchange).tokenToEthSwapInput(amount, as_wei_value(limit, 'wei'), deadline))
+        elif kind == 3:
+            results[i] = Exchange(exchange).tokenToEthSwapOutput(as_wei_value(amount, 'wei'), limit, deadline)
+        elif kind == 4:
+            results[i] = Exchange(exchange).tokenToExchangeSwapInput(amount, limit, 1, deadline, self.exchangeOf(targets[i]))
+        else:
+            assert kind == 5
+            results[i] = Exchange(exchange).tokenToExchangeSwapOutput(amount, limit, as_wei_value(MAX_UINT256, 'wei'), deadline, self.exchangeOf(targets[i]))
+    return results
+
+# @notice Send amount of token held by the router to the owner.
+@public
+def withdrawTokens(token: address, amount: uint256):
+    assert msg.sender == self.owner
+    assert Token(token).transfer(msg.sender, amount)
+
+# @notice Send amount of the ETH held by the router to the owner.
+@public
+def withdrawEth(amount: uint256(wei)):
+    assert msg.sender == self.owner
+    send(msg.sender, amount)
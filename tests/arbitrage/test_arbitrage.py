@@ -0,0 +1,67 @@
+import random
+
+from uniswap import arbitrage
+from uniswap import model
+from uniswap.reader import Pool
+
+from benchmarks import bench_arbitrage
+
+def test_optimal():
+    # The exact optimum of an exhaustive search, on reserves small enough to search
+    rng = random.Random(0)
+    profitable = 0
+    for _ in range(100):
+        eth_a, token_a, eth_b, token_b = [rng.randrange(50, 3000) for _ in range(4)]
+        best = max(model.get_input_price(model.get_input_price(x, eth_a, token_a), token_b, eth_b) - x
+                   for x in range(1, 4 * eth_a))
+        sized = arbitrage.optimal(eth_a, token_a, eth_b, token_b)
+        if best <= 0:
+            assert sized is None
+            continue
+        profitable += 1
+        eth_sold, tokens, eth_bought, profit = sized
+        assert profit == best == eth_bought - eth_sold
+        assert tokens == model.get_input_price(eth_sold, eth_a, token_a)
+        assert eth_bought == model.get_input_price(tokens, token_b, eth_b)
+    assert profitable > 20
+    assert arbitrage.optimal(10**18, 10**18, 10**18, 10**18) is None
+
+def test_scan(monkeypatch):
+    rows = bench_arbitrage.pools(tokens=50, factories=3, spread=0.02)
+    expected = []
+    for buy in rows:
+        for sell in rows:
+            if buy.token == sell.token and buy is not sell:
+                sized = arbitrage.optimal(buy.eth_reserve, buy.token_reserve, sell.eth_reserve, sell.token_reserve)
+                if sized is not None:
+                    expected.append(arbitrage.Opportunity(buy.token, buy, sell, *sized))
+    opportunities = arbitrage.scan(rows)
+    assert sorted(opportunities) == sorted(expected) and len(expected) > 10
+    assert [o.profit for o in opportunities] == sorted([o.profit for o in expected], reverse=True)
+    assert arbitrage.scan(rows, min_profit=10**17) == [o for o in opportunities if o.profit >= 10**17]
+    monkeypatch.setattr(arbitrage, 'numpy', None)
+    assert arbitrage.scan(rows) == opportunities
+
+def test_trade():
+    # Run the top opportunity through the model: two factories listing the same token
+    chain = model.Chain(timestamp=0)
+    trader = '0x%040x' % 0xacc
+    chain.fund(trader, 10**40)
+    token = model.Token(chain, b'T', b'T', 18, 10**40, trader)
+    pools = []
+    for eth, tokens in ((10**21, 2 * 10**23), (3 * 10**21, 63 * 10**22)):
+        factory = model.Factory(chain)
+        factory.initializeFactory(model.Exchange(chain).address, sender=trader)
+        exchange = chain.contract(factory.createExchange(token.address, sender=trader), model.Exchange)
+        token.approve(exchange.address, 2**256 - 1, sender=trader)
+        exchange.addLiquidity(0, tokens, 1, sender=trader, value=eth)
+        pools.append((exchange, Pool(token.address, exchange.address, eth, tokens, eth)))
+    exchanges = {pool.exchange: exchange for exchange, pool in pools}
+    best = arbitrage.scan([pool for _, pool in pools])[0]
+    # tokens are cheaper in the second: 210 per ETH against 200
+    assert best.buy.eth_reserve == 3 * 10**21
+    balance = chain.balance(trader)
+    tokens = exchanges[best.buy.exchange].ethToTokenSwapInput(1, 1, sender=trader, value=best.eth_sold)
+    assert tokens == best.tokens
+    eth = exchanges[best.sell.exchange].tokenToEthSwapInput(tokens, 1, 1, sender=trader)
+    assert eth == best.eth_bought and chain.balance(trader) - balance == best.profit > 0
@@ -0,0 +1,46 @@
+import os
+
+from uniswap import artifacts
+
+FACTORY = 'contracts/uniswap_factory.vy'
+
+def test_cache(tmpdir, monkeypatch):
+    monkeypatch.setattr(artifacts, 'CACHE_DIR', str(tmpdir))
+    monkeypatch.setattr(artifacts, '_memo', {})
+    factory = artifacts.load(FACTORY)
+    assert factory.bytecode.startswith('0x')
+    assert os.path.exists(os.path.join(str(tmpdir), factory.key + '.json'))
+    # In-process memo returns the same object
+    assert artifacts.load(FACTORY) is factory
+    # A fresh process reads the disk cache without compiling
+    monkeypatch.setattr(artifacts, '_memo', {})
+    def fail(source):
+        raise AssertionError('recompiled a cached contract')
+    monkeypatch.setattr(artifacts, '_compile', fail)
+    cached = artifacts.load(FACTORY)
+    assert cached is not factory
+    assert cached.bytecode == factory.bytecode
+    assert cached.abi == factory.abi
+
+def test_source_key():
+    assert artifacts.source_key('x', '0.1.0b4') == artifacts.source_key('x', '0.1.0b4')
+    assert artifacts.source_key('x', '0.1.0b4') != artifacts.source_key('x', '0.1.0b5')
+    assert artifacts.source_key('x', '0.1.0b4') != artifacts.source_key('y', '0.1.0b4')
+
+def test_drift(tmpdir, monkeypatch):
+    assert artifacts.check_committed() == []
+    bytecode = tmpdir.join('factory.txt')
+    bytecode.write('0x00')
+    committed = {FACTORY: (str(bytecode), 'abi/uniswap_exchange.json')}
+    monkeypatch.setattr(artifacts, 'COMMITTED', committed)
+    drift = artifacts.drift(FACTORY)
+    assert drift[0] == '%s does not match compiled %s' % (bytecode, FACTORY)
+    assert any('function createExchange' in d for d in drift)
+    assert any('event NewExchange' in d for d in drift)
+
+def test_lean_exchange_abi():
+    # the gas-lean exchange is a drop-in template: same functions and events, only vyper's gas estimates differ
+    def entries(path):
+        return {key: {k: v for k, v in entry.items() if k != 'gas'}
+                for key, entry in artifacts._abi_entries(artifacts.load(path).abi).items()}
+    assert entries('contracts/uniswap_exchange_lean.vy') == entries('contracts/uniswap_exchange.vy')
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from uniswap import genesis, rpc
+from uniswap.client import Client
+from uniswap.model import ZERO_ADDRESS
+
+from tests.constants import DEADLINE
+
+pytestmark = pytest.mark.evm
+
+SCENARIO = {
+    'tokens': [{'symbol': 'T%d' % i, 'balances': {0: 10**22}, 'allowances': {0: 10**22}} for i in range(4)],
+    'pools': [{'token': 'T%d' % i, 'eth_reserve': 5*10**18, 'token_reserve': (i + 1) * 10**19} for i in range(4)],
+}
+
+@pytest.fixture(scope='module')
+def world(tmpdir_factory):
+    return genesis.World(genesis.cached(SCENARIO, str(tmpdir_factory.mktemp('images'))))
+
+@pytest.fixture
+def server(world):
+    world.snapshot()
+    with rpc.Server(world.tester) as server:
+        yield server
+    world.revert()
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+def test_quotes(world, server):
+    symbols = sorted(world.addresses['exchanges'])
+    views = [('getEthToTokenInputPrice', 10**18), ('getEthToTokenOutputPrice', 10**18),
+             ('getTokenToEthInputPrice', 10**18), ('getTokenToEthOutputPrice', 10**17)]
+
+    async def quote():
+        async with Client(server.url, max_connections=2, batch_size=5) as client:
+            factory = client.factory(world.addresses['factory'])
+            assert await factory.tokenCount() == 4
+            assert await factory.getExchange(world.addresses['tokens']['T1']) == world.addresses['exchanges']['T1']
+            exchanges = [client.exchange(world.addresses['exchanges'][s]) for s in symbols]
+            prices = await asyncio.gather(*[getattr(e, name)(amount) for e in exchanges for name, amount in views])
+            # 16 calls in batches of 5
+            assert client.round_trips == 2 + 4
+            assert await exchanges[2].tokenAddress() == world.addresses['tokens'][symbols[2]]
+            assert await exchanges[0].totalSupply() == 5*10**18
+            pairs = await factory.getExchangesWithIds(1, 2)
+            assert pairs[:2] == [world.addresses['tokens']['T0'], world.addresses['exchanges']['T0']]
+            assert pairs[4:] == [ZERO_ADDRESS] * 196
+            return prices
+
+    expected = [getattr(world.exchange(s).functions, name)(amount).call()
+                for s in symbols for name, amount in views]
+    assert run(quote()) == expected
+
+def test_coalescing(world, server):
+    async def quote():
+        async with Client(server.url) as client:
+            exchange = client.exchange(world.addresses['exchanges']['T0'])
+            prices = await asyncio.gather(*[exchange.getEthToTokenInputPrice(10**18) for _ in range(5)],
+                                          exchange.getEthToTokenInputPrice(10**17))
+            return prices, client.requests
+
+    prices, requests = run(quote())
+    assert len(set(prices[:5])) == 1 and prices[5] < prices[0]
+    assert requests == 2
+
+def test_cancel(world, server):
+    async def quote():
+        async with Client(server.url) as client:
+            exchange = client.exchange(world.addresses['exchanges']['T0'])
+            withdrawn = asyncio.ensure_future(exchange.getTokenToEthInputPrice(10**18))
+            shared = [asyncio.ensure_future(exchange.getEthToTokenInputPrice(10**18)) for _ in range(2)]
+            await asyncio.sleep(0)
+            withdrawn.cancel()
+            shared[0].cancel()
+            # the second caller of the shared call still gets its response
+            price = await shared[1]
+            with pytest.raises(asyncio.CancelledError):
+                await withdrawn
+            return price, client.requests
+
+    price, requests = run(quote())
+    assert price == world.exchange('T0').functions.getEthToTokenInputPrice(10**18).call()
+    assert requests == 1
+
+def test_swaps(world, server):
+    account = world.w3.eth.accounts[0]
+    tokens = world.addresses['tokens']
+
+    async def swap():
+        async with Client(server.url) as client:
+            exchange = client.exchange(world.addresses['exchanges']['T0'])
+            bought = await exchange.getEthToTokenInputPrice(10**18)
+            hashes = [await exchange.ethToTokenSwapInput(10**18, bought, DEADLINE, {'from': account, 'gas': 10**6})]
+            hashes.append(await exchange.tokenToEthSwapInput(10**18, 1, DEADLINE, {'from': account, 'gas': 10**6}))
+            hashes.append(await exchange.tokenToTokenSwapInput(10**18, 1, 1, DEADLINE, tokens['T1'],
+                                                               {'from': account, 'gas': 10**6}))
+            with pytest.raises(ValueError):
+                await exchange.getEthToTokenOutputPrice(10**30)
+            return bought, hashes
+
+    bought, hashes = run(swap())
+    assert [world.w3.eth.getTransactionReceipt(h).status for h in hashes] == [1, 1, 1]
+    token = world.token('T0').functions
+    assert token.balanceOf(world.addresses['exchanges']['T0']).call() == 10**19 - bought + 2 * 10**18
@@ -1,38 +1,65 @@
 import os
+
 import pytest
 from pytest import raises
 
-from web3 import Web3
-from web3.contract import ConciseContract
-import eth_tester
-from eth_tester import EthereumTester, PyEVMBackend
-from eth_tester.exceptions import TransactionFailed
-from vyper import compiler
-
-from tests.constants import (
-    ETH_RESERVE,
-    HAY_RESERVE,
-    DEN_RESERVE,
-    DEADLINE,
-)
+from uniswap import artifacts
+from uniswap.world import EXCHANGES, World
 
 '''
 # run tests with:             python -m pytest -v
 '''
 
-setattr(eth_tester.backends.pyevm.main, 'GENESIS_GAS_LIMIT', 10**9)
-setattr(eth_tester.backends.pyevm.main, 'GENESIS_DIFFICULTY', 1)
+def pytest_addoption(parser):
+    parser.addoption('--backend', choices=('evm', 'model'), default='evm',
+                     help='run the tests on py-evm or on the pure-Python model in uniswap.model')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'evm: needs the py-evm backend (deploys contracts outside uniswap.model)')
+
+def pytest_generate_tests(metafunc):
+    if 'exchange_source' in metafunc.fixturenames and metafunc.config.getoption('backend') == 'evm' and \
+            os.path.basename(os.path.dirname(str(metafunc.definition.fspath))) == 'exchange':
+        metafunc.parametrize('exchange_source', EXCHANGES, indirect=True, scope='session',
+                             ids=[os.path.basename(path)[:-3] for path in EXCHANGES])
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('backend') == 'evm':
+        return
+    skip = pytest.mark.skip(reason='needs --backend=evm')
+    for item in items:
+        if 'evm' in item.keywords:
+            item.add_marker(skip)
+
+def pytest_report_header(config):
+    drift = artifacts.check_committed()
+    if drift:
+        return ['committed artifacts drift from compiled contracts:'] + ['  ' + d for d in drift]
+
+_worlds = {}
+
+@pytest.fixture(scope='session')
+def exchange_source(request):
+    return getattr(request, 'param', EXCHANGES[0])
+
+@pytest.fixture(scope='session')
+def world(request, exchange_source):
+    if request.config.getoption('backend') == 'model':
+        from tests.model_backend import ModelWorld
+        return ModelWorld()
+    # one World per exchange template, shared by the parametrized and the plain tests
+    if exchange_source not in _worlds:
+        _worlds[exchange_source] = World(exchange_source)
+    return _worlds[exchange_source]
 
 @pytest.fixture
-def tester():
-    return EthereumTester(backend=PyEVMBackend())
+def tester(request, world):
+    world.revert(request.fixturenames)
+    return world.tester
 
 @pytest.fixture
-def w3(tester):
-    w3 = Web3(Web3.EthereumTesterProvider(tester))
-    w3.eth.setGasPriceStrategy(lambda web3, params: 0)
-    w3.eth.defaultAccount = w3.eth.accounts[0]
-    return w3
+def w3(tester, world):
+    return world.w3
 
 @pytest.fixture
 def pad_bytes32():
@@ -42,86 +69,33 @@ def pad_bytes32():
         return bstr + (32 - len(bstr)) * b'\x00'
     return pad_bytes32
 
-# @pytest.fixture
-def create_contract(w3, path):
-    wd = os.path.dirname(os.path.realpath(__file__))
-    with open(os.path.join(wd, os.pardir, path)) as f:
-        source = f.read()
-    bytecode = '0x' + compiler.compile(source).hex()
-    abi = compiler.mk_full_signature(source)
-    return w3.eth.contract(abi=abi, bytecode=bytecode)
-
 @pytest.fixture
-def exchange_template(w3):
-    deploy = create_contract(w3, 'contracts/uniswap_exchange.vy')
-    tx_hash = deploy.constructor().transact()
-    tx_receipt = w3.eth.getTransactionReceipt(tx_hash)
-    return ConciseContract(w3.eth.contract(
-        address=tx_receipt.contractAddress,
-        abi=deploy.abi
-    ))
+def exchange_template(w3, world):
+    return world.exchange_template
 
 @pytest.fixture
-def HAY_token(w3):
-    deploy = create_contract(w3, 'contracts/test_contracts/ERC20.vy')
-    tx_hash = deploy.constructor(b'HAY Token', b'HAY', 18, 100000*10**18).transact()
-    tx_receipt = w3.eth.getTransactionReceipt(tx_hash)
-    return ConciseContract(w3.eth.contract(
-        address=tx_receipt.contractAddress,
-        abi=deploy.abi
-    ))
+def HAY_token(w3, world):
+    return world.HAY_token
 
 @pytest.fixture
-def DEN_token(w3):
-    deploy = create_contract(w3, 'contracts/test_contracts/ERC20.vy')
-    tx_hash = deploy.constructor(b'DEN Token', b'DEN', 18, 100000*10**18).transact()
-    tx_receipt = w3.eth.getTransactionReceipt(tx_hash)
-    return ConciseContract(w3.eth.contract(
-        address=tx_receipt.contractAddress,
-        abi=deploy.abi
-    ))
+def DEN_token(w3, world):
+    return world.DEN_token
 
 @pytest.fixture
-def factory(w3, exchange_template):
-    deploy = create_contract(w3, 'contracts/uniswap_factory.vy')
-    tx_hash = deploy.constructor().transact()
-    tx_receipt = w3.eth.getTransactionReceipt(tx_hash)
-    contract = ConciseContract(w3.eth.contract(
-        address=tx_receipt.contractAddress,
-        abi=deploy.abi
-    ))
-    contract.initializeFactory(exchange_template.address, transact={})
-    return contract
+def factory(w3, world):
+    return world.factory
 
 @pytest.fixture
 def exchange_abi():
-    wd = os.path.dirname(os.path.realpath(__file__))
-    code = open(os.path.join(wd, os.pardir, 'contracts/uniswap_exchange.vy')).read()
-    return compiler.mk_full_signature(code)
+    return artifacts.load('contracts/uniswap_exchange.vy').abi
 
 @pytest.fixture
-def HAY_exchange(w3, exchange_abi, factory, HAY_token):
-    factory.createExchange(HAY_token.address, transact={})
-    exchange_address = factory.getExchange(HAY_token.address)
-    exchange = ConciseContract(w3.eth.contract(
-        address=exchange_address,
-        abi=exchange_abi
-    ))
-    HAY_token.approve(exchange_address, HAY_RESERVE, transact={})
-    exchange.addLiquidity(0, HAY_RESERVE, DEADLINE, transact={'value': ETH_RESERVE})
-    return exchange
+def HAY_exchange(w3, world):
+    return world.HAY_exchange
 
 @pytest.fixture
-def DEN_exchange(w3, exchange_abi, factory, DEN_token):
-    factory.createExchange(DEN_token.address, transact={})
-    exchange_address = factory.getExchange(DEN_token.address)
-    exchange = ConciseContract(w3.eth.contract(
-        address=exchange_address,
-        abi=exchange_abi
-    ))
-    DEN_token.approve(exchange_address, DEN_RESERVE, transact={})
-    exchange.addLiquidity(0, DEN_RESERVE, DEADLINE, transact={'value': ETH_RESERVE})
-    return exchange
+def DEN_exchange(w3, world):
+    return world.DEN_exchange
 
 
 @pytest.fixture
@@ -1,12 +1,9 @@
+# Passing deadline and INITIAL RESERVE SIZE, as the world is deployed with them
+from uniswap.world import DEADLINE, ETH_RESERVE, HAY_RESERVE, DEN_RESERVE
+
 ZERO_ADDR = '0x0000000000000000000000000000000000000000'
 # Initial ETH balance of buyer
 INITIAL_ETH = 1*10**24
-# Passing deadline
-DEADLINE = 1742680400 # deadline = w3.eth.getBlock(w3.eth.blockNumber).timestamp
-# INITIAL RESERVE SIZE
-ETH_RESERVE = 5*10**18
-HAY_RESERVE = 10*10**18
-DEN_RESERVE = 20*10**18
 # ETH to ERC20 swap input
 ETH_SOLD = 1*10**18
 MIN_HAY_BOUGHT = 1
@@ -0,0 +1,74 @@
+import bisect
+import random
+from fractions import Fraction
+
+import pytest
+
+from uniswap import model
+from uniswap.depth import Depth, DepthTable, ETH_TO_TOKEN, TOKEN_TO_ETH
+from uniswap.reserves import Reserves
+
+def brute_min_input(amount, outputs):
+    # outputs holds every size's price, so the first one reaching amount is exact
+    return bisect.bisect_left(outputs, amount)
+
+def brute_max_output(budget, costs):
+    return max(amount for amount, cost in enumerate(costs) if cost <= budget)
+
+def test_small_reserves():
+    # Every answer checked against a scan of the contract's formulas
+    table = DepthTable(1000, 3000, points_per_decade=4)
+    outputs = [model.get_input_price(size, 1000, 3000) for size in range(3 * 10**5)]
+    costs = [0] + [model.get_output_price(amount, 1000, 3000) for amount in range(1, 3000)]
+    for amount in range(1, 2990):
+        assert table.min_input(amount) == brute_min_input(amount, outputs)
+    assert table.min_input(3000) is None and table.min_input(0) == 0
+    for budget in list(range(0, 5000)) + [10**9]:
+        assert table.max_output(budget) == brute_max_output(budget, costs)
+
+def test_large_reserves():
+    rng = random.Random(0)
+    for _ in range(20):
+        eth, tokens = rng.randrange(10**18, 10**22), rng.randrange(10**18, 10**24)
+        table = DepthTable(eth, tokens)
+        for amount in [1, 2, rng.randrange(tokens // 1000), rng.randrange(tokens), tokens - 1]:
+            size = table.min_input(amount)
+            assert table.output(size) >= amount > table.output(size - 1)
+            # an Output swap charges at least what the cheapest Input swap costs, the +1 included
+            assert size <= table.cost(amount)
+        for budget in [1, rng.randrange(eth), rng.randrange(eth * 10**4)]:
+            amount = table.max_output(budget)
+            assert amount == 0 or table.cost(amount) <= budget
+            assert amount + 1 == tokens or table.cost(amount + 1) > budget
+
+def test_max_input():
+    table = DepthTable(10**21, 5 * 10**23)
+    for impact in [Fraction(1, 10**6), Fraction(1, 100), 0.05, Fraction(1, 2), Fraction(99, 100)]:
+        size = table.max_input(impact)
+        assert table.impact(size) <= Fraction(impact) < table.impact(size + 1)
+        # without rounding impact is 997 * size / (1000 * reserve + 997 * size)
+        smooth = Fraction(1000 * 10**21) * Fraction(impact) / (997 * (1 - Fraction(impact)))
+        assert abs(size - smooth) <= smooth / 10**6 + 2
+    assert table.max_input(Fraction(1, 10**30)) == 0
+    assert table.max_input(1) == table.sizes[-1]
+
+class Cache(object):
+    def __init__(self):
+        self.reserves = {}
+    def get(self, exchange):
+        return self.reserves[exchange]
+
+def test_invalidation():
+    cache = Cache()
+    cache.reserves['A'] = Reserves(10**20, 10**22, 10**20)
+    depth = Depth(cache)
+    table = depth.table('A')
+    assert depth.table('A', ETH_TO_TOKEN) is table and depth.builds == 1
+    assert depth.table('A', TOKEN_TO_ETH).input_reserve == 10**22 and depth.builds == 2
+    # a swap moved the reserves: only the tables of the new reserves answer
+    cache.reserves['A'] = Reserves(10**20 + 10**18, 10**22 - 98715803439706130000, 10**20)
+    moved = depth.table('A')
+    assert moved is not table and depth.builds == 3
+    assert moved.min_input(10**20) == DepthTable(*cache.reserves['A'][:2]).min_input(10**20) != table.min_input(10**20)
+    with pytest.raises(ValueError):
+        depth.table('A', 'sideways')
@@ -1,7 +1,14 @@
+import pytest
 from pytest import raises
+from web3 import Web3
 from web3.contract import ConciseContract
 from eth_tester.exceptions import TransactionFailed
 
+from uniswap import artifacts
+from uniswap import factory as bulk
+
+ZERO = '0x' + '00' * 20
+
 def test_factory(w3, exchange_template, HAY_token, factory, pad_bytes32, exchange_abi, assert_fail):
     a0, a1 = w3.eth.accounts[:2]
     # Can't call initializeFactory on factory twice
@@ -32,3 +39,50 @@ def test_factory(w3, exchange_template, HAY_token, factory, pad_bytes32, exchang
     assert HAY_exchange.factoryAddress() == factory.address
     assert w3.eth.getBalance(HAY_exchange.address) == 0
     assert HAY_token.balanceOf(HAY_exchange.address) == 0
+
+def test_create_exchanges(w3, factory, exchange_abi):
+    tokens = [Web3.toChecksumAddress('0x%040x' % (0xf00d << 128 | i)) for i in range(1, 26)]
+    # one transaction creates up to 20 exchanges, in list order, all or none
+    with raises(TransactionFailed):
+        factory.createExchanges([ZERO] * 20)
+    with raises(TransactionFailed):
+        factory.createExchanges([tokens[0], tokens[0]] + [ZERO] * 18)
+    exchanges = factory.createExchanges(tokens[:3] + [ZERO] * 17)
+    factory.createExchanges(tokens[:3] + [ZERO] * 17, transact={})
+    assert exchanges[3:] == [None] * 17
+    assert [factory.getExchange(t) for t in tokens[:3]] == exchanges[:3]
+    assert [factory.getToken(e) for e in exchanges[:3]] == tokens[:3]
+    exchange = ConciseContract(w3.eth.contract(address=exchanges[2], abi=exchange_abi))
+    assert exchange.tokenAddress() == tokens[2] and exchange.factoryAddress() == factory.address
+    factory.createExchange(tokens[3], transact={})
+    factory.createExchanges(tokens[4:24], transact={})
+    assert factory.tokenCount() == 24
+    assert [factory.getTokenWithId(i) for i in (1, 4, 5, 24, 25)] == tokens[:1] + tokens[3:5] + [tokens[23], None]
+    with raises(TransactionFailed):
+        factory.createExchanges(tokens[23:25] + [ZERO] * 18)
+    # pages of (token, exchange) pairs by token id
+    pairs = factory.getExchangesWithIds(1, 100)
+    assert pairs[:48] == [a for t in tokens[:24] for a in (t, factory.getExchange(t))]
+    assert pairs[48:] == [None] * 152
+    assert factory.getExchangesWithIds(3, 2)[:6] == pairs[4:8] + [None, None]
+    assert factory.getExchangesWithIds(25, 100) == [None] * 200
+    with raises(TransactionFailed):
+        factory.getExchangesWithIds(0, 10)
+    with raises(TransactionFailed):
+        factory.getExchangesWithIds(1, 101)
+
+@pytest.mark.evm
+def test_bulk_helpers(w3, exchange_template):
+    tokens = [Web3.toChecksumAddress('0x%040x' % (0xbeef << 128 | i)) for i in range(1, 46)]
+    contract = w3.eth.contract(address=bulk.deploy(w3, exchange_template.address), abi=artifacts.load(bulk.FACTORY).abi)
+    # 45 exchanges in three transactions, read back in pages at one block
+    block = w3.eth.blockNumber
+    exchanges = bulk.create_exchanges(contract, tokens)
+    assert w3.eth.blockNumber == block + 3
+    assert exchanges == [contract.functions.getExchange(t).call() for t in tokens]
+    assert list(bulk.pairs(contract)) == list(zip(tokens, exchanges))
+    assert list(bulk.pairs(contract, start=40, page_size=4)) == list(zip(tokens, exchanges))[39:]
+    assert list(bulk.pairs(contract, block_identifier=block)) == []
+    # an existing exchange fails the whole batch it is in, which the read back notices
+    with raises(RuntimeError):
+        bulk.create_exchanges(contract, tokens[44:] + [Web3.toChecksumAddress('0x%040x' % 0xbeef)])
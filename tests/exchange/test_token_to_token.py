@@ -144,3 +144,25 @@ def test_transfer_output(w3, HAY_token, DEN_token, HAY_exchange, DEN_exchange, s
     assert HAY_token.balanceOf(a2) ==  0
     assert DEN_token.balanceOf(a2) == DEN_BOUGHT
     assert w3.eth.getBalance(a2) == INITIAL_ETH
+
+def test_repeated_swaps(w3, HAY_token, DEN_token, HAY_exchange, DEN_exchange, swap_input, swap_output):
+    a0, a1, a2 = w3.eth.accounts[:3]
+    FIRST_ETH = swap_input(HAY_SOLD, HAY_RESERVE, ETH_RESERVE)
+    FIRST_DEN = swap_input(FIRST_ETH, ETH_RESERVE, DEN_RESERVE)
+    SECOND_ETH = swap_input(HAY_SOLD, HAY_RESERVE + HAY_SOLD, ETH_RESERVE - FIRST_ETH)
+    SECOND_DEN = swap_input(SECOND_ETH, ETH_RESERVE + FIRST_ETH, DEN_RESERVE - FIRST_DEN)
+    ETH_COST = swap_output(DEN_BOUGHT, ETH_RESERVE + FIRST_ETH + SECOND_ETH, DEN_RESERVE - FIRST_DEN - SECOND_DEN)
+    HAY_COST = swap_output(ETH_COST, HAY_RESERVE + 2*HAY_SOLD, ETH_RESERVE - FIRST_ETH - SECOND_ETH)
+    HAY_token.transfer(a1, 2*HAY_SOLD + HAY_COST, transact={})
+    HAY_token.approve(HAY_exchange.address, 2*HAY_SOLD + HAY_COST, transact={'from': a1})
+    # Later swaps to DEN go to the same exchange as the first one
+    HAY_exchange.tokenToTokenSwapInput(HAY_SOLD, MIN_DEN_BOUGHT, MIN_ETH_BOUGHT, DEADLINE, DEN_token.address, transact={'from': a1})
+    HAY_exchange.tokenToTokenTransferInput(HAY_SOLD, MIN_DEN_BOUGHT, MIN_ETH_BOUGHT, DEADLINE, a2, DEN_token.address, transact={'from': a1})
+    HAY_exchange.tokenToTokenSwapOutput(DEN_BOUGHT, HAY_COST, ETH_COST, DEADLINE, DEN_token.address, transact={'from': a1})
+    assert w3.eth.getBalance(HAY_exchange.address) == ETH_RESERVE - FIRST_ETH - SECOND_ETH - ETH_COST
+    assert HAY_token.balanceOf(HAY_exchange.address) == HAY_RESERVE + 2*HAY_SOLD + HAY_COST
+    assert w3.eth.getBalance(DEN_exchange.address) == ETH_RESERVE + FIRST_ETH + SECOND_ETH + ETH_COST
+    assert DEN_token.balanceOf(DEN_exchange.address) == DEN_RESERVE - FIRST_DEN - SECOND_DEN - DEN_BOUGHT
+    assert HAY_token.balanceOf(a1) == 0
+    assert DEN_token.balanceOf(a1) == FIRST_DEN + DEN_BOUGHT
+    assert DEN_token.balanceOf(a2) == SECOND_DEN
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from uniswap import fuzz, genesis, model
+from uniswap.fuzz import Fuzzer, Op
+
+pytestmark = pytest.mark.evm
+
+@pytest.fixture(scope='module')
+def fuzzer(tmpdir_factory):
+    world = genesis.World(genesis.cached(fuzz.SCENARIO, str(tmpdir_factory.mktemp('genesis'))))
+    return Fuzzer(world.tester, world.addresses)
+
+def test_agreement(fuzzer):
+    for n in range(6):
+        ops = fuzz.sequence(random.Random(n), fuzzer.timestamp)
+        assert fuzzer.run(ops, seed=n) is None
+    # edge cases by hand: the minimum pool, amounts that overflow, a new exchange and a donation
+    ops = [
+        Op('tokenToEthSwapInput', 'LOW', 1, (10**9, 1, fuzz.FAR), 0),
+        Op('ethToTokenSwapOutput', 'HIGH', 2, (2**199, fuzz.FAR), 2**249),
+        Op('addLiquidity', 'HIGH', 2, (1, fuzz.MAX, fuzz.FAR), 2**200),
+        Op('createExchange', 'NEW', 0, (('token', 'NEW'),), 0),
+        Op('approve', 'NEW', 1, (('exchange', 'NEW'), fuzz.MAX), 0),
+        Op('addLiquidity', 'NEW', 1, (0, 10**9, fuzz.FAR), 10**9 - 1),
+        Op('addLiquidity', 'NEW', 1, (0, 10**9, fuzz.FAR), 10**9),
+        Op('transfer', 'MID', 3, (('exchange', 'MID'), 10**6), 0),
+        Op('removeLiquidity', 'MID', 0, (10**18, 1, 1, fuzzer.timestamp - 1), 0),
+        Op('removeLiquidity', 'LOW', 0, (10**9, 1, 1, fuzz.FAR), 0),
+    ]
+    assert fuzzer.run(ops) is None
+
+def test_shrink(fuzzer, monkeypatch):
+    swap = model.Exchange.tokenToEthSwapInput
+    def skimmed(self, tokens_sold, min_eth, deadline, sender=None):
+        return swap(self, tokens_sold - (tokens_sold > 10**20), min_eth, deadline, sender=sender)
+    monkeypatch.setattr(model.Exchange, 'tokenToEthSwapInput', skimmed)
+    ops = [
+        Op('ethToTokenSwapInput', 'MID', 0, (1, fuzz.FAR), 10**18),
+        Op('tokenToEthSwapInput', 'MID', 2, (10**21, 1, fuzz.FAR), 0),
+        Op('ethToTokenSwapInput', 'LOW', 1, (1, fuzz.FAR), 10**9),
+    ]
+    failure = fuzzer.run(ops, seed=7)
+    # the ETH paid out rounds the same, the reserve it leaves does not
+    assert (failure.step, failure.kind) == (1, 'pool MID')
+    shrunk = fuzzer.shrink(failure)
+    # one swap of the least tokens that are skimmed, before the least deadline that passes
+    assert shrunk.seed == 7 and shrunk.kind == 'pool MID'
+    assert shrunk.ops == [Op('tokenToEthSwapInput', 'MID', 2, (10**20 + 1, 1, fuzzer.timestamp), 0)]
+
+def test_invariant():
+    swap = Op('ethToTokenSwapInput', 'MID', 0, (1, fuzz.FAR), 10)
+    assert fuzz._invariant(swap, (100, 100, 100), (110, 91, 100)) is None
+    assert 'k decreased' in fuzz._invariant(swap, (100, 100, 100), (110, 90, 100))
+    remove = Op('removeLiquidity', 'MID', 0, (10, 1, 1, fuzz.FAR), 0)
+    assert fuzz._invariant(remove, (100, 100, 100), (90, 90, 90)) is None
+    assert 'per UNI' in fuzz._invariant(remove, (100, 100, 100), (89, 90, 90))
+    # the last UNI burnt leaves nothing to compare
+    assert fuzz._invariant(remove, (100, 100, 100), (0, 0, 0)) is None
+
+def test_batch(tmpdir):
+    batches = list(fuzz.fuzz(6, batch_size=3, length=4, processes=2, cache_dir=str(tmpdir)))
+    assert [b.sequences for b in batches] == [3, 3] and sum(sum(b.outcomes.values()) for b in batches) == 24
+    assert not any(b.failures for b in batches)
+    # the model's invariants alone, without the EVM
+    batches = list(fuzz.fuzz(40, batch_size=20, processes=1, evm=False, cache_dir=str(tmpdir)))
+    assert sum(b.sequences for b in batches) == 40 and not any(b.failures for b in batches)
@@ -0,0 +1,38 @@
+import pytest
+
+from uniswap.world import EXCHANGES
+
+from benchmarks import bench_gas
+
+def test_regressions():
+    baseline = {'a': 1000, 'b': 1000}
+    assert bench_gas.regressions({'a': 1010, 'b': 1011, 'c': 5000}, baseline) == ['b']
+    assert bench_gas.regressions({'a': 1010, 'b': 1011}, baseline, threshold=0.02) == []
+    lines = bench_gas.table({'a': 900, 'b': 1011, 'c': 5000}, baseline).splitlines()
+    assert lines[1].split() == ['a', '1000', '900', '-10.00%']
+    assert lines[2].split() == ['b', '1000', '1011', '+1.10%', '!']
+    assert lines[3].split() == ['c', '-', '5000', 'new']
+
+@pytest.mark.evm
+def test_gas_baseline(world):
+    gas = bench_gas.measure(world)
+    baseline = bench_gas.load_baseline()['gas']
+    # Every entry point is covered, and none costs more than the committed baseline allows
+    assert list(gas) == list(baseline)
+    assert bench_gas.regressions(gas, baseline) == [], bench_gas.table(gas, baseline)
+
+@pytest.mark.evm
+def test_lean_exchange():
+    gas = bench_gas.measure(exchange=EXCHANGES[1])
+    baseline = bench_gas.load_baseline()['gas']
+    first = 'exchange.tokenToTokenSwapInput (first to DEN)'
+    # No exchange entry point costs more than with uniswap_exchange.vy, but the first swap to a token,
+    # which stores its exchange; createExchange pays a little more for setup(), dispatched after everything else
+    exchange = {name: used for name, used in gas.items() if name.startswith('exchange.') and name != first}
+    assert bench_gas.regressions(exchange, baseline, threshold=0) == [], bench_gas.table(gas, baseline)
+    # Later swaps to that token read it back instead of calling the factory
+    assert gas[first] - gas['exchange.tokenToTokenSwapInput'] < 20000 + 3000, bench_gas.table(gas, baseline)
+    tokens = [name for name in exchange if 'tokenToToken' in name]
+    swaps = [name for name in exchange if 'To' in name or name == 'exchange.__default__']
+    assert len(tokens) == 4 and all(gas[name] < baseline[name] * 0.96 for name in tokens), bench_gas.table(gas, baseline)
+    assert len(swaps) == 17 and all(gas[name] < baseline[name] * 0.985 for name in swaps), bench_gas.table(gas, baseline)
@@ -0,0 +1,119 @@
+import pytest
+
+from web3.contract import ConciseContract
+
+from uniswap import artifacts, genesis
+from uniswap.world import make_w3
+
+from tests.constants import ETH_RESERVE, HAY_RESERVE, DEN_RESERVE, DEADLINE, INITIAL_ETH
+
+pytestmark = pytest.mark.evm
+
+SUPPLY = 100000*10**18
+
+# The state tests/conftest.py World reaches with transactions
+WORLD = {
+    'eth': {0: INITIAL_ETH - 2*ETH_RESERVE},
+    'tokens': [
+        {'symbol': 'HAY', 'balances': {0: SUPPLY - HAY_RESERVE}},
+        {'symbol': 'DEN', 'balances': {0: SUPPLY - DEN_RESERVE}},
+    ],
+    'pools': [
+        {'token': 'HAY', 'eth_reserve': ETH_RESERVE, 'token_reserve': HAY_RESERVE},
+        {'token': 'DEN', 'eth_reserve': ETH_RESERVE, 'token_reserve': DEN_RESERVE},
+    ],
+}
+
+def contract(w3, address, path):
+    return ConciseContract(w3.eth.contract(address=address, abi=artifacts.load(path).abi))
+
+def views(w3, factory, token, exchange):
+    a0, a1 = w3.eth.accounts[:2]
+    return [
+        factory.tokenCount(), factory.getExchange(token.address) == exchange.address,
+        factory.getToken(exchange.address) == token.address,
+        exchange.name(), exchange.symbol(), exchange.decimals(), exchange.totalSupply(),
+        exchange.balanceOf(a0), exchange.balanceOf(a1), exchange.tokenAddress() == token.address,
+        exchange.factoryAddress() == factory.address, w3.eth.getBalance(exchange.address),
+        exchange.getEthToTokenInputPrice(10**18), exchange.getTokenToEthOutputPrice(10**17),
+        token.name(), token.symbol(), token.decimals(), token.totalSupply(), token.balanceOf(a0),
+        token.balanceOf(exchange.address), token.allowance(a0, exchange.address), w3.eth.getBalance(a0),
+    ]
+
+def test_layout(tester, w3, exchange_template, factory, HAY_token, HAY_exchange, DEN_exchange):
+    # Slots and code computed by genesis match what the transactions left behind. (DEN_exchange
+    # keeps the approve below off a fork of the HAY-only snapshot: reverting across a fork drops
+    # the transaction lookups later log queries need.)
+    def storage(contract, path, name, *keys):
+        # eth-tester has no eth_getStorageAt
+        account_db = tester.backend.chain.get_vm().state.account_db
+        return account_db.get_storage(w3.toBytes(hexstr=contract.address), genesis.slot(path, name, *keys))
+    assert storage(factory, genesis.FACTORY, 'tokenCount') == 2
+    assert storage(factory, genesis.FACTORY, 'token_to_exchange', HAY_token.address) == int(HAY_exchange.address, 16)
+    assert storage(factory, genesis.FACTORY, 'exchange_to_token', HAY_exchange.address) == int(HAY_token.address, 16)
+    assert storage(factory, genesis.FACTORY, 'id_to_token', 1) == int(HAY_token.address, 16)
+    assert storage(HAY_exchange, genesis.EXCHANGE, 'balances', w3.eth.accounts[0]) == ETH_RESERVE
+    assert storage(HAY_exchange, genesis.EXCHANGE, 'name') == genesis.bytes32('Uniswap V1')
+    assert storage(HAY_token, genesis.TOKEN, 'name') == genesis.bytes32('HAY Token')
+    HAY_token.approve(HAY_exchange.address, 123, transact={})
+    assert storage(HAY_token, genesis.TOKEN, 'allowances', w3.eth.accounts[0], HAY_exchange.address) == 123
+    assert w3.eth.getCode(exchange_template.address) == artifacts.runtime(genesis.EXCHANGE)
+    assert w3.eth.getCode(HAY_exchange.address) == genesis.forwarder(exchange_template.address)
+
+def test_world(w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    image = genesis.Image.build(WORLD)
+    loaded = make_w3(image.load())
+    assert loaded.eth.accounts == w3.eth.accounts
+    loaded_factory = contract(loaded, image.addresses['factory'], genesis.FACTORY)
+    for symbol, token, exchange in (('HAY', HAY_token, HAY_exchange), ('DEN', DEN_token, DEN_exchange)):
+        loaded_token = contract(loaded, image.addresses['tokens'][symbol], genesis.TOKEN)
+        loaded_exchange = contract(loaded, image.addresses['exchanges'][symbol], genesis.EXCHANGE)
+        assert views(loaded, loaded_factory, loaded_token, loaded_exchange) == views(w3, factory, token, exchange)
+    assert loaded_factory.getTokenWithId(2) == image.addresses['tokens']['DEN']
+    # The same swap costs the same gas and leaves the same reserves
+    a1 = w3.eth.accounts[1]
+    HAY = contract(loaded, image.addresses['exchanges']['HAY'], genesis.EXCHANGE)
+    receipts = [
+        w3.eth.getTransactionReceipt(HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})),
+        loaded.eth.getTransactionReceipt(HAY.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})),
+    ]
+    assert receipts[0].gasUsed == receipts[1].gasUsed
+    assert HAY.getEthToTokenInputPrice(10**18) == HAY_exchange.getEthToTokenInputPrice(10**18)
+    # A new exchange from the loaded factory does not collide with the genesis ones
+    new_token = loaded.toChecksumAddress('0x%040x' % 0xbeef)
+    loaded_factory.createExchange(new_token, transact={})
+    assert loaded_factory.tokenCount() == 3
+    assert loaded_factory.getExchange(new_token) not in image.addresses['exchanges'].values()
+
+def test_cached(tmpdir):
+    scenario = {
+        'accounts': 12,
+        'tokens': [{'symbol': 'T%d' % i, 'balances': {11: 10**20}, 'allowances': {11: 10**20}} for i in range(5)] +
+                  [{'symbol': 'NOPOOL', 'decimals': 6, 'balances': {0: 10**12}}],
+        'pools': [{'token': 'T%d' % i, 'eth_reserve': (i + 1)*10**18, 'token_reserve': 10**20,
+                   'liquidity': {0: (i + 1)*10**18, 11: 10**18}} for i in range(5)],
+    }
+    image = genesis.cached(scenario, str(tmpdir))
+    assert len(tmpdir.listdir()) == 1
+    reread = genesis.cached(scenario, str(tmpdir))
+    assert reread.kv_store == image.kv_store and reread.addresses == image.addresses
+    # Each load is an independent chain
+    first, second = make_w3(reread.load()), make_w3(reread.load())
+    a11 = first.eth.accounts[11]
+    T4 = contract(first, image.addresses['exchanges']['T4'], genesis.EXCHANGE)
+    assert T4.totalSupply() == 6*10**18
+    assert T4.balanceOf(a11) == 10**18
+    T4.tokenToEthSwapInput(10**18, 1, DEADLINE, transact={'from': a11})
+    T4.removeLiquidity(10**18, 1, 1, DEADLINE, transact={'from': a11})
+    assert T4.balanceOf(a11) == 0
+    assert contract(second, image.addresses['exchanges']['T4'], genesis.EXCHANGE).balanceOf(a11) == 10**18
+    token = contract(first, image.addresses['tokens']['NOPOOL'], genesis.TOKEN)
+    assert (token.decimals(), token.totalSupply()) == (6, 10**12)
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        genesis.genesis_state({'tokens': [{'symbol': 'A'}], 'pools': [{'token': 'B'}]})
+    with pytest.raises(ValueError):
+        genesis.genesis_state({'tokens': [{'symbol': 'A'}], 'pools': [{'token': 'A', 'eth_reserve': 10**18}]})
+    with pytest.raises(ValueError):
+        genesis.genesis_state({'tokens': [{'symbol': 'A', 'allowances': {0: 1}}]})
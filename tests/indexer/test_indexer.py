@@ -0,0 +1,87 @@
+import pytest
+
+from uniswap import indexer as indexer_module
+from uniswap.indexer import Indexer
+
+from uniswap.model import ZERO_ADDRESS
+
+from tests.constants import ETH_RESERVE, HAY_RESERVE, DEADLINE
+
+pytestmark = pytest.mark.evm
+
+def test_indexer(tmpdir, w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange, swap_input):
+    a0, a1 = w3.eth.accounts[:2]
+    path = str(tmpdir.join('uniswap.sqlite'))
+    indexer = Indexer(w3, factory.address, path, batch_size=3)
+    indexer.sync()
+    assert [(e.token, e.exchange) for e in indexer.exchanges()] == [
+        (HAY_token.address, HAY_exchange.address), (DEN_token.address, DEN_exchange.address)]
+    # Each exchange adds the initial liquidity and mints UNI to a0
+    HAY_events = indexer.events(exchange=HAY_exchange.address)
+    assert [(e.event, e.account, e.eth, e.tokens) for e in HAY_events] == [
+        ('AddLiquidity', a0, ETH_RESERVE, HAY_RESERVE),
+        ('Transfer', ZERO_ADDRESS, None, ETH_RESERVE),
+    ]
+    assert HAY_events[1].recipient == a0
+    assert [e.event for e in indexer.events(exchange=DEN_exchange.address)] == ['AddLiquidity', 'Transfer']
+    # Swaps after the cursor are picked up incrementally
+    tokens_bought = swap_input(10**18, ETH_RESERVE, HAY_RESERVE)
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+    start = w3.eth.getBlock('latest')['timestamp']
+    HAY_token.approve(HAY_exchange.address, tokens_bought, transact={'from': a1})
+    HAY_exchange.tokenToEthSwapInput(tokens_bought, 1, DEADLINE, transact={'from': a1})
+    assert indexer.sync() == 2
+    purchases = indexer.events(names=['TokenPurchase', 'EthPurchase'])
+    assert [(e.event, e.exchange, e.account, e.tokens) for e in purchases] == [
+        ('TokenPurchase', HAY_exchange.address, a1, tokens_bought),
+        ('EthPurchase', HAY_exchange.address, a1, tokens_bought),
+    ]
+    assert purchases[0].eth == 10**18
+    assert [e.event for e in indexer.events(exchange=HAY_exchange.address, start=start + 1)] == ['EthPurchase']
+    assert indexer.events(exchange=DEN_exchange.address, start=start + 1) == []
+    assert indexer.sync() == 0
+    indexer.close()
+
+def test_resume(tmpdir, w3, factory, HAY_exchange, DEN_exchange, monkeypatch):
+    head = w3.eth.blockNumber
+    full = Indexer(w3, factory.address, str(tmpdir.join('full.sqlite')))
+    full.sync()
+    DEN_block = full.events(exchange=DEN_exchange.address)[0].block
+    # Crash while fetching the timestamp of the first DEN exchange event
+    path = str(tmpdir.join('uniswap.sqlite'))
+    indexer = Indexer(w3, factory.address, path, batch_size=1)
+    indexer.sync(DEN_block - 1)
+    def crash(block_identifier, full_transactions=False):
+        raise RuntimeError('crash')
+    get_block = w3.eth.getBlock
+    monkeypatch.setattr(w3.eth, 'getBlock', crash)
+    with pytest.raises(RuntimeError):
+        indexer.sync()
+    assert indexer.cursor == DEN_block
+    indexer.close()
+    monkeypatch.setattr(w3.eth, 'getBlock', get_block)
+    # A new process resumes from the cursor without duplicating or losing rows
+    indexer = Indexer(w3, factory.address, path, batch_size=1)
+    assert len(indexer.exchanges()) == 2
+    indexer.sync()
+    assert indexer.cursor == head + 1
+    assert indexer.exchanges() == full.exchanges()
+    assert indexer.events() == full.events()
+
+def test_filters(tmpdir, w3, factory, HAY_exchange, DEN_exchange, monkeypatch):
+    full = Indexer(w3, factory.address, str(tmpdir.join('full.sqlite')), batch_size=1000)
+    requests = []
+    get_logs = w3.eth.getLogs
+    monkeypatch.setattr(w3.eth, 'getLogs', lambda params: requests.append(params) or get_logs(params))
+    full.sync()
+    # one range: the factory and no exchange yet, then the two exchanges it created, by topic
+    assert [r['address'] for r in requests] == [[factory.address], sorted([HAY_exchange.address, DEN_exchange.address])]
+    assert all(len(r['topics'][0]) == 6 for r in requests)
+    # ranges that start after an exchange exists list it; past MAX_ADDRESSES only topics are filtered
+    for max_addresses in (1000, 1):
+        monkeypatch.setattr(indexer_module, 'MAX_ADDRESSES', max_addresses)
+        requests[:] = []
+        indexer = Indexer(w3, factory.address, str(tmpdir.join('%d.sqlite' % max_addresses)), batch_size=2)
+        indexer.sync()
+        assert indexer.exchanges() == full.exchanges() and indexer.events() == full.events()
+        assert ('address' in requests[-1]) == (max_addresses > 1)
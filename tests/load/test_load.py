@@ -0,0 +1,32 @@
+import argparse
+
+import pytest
+
+from benchmarks import load
+from uniswap import genesis
+
+pytestmark = pytest.mark.evm
+
+def test_targets_agree(tmpdir):
+    image = genesis.cached(load.scenario(accounts=4, pools=2), str(tmpdir))
+    reports = []
+    for target_class in (load.InProcess, load.Rpc):
+        world = genesis.World(image)
+        target = target_class(world)
+        try:
+            reports.append(load.run(target, load.Traffic(world, seed=1), blocks=2, per_block=6))
+        finally:
+            target.close()
+    in_process, rpc = reports
+    assert in_process['transactions'] == rpc['transactions'] == 12
+    # Every block holds all its transactions, and the same seed gives the same chain either way
+    assert in_process['transactions_per_block']['min'] == 6
+    for key in ('gas_per_block', 'transactions_per_block', 'sent', 'failures'):
+        assert in_process[key] == rpc[key]
+
+def test_parse_mix():
+    mix = load.parse_mix(['transfer=2', 'eth_to_token=1'])
+    assert list(mix) == list(load.MIX)
+    assert mix['transfer'] == 2 and mix['eth_to_token'] == 1 and mix['token_to_eth'] == 0
+    with pytest.raises(argparse.ArgumentTypeError):
+        load.parse_mix(['mint=1'])
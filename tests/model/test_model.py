@@ -0,0 +1,116 @@
+from pytest import raises
+
+from uniswap.model import (
+    Chain,
+    Exchange,
+    Factory,
+    Token,
+    Revert,
+    UINT256_MAX,
+    get_input_price,
+    get_output_price,
+)
+from tests.constants import (
+    ETH_RESERVE,
+    HAY_RESERVE,
+    DEN_RESERVE,
+    HAY_SOLD,
+    DEN_BOUGHT,
+    INITIAL_ETH,
+    DEADLINE,
+)
+
+a0, a1, a2 = ['0x%040x' % i for i in range(0xa0, 0xa3)]
+
+def make_world():
+    chain = Chain(timestamp=DEADLINE - 3600, record_logs=True)
+    for account in (a0, a1, a2):
+        chain.fund(account, INITIAL_ETH)
+    factory = Factory(chain)
+    factory.initializeFactory(Exchange(chain).address, sender=a0)
+    exchanges = []
+    for reserve in (HAY_RESERVE, DEN_RESERVE):
+        token = Token(chain, b'', b'', 18, 100000*10**18, a0)
+        exchange = chain.contracts[factory.createExchange(token.address, sender=a0)]
+        token.approve(exchange.address, reserve, sender=a0)
+        exchange.addLiquidity(0, reserve, DEADLINE, sender=a0, value=ETH_RESERVE)
+        exchanges.append((token, exchange))
+    return chain, factory, exchanges
+
+def test_prices():
+    assert get_input_price(HAY_SOLD, HAY_RESERVE, ETH_RESERVE) == 831248957812239453
+    assert get_output_price(831248957812239453, HAY_RESERVE, ETH_RESERVE) == HAY_SOLD
+    with raises(Revert):
+        get_input_price(1, 0, 1)
+    # output == reserve divides by zero, output > reserve underflows
+    with raises(Revert):
+        get_output_price(ETH_RESERVE, HAY_RESERVE, ETH_RESERVE)
+    with raises(Revert):
+        get_output_price(ETH_RESERVE + 1, HAY_RESERVE, ETH_RESERVE)
+    # input_amount * 997 * output_reserve overflows uint256
+    with raises(Revert):
+        get_input_price(UINT256_MAX // 997, 1, 2)
+
+def test_token_to_token():
+    chain, factory, ((HAY, HAY_exchange), (DEN, DEN_exchange)) = make_world()
+    HAY.transfer(a1, HAY_SOLD, sender=a0)
+    HAY.approve(HAY_exchange.address, HAY_SOLD, sender=a1)
+    assert HAY_exchange.tokenToTokenSwapInput(HAY_SOLD, 1, 1, DEADLINE, DEN.address, sender=a1) == DEN_BOUGHT
+    assert DEN.balanceOf(a1) == DEN_BOUGHT
+    assert chain.balance(a1) == INITIAL_ETH
+    assert [log[1] for log in chain.logs[-4:]] == ['Transfer', 'Transfer', 'TokenPurchase', 'EthPurchase']
+
+def test_rollback():
+    chain, factory, ((HAY, HAY_exchange), (DEN, DEN_exchange)) = make_world()
+    HAY.transfer(a1, HAY_SOLD, sender=a0)
+    HAY.approve(HAY_exchange.address, HAY_SOLD, sender=a1)
+    logs = list(chain.logs)
+    # Fails in the nested ethToTokenTransferInput, after HAY was already moved
+    with raises(Revert):
+        HAY_exchange.tokenToTokenSwapInput(HAY_SOLD, DEN_BOUGHT + 1, 1, DEADLINE, DEN.address, sender=a1)
+    assert HAY.balanceOf(a1) == HAY_SOLD
+    assert HAY.allowance(a1, HAY_exchange.address) == HAY_SOLD
+    assert HAY.balanceOf(HAY_exchange.address) == HAY_RESERVE
+    assert chain.balance(HAY_exchange.address) == ETH_RESERVE
+    assert chain.balance(DEN_exchange.address) == ETH_RESERVE
+    assert chain.logs == logs
+    # Fails in token.transferFrom after ETH was already sent
+    with raises(Revert):
+        HAY_exchange.tokenToEthSwapInput(HAY_SOLD + 1, 1, DEADLINE, sender=a1)
+    assert chain.balance(a1) == INITIAL_ETH
+    assert chain.balance(HAY_exchange.address) == ETH_RESERVE
+
+def test_add_liquidity():
+    chain, factory, ((HAY, HAY_exchange), _) = make_world()
+    token = Token(chain, b'', b'', 18, 100*10**18, a0)
+    exchange = chain.contracts[factory.createExchange(token.address, sender=a0)]
+    token.approve(exchange.address, 100*10**18, sender=a0)
+    # First deposit needs at least 1e9 wei
+    with raises(Revert):
+        exchange.addLiquidity(0, 10**18, DEADLINE, sender=a0, value=10**9 - 1)
+    assert exchange.addLiquidity(0, 10**18, DEADLINE, sender=a0, value=10**9) == 10**9
+    # Later deposits round the token amount up by one
+    assert exchange.addLiquidity(1, 100*10**18, DEADLINE, sender=a0, value=10**9) == 10**9
+    assert token.balanceOf(exchange.address) == 2*10**18 + 1
+    # Templates and exchanges not created by the factory can't be seeded
+    with raises(Revert):
+        Exchange(chain).addLiquidity(0, 1, DEADLINE, sender=a0, value=10**9)
+    # send() to a contract runs out of its 2300 gas stipend
+    HAY.approve(HAY_exchange.address, 10**18, sender=a0)
+    with raises(Revert):
+        HAY_exchange.tokenToEthTransferInput(10**18, 1, DEADLINE, exchange.address, sender=a0)
+    assert HAY_exchange.tokenToEthTransferInput(10**18, 1, DEADLINE, a2, sender=a0) > 0
+
+def test_snapshot():
+    chain, factory, ((HAY, HAY_exchange), (DEN, DEN_exchange)) = make_world()
+    snapshot = chain.take_snapshot()
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, sender=a1, value=10**18)
+    new_exchange = factory.createExchange(a2, sender=a0)
+    chain.revert_to_snapshot(snapshot)
+    assert HAY.balanceOf(a1) == 0
+    assert chain.balance(HAY_exchange.address) == ETH_RESERVE
+    assert factory.tokenCount == 2
+    assert new_exchange not in chain.contracts
+    # References taken before the snapshot still drive the live state
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, sender=a1, value=10**18)
+    assert HAY.balanceOf(a1) == chain.contracts[HAY.address].balanceOf(a1) > 0
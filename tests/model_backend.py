@@ -0,0 +1,181 @@
+import itertools
+
+from web3.contract import ConciseContract
+from eth_tester.exceptions import TransactionFailed
+
+from uniswap import artifacts
+from uniswap import model
+from uniswap.world import World
+
+from tests.constants import (
+    ETH_RESERVE,
+    HAY_RESERVE,
+    DEN_RESERVE,
+    INITIAL_ETH,
+    DEADLINE,
+)
+
+'''
+Run the exchange tests against uniswap.model instead of py-evm:
+
+# python -m pytest -v --backend=model
+
+ModelWeb3 implements the slice of the web3 API the tests use, and ModelContract
+the slice of web3.contract.Contract that ConciseContract needs, so fixtures and
+tests are shared between both backends.
+'''
+
+ACCOUNTS = ['0x%040x' % (0xacc << 148 | i) for i in range(10)]
+
+
+def _invoke(chain, target, name, fn_abi, args, tx):
+    method = getattr(target, name)
+    if not callable(method):
+        return method
+    if fn_abi.get('constant'):
+        return method(*args)
+    kwargs = {'sender': tx.get('from', ACCOUNTS[0])}
+    if fn_abi.get('payable'):
+        kwargs['value'] = tx.get('value', 0)
+    elif tx.get('value'):
+        raise model.Revert('non-payable')
+    return method(*args, **kwargs)
+
+
+def _normalize(fn_abi, result):
+    outputs = fn_abi.get('outputs', [])
+    if len(outputs) != 1:
+        return list(result) if isinstance(result, tuple) else result
+    if outputs[0]['type'] == 'address' and result == model.ZERO_ADDRESS:
+        return None
+    if outputs[0]['type'].startswith('address['):
+        return [None if a == model.ZERO_ADDRESS else a for a in result]
+    return result
+
+
+class ModelCall(object):
+
+    def __init__(self, contract, fn_abi, args):
+        self.contract = contract
+        self.fn_abi = fn_abi
+        self.args = args
+
+    def _run(self, tx):
+        chain = self.contract.chain
+        target = chain.contracts[self.contract.address]
+        return _invoke(chain, target, self.fn_abi['name'], self.fn_abi, self.args, tx)
+
+    def call(self, tx):
+        chain = self.contract.chain
+        chain.journal = []
+        try:
+            return _normalize(self.fn_abi, self._run(tx))
+        except model.Revert as e:
+            raise TransactionFailed(str(e))
+        finally:
+            chain.rollback()
+            chain.journal = None
+
+    def transact(self, tx):
+        try:
+            self._run(tx)
+        except model.Revert as e:
+            raise TransactionFailed(str(e))
+        return next(self.contract.tx_hashes)
+
+
+class ModelFunctions(object):
+
+    def __init__(self, contract, abi):
+        self._contract = contract
+        self._abi = {fn['name']: fn for fn in abi if fn['type'] == 'function'}
+
+    def __iter__(self):
+        return iter(self._abi)
+
+    def __getattr__(self, name):
+        if name.startswith('_') and name not in self._abi:
+            raise AttributeError(name)
+        fn_abi = self._abi[name]
+        return lambda *args: ModelCall(self._contract, fn_abi, args)
+
+
+class ModelContract(object):
+
+    def __init__(self, chain, address, abi):
+        self.chain = chain
+        self.address = address
+        self.abi = abi
+        self.functions = ModelFunctions(self, abi)
+        self.tx_hashes = ('0x%064x' % i for i in itertools.count(1))
+        self._return_data_normalizers = []
+
+
+class ModelEth(object):
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.accounts = ACCOUNTS
+        self.defaultAccount = ACCOUNTS[0]
+
+    def getBalance(self, address):
+        return self.chain.balance(address)
+
+    def sendTransaction(self, tx):
+        sender = tx.get('from', self.defaultAccount)
+        target = self.chain.contracts.get(tx['to'])
+        try:
+            if isinstance(target, model.Exchange):
+                target.__default__(sender=sender, value=tx.get('value', 0))
+            else:
+                self.chain.send(sender, tx['to'], tx.get('value', 0))
+        except model.Revert as e:
+            raise TransactionFailed(str(e))
+
+    def contract(self, address, abi):
+        return ModelContract(self.chain, address, abi)
+
+
+class ModelWeb3(object):
+
+    def __init__(self, chain):
+        self.eth = ModelEth(chain)
+
+
+def _concise(chain, contract, path):
+    return ConciseContract(ModelContract(chain, contract.address, artifacts.load(path).abi))
+
+
+def _deploy_exchange(chain, factory, token, token_reserve):
+    exchange = chain.contracts[factory.createExchange(token.address, sender=ACCOUNTS[0])]
+    token.approve(exchange.address, token_reserve, sender=ACCOUNTS[0])
+    exchange.addLiquidity(0, token_reserve, DEADLINE, sender=ACCOUNTS[0], value=ETH_RESERVE)
+    return _concise(chain, exchange, 'contracts/uniswap_exchange.vy')
+
+
+class ModelWorld(World):
+    """ The uniswap.world World, built on a uniswap.model Chain. """
+
+    def __init__(self):
+        chain = self.tester = model.Chain()
+        for account in ACCOUNTS:
+            chain.fund(account, INITIAL_ETH)
+        self.w3 = ModelWeb3(chain)
+        self.snapshots = {}
+        template = model.Exchange(chain)
+        factory = model.Factory(chain)
+        factory.initializeFactory(template.address, sender=ACCOUNTS[0])
+        HAY = model.Token(chain, b'HAY Token' + b'\x00' * 23, b'HAY' + b'\x00' * 29, 18, 100000*10**18, ACCOUNTS[0])
+        DEN = model.Token(chain, b'DEN Token' + b'\x00' * 23, b'DEN' + b'\x00' * 29, 18, 100000*10**18, ACCOUNTS[0])
+        self.exchange_template = _concise(chain, template, 'contracts/uniswap_exchange.vy')
+        self.factory = _concise(chain, factory, 'contracts/uniswap_factory.vy')
+        self.HAY_token = _concise(chain, HAY, 'contracts/test_contracts/ERC20.vy')
+        self.DEN_token = _concise(chain, DEN, 'contracts/test_contracts/ERC20.vy')
+        self.snapshot('contracts')
+        self.HAY_exchange = _deploy_exchange(chain, factory, HAY, HAY_RESERVE)
+        self.snapshot('HAY_exchange')
+        self.DEN_exchange = _deploy_exchange(chain, factory, DEN, DEN_RESERVE)
+        self.snapshot('DEN_exchange')
+
+    def snapshot(self, stage):
+        self.snapshots[stage] = self.tester.take_snapshot()
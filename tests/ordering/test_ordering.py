@@ -0,0 +1,73 @@
+import pytest
+
+from uniswap import genesis, model, ordering
+from uniswap.fuzz import FAR, Op
+from uniswap.ordering import OURS, Simulator
+
+pytestmark = pytest.mark.evm
+
+HAY = (10 * 10**18, 20 * 10**18)
+DEN = (5 * 10**18, 50 * 10**18)
+SCENARIO = ordering.fork({'HAY': HAY, 'DEN': DEN})
+OURS_OP = Op('ethToTokenSwapInput', 'HAY', 0, (1, FAR), 10**18)
+PENDING = [
+    Op('ethToTokenSwapInput', 'HAY', 1, (1, FAR), 2 * 10**18),
+    Op('tokenToEthSwapInput', 'HAY', 1, (3 * 10**18, 1, FAR), 0),
+    Op('tokenToTokenSwapInput', 'DEN', 2, (10**19, 1, 1, FAR, ('token', 'HAY')), 0),
+    Op('ethToTokenSwapOutput', 'DEN', 3, (10**18, FAR), 10**18),
+]
+
+@pytest.fixture(scope='module')
+def simulator(tmpdir_factory):
+    world = genesis.World(genesis.cached(SCENARIO, str(tmpdir_factory.mktemp('genesis'))))
+    return Simulator(world.tester, world.addresses, SCENARIO)
+
+def test_sandwich(simulator):
+    report = simulator.run(OURS_OP, PENDING, confirm=3)
+    # every ordering, worst first; alone, ours gets the price on the forked reserves
+    assert len(report.outcomes) == 120 and report.reverts == 0
+    assert report.baseline == model.get_input_price(10**18, *HAY)
+    assert report.worst == report.outcomes[0] and report.worst.quote < report.baseline
+    assert report.slippage == (report.baseline - report.worst.quote) / report.baseline
+    # the worst orderings buy HAY before ours and sell it after, and py-evm agrees with the model on them
+    before = report.worst.order[:report.worst.order.index(OURS)]
+    assert 1 in before and 2 not in before
+    assert [c.order for c in report.confirmed] == [o.order for o in report.outcomes[:3]]
+    assert [c.quote for c in report.confirmed] == [o.quote for o in report.outcomes[:3]]
+    # limits from the data: the worst quote fills every ordering, the baseline only those it is not front-run in
+    assert ordering.limit(report, 1.0) == report.worst.quote
+    assert ordering.limit(report, 0.01) == report.outcomes[-1].quote
+    median = ordering.limit(report, 0.5)
+    assert sum(1 for o in report.outcomes if o.quote >= median) >= 60
+    safe = simulator.run(ordering.with_limit(OURS_OP, report.worst.quote), PENDING, confirm=1)
+    assert safe.reverts == 0
+    tight = simulator.run(ordering.with_limit(OURS_OP, report.baseline), PENDING, confirm=2)
+    assert 0 < tight.reverts < 120 and [c.status for c in tight.confirmed] == ['revert', 'revert']
+    assert tight.reverts == sum(1 for o in report.outcomes if o.quote < report.baseline)
+
+def test_output(simulator):
+    # an exact output swap: the quote is what it sells, so the worst ordering sells the most
+    ours = Op('tokenToEthSwapOutput', 'HAY', 0, (10**18, 2**256 - 1, FAR), 0)
+    report = simulator.run(ours, PENDING, confirm=1)
+    assert report.baseline == model.get_output_price(10**18, HAY[1], HAY[0])
+    assert report.worst.quote == max(o.quote for o in report.outcomes) > report.baseline
+    assert ordering.limit(report, 1.0) == report.worst.quote
+    assert ordering.with_limit(ours, 7).args == (10**18, 7, FAR)
+    assert ordering.with_limit(Op('ethToTokenSwapOutput', 'HAY', 0, (1, FAR), 0), 7).value == 7
+
+def test_sampled(simulator):
+    # more orderings than samples: random ones plus ours first and the adversary's
+    pending = PENDING + PENDING[:2]
+    orders = ordering.orders(len(pending), samples=50, seed=1)
+    assert len(orders) == 51 and orders[0] == tuple(range(7)) and ordering.sampled(len(pending), 50)
+    adversary = simulator.adversary(OURS_OP, pending)
+    assert sorted(adversary) == list(range(7))
+    report = simulator.run(OURS_OP, pending, samples=50, seed=1, confirm=1)
+    assert len(report.outcomes) == 52 and report.baseline == model.get_input_price(10**18, *HAY)
+    assert adversary in [o.order for o in report.outcomes]
+    assert report.worst.quote <= min(o.quote for o in simulator.evaluate(OURS_OP, pending, orders))
+
+def test_simulate(tmpdir, simulator):
+    report = ordering.simulate(SCENARIO, OURS_OP, PENDING, confirm=2, processes=2, chunk=25, cache_dir=str(tmpdir))
+    local = simulator.run(OURS_OP, PENDING, confirm=2)
+    assert report.outcomes == local.outcomes and report.confirmed == local.confirmed
@@ -0,0 +1,84 @@
+import pytest
+
+from uniswap import model
+from uniswap.planner import Planner, Refill
+
+NOW = 1000
+
+def deploy(chain, trader, factory, eth, tokens):
+    token = model.Token(chain, b'T', b'T', 18, 10**40, trader)
+    exchange = chain.contract(factory.createExchange(token.address, sender=trader), model.Exchange)
+    token.approve(exchange.address, 2**256 - 1, sender=trader)
+    exchange.addLiquidity(0, tokens, NOW + 1, sender=trader, value=eth)
+    return exchange, token
+
+def refill(chain, planner, exchanges):
+    # stand in for the arbitrageurs: move the reserves where the refill model expects them
+    for exchange, token, (eth, tokens) in exchanges:
+        chain.eth[exchange.address] = planner.refill(chain.balance(exchange.address), eth)
+        token.balances[exchange.address] = planner.refill(token.balanceOf(exchange.address), tokens)
+
+@pytest.mark.parametrize('strategy', ['twap', 'vwap', 'optimal'])
+def test_eth_to_token(strategy):
+    chain = model.Chain(timestamp=NOW)
+    trader = '0x%040x' % 0xacc
+    chain.fund(trader, 10**40)
+    factory = model.Factory(chain)
+    factory.initializeFactory(model.Exchange(chain).address, sender=trader)
+    exchange, token = deploy(chain, trader, factory, 10**21, 5 * 10**23)
+    planner = Planner([(10**21, 5 * 10**23)], refill=Refill(0.3))
+    plan = getattr(planner, strategy)(3 * 10**20, 8, now=NOW)
+    assert plan.method == 'ethToTokenSwapInput' and sum(c.amount for c in plan.children) == 3 * 10**20
+    # the children pay exactly what the plan expects, within their limits and deadlines
+    for block, child in enumerate(plan.children):
+        if block:
+            refill(chain, planner, [(exchange, token, (10**21, 5 * 10**23))])
+        chain.timestamp = NOW + child.block * planner.block_time
+        assert child.min_tokens < child.tokens and child.deadline > chain.timestamp
+        assert exchange.ethToTokenSwapInput(child.min_tokens, child.deadline, sender=trader,
+                                            value=child.amount) == child.tokens
+    assert plan.output == sum(c.tokens for c in plan.children)
+
+def test_token_to_token():
+    chain = model.Chain(timestamp=NOW)
+    trader = '0x%040x' % 0xacc
+    chain.fund(trader, 10**40)
+    factory = model.Factory(chain)
+    factory.initializeFactory(model.Exchange(chain).address, sender=trader)
+    exchange_a, token_a = deploy(chain, trader, factory, 10**21, 5 * 10**23)
+    exchange_b, token_b = deploy(chain, trader, factory, 2 * 10**21, 10**24)
+    planner = Planner([(10**21, 5 * 10**23), (2 * 10**21, 10**24)], refill=Refill(0.5))
+    plan = planner.optimal(10**23, 5, now=NOW)
+    assert plan.method == 'tokenToTokenSwapInput'
+    for child in plan.children:
+        if child.block:
+            refill(chain, planner, [(exchange_a, token_a, (10**21, 5 * 10**23)),
+                                    (exchange_b, token_b, (2 * 10**21, 10**24))])
+        before = chain.balance(exchange_a.address)
+        assert exchange_a.tokenToTokenSwapInput(child.amount, child.min_tokens, child.min_eth, child.deadline,
+                                                token_b.address, sender=trader) == child.tokens
+        assert before - chain.balance(exchange_a.address) == child.eth > child.min_eth
+
+def test_strategies():
+    for rate in (0, 0.2, 0.6, 1):
+        planner = Planner([(10**21, 5 * 10**23)], refill=Refill(rate))
+        plans = {p.strategy: p for p in planner.compare(5 * 10**20, 10)}
+        assert planner.compare(5 * 10**20, 10)[0].output == plans['optimal'].output
+        assert plans['optimal'].output >= max(plans['twap'].output, plans['vwap'].output)
+        if 0 < rate < 1:
+            # with partial refill, splitting pays and the best split is not the even one
+            assert plans['optimal'].output > plans['twap'].output > planner.twap(5 * 10**20, 1).output
+    # with full refill, vwap's rounding beats both the searched shape and twap, and optimal returns it
+    planner = Planner([(10**21, 5 * 10**23)], refill=Refill(1))
+    vwap = planner.vwap(10**18, 12)
+    assert vwap.output > planner.twap(10**18, 12).output
+    assert planner.optimal(10**18, 12).output == vwap.output
+    # slices from fractions summing past 1 stay non-negative and add up to the size
+    assert planner._sizes([0.7, 0.2, 0.2], 10) == [7, 2, 1]
+    assert planner._sizes([0.5000000001] * 2, 3) == [1, 2]
+    one = Planner([(10**21, 5 * 10**23)]).optimal(10**18, 1, now=NOW)
+    assert [(c.block, c.amount, c.deadline) for c in one.children] == [(0, 10**18, NOW + 3 * 15)]
+    # uint256 overflow in getInputPrice
+    assert Planner([(10**60, 10**60)]).twap(2**200, 2) is None
+    with pytest.raises(ValueError):
+        Refill(1.5)
@@ -0,0 +1,47 @@
+import pytest
+
+from uniswap.profiler import Profiler, source_map
+
+from tests.constants import DEADLINE
+
+pytestmark = pytest.mark.evm
+
+def line_of(path, text):
+    return source_map(path).lines.index(text) + 1
+
+def test_source_map(w3, exchange_template):
+    exchange = source_map('contracts/uniswap_exchange.vy')
+    assert exchange.code == bytes(w3.eth.getCode(exchange_template.address))
+    lineno = line_of('contracts/uniswap_exchange.vy', '    assert self.token.transfer(recipient, tokens_bought)')
+    assert exchange.function(lineno) == 'ethToTokenInput'
+
+def test_profile(w3, HAY_token, HAY_exchange, factory):
+    a1 = w3.eth.accounts[1]
+    names = {HAY_exchange.address: 'HAY_exchange', HAY_token.address: 'HAY_token'}
+    with Profiler(names=names) as profile:
+        tx_hash = HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+    # estimateGas runs first; the last run is the transaction
+    assert len(profile.runs) > 1
+    tx = w3.eth.getTransaction(tx_hash)
+    data = bytes(w3.toBytes(hexstr=tx['data']))
+    intrinsic = 21000 + sum(4 if b == 0 else 68 for b in data)
+    assert w3.eth.getTransactionReceipt(tx_hash).gasUsed == intrinsic + profile.total()
+    # The token transfer line is charged for the ERC20 frame below it
+    transfer = 'uniswap_exchange.vy:%d ethToTokenInput' % line_of(
+        'contracts/uniswap_exchange.vy', '    assert self.token.transfer(recipient, tokens_bought)')
+    frame = 'HAY_exchange (uniswap_exchange.vy)'
+    self_gas, inclusive = profile.lines()[frame, transfer]
+    token_gas = sum(gas for stack, gas in profile.stacks().items()
+                    if stack[-4:-2] == (frame, transfer) and stack[-2] == 'HAY_token (ERC20.vy)')
+    assert inclusive == self_gas + token_gas
+    assert token_gas > 5000
+    # Folded stacks add up to the total, and the tree's root is the whole run
+    folded = profile.folded().splitlines()
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in folded) == profile.total()
+    assert any(line.startswith('HAY_exchange;pc ') and ';%s;%s;HAY_token (ERC20.vy);ERC20.vy:' % (frame, transfer) in line
+               for line in folded)
+    assert profile.tree().splitlines()[0].split() == [str(profile.total()), 'HAY_exchange']
+    # The profiler is removed on exit
+    runs = len(profile.runs)
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+    assert len(profile.runs) == runs
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from uniswap import model
+from uniswap import quote
+
+random.seed(1)
+# A mix of wei-sized values, small values that fit the uint64 path, and edges
+ROWS = [(random.choice([0, 1, random.randrange(10**6), random.randrange(10**21), 2**255]),
+         random.choice([0, 1, random.randrange(1, 10**6), random.randrange(1, 10**22)]),
+         random.choice([0, 1, random.randrange(1, 10**6), random.randrange(1, 10**22)])) for _ in range(2000)]
+
+def exact(price, row):
+    try:
+        return price(*row)
+    except model.Revert:
+        return None
+
+def columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+def test_input_prices():
+    expected = [exact(model.get_input_price, row) for row in ROWS]
+    assert quote.input_prices(*columns(ROWS)) == expected
+    assert any(e is None for e in expected) and any(e for e in expected)
+
+def test_output_prices():
+    expected = [exact(model.get_output_price, row) for row in ROWS]
+    assert quote.output_prices(*columns(ROWS)) == expected
+    assert any(e is None for e in expected) and any(e for e in expected)
+
+def test_broadcast(swap_input, swap_output):
+    amounts = [10**15 * i for i in range(1, 50)]
+    assert quote.input_prices(amounts, 5*10**18, 10*10**18) == [swap_input(a, 5*10**18, 10*10**18) for a in amounts]
+    assert quote.output_prices(amounts, 5*10**18, 10*10**18) == [swap_output(a, 5*10**18, 10*10**18) for a in amounts]
+
+def test_token_to_token(swap_input, swap_output):
+    # Same numbers as tests/exchange/test_token_to_token.py
+    eth, tokens = quote.token_to_token_input_prices([2*10**18], 10*10**18, 5*10**18, 5*10**18, 20*10**18)
+    assert eth[0] == swap_input(2*10**18, 10*10**18, 5*10**18)
+    assert tokens[0] == swap_input(eth[0], 5*10**18, 20*10**18) == 2843678215834080602
+    eth, sold = quote.token_to_token_output_prices([2843678215834080602], 10*10**18, 5*10**18, 5*10**18, 20*10**18)
+    assert eth[0] == swap_output(2843678215834080602, 5*10**18, 20*10**18)
+    assert sold[0] == swap_output(eth[0], 10*10**18, 5*10**18)
+    # A first hop that buys no ETH fails the nested ethToTokenTransferInput
+    assert quote.token_to_token_input_prices([1], 10**18, 1, 10**18, 10**18) == ([None], [None])
+    assert quote.token_to_token_output_prices([0], 10**18, 10**18, 10**18, 10**18) == ([None], [None])
+
+def test_numpy():
+    numpy = pytest.importorskip('numpy')
+    small = [row for row in ROWS if all(v < 2**63 for v in row)]
+    arrays = [numpy.array(column, dtype=numpy.uint64) for column in columns(small)]
+    assert quote.input_prices(*arrays) == quote.input_prices(*columns(small))
+    assert quote.output_prices(*arrays) == quote.output_prices(*columns(small))
+    sold = numpy.arange(1, 5000, dtype=numpy.uint64) * 1000
+    reserves = [10**6, 10**6, 10**7, 10**22]
+    assert quote.token_to_token_input_prices(sold, *reserves) == quote.token_to_token_input_prices(sold.tolist(), *reserves)
+    assert quote.token_to_token_output_prices(sold, *reserves) == quote.token_to_token_output_prices(sold.tolist(), *reserves)
+
+def test_wide():
+    numpy = pytest.importorskip('numpy')
+    # Wei-sized and overflowing rows, as object arrays, give the exact results
+    arrays = [numpy.array(column, dtype=object) for column in columns(ROWS)]
+    assert quote.input_prices(*arrays) == quote.input_prices(*columns(ROWS))
+    assert quote.output_prices(*arrays) == quote.output_prices(*columns(ROWS))
+    # as does a uint64 column broadcast against a reserve past 64 bits
+    amounts = numpy.arange(0, 5000, dtype=numpy.uint64) * 10**15
+    assert quote.input_prices(amounts, 10**22, 3 * 10**24) == quote.input_prices(amounts.tolist(), 10**22, 3 * 10**24)
+    assert quote.output_prices(amounts, 10**22, 3 * 10**18) == quote.output_prices(amounts.tolist(), 10**22, 3 * 10**18)
+    rng = random.Random(2)
+    hops = [[rng.choice([0, 1, rng.randrange(10**24)]) for _ in range(500)] for _ in range(5)]
+    wide = [numpy.array(column, dtype=object) for column in hops]
+    assert quote.token_to_token_input_prices(*wide) == quote.token_to_token_input_prices(*hops)
+    assert quote.token_to_token_output_prices(*wide) == quote.token_to_token_output_prices(*hops)
+    # and uint64 columns of wei amounts, whose products overflow 64 bits
+    eth = numpy.array([rng.randrange(10**18, 10**19) for _ in range(500)], dtype=numpy.uint64)
+    sold = numpy.array([rng.randrange(10**15, 10**18) for _ in range(500)], dtype=numpy.uint64)
+    assert quote.input_prices(sold, eth, eth[::-1]) == quote.input_prices(sold.tolist(), eth.tolist(), eth[::-1].tolist())
+    assert quote.output_prices(sold, eth, eth[::-1]) == quote.output_prices(sold.tolist(), eth.tolist(), eth[::-1].tolist())
+    assert quote.token_to_token_input_prices(sold, eth, eth, eth, eth[::-1]) == \
+        quote.token_to_token_input_prices(sold.tolist(), *[eth.tolist()] * 3 + [eth[::-1].tolist()])
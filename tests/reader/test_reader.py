@@ -0,0 +1,74 @@
+import pytest
+from eth_tester.exceptions import TransactionFailed
+
+from uniswap import reader
+from uniswap.reserves import ReserveCache
+from uniswap.world import deploy_contract, deploy_exchange
+
+from tests.constants import ETH_RESERVE, HAY_RESERVE, DEN_RESERVE
+
+pytestmark = pytest.mark.evm
+
+def test_reserves(w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    client = reader.ReserveReader(w3, factory.address, reader.deploy(w3))
+    pools = list(client.pools())
+    assert pools == [
+        reader.Pool(HAY_token.address, HAY_exchange.address, ETH_RESERVE, HAY_RESERVE, ETH_RESERVE),
+        reader.Pool(DEN_token.address, DEN_exchange.address, ETH_RESERVE, DEN_RESERVE, ETH_RESERVE),
+    ]
+    # Pages start at any token id; ids past tokenCount are empty
+    assert client.page(2) == pools[1:]
+    assert client.page(3) == []
+    # Token ids start at 1
+    with pytest.raises(TransactionFailed):
+        client.page(0)
+    # Or read exchanges by address
+    assert client.read([DEN_exchange.address, HAY_exchange.address]) == pools[::-1]
+    # Reads are pinned to one block
+    block = w3.eth.blockNumber
+    HAY_exchange.ethToTokenSwapInput(1, 10**10, transact={'value': 10**18})
+    assert list(client.pools(block)) == pools
+    assert client.read([HAY_exchange.address], block) == pools[:1]
+    assert client.page(1)[0].eth_reserve == ETH_RESERVE + 10**18
+
+def test_paging(w3, factory):
+    client = reader.ReserveReader(w3, factory.address, reader.deploy(w3), page_size=2)
+    assert list(client.pools()) == []
+    tokens = [deploy_contract(w3, 'contracts/test_contracts/ERC20.vy', b'T', b'T', 18, 10**30) for i in range(5)]
+    for i, token in enumerate(tokens):
+        deploy_exchange(w3, factory, token, 10**18 + i)
+    pools = list(client.pools())
+    assert [p.token for p in pools] == [t.address for t in tokens]
+    assert [p.token_reserve for p in pools] == [10**18 + i for i in range(len(tokens))]
+    assert client.page(1) == pools[:2]
+    assert client.page(5) == pools[4:]
+    assert client.read([p.exchange for p in pools]) == pools
+    # At most MAX_PAGE_SIZE rows fit in the return value
+    with pytest.raises(TransactionFailed):
+        client.reader.functions.getReserves(factory.address, 1, reader.MAX_PAGE_SIZE + 1).call()
+
+def test_unreadable(w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    # An exchange for an address without code makes the reader contract throw for its whole page
+    account = w3.eth.accounts[5]
+    factory.createExchange(account, transact={})
+    bad = factory.getExchange(account)
+    later = deploy_contract(w3, 'contracts/test_contracts/ERC20.vy', b'T', b'T', 18, 10**30)
+    deploy_exchange(w3, factory, later, 10**18)
+    client = reader.ReserveReader(w3, factory.address, reader.deploy(w3), page_size=4)
+    with pytest.raises(TransactionFailed):
+        client.page(1)
+    # pools() and read() skip it and report it
+    pools = list(client.pools())
+    assert [p.token for p in pools] == [HAY_token.address, DEN_token.address, later.address]
+    assert pools[2].token_reserve == 10**18
+    assert client.unreadable == [(account, bad)]
+    exchanges = [HAY_exchange.address, bad, DEN_exchange.address]
+    assert client.read(exchanges) == pools[:2]
+    assert client.unreadable == [(account, bad)]
+    assert client.read(exchanges[::2]) == pools[:2] and client.unreadable == []
+    # as does a cache, whose get() of it raises
+    cache = ReserveCache(client)
+    cache.load([bad, DEN_exchange.address])
+    assert cache.get(DEN_exchange.address).token == DEN_RESERVE
+    with pytest.raises(ValueError):
+        cache.get(bad)
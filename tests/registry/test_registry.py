@@ -0,0 +1,85 @@
+import pytest
+from web3 import Web3
+
+from uniswap.registry import Registry
+
+pytestmark = pytest.mark.evm
+
+def placeholder(i):
+    return Web3.toChecksumAddress('0x%040x' % (0xf00d << 128 | i))
+
+def test_registry(tmpdir, w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange, monkeypatch):
+    path = str(tmpdir.join('registry.sqlite'))
+    registry = Registry(w3, factory.address, path, batch_size=4)
+    assert registry.sync() == 2
+    assert [(e.token, e.exchange) for e in registry.exchanges()] == [
+        (HAY_token.address, HAY_exchange.address), (DEN_token.address, DEN_exchange.address)]
+    # lookups in either direction and any case, None for unknown addresses like the factory's zero
+    assert registry.exchange_of(HAY_token.address.lower()) == HAY_exchange.address
+    assert registry.token_of(DEN_exchange.address) == DEN_token.address
+    assert registry.exchange_of(HAY_exchange.address) is None and registry.token_of(HAY_token.address) is None
+    assert registry.sync() == 0 and registry.cursor == w3.eth.blockNumber + 1
+    cursor = registry.cursor
+    registry.close()
+    # after a restart, lookups work before any sync and a sync only fetches the new blocks
+    factory.createExchange(placeholder(1), transact={})
+    registry = Registry(w3, factory.address, path, batch_size=4)
+    assert len(registry) == 2 and registry.exchange_of(DEN_token.address) == DEN_exchange.address
+    fetched = []
+    get_logs = w3.eth.getLogs
+    monkeypatch.setattr(w3.eth, 'getLogs', lambda params: fetched.append(params['fromBlock']) or get_logs(params))
+    assert registry.sync() == 1 and fetched == [cursor]
+    assert registry.exchange_of(placeholder(1)) == factory.getExchange(placeholder(1))
+    registry.close()
+
+def test_reorg(tmpdir, tester, w3, factory, HAY_token, DEN_exchange):
+    registry = Registry(w3, factory.address, str(tmpdir.join('registry.sqlite')))
+    registry.sync()
+    fork = registry.cursor
+    snapshot = tester.take_snapshot()
+    factory.createExchange(placeholder(1), transact={})
+    factory.createExchange(placeholder(2), transact={})
+    assert registry.sync() == 2
+    # the blocks of both exchanges are replaced by a branch that creates another one
+    tester.revert_to_snapshot(snapshot)
+    factory.createExchange(placeholder(3), transact={})
+    tester.mine_blocks(3)
+    assert registry.sync() == 1 and registry.cursor == w3.eth.blockNumber + 1
+    assert registry.exchange_of(placeholder(1)) is None and registry.exchange_of(placeholder(2)) is None
+    assert registry.exchange_of(placeholder(3)) == factory.getExchange(placeholder(3))
+    assert [e.block for e in registry.exchanges()][-1] == fork
+    assert registry.sync() == 0 and len(registry) == 3
+    registry.close()
+
+def test_deep_reorg(tmpdir, tester, w3, factory, HAY_token, DEN_exchange):
+    registry = Registry(w3, factory.address, str(tmpdir.join('registry.sqlite')), depth=2)
+    snapshot = tester.take_snapshot()
+    factory.createExchange(placeholder(1), transact={})
+    tester.mine_blocks(3)
+    registry.sync()
+    assert len(registry) == 3
+    # no block the registry kept a hash of is still on the chain: it starts over
+    tester.revert_to_snapshot(snapshot)
+    factory.createExchange(placeholder(2), transact={})
+    assert registry.rollback() == 0 and len(registry) == 0
+    assert registry.sync() == 3 and registry.exchange_of(HAY_token.address) == factory.getExchange(HAY_token.address)
+    assert registry.exchange_of(placeholder(1)) is None and registry.exchange_of(placeholder(2)) is not None
+    registry.close()
+
+def test_reorg_during_sync(tmpdir, tester, w3, factory, HAY_token, DEN_exchange, monkeypatch):
+    registry = Registry(w3, factory.address, str(tmpdir.join('registry.sqlite')))
+    registry.sync()
+    snapshot = tester.take_snapshot()
+    factory.createExchange(placeholder(1), transact={})
+    # the logs come from a branch that is replaced before the block hashes are read
+    get_logs = w3.eth.getLogs
+    def stale(params):
+        logs = get_logs(params)
+        monkeypatch.setattr(w3.eth, 'getLogs', get_logs)
+        tester.revert_to_snapshot(snapshot)
+        factory.createExchange(placeholder(2), transact={})
+        return logs
+    monkeypatch.setattr(w3.eth, 'getLogs', stale)
+    assert registry.sync() == 1
+    assert registry.exchange_of(placeholder(1)) is None and registry.exchange_of(placeholder(2)) is not None
+    registry.close()
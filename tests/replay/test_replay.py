@@ -0,0 +1,78 @@
+import itertools
+import random
+
+import pytest
+
+from uniswap import reader, synthetic
+from uniswap.indexer import Indexer
+from uniswap.replay import Replay
+from uniswap.reserves import Reserves
+
+from tests.constants import DEADLINE
+
+def test_replay(tmpdir):
+    indexer = Indexer(None, '0x' + '00' * 20, str(tmpdir.join('history.sqlite')))
+    last = synthetic.write(indexer, pools=3, events=400, seed=1)
+    truth = {block: reserves for block, _, reserves, _ in
+             itertools.islice(synthetic.history(pools=3, seed=1), last + 1)}
+    replay = Replay(indexer, interval=7)
+    # Replay in two steps; the state after each block's last event is the model's
+    states = list(replay.states(to_block=last // 2)) + list(replay.states())
+    assert len(states) == len(indexer.events()) and replay.block == last
+    assert all(state.exact for state in states)
+    for state, following in zip(states, states[1:] + [None]):
+        if following is None or following.block != state.block:
+            assert (state.eth_reserve, state.token_reserve, state.total_supply) == truth[state.block][state.exchange]
+    # Random access from the checkpoints, including blocks before the first checkpoint
+    rng = random.Random(0)
+    exchanges = [e.exchange for e in indexer.exchanges()]
+    for block in [0, 1, last] + [rng.randrange(last + 1) for _ in range(50)]:
+        for exchange in exchanges:
+            assert replay.at(exchange, block) == Reserves(*truth[block][exchange])
+    exchange = exchanges[1]
+    tail = list(replay.history(exchange, from_block=last // 3))
+    assert tail == [s for s in states if s.exchange == exchange and s.block >= last // 3]
+    assert replay.sample_blocks(5) == sorted(set(replay.sample_blocks(5)))
+    indexer.close()
+
+def test_inexact(tmpdir):
+    indexer = Indexer(None, '0x' + '00' * 20, str(tmpdir.join('history.sqlite')))
+    last = synthetic.write(indexer, pools=1, events=50)
+    # a purchase that does not follow from the reserves, as after a token donation
+    event = indexer.events(names=['TokenPurchase'])[0]
+    with indexer.db:
+        indexer.db.execute('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+            last + 1, 0, last + 1, event.tx_hash, event.exchange, 'TokenPurchase', event.account, None,
+            str(event.eth), str(event.tokens + 1)))
+    replay = Replay(indexer)
+    events, inexact = replay.run()
+    assert inexact == 1 and events == len(indexer.events())
+    indexer.close()
+
+@pytest.mark.evm
+def test_verify(tmpdir, w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    a1 = w3.eth.accounts[1]
+    reserve_reader = reader.ReserveReader(w3, factory.address, reader.deploy(w3))
+    deployed = w3.eth.blockNumber
+    HAY_token.transfer(a1, 10*10**18, transact={})
+    HAY_token.approve(HAY_exchange.address, 100*10**18, transact={'from': a1})
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+    HAY_exchange.tokenToEthSwapOutput(10**17, 10**19, DEADLINE, transact={'from': a1})
+    HAY_exchange.tokenToTokenSwapInput(10**18, 1, 1, DEADLINE, DEN_token.address, transact={'from': a1})
+    HAY_token.approve(HAY_exchange.address, 100*10**18, transact={})
+    HAY_exchange.addLiquidity(1, 100*10**18, DEADLINE, transact={'value': 10**18})
+    HAY_exchange.removeLiquidity(10**17, 1, 1, DEADLINE, transact={})
+    indexer = Indexer(w3, factory.address, str(tmpdir.join('uniswap.sqlite')))
+    indexer.sync()
+    replay = Replay(indexer, interval=2)
+    assert replay.run()[1] == 0
+    assert replay.verify(reserve_reader, range(deployed, w3.eth.blockNumber + 1)) == []
+    # Tokens sent straight to the exchange leave no exchange event
+    HAY_token.transfer(HAY_exchange.address, 12345, transact={})
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+    indexer.sync()
+    assert replay.run()[1] == 1
+    differences = replay.verify(reserve_reader, [w3.eth.blockNumber])
+    assert [(d.exchange, d.field) for d in differences] == [(HAY_exchange.address, 'token')]
+    assert differences[0].chain - differences[0].replayed == 12345
+    indexer.close()
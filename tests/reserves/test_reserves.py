@@ -0,0 +1,69 @@
+import pytest
+
+from uniswap.model import Revert
+from uniswap import reader
+from uniswap.reserves import ReserveCache, Reserves
+
+from tests.constants import ETH_RESERVE, HAY_RESERVE, DEN_RESERVE, DEADLINE
+
+pytestmark = pytest.mark.evm
+
+def read(w3, token, exchange):
+    return Reserves(w3.eth.getBalance(exchange.address), token.balanceOf(exchange.address), exchange.totalSupply())
+
+def make_cache(w3, factory, **kwargs):
+    return ReserveCache(reader.ReserveReader(w3, factory.address, reader.deploy(w3)), **kwargs)
+
+def test_cache(w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    a0, a1 = w3.eth.accounts[:2]
+    cache = make_cache(w3, factory)
+    cache.load([HAY_exchange.address, DEN_exchange.address])
+    assert cache.stats()['misses'] == 2
+    assert cache.get(HAY_exchange.address) == Reserves(ETH_RESERVE, HAY_RESERVE, ETH_RESERVE)
+    assert cache.get(DEN_exchange.address) == Reserves(ETH_RESERVE, DEN_RESERVE, ETH_RESERVE)
+    # Every kind of reserve change, including a token donation with no exchange event
+    HAY_token.transfer(a1, 10*10**18, transact={})
+    HAY_token.approve(HAY_exchange.address, 100*10**18, transact={'from': a1})
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18, 'from': a1})
+    HAY_exchange.tokenToEthSwapOutput(10**17, 10**19, DEADLINE, transact={'from': a1})
+    HAY_exchange.tokenToTokenSwapInput(10**18, 1, 1, DEADLINE, DEN_token.address, transact={'from': a1})
+    w3.eth.sendTransaction({'to': DEN_exchange.address, 'value': 10**17, 'from': a1})
+    HAY_token.approve(HAY_exchange.address, 100*10**18, transact={})
+    HAY_exchange.addLiquidity(1, 100*10**18, DEADLINE, transact={'value': 10**18})
+    HAY_exchange.removeLiquidity(10**17, 1, 1, DEADLINE, transact={})
+    HAY_token.transfer(HAY_exchange.address, 12345, transact={})
+    cache.sync()
+    assert cache.get(HAY_exchange.address) == read(w3, HAY_token, HAY_exchange)
+    assert cache.get(DEN_exchange.address) == read(w3, DEN_token, DEN_exchange)
+    assert cache.eth_to_token_input_price(HAY_exchange.address, 10**18) == HAY_exchange.getEthToTokenInputPrice(10**18)
+    assert cache.eth_to_token_output_price(HAY_exchange.address, 10**18) == HAY_exchange.getEthToTokenOutputPrice(10**18)
+    assert cache.token_to_eth_input_price(DEN_exchange.address, 10**18) == DEN_exchange.getTokenToEthInputPrice(10**18)
+    assert cache.token_to_eth_output_price(DEN_exchange.address, 10**18) == DEN_exchange.getTokenToEthOutputPrice(10**18)
+    with pytest.raises(Revert):
+        cache.token_to_eth_output_price(DEN_exchange.address, 0)
+    with pytest.raises(Revert):
+        cache.eth_to_token_output_price(HAY_exchange.address, 10**30)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stale']) == (9, 2, 0)
+    assert stats['block'] == w3.eth.blockNumber
+
+def test_staleness(w3, factory, HAY_token, HAY_exchange):
+    cache = make_cache(w3, factory, max_age=2, max_gap=5)
+    cache.get(HAY_exchange.address)
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18})
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18})
+    cache.sync()
+    assert cache.stats()['oldest'] == 2
+    assert cache.get(HAY_exchange.address) == read(w3, HAY_token, HAY_exchange)
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18})
+    cache.sync()
+    # Older than max_age: read again
+    assert cache.get(HAY_exchange.address) == read(w3, HAY_token, HAY_exchange)
+    assert (cache.hits, cache.misses, cache.stale) == (1, 1, 1)
+    assert cache.stats()['oldest'] == 0
+    # More than max_gap blocks behind: drop everything
+    w3.testing.mine(6)
+    cache.sync()
+    assert cache.stats()['oldest'] is None
+    assert cache.get(HAY_exchange.address) == read(w3, HAY_token, HAY_exchange)
+    assert cache.misses == 2
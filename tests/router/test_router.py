@@ -0,0 +1,137 @@
+import pytest
+from eth_tester.exceptions import TransactionFailed
+
+from uniswap import artifacts, router
+from uniswap.router import BatchBuilder
+
+from tests.constants import DEADLINE, ETH_RESERVE, HAY_RESERVE, DEN_RESERVE
+
+pytestmark = pytest.mark.evm
+
+DEPOSIT = 10**20
+
+@pytest.fixture
+def batch_router(w3, factory, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    contract = w3.eth.contract(address=router.deploy(w3, factory.address), abi=artifacts.load(router.ROUTER).abi)
+    for token in (HAY_token, DEN_token):
+        token.transfer(contract.address, DEPOSIT, transact={})
+    w3.eth.sendTransaction({'to': contract.address, 'value': DEPOSIT})
+    return contract
+
+@pytest.fixture
+def builder(HAY_token, DEN_token):
+    return BatchBuilder({HAY_token.address: (ETH_RESERVE, HAY_RESERVE), DEN_token.address: (ETH_RESERVE, DEN_RESERVE)})
+
+def holdings(w3, tokens, address):
+    return [w3.eth.getBalance(address)] + [token.balanceOf(address) for token in tokens]
+
+def test_batch(w3, batch_router, builder, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    HAY, DEN = HAY_token.address, DEN_token.address
+    # every kind of leg, two of them on each exchange
+    builder.token_to_eth(HAY, 2 * 10**18)
+    builder.eth_to_token(DEN, 10**18)
+    builder.token_to_token_output(HAY, DEN, 10**18)
+    builder.eth_to_token_output(HAY, 10**17)
+    builder.token_to_eth_output(DEN, 10**17)
+    builder.token_to_token(DEN, HAY, 3 * 10**18)
+    batch = builder.build(DEADLINE)
+    assert [leg.kind for leg in batch.legs] == [2, 0, 5, 1, 3, 4]
+    quotes = [leg.quote for leg in batch.legs]
+    assert batch_router.functions.batchSwap(*batch.args).call()[:6] == quotes
+    before = holdings(w3, (HAY_token, DEN_token), batch_router.address)
+    batch_router.functions.batchSwap(*batch.args).transact()
+    after = holdings(w3, (HAY_token, DEN_token), batch_router.address)
+    # the router's balances move as the builder expects, and the exchanges end on its reserves
+    assert [a - b for a, b in zip(after, before)] == [batch.changes[None], batch.changes[HAY], batch.changes[DEN]]
+    assert batch.changes[HAY] == -2 * 10**18 - quotes[2] + 10**17 + quotes[5]
+    assert (w3.eth.getBalance(HAY_exchange.address), HAY_token.balanceOf(HAY_exchange.address)) == builder.reserves[HAY]
+    assert (w3.eth.getBalance(DEN_exchange.address), DEN_token.balanceOf(DEN_exchange.address)) == builder.reserves[DEN]
+
+def test_limits(w3, batch_router, builder, HAY_token, DEN_token, HAY_exchange):
+    HAY, DEN = HAY_token.address, DEN_token.address
+    a0, a1 = w3.eth.accounts[:2]
+    builder.token_to_eth(DEN, 10**18)
+    builder.eth_to_token(HAY, 10**17)
+    batch = builder.build(DEADLINE)
+    # someone buys HAY first: the second leg misses its limit and the first one is undone too
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**17, 'from': a1})
+    before = holdings(w3, (HAY_token, DEN_token), batch_router.address)
+    with pytest.raises(TransactionFailed):
+        batch_router.functions.batchSwap(*batch.args).transact()
+    assert holdings(w3, (HAY_token, DEN_token), batch_router.address) == before
+    # within tolerance it still goes through
+    builder = BatchBuilder({HAY: (w3.eth.getBalance(HAY_exchange.address), HAY_token.balanceOf(HAY_exchange.address)),
+                            DEN: (ETH_RESERVE, DEN_RESERVE)}, tolerance=0.05)
+    builder.token_to_eth(DEN, 10**18)
+    builder.eth_to_token(HAY, 10**17)
+    batch = builder.build(DEADLINE)
+    HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**15, 'from': a1})
+    batch_router.functions.batchSwap(*batch.args).transact()
+    # only the owner swaps, legs must name exchanges of the router's factory, and past deadlines fail
+    with pytest.raises(TransactionFailed):
+        batch_router.functions.batchSwap(*batch.args).transact({'from': a1})
+    args = list(batch.args)
+    args[1] = [batch_router.address] + args[1][1:]
+    with pytest.raises(TransactionFailed):
+        batch_router.functions.batchSwap(*args).transact()
+    with pytest.raises(TransactionFailed):
+        batch_router.functions.batchSwap(*batch.args[:5], 1).transact()
+    # only the owner withdraws
+    with pytest.raises(TransactionFailed):
+        batch_router.functions.withdrawTokens(HAY, 1).transact({'from': a1})
+    with pytest.raises(TransactionFailed):
+        batch_router.functions.withdrawEth(1).transact({'from': a1})
+    held = holdings(w3, (HAY_token, DEN_token), batch_router.address)
+    batch_router.functions.withdrawTokens(HAY, held[1]).transact()
+    batch_router.functions.withdrawEth(held[0]).transact()
+    assert holdings(w3, (HAY_token, DEN_token), batch_router.address) == [0, 0, held[2]]
+
+def test_builder(HAY_token, DEN_token, builder):
+    HAY, DEN = HAY_token.address, DEN_token.address
+    # what the router must hold is the most it is short at any leg, when every leg hits its limit
+    builder.eth_to_token_output(HAY, 10**18)
+    builder.eth_to_token(DEN, 10**17)
+    builder.token_to_eth(DEN, 10**19)
+    builder.eth_to_token(HAY, 10**18)
+    builder.token_to_token(HAY, DEN, 3 * 10**18)
+    batch = builder.build(DEADLINE)
+    first = batch.legs[0].limit + 10**17
+    assert batch.eth == max(first, first - batch.legs[2].limit + 10**18)
+    assert batch.tokens == {DEN: 10**19 - batch.legs[1].limit, HAY: 3 * 10**18 - 10**18 - batch.legs[3].limit}
+    assert batch.changes[None] == -batch.legs[0].quote - 10**17 + batch.legs[2].quote - 10**18
+    assert batch.args[0] == [1, 0, 2, 0, 4, 0, 0, 0] and batch.args[1][5:] == [router.ZERO_ADDRESS] * 3
+    for _ in range(3):
+        builder.eth_to_token(DEN, 1)
+    with pytest.raises(ValueError):
+        builder.eth_to_token(DEN, 1)
+    # a rebalance sells first and spends only what the sales are sure to buy
+    batch = BatchBuilder(builder.reserves).rebalance({HAY: 10**18, DEN: 10**18}, {HAY: 1, DEN: 3}, DEADLINE)
+    sold = batch.legs[0].limit + batch.legs[1].limit
+    assert [leg.kind for leg in batch.legs] == [2, 2, 0, 0] and batch.eth == 0
+    assert batch.legs[2].amount + batch.legs[3].amount <= sold and batch.legs[3].amount == sold * 3 // 4
+
+def test_gas(w3, batch_router, HAY_token, DEN_token, HAY_exchange, DEN_exchange):
+    HAY, DEN = HAY_token.address, DEN_token.address
+    tokens = {HAY: HAY_token, DEN: DEN_token}
+    exchanges = {HAY: HAY_exchange.address, DEN: DEN_exchange.address}
+    for token in tokens.values():
+        for exchange in exchanges.values():
+            token.approve(exchange, 10**30, transact={})
+    def cycle():
+        builder = BatchBuilder({t: (w3.eth.getBalance(exchanges[t]), tokens[t].balanceOf(exchanges[t])) for t in tokens})
+        builder.token_to_eth(HAY, 2 * 10**18)
+        builder.eth_to_token(DEN, 10**18)
+        builder.token_to_token_output(HAY, DEN, 10**18)
+        builder.eth_to_token_output(HAY, 10**17)
+        builder.token_to_eth_output(DEN, 10**17)
+        builder.token_to_token(DEN, HAY, 3 * 10**18)
+        return builder.build(DEADLINE)
+    gas = lambda tx_hash: w3.eth.getTransactionReceipt(tx_hash).gasUsed
+    # each leg alone, quoted in order, fills at its quote
+    before = DEN_token.balanceOf(w3.eth.defaultAccount)
+    legs = cycle().legs
+    separate = sum(gas(router.send(w3, exchanges[leg.token], leg, DEADLINE)) for leg in legs)
+    assert DEN_token.balanceOf(w3.eth.defaultAccount) - before == legs[1].quote + 10**18 - legs[4].quote - legs[5].amount
+    # once the router has looked up the exchanges, one batch costs less gas than sending each swap alone
+    batched = [gas(batch_router.functions.batchSwap(*cycle().args).transact()) for _ in range(2)]
+    assert batched[1] < batched[0] and batched[1] < separate * 0.9
@@ -0,0 +1,137 @@
+import asyncio
+import http.client
+import json
+import threading
+import time
+
+import pytest
+import websockets
+from web3 import Web3
+
+from uniswap import artifacts, factory, genesis, rpc
+
+from tests.constants import DEADLINE
+
+pytestmark = pytest.mark.evm
+
+SCENARIO = {
+    'tokens': [{'symbol': 'HAY'}],
+    'pools': [{'token': 'HAY', 'eth_reserve': 5*10**18, 'token_reserve': 10*10**18}],
+}
+
+@pytest.fixture
+def world(tmpdir):
+    return genesis.World(genesis.cached(SCENARIO, str(tmpdir)))
+
+def post(connection, body):
+    connection.request('POST', '/', body if isinstance(body, bytes) else json.dumps(body).encode(),
+                       {'Content-Type': 'application/json'})
+    return json.loads(connection.getresponse().read().decode())
+
+def test_batch(world):
+    with rpc.Server(world.tester) as server:
+        # one connection, kept alive across requests
+        connection = http.client.HTTPConnection(*server.httpd.server_address)
+        assert post(connection, {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber'})['result'] == '0x0'
+        responses = post(connection, [
+            {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_accounts'},
+            {'jsonrpc': '2.0', 'id': 2, 'method': 'eth_getBalance', 'params': [world.addresses['exchanges']['HAY'], 'latest']},
+            {'jsonrpc': '2.0', 'id': 3, 'method': 'no_such_method'},
+            {'jsonrpc': '2.0', 'id': 4},
+        ])
+        assert [r['id'] for r in responses] == [1, 2, 3, 4]
+        assert responses[0]['result'] == world.w3.eth.accounts
+        assert int(responses[1]['result'], 16) == 5*10**18
+        assert responses[2]['error']['code'] == rpc.SERVER_ERROR
+        assert responses[3]['error']['code'] == rpc.INVALID_REQUEST
+        assert post(connection, b'{not json')['error']['code'] == rpc.PARSE_ERROR
+        assert post(connection, [])['error']['code'] == rpc.INVALID_REQUEST
+        connection.close()
+        # a body without a Content-Length is answered, not dropped
+        for headers in ({'Transfer-Encoding': 'chunked'}, {'Content-Length': 'ten'}):
+            connection = http.client.HTTPConnection(*server.httpd.server_address)
+            connection.putrequest('POST', '/')
+            for name, value in headers.items():
+                connection.putheader(name, value)
+            connection.endheaders()
+            assert connection.getresponse().status == 411
+            connection.close()
+
+def test_latency(world):
+    with rpc.Server(world.tester, latency=0.05, call_latency=0.01) as server:
+        connection = http.client.HTTPConnection(*server.httpd.server_address)
+        start = time.perf_counter()
+        post(connection, [{'jsonrpc': '2.0', 'id': i, 'method': 'eth_blockNumber'} for i in range(5)])
+        elapsed = time.perf_counter() - start
+        # one round trip for the batch, plus each call
+        assert 0.1 <= elapsed < 0.2
+        connection.close()
+
+def test_subscriptions(world):
+    exchange = world.exchange('HAY')
+    transaction = {'from': world.w3.eth.accounts[0], 'to': exchange.address, 'value': 10**17, 'gas': 10**6,
+                   'gasPrice': 0, 'data': exchange.encodeABI('ethToTokenSwapInput', [1, DEADLINE])}
+
+    async def subscribe(server):
+        loop = asyncio.get_event_loop()
+        async with websockets.connect(server.ws_url) as ws:
+            async def request(method, *params):
+                await ws.send(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': list(params)}))
+                return json.loads(await ws.recv())['result']
+            logs = await request('eth_subscribe', 'logs', {'address': exchange.address})
+            heads = await request('eth_subscribe', 'newHeads')
+            # the swap arrives over HTTP; notifications go to this connection
+            connection = http.client.HTTPConnection(*server.httpd.server_address)
+            await loop.run_in_executor(None, post, connection, {
+                'jsonrpc': '2.0', 'id': 1, 'method': 'eth_sendTransaction', 'params': [transaction]})
+            notifications = [json.loads(await ws.recv())['params'] for _ in range(2)]
+            assert await request('eth_unsubscribe', logs)
+            connection.close()
+            return logs, heads, notifications
+
+    with rpc.Server(world.tester, ws_port=0) as server:
+        logs, heads, notifications = asyncio.get_event_loop().run_until_complete(subscribe(server))
+    by_subscription = {n['subscription']: n['result'] for n in notifications}
+    purchase = by_subscription[logs]
+    assert purchase['address'] == exchange.address
+    assert purchase['topics'][0] == Web3.toHex(Web3.sha3(text='TokenPurchase(address,uint256,uint256)'))
+    assert by_subscription[heads]['number'] == '0x1'
+    assert world.w3.eth.blockNumber == 1
+
+def test_miner(world):
+    exchange = world.exchange('HAY')
+    account = world.w3.eth.accounts[0]
+    with rpc.Server(world.tester) as server:
+        connection = http.client.HTTPConnection(*server.httpd.server_address)
+        assert post(connection, {'jsonrpc': '2.0', 'id': 1, 'method': 'miner_stop'})['result'] is True
+        transaction = {'from': account, 'to': exchange.address, 'value': 10**16, 'gas': 10**6, 'gasPrice': 0,
+                       'data': exchange.encodeABI('ethToTokenSwapInput', [1, DEADLINE])}
+        # two transactions from one sender, numbered by the server, mined in one block
+        post(connection, [{'jsonrpc': '2.0', 'id': i, 'method': 'eth_sendTransaction', 'params': [transaction]}
+                          for i in range(2)])
+        assert world.w3.eth.blockNumber == 0
+        post(connection, {'jsonrpc': '2.0', 'id': 1, 'method': 'evm_mine'})
+        post(connection, {'jsonrpc': '2.0', 'id': 1, 'method': 'miner_start'})
+        connection.close()
+    assert len(world.w3.eth.getBlock(1).transactions) == 2
+    assert world.w3.eth.getTransactionCount(account) == 2
+
+def test_create_exchanges_mined_later(world):
+    tokens = [Web3.toChecksumAddress('0x%040x' % (0xf00d << 128 | i)) for i in range(1, 26)]
+    with rpc.Server(world.tester) as server:
+        w3 = Web3(Web3.HTTPProvider(server.url))
+        contract = w3.eth.contract(address=world.addresses['factory'], abi=artifacts.load(factory.FACTORY).abi)
+        transaction = {'from': w3.eth.accounts[0], 'gasPrice': 0}
+        w3.manager.request_blocking('miner_stop', [])
+        # nothing is mined until evm_mine a second later: create_exchanges waits for the receipts
+        block = w3.eth.blockNumber
+        miner = threading.Timer(1.0, w3.manager.request_blocking, ['evm_mine', []])
+        miner.start()
+        exchanges = factory.create_exchanges(contract, tokens, transaction=transaction, timeout=30)
+        miner.join()
+        assert w3.eth.blockNumber == block + 1 and len(w3.eth.getBlock('latest').transactions) == 2
+        assert exchanges == [contract.functions.getExchange(t).call() for t in tokens]
+        # a batch that reverts is reported from its receipt
+        w3.manager.request_blocking('miner_start', [])
+        with pytest.raises(RuntimeError, match='1 of 1 createExchanges transactions reverted'):
+            factory.create_exchanges(contract, tokens[:1], transaction=transaction)
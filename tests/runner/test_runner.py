@@ -0,0 +1,36 @@
+import pytest
+
+from uniswap.runner import Runner
+
+from tests.constants import DEADLINE
+
+pytestmark = pytest.mark.evm
+
+SCENARIO = {
+    'tokens': [{'symbol': 'HAY'}],
+    'pools': [{'token': 'HAY', 'eth_reserve': 5*10**18, 'token_reserve': 10*10**18}],
+}
+
+def warmup(world):
+    world.exchange('HAY').functions.ethToTokenSwapInput(1, DEADLINE).transact({'value': 10**18, 'gas': 10**6})
+
+def simulate(world, eth_sold):
+    if eth_sold == 0:
+        raise ValueError('nothing to sell')
+    exchange = world.exchange('HAY')
+    before = exchange.functions.getEthToTokenInputPrice(10**18).call()
+    exchange.functions.ethToTokenSwapInput(1, DEADLINE).transact({'value': eth_sold, 'gas': 10**6})
+    return before, world.w3.eth.getBalance(exchange.address)
+
+def test_runner(tmpdir):
+    items = [10**18, 2*10**18, 0, 3*10**18, 10**17, 10**18, 5*10**18]
+    with Runner(simulate, SCENARIO, processes=2, tasks_per_worker=2, warmup=warmup, cache_dir=str(tmpdir)) as runner:
+        results = list(runner.run(items))
+    assert [r.index for r in results] == list(range(len(items)))
+    # A failure is reported without stopping the run
+    assert results[2].value is None and 'nothing to sell' in results[2].error
+    # Every simulation starts from the genesis reserves, whatever ran before it in that worker
+    assert {r.value[0] for r in results if r.error is None} == {1662497915624478906}
+    assert [r.value[1] for r in results if r.error is None] == [5*10**18 + e for e in items if e]
+    # Workers are replaced after tasks_per_worker simulations
+    assert len({r.worker for r in results}) > 2
@@ -0,0 +1,25 @@
+from benchmarks import bench_wall
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert bench_wall.percentile(samples, 50) == 50
+    assert bench_wall.percentile(samples, 90) == 90
+    assert bench_wall.percentile(samples, 100) == 100
+    # the ceil(q / 100 * n)-th smallest, whatever way q / 100 * n rounds
+    assert [bench_wall.percentile(samples, q) for q in (1, 51, 95, 99)] == [1, 51, 95, 99]
+    assert bench_wall.percentile(samples, 99.5) == 100 and bench_wall.percentile(samples, 0.5) == 1
+    assert bench_wall.percentile([3, 1, 2], 0) == 1
+    assert bench_wall.percentile([7], 99) == 7
+
+def test_bench():
+    calls = []
+    result = bench_wall.bench(lambda: calls.append([0] * 1000), repeat=5, setup=lambda: calls.append(None))
+    # setup runs before every timed call and before the traced one
+    assert calls.count(None) == 6 and len(calls) == 12
+    assert result['n'] == 5
+    assert result['min'] <= result['p50'] <= result['p90'] <= result['max']
+    assert result['alloc_blocks'] > 0
+    lines = bench_wall.table({'x': result}).splitlines()
+    assert lines[1].split()[:2] == ['x', '5']
+    old = dict(result, p50=2 * result['p50'])
+    assert bench_wall.compare({'x': old}, {'x': result, 'y': result}).splitlines()[1].split()[-1] == '0.50x'
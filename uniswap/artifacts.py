@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+
+'''
+Compiled contract artifacts, cached on disk by content.
+
+An artifact is keyed by sha256(vyper version + source), so editing a contract
+or switching compilers produces a new entry rather than a stale hit. Loaded
+artifacts are also memoized in-process, so a test session compiles each
+contract at most once and usually not at all.
+
+# override the cache location with:   VYPER_CACHE_DIR=/some/dir
+'''
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir))
+CACHE_DIR = os.environ.get('VYPER_CACHE_DIR', os.path.join(ROOT, '.vyper_cache'))
+
+# contract source -> (committed bytecode, committed abi)
+COMMITTED = {
+    'contracts/uniswap_exchange.vy': ('bytecode/exchange.txt', 'abi/uniswap_exchange.json'),
+    'contracts/uniswap_exchange_lean.vy': ('bytecode/exchange_lean.txt', 'abi/uniswap_exchange_lean.json'),
+    'contracts/uniswap_factory.vy': ('bytecode/factory.txt', 'abi/uniswap_factory.json'),
+    'contracts/uniswap_reader.vy': ('bytecode/reader.txt', 'abi/uniswap_reader.json'),
+    'contracts/uniswap_router.vy': ('bytecode/router.txt', 'abi/uniswap_router.json'),
+}
+
+_memo = {}
+
+
+class Artifact(object):
+    __slots__ = ('path', 'key', 'bytecode', 'abi')
+
+    def __init__(self, path, key, bytecode, abi):
+        self.path = path
+        self.key = key
+        self.bytecode = bytecode
+        self.abi = abi
+
+
+def vyper_version():
+    import vyper
+    return vyper.__version__
+
+
+def source_key(source, version=None):
+    if version is None:
+        version = vyper_version()
+    digest = hashlib.sha256()
+    digest.update(version.encode())
+    digest.update(b'\x00')
+    digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def _read(path):
+    with open(os.path.join(ROOT, path)) as f:
+        return f.read()
+
+
+def _compile(source):
+    from vyper import compiler
+    bytecode = '0x' + compiler.compile(source).hex()
+    abi = compiler.mk_full_signature(source)
+    return bytecode, abi
+
+
+def load(path):
+    """ Return the Artifact for a contract path relative to the repo root. """
+    source = _read(path)
+    key = source_key(source)
+    if key in _memo:
+        return _memo[key]
+    cache_file = os.path.join(CACHE_DIR, key + '.json')
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        bytecode, abi = cached['bytecode'], cached['abi']
+    except (IOError, ValueError, KeyError):
+        bytecode, abi = _compile(source)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # write-then-rename so concurrent sessions never read a partial file
+        tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump({'path': path, 'bytecode': bytecode, 'abi': abi}, f)
+        os.replace(tmp_file, cache_file)
+    artifact = Artifact(path, key, bytecode, abi)
+    _memo[key] = artifact
+    return artifact
+
+
+def runtime(path):
+    """ Runtime bytecode, the code a deployed contract holds, for a contract path relative to the repo root. """
+    source = _read(path)
+    key = source_key(source) + '.runtime'
+    if key in _memo:
+        return _memo[key]
+    cache_file = os.path.join(CACHE_DIR, key)
+    try:
+        with open(cache_file) as f:
+            code = bytes.fromhex(f.read())
+    except (IOError, ValueError):
+        from vyper import compiler
+        code = compiler.compile(source, bytecode_runtime=True)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            f.write(code.hex())
+        os.replace(tmp_file, cache_file)
+    _memo[key] = code
+    return code
+
+
+def _abi_entries(abi):
+    return {(e['type'], e.get('name')): e for e in abi}
+
+
+def drift(path):
+    """ List how the compiled artifact differs from the committed bytecode/ and abi/ files. """
+    if path not in COMMITTED:
+        return []
+    bytecode_path, abi_path = COMMITTED[path]
+    artifact = load(path)
+    problems = []
+    if _read(bytecode_path).strip().lower() != artifact.bytecode.lower():
+        problems.append('%s does not match compiled %s' % (bytecode_path, path))
+    committed = _abi_entries(json.loads(_read(abi_path)))
+    compiled = _abi_entries(artifact.abi)
+    for entry in sorted(set(committed) | set(compiled), key=str):
+        if committed.get(entry) != compiled.get(entry):
+            problems.append('%s: %s %s differs from compiled %s' % (abi_path, entry[0], entry[1], path))
+    return problems
+
+
+def check_committed():
+    problems = []
+    for path in sorted(COMMITTED):
+        problems.extend(drift(path))
+    return problems
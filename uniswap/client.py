@@ -0,0 +1,420 @@
+import asyncio
+import json
+import os
+from urllib.parse import urlsplit
+
+from eth_abi import decode_abi, encode_abi
+from eth_utils import function_abi_to_4byte_selector
+from web3 import Web3
+
+from uniswap import artifacts
+
+'''
+An asyncio JSON-RPC client for the factory and exchanges.
+
+    client = Client('http://127.0.0.1:8545', max_connections=8)
+    factory = client.factory(factory_address)
+    exchanges = [client.exchange(address) for address in addresses]
+    prices = await asyncio.gather(*[e.getEthToTokenInputPrice(10**18) for e in exchanges])
+    tx_hash = await exchanges[0].ethToTokenSwapInput(10**18, 1, deadline, {'from': trader})
+    await client.close()
+
+Requests made while the event loop is busy (a gather, or many tasks) are
+queued and sent together when it next runs the client: split into JSON-RPC
+batches of at most batch_size, the batches in parallel over at most
+max_connections keep-alive HTTP/1.1 connections. A fan-out over 1,000
+exchanges is then 1,000 / batch_size round trips, max_connections at a time,
+instead of 1,000 in a row.
+
+An eth_call identical (target, data, block) to one already queued or in
+flight shares its response instead of being sent again. Cancelling a caller
+(wait_for, task.cancel()) withdraws its call from the queue once no other
+caller waits for it; a call already sent completes and is dropped. close()
+cancels everything pending and closes the connections.
+
+Method names, argument order and outputs follow abi/uniswap_exchange.json and
+abi/uniswap_factory.json: uint256 outputs as int, addresses as checksummed
+strings. Payable swaps take the ether sent (eth_sold or max_eth) first, and
+every transaction method takes the rest of the transaction ('from', 'gas',
+'gasPrice') as a dict and returns the transaction hash.
+'''
+
+EXCHANGE_ABI = 'abi/uniswap_exchange.json'
+FACTORY_ABI = 'abi/uniswap_factory.json'
+MAX_CONNECTIONS = 8
+BATCH_SIZE = 100
+# gas for eth_call; without one, eth-tester estimates it first, about 18 executions
+CALL_GAS = 10**6
+
+
+def _functions(path):
+    with open(os.path.join(artifacts.ROOT, path)) as f:
+        abi = json.load(f)
+    return {e['name']: e for e in abi if e['type'] == 'function'}
+
+
+def _checksum(type_, value):
+    if type_ == 'address':
+        return Web3.toChecksumAddress(value)
+    if type_.startswith('address['):
+        return [Web3.toChecksumAddress(v) for v in value]
+    return value
+
+
+class _Contract(object):
+    """ Calls and transactions to one contract, encoded with its committed ABI. """
+
+    functions = {}
+
+    def __init__(self, client, address):
+        self.client = client
+        self.address = Web3.toChecksumAddress(address)
+
+    def _data(self, name, args):
+        function = self.functions[name]
+        types = [i['type'] for i in function['inputs']]
+        return Web3.toHex(function_abi_to_4byte_selector(function) + encode_abi(types, args))
+
+    async def _call(self, name, *args, block='latest'):
+        function = self.functions[name]
+        result = await self.client.call({'to': self.address, 'data': self._data(name, args)}, block)
+        values = decode_abi([o['type'] for o in function['outputs']], Web3.toBytes(hexstr=result))
+        values = [_checksum(o['type'], v) for o, v in zip(function['outputs'], values)]
+        return values[0] if len(values) == 1 else tuple(values)
+
+    async def _transact(self, name, args, transaction, value=0):
+        transaction = dict(transaction or {}, to=self.address, data=self._data(name, args))
+        if value:
+            transaction['value'] = hex(value)
+        for key in ('gas', 'gasPrice', 'nonce'):
+            if isinstance(transaction.get(key), int):
+                transaction[key] = hex(transaction[key])
+        return await self.client.request('eth_sendTransaction', [transaction])
+
+
+class Exchange(_Contract):
+
+    functions = _functions(EXCHANGE_ABI)
+
+    # prices
+
+    async def getEthToTokenInputPrice(self, eth_sold, block='latest'):
+        return await self._call('getEthToTokenInputPrice', eth_sold, block=block)
+
+    async def getEthToTokenOutputPrice(self, tokens_bought, block='latest'):
+        return await self._call('getEthToTokenOutputPrice', tokens_bought, block=block)
+
+    async def getTokenToEthInputPrice(self, tokens_sold, block='latest'):
+        return await self._call('getTokenToEthInputPrice', tokens_sold, block=block)
+
+    async def getTokenToEthOutputPrice(self, eth_bought, block='latest'):
+        return await self._call('getTokenToEthOutputPrice', eth_bought, block=block)
+
+    async def tokenAddress(self, block='latest'):
+        return await self._call('tokenAddress', block=block)
+
+    async def factoryAddress(self, block='latest'):
+        return await self._call('factoryAddress', block=block)
+
+    async def totalSupply(self, block='latest'):
+        return await self._call('totalSupply', block=block)
+
+    async def balanceOf(self, owner, block='latest'):
+        return await self._call('balanceOf', owner, block=block)
+
+    # ETH to token
+
+    async def ethToTokenSwapInput(self, eth_sold, min_tokens, deadline, transaction=None):
+        return await self._transact('ethToTokenSwapInput', [min_tokens, deadline], transaction, eth_sold)
+
+    async def ethToTokenTransferInput(self, eth_sold, min_tokens, deadline, recipient, transaction=None):
+        return await self._transact('ethToTokenTransferInput', [min_tokens, deadline, recipient], transaction,
+                                    eth_sold)
+
+    async def ethToTokenSwapOutput(self, max_eth, tokens_bought, deadline, transaction=None):
+        return await self._transact('ethToTokenSwapOutput', [tokens_bought, deadline], transaction, max_eth)
+
+    async def ethToTokenTransferOutput(self, max_eth, tokens_bought, deadline, recipient, transaction=None):
+        return await self._transact('ethToTokenTransferOutput', [tokens_bought, deadline, recipient], transaction,
+                                    max_eth)
+
+    # token to ETH
+
+    async def tokenToEthSwapInput(self, tokens_sold, min_eth, deadline, transaction=None):
+        return await self._transact('tokenToEthSwapInput', [tokens_sold, min_eth, deadline], transaction)
+
+    async def tokenToEthTransferInput(self, tokens_sold, min_eth, deadline, recipient, transaction=None):
+        return await self._transact('tokenToEthTransferInput', [tokens_sold, min_eth, deadline, recipient],
+                                    transaction)
+
+    async def tokenToEthSwapOutput(self, eth_bought, max_tokens, deadline, transaction=None):
+        return await self._transact('tokenToEthSwapOutput', [eth_bought, max_tokens, deadline], transaction)
+
+    async def tokenToEthTransferOutput(self, eth_bought, max_tokens, deadline, recipient, transaction=None):
+        return await self._transact('tokenToEthTransferOutput', [eth_bought, max_tokens, deadline, recipient],
+                                    transaction)
+
+    # token to token
+
+    async def tokenToTokenSwapInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, token_addr,
+                                    transaction=None):
+        return await self._transact('tokenToTokenSwapInput',
+                                    [tokens_sold, min_tokens_bought, min_eth_bought, deadline, token_addr],
+                                    transaction)
+
+    async def tokenToTokenTransferInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, recipient,
+                                        token_addr, transaction=None):
+        return await self._transact('tokenToTokenTransferInput',
+                                    [tokens_sold, min_tokens_bought, min_eth_bought, deadline, recipient, token_addr],
+                                    transaction)
+
+    async def tokenToTokenSwapOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, token_addr,
+                                     transaction=None):
+        return await self._transact('tokenToTokenSwapOutput',
+                                    [tokens_bought, max_tokens_sold, max_eth_sold, deadline, token_addr],
+                                    transaction)
+
+    async def tokenToTokenTransferOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, recipient,
+                                         token_addr, transaction=None):
+        return await self._transact('tokenToTokenTransferOutput',
+                                    [tokens_bought, max_tokens_sold, max_eth_sold, deadline, recipient, token_addr],
+                                    transaction)
+
+    # token to exchange
+
+    async def tokenToExchangeSwapInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline,
+                                       exchange_addr, transaction=None):
+        return await self._transact('tokenToExchangeSwapInput',
+                                    [tokens_sold, min_tokens_bought, min_eth_bought, deadline, exchange_addr],
+                                    transaction)
+
+    async def tokenToExchangeTransferInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline,
+                                           recipient, exchange_addr, transaction=None):
+        return await self._transact('tokenToExchangeTransferInput',
+                                    [tokens_sold, min_tokens_bought, min_eth_bought, deadline, recipient,
+                                     exchange_addr], transaction)
+
+    async def tokenToExchangeSwapOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline,
+                                        exchange_addr, transaction=None):
+        return await self._transact('tokenToExchangeSwapOutput',
+                                    [tokens_bought, max_tokens_sold, max_eth_sold, deadline, exchange_addr],
+                                    transaction)
+
+    async def tokenToExchangeTransferOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline,
+                                            recipient, exchange_addr, transaction=None):
+        return await self._transact('tokenToExchangeTransferOutput',
+                                    [tokens_bought, max_tokens_sold, max_eth_sold, deadline, recipient,
+                                     exchange_addr], transaction)
+
+
+class Factory(_Contract):
+
+    functions = _functions(FACTORY_ABI)
+
+    async def getExchange(self, token, block='latest'):
+        return await self._call('getExchange', token, block=block)
+
+    async def getToken(self, exchange, block='latest'):
+        return await self._call('getToken', exchange, block=block)
+
+    async def getTokenWithId(self, token_id, block='latest'):
+        return await self._call('getTokenWithId', token_id, block=block)
+
+    async def tokenCount(self, block='latest'):
+        return await self._call('tokenCount', block=block)
+
+    async def createExchange(self, token, transaction=None):
+        return await self._transact('createExchange', [token], transaction)
+
+    async def getExchangesWithIds(self, start, count, block='latest'):
+        return await self._call('getExchangesWithIds', start, count, block=block)
+
+    async def createExchanges(self, tokens, transaction=None):
+        return await self._transact('createExchanges', [tokens], transaction)
+
+
+class _Call(object):
+    """ One queued request and the callers waiting for it. """
+    __slots__ = ('request', 'future', 'waiters', 'key')
+
+    def __init__(self, request, future, key=None):
+        self.request = request
+        self.future = future
+        self.waiters = 0
+        self.key = key
+
+
+class _Connection(object):
+    """ A keep-alive HTTP/1.1 connection. """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def post(self, host, path, body):
+        self.writer.write(('POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n'
+                           'Content-Length: %d\r\n\r\n' % (path, host, len(body))).encode() + body)
+        status = (await self.reader.readline()).decode().split(None, 2)
+        if len(status) < 2:
+            raise ConnectionError('connection closed by the server')
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode().strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                body += chunk[:-2]
+        else:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        if status[1] != '200':
+            raise ConnectionError('HTTP %s: %s' % (status[1], body[:200]))
+        return body, headers.get('connection', '').lower() != 'close'
+
+    def close(self):
+        self.writer.close()
+
+
+class Client(object):
+
+    def __init__(self, url, max_connections=MAX_CONNECTIONS, batch_size=BATCH_SIZE, call_gas=CALL_GAS, loop=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or '/'
+        self.batch_size = batch_size
+        self.call_gas = call_gas
+        self.loop = loop or asyncio.get_event_loop()
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections, loop=self.loop)
+        self._queue = []
+        self._in_flight = {}
+        self._tasks = set()
+        self._ids = 0
+        self.requests = 0
+        self.round_trips = 0
+
+    def exchange(self, address):
+        return Exchange(self, address)
+
+    def factory(self, address):
+        return Factory(self, address)
+
+    async def request(self, method, params=()):
+        """ The result of one JSON-RPC call; an error response raises ValueError. """
+        return await self._wait(self._enqueue(method, list(params)))
+
+    async def call(self, transaction, block='latest'):
+        """ eth_call, shared with any identical call queued or in flight. """
+        if isinstance(block, int):
+            block = hex(block)
+        if 'gas' not in transaction and self.call_gas:
+            transaction = dict(transaction, gas=hex(self.call_gas))
+        key = (transaction['to'].lower(), transaction['data'], transaction.get('from'), block)
+        call = self._in_flight.get(key)
+        if call is None or call.future.cancelled():
+            call = self._enqueue('eth_call', [transaction, block], key)
+        return await self._wait(call)
+
+    def _enqueue(self, method, params, key=None):
+        self._ids += 1
+        call = _Call({'jsonrpc': '2.0', 'id': self._ids, 'method': method, 'params': params},
+                     self.loop.create_future(), key)
+        if key is not None:
+            self._in_flight[key] = call
+            call.future.add_done_callback(lambda _: self._in_flight.pop(key, None)
+                                          if self._in_flight.get(key) is call else None)
+        if not self._queue:
+            self.loop.call_soon(self._flush)
+        self._queue.append(call)
+        return call
+
+    async def _wait(self, call):
+        call.waiters += 1
+        try:
+            # shielded, so one cancelled caller leaves the others their response
+            return await asyncio.shield(call.future, loop=self.loop)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if not call.waiters:
+                call.future.cancel()
+            raise
+
+    def _flush(self):
+        queue, self._queue = self._queue, []
+        for i in range(0, len(queue), self.batch_size):
+            task = self.loop.create_task(self._send(queue[i:i + self.batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, calls):
+        async with self._slots:
+            # withdrawn while waiting for a connection
+            calls = [call for call in calls if not call.future.done()]
+            if not calls:
+                return
+            try:
+                responses = await self._post([call.request for call in calls])
+            except asyncio.CancelledError:
+                for call in calls:
+                    call.future.cancel()
+                raise
+            except Exception as e:
+                for call in calls:
+                    if not call.future.done():
+                        call.future.set_exception(e)
+                return
+        by_id = {r.get('id'): r for r in (responses if isinstance(responses, list) else [responses])}
+        for call in calls:
+            if call.future.done():
+                continue
+            response = by_id.get(call.request['id'])
+            if response is None:
+                call.future.set_exception(ValueError('no response to request %d' % call.request['id']))
+            elif 'error' in response:
+                call.future.set_exception(ValueError(response['error']))
+            else:
+                call.future.set_result(response['result'])
+
+    async def _post(self, batch):
+        connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = _Connection(*await asyncio.open_connection(self.host, self.port, loop=self.loop))
+        self.requests += len(batch)
+        self.round_trips += 1
+        try:
+            body, keep_alive = await connection.post(self.host, self.path, json.dumps(batch).encode())
+        except BaseException:
+            # a request cut short leaves the connection mid-response
+            connection.close()
+            raise
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        return json.loads(body.decode())
+
+    async def close(self):
+        for call in self._queue:
+            call.future.cancel()
+        self._queue = []
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), loop=self.loop)
+        for connection in self._idle:
+            connection.close()
+        self._idle = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
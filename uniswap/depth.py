@@ -0,0 +1,167 @@
+import bisect
+from fractions import Fraction
+
+from uniswap.model import Revert, get_input_price, get_output_price
+
+'''
+Price-impact depth of an exchange, precomputed once per reserve change.
+
+    depth = Depth(ReserveCache(reader))              # or anything with get(exchange) -> Reserves
+    table = depth.table(exchange, ETH_TO_TOKEN)      # rebuilt only when the reserves moved
+    table.max_input(Fraction(1, 100))                # the most ETH to sell before 1% impact
+    table.min_input(tokens)                          # the least ETH an Input swap needs to get tokens
+    table.max_output(eth)                            # the most tokens an Output swap buys for eth
+    table.output(eth_sold), table.cost(tokens_bought) # getInputPrice, getOutputPrice
+
+A DepthTable holds one direction of one exchange at fixed reserves: the
+getInputPrice curve at log-spaced sizes from 1 to MAX_MULTIPLE times the input
+reserve, the getOutputPrice curve at log-spaced amounts up to the output
+reserve, and the impact at each size. Both curves are monotone, so an inverse
+query bisects the table for the two points around the answer, O(log n), then
+bisects the sizes between them with the contract's integer formulas. Answers
+are exact, rounding and the +1 of getOutputPrice included: min_input(a) is the
+smallest size whose Input swap returns at least a, max_output(b) the largest
+amount whose Output swap costs at most b.
+
+Impact is the shortfall of the execution price from the price a marginal trade
+gets after the 0.3% fee, 1 - output * 1000 * input_reserve /
+(size * 997 * output_reserve), exact, so tiny trades show their rounding.
+max_input(x) is the largest size at or beyond the least-impact point whose
+impact is at most x (a Fraction, or a float taken exactly), 0 if there is none.
+
+Depth keeps a table per exchange and direction and compares the reserves on
+every lookup, so a table is built at most once per reserve change and a lookup
+makes no RPC call once the ReserveCache is synced.
+'''
+
+ETH_TO_TOKEN = 'eth_to_token'
+TOKEN_TO_ETH = 'token_to_eth'
+POINTS_PER_DECADE = 16
+MAX_MULTIPLE = 1000
+
+
+def _grid(limit, points_per_decade):
+    """ Distinct integers from 1 to limit, log-spaced. """
+    points = []
+    k = 0
+    while True:
+        point = min(int(round(10 ** (k / points_per_decade))), limit)
+        if not points or point > points[-1]:
+            points.append(point)
+        if point >= limit:
+            return points
+        k += 1
+
+
+def _last_true(predicate, lo, hi):
+    """ The largest n in [lo, hi] with predicate(n), given predicate(lo) and a single change from true to false. """
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if predicate(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class DepthTable(object):
+
+    def __init__(self, input_reserve, output_reserve, points_per_decade=POINTS_PER_DECADE):
+        if not (input_reserve > 0 and output_reserve > 0):
+            raise Revert('empty reserve')
+        self.input_reserve = input_reserve
+        self.output_reserve = output_reserve
+        self.sizes = []
+        self.outputs = []
+        for size in _grid(input_reserve * MAX_MULTIPLE, points_per_decade):
+            try:
+                self.outputs.append(get_input_price(size, input_reserve, output_reserve))
+            except Revert:
+                break
+            self.sizes.append(size)
+        self.amounts = _grid(output_reserve - 1, points_per_decade) if output_reserve > 1 else []
+        self.costs = [get_output_price(amount, input_reserve, output_reserve) for amount in self.amounts]
+        self.impacts = [1 - output * 1000 * input_reserve / (size * 997 * output_reserve)
+                        for size, output in zip(self.sizes, self.outputs)]
+        # impact falls while rounding dominates, then rises with size
+        self._least = min(range(len(self.impacts)), key=self.impacts.__getitem__)
+
+    def output(self, size):
+        """ getInputPrice: what an Input swap of size returns. """
+        return get_input_price(size, self.input_reserve, self.output_reserve)
+
+    def cost(self, amount):
+        """ getOutputPrice: what an Output swap of amount costs. """
+        return get_output_price(amount, self.input_reserve, self.output_reserve)
+
+    def impact(self, size):
+        """ The exact impact of an Input swap of size, a Fraction. """
+        output = self.output(size)
+        return 1 - Fraction(output * 1000 * self.input_reserve, size * 997 * self.output_reserve)
+
+    def min_input(self, amount):
+        """ The smallest size whose Input swap returns at least amount, or None if none does. """
+        if amount <= 0:
+            return 0
+        if amount >= self.output_reserve:
+            return None
+        i = bisect.bisect_left(self.outputs, amount)
+        lo = self.sizes[i - 1] if i > 0 else 0
+        if i < len(self.sizes):
+            hi = self.sizes[i]
+        else:
+            # past the table: an Input swap of the Output swap's cost returns at least amount
+            hi = self.cost(amount)
+        # the last size that returns too little, plus one
+        return _last_true(lambda size: size == lo or self.output(size) < amount, lo, hi) + 1
+
+    def max_output(self, budget):
+        """ The largest amount an Output swap buys for at most budget, 0 if none. """
+        i = bisect.bisect_right(self.costs, budget)
+        if i == 0:
+            return 0
+        lo = self.amounts[i - 1]
+        hi = self.amounts[i] - 1 if i < len(self.amounts) else self.output_reserve - 1
+        return _last_true(lambda amount: self.cost(amount) <= budget, lo, hi)
+
+    def max_input(self, impact):
+        """ The largest size with impact at most impact, past the least-impact point; 0 if none. """
+        impact = Fraction(impact)
+        least = self._least
+        if self.impact(self.sizes[least]) > impact:
+            return 0
+        # the float column only picks the bracket, whose ends are then checked exactly
+        lo = least + bisect.bisect_right(self.impacts[least:], float(impact)) - 1
+        while lo > least and self.impact(self.sizes[lo]) > impact:
+            lo -= 1
+        hi = lo + 1
+        while hi < len(self.sizes) and self.impact(self.sizes[hi]) <= impact:
+            lo, hi = hi, hi + 1
+        if hi == len(self.sizes):
+            return self.sizes[lo]
+        return _last_true(lambda size: self.impact(size) <= impact, self.sizes[lo], self.sizes[hi] - 1)
+
+
+class Depth(object):
+
+    def __init__(self, cache, points_per_decade=POINTS_PER_DECADE):
+        self.cache = cache
+        self.points_per_decade = points_per_decade
+        self.builds = 0
+        self._tables = {}
+
+    def table(self, exchange, direction=ETH_TO_TOKEN):
+        """ The DepthTable of exchange in direction at its current reserves. """
+        reserves = self.cache.get(exchange)
+        if direction == ETH_TO_TOKEN:
+            input_reserve, output_reserve = reserves.eth, reserves.token
+        elif direction == TOKEN_TO_ETH:
+            input_reserve, output_reserve = reserves.token, reserves.eth
+        else:
+            raise ValueError('direction must be %s or %s' % (ETH_TO_TOKEN, TOKEN_TO_ETH))
+        table = self._tables.get((exchange, direction))
+        if table is None or (table.input_reserve, table.output_reserve) != (input_reserve, output_reserve):
+            table = self._tables[exchange, direction] = DepthTable(input_reserve, output_reserve,
+                                                                   self.points_per_decade)
+            self.builds += 1
+        return table
@@ -0,0 +1,95 @@
+from web3 import Web3
+
+from uniswap import artifacts
+from uniswap.model import ZERO_ADDRESS
+
+'''
+Create and list the exchanges of a factory in bulk, with the createExchanges
+and getExchangesWithIds entry points of contracts/uniswap_factory.vy.
+
+    factory = w3.eth.contract(address=deploy(w3, template_address), abi=artifacts.load(FACTORY).abi)
+    exchanges = create_exchanges(factory, tokens)     # CREATE_BATCH per transaction
+    for token, exchange in pairs(factory):            # PAGE_SIZE per eth_call, all at one block
+        ...
+
+A factory of N exchanges is built in N / CREATE_BATCH transactions instead of
+N, each paying the 21000 base gas once and writing tokenCount once, and listed
+in 1 + N / PAGE_SIZE calls instead of 1 + 2 * N (tokenCount, then
+getTokenWithId and getExchange per id). create_exchanges sends every batch
+before it waits for any receipt, raises RuntimeError if a batch reverted (one
+token that already has an exchange fails its whole batch), and reads the pairs
+back at the block of the last receipt. It gives every transaction and call its
+gas, so nothing is estimated first.
+
+# benchmark with:             python -m benchmarks.bench_factory
+'''
+
+FACTORY = 'contracts/uniswap_factory.vy'
+# tokens per createExchanges and pairs per getExchangesWithIds, as the contract sizes its arrays
+CREATE_BATCH = 20
+PAGE_SIZE = 100
+# gas per exchange created, and for the call around them
+CREATE_GAS = 250000
+CREATE_BASE_GAS = 50000
+# gas for eth_call; without one, eth-tester estimates it first
+CALL_GAS = 10**6
+# seconds to wait for each createExchanges receipt
+RECEIPT_TIMEOUT = 120
+
+
+def deploy(w3, exchange_template):
+    """ Deploy a factory of exchange_template and return its address. """
+    artifact = artifacts.load(FACTORY)
+    tx_hash = w3.eth.contract(abi=artifact.abi, bytecode=artifact.bytecode).constructor().transact()
+    address = w3.eth.getTransactionReceipt(tx_hash).contractAddress
+    w3.eth.contract(address=address, abi=artifact.abi).functions.initializeFactory(exchange_template).transact()
+    return address
+
+
+def create_exchanges(factory, tokens, batch_size=CREATE_BATCH, transaction=None, timeout=RECEIPT_TIMEOUT):
+    """ Create an exchange for each of tokens, batch_size per transaction, once mined; return them in token order. """
+    assert 0 < batch_size <= CREATE_BATCH
+    if not tokens:
+        return []
+    w3 = factory.web3
+    start = factory.functions.tokenCount().call({'gas': CALL_GAS}) + 1
+    hashes = []
+    for i in range(0, len(tokens), batch_size):
+        batch = list(tokens[i:i + batch_size])
+        tx = dict(transaction or {})
+        tx.setdefault('gas', CREATE_BASE_GAS + CREATE_GAS * len(batch))
+        hashes.append(factory.functions.createExchanges(batch + [ZERO_ADDRESS] * (CREATE_BATCH - len(batch))).transact(tx))
+    receipts = [w3.eth.waitForTransactionReceipt(tx_hash, timeout) for tx_hash in hashes]
+    failed = [i for i, receipt in enumerate(receipts) if not receipt.status]
+    if failed:
+        raise RuntimeError('%d of %d createExchanges transactions reverted, the first for tokens %d to %d' % (
+            len(failed), len(receipts), failed[0] * batch_size, min(len(tokens), (failed[0] + 1) * batch_size) - 1))
+    created = dict(pairs(factory, start, block_identifier=max(receipt.blockNumber for receipt in receipts)))
+    missing = [token for token in tokens if Web3.toChecksumAddress(token) not in created]
+    if missing:
+        raise RuntimeError('no exchange was created for %d tokens, the first %s' % (len(missing), missing[0]))
+    return [created[Web3.toChecksumAddress(token)] for token in tokens]
+
+
+def page(factory, start, count=PAGE_SIZE, block_identifier='latest'):
+    """ The (token, exchange) pairs with token ids start to start + count - 1. """
+    addresses = factory.functions.getExchangesWithIds(start, count).call(
+        {'gas': CALL_GAS}, block_identifier=block_identifier)
+    result = []
+    for i in range(0, len(addresses), 2):
+        if addresses[i] in (None, ZERO_ADDRESS):
+            break
+        result.append((addresses[i], addresses[i + 1]))
+    return result
+
+
+def pairs(factory, start=1, page_size=PAGE_SIZE, block_identifier=None):
+    """ Yield (token, exchange) for every token id from start, in id order, all read at one block. """
+    assert 0 < page_size <= PAGE_SIZE
+    w3 = factory.web3
+    if block_identifier is None:
+        block_identifier = w3.eth.blockNumber
+    token_count = factory.functions.tokenCount().call({'gas': CALL_GAS}, block_identifier=block_identifier)
+    for first in range(start, token_count + 1, page_size):
+        for pair in page(factory, first, page_size, block_identifier):
+            yield pair
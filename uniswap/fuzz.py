@@ -0,0 +1,547 @@
+import argparse
+import random
+import sys
+import time
+from collections import Counter, namedtuple
+
+from eth_abi import decode_abi, encode_abi
+from eth_utils import keccak, to_canonical_address, to_checksum_address
+
+from uniswap import artifacts, genesis, model
+
+'''
+Differential fuzzing of the compiled contracts against uniswap.model.
+
+    fuzzer = Fuzzer(world.tester, world.addresses)     # a genesis World of SCENARIO
+    failure = fuzzer.run(sequence(random.Random(seed), fuzzer.timestamp))
+    if failure:
+        failure = fuzzer.shrink(failure)                # the fewest, smallest ops that still fail
+
+# python -m uniswap.fuzz --sequences 2000 --processes 8
+# python -m uniswap.fuzz --sequences 100000 --no-evm    # the model's invariants only, much faster
+
+sequence() draws random operations over the factory, the exchanges and the
+tokens: every swap, addLiquidity and removeLiquidity, createExchange for the
+token without an exchange, approvals and tokens sent straight to an exchange.
+Amounts mix small numbers, values around the 1e9 wei minimum liquidity, log-
+uniform fractions of the reserves, the reserves themselves and values up to
+2^256 - 1; limits are mostly permissive and deadlines mostly far off. SCENARIO
+has a pool at the minimum, an ordinary one and one whose reserves make wei
+amounts overflow uint256, and an account rich enough to try.
+
+Each op runs on both sides. On the EVM it is an unsigned transaction applied
+to a py-evm state, as eth_call would run it but kept; the state is snapshot
+after loading the genesis image and reverted between sequences, which costs
+microseconds. The model runs the same op on an equivalent model world. After
+every op the outcome (reverted or not, and the return value) must agree, and
+so must the reserves and UNI supply of the exchanges it touched and the
+sender's balances; after the last op every balance and allowance is compared.
+The model also checks invariants after every successful op: a swap never
+decreases eth_reserve * token_reserve, and a liquidity change never decreases
+the ETH or tokens behind each UNI.
+
+A Failure records the sequence, the step and what disagreed. shrink() drops
+ops while the sequence still fails the same way, then makes every amount as
+small as it can. fuzz() spreads batches over worker processes with
+uniswap.runner. py-evm takes a few tens of milliseconds per op, so each
+process checks about 200 sequences of LENGTH ops a minute against the EVM,
+and thousands a minute take a machine with a few dozen cores; the model on
+its own checks about 30,000 a minute per process.
+'''
+
+MAX = 2**256 - 1
+LENGTH = 8
+GAS = 2 * 10**6
+FAR = 2**40
+POOLS = ('LOW', 'MID', 'HIGH')
+SPARE = 'NEW'
+
+_everyone = {account: MAX for account in range(4)}
+_balances = {0: 10**24, 1: 10**24, 2: 2**250, 3: 10**6}
+SCENARIO = {
+    'accounts': 4,
+    'eth': {2: 2**250},
+    'tokens': [{'symbol': symbol, 'balances': _balances, 'allowances': _everyone} for symbol in POOLS] +
+              [{'symbol': SPARE, 'balances': _balances}],
+    'pools': [
+        {'token': 'LOW', 'eth_reserve': 10**9, 'token_reserve': 10**9},
+        {'token': 'MID', 'eth_reserve': 5 * 10**18, 'token_reserve': 10 * 10**18},
+        {'token': 'HIGH', 'eth_reserve': 2**120, 'token_reserve': 2**200},
+    ],
+}
+
+# method: (the contract it is called on, payable)
+METHODS = {
+    'ethToTokenSwapInput': (genesis.EXCHANGE, True),
+    'ethToTokenSwapOutput': (genesis.EXCHANGE, True),
+    'tokenToEthSwapInput': (genesis.EXCHANGE, False),
+    'tokenToEthSwapOutput': (genesis.EXCHANGE, False),
+    'tokenToTokenSwapInput': (genesis.EXCHANGE, False),
+    'tokenToTokenSwapOutput': (genesis.EXCHANGE, False),
+    'addLiquidity': (genesis.EXCHANGE, True),
+    'removeLiquidity': (genesis.EXCHANGE, False),
+    'createExchange': (genesis.FACTORY, False),
+    'approve': (genesis.TOKEN, False),
+    'transfer': (genesis.TOKEN, False),
+}
+WEIGHTS = {'ethToTokenSwapInput': 4, 'ethToTokenSwapOutput': 3, 'tokenToEthSwapInput': 4, 'tokenToEthSwapOutput': 3,
+           'tokenToTokenSwapInput': 2, 'tokenToTokenSwapOutput': 2, 'addLiquidity': 3, 'removeLiquidity': 3,
+           'createExchange': 1, 'approve': 1, 'transfer': 1}
+
+# target is a token symbol: its exchange, the token itself for approve and transfer, unused for createExchange;
+# ('exchange', symbol) and ('token', symbol) in args are resolved to addresses on each side
+Op = namedtuple('Op', ['method', 'target', 'sender', 'args', 'value'])
+Failure = namedtuple('Failure', ['seed', 'ops', 'step', 'kind', 'detail'])
+Batch = namedtuple('Batch', ['sequences', 'ops', 'outcomes', 'failures'])
+
+_abi = {}
+
+
+def _function(method):
+    """ (selector, input types, output types) of method. """
+    if method not in _abi:
+        path = METHODS[method][0]
+        fn = next(f for f in artifacts.load(path).abi if f.get('name') == method)
+        inputs = [i['type'] for i in fn['inputs']]
+        selector = keccak(text='%s(%s)' % (method, ','.join(inputs)))[:4]
+        _abi[method] = (selector, inputs, [o['type'] for o in fn['outputs']])
+    return _abi[method]
+
+
+def _amount(rng, scale):
+    roll = rng.random()
+    if roll < 0.1:
+        return rng.randrange(1000)
+    if roll < 0.2:
+        return 10**9 + rng.randrange(-10, 11)
+    if roll < 0.65:
+        return max(int(scale * 10 ** rng.uniform(-6, 0)), 1)
+    if roll < 0.8:
+        return scale + rng.randrange(-2, 3)
+    if roll < 0.95:
+        return rng.randrange(2 ** rng.randrange(64, 257))
+    return MAX - rng.randrange(1000)
+
+
+def _reserves(symbol):
+    for pool in SCENARIO['pools']:
+        if pool['token'] == symbol:
+            return pool['eth_reserve'], pool['token_reserve']
+    return 10**18, 10**18
+
+
+def sequence(rng, timestamp, length=LENGTH):
+    """ length random Ops; timestamp is the block's, for deadlines at and just before it. """
+    methods = sorted(METHODS)
+    weights = [WEIGHTS[m] for m in methods]
+    symbols = POOLS + (SPARE,)
+    # mostly the exchanges that exist at genesis
+    often = [3] * len(POOLS) + [1]
+    ops = []
+    for _ in range(length):
+        method = rng.choices(methods, weights)[0]
+        symbol = rng.choices(symbols, often)[0]
+        other = rng.choice([s for s in symbols if s != symbol])
+        eth, tokens = _reserves(symbol)
+        roll = rng.random()
+        deadline = FAR if roll < 0.9 else timestamp if roll < 0.95 else timestamp - 1
+
+        def limit(scale, permissive):
+            return permissive if rng.random() < 0.8 else _amount(rng, scale)
+        value = 0
+        if method == 'ethToTokenSwapInput':
+            args, value = (limit(tokens, 1), deadline), _amount(rng, eth)
+        elif method == 'ethToTokenSwapOutput':
+            args, value = (_amount(rng, tokens), deadline), limit(eth, eth * 10)
+        elif method == 'tokenToEthSwapInput':
+            args = (_amount(rng, tokens), limit(eth, 1), deadline)
+        elif method == 'tokenToEthSwapOutput':
+            args = (_amount(rng, eth), limit(tokens, MAX), deadline)
+        elif method == 'tokenToTokenSwapInput':
+            args = (_amount(rng, tokens), limit(tokens, 1), limit(eth, 1), deadline, ('token', other))
+        elif method == 'tokenToTokenSwapOutput':
+            args = (_amount(rng, _reserves(other)[1]), limit(tokens, MAX), limit(eth, MAX), deadline,
+                    ('token', other))
+        elif method == 'addLiquidity':
+            args, value = (limit(eth, 1), limit(tokens, MAX), deadline), _amount(rng, eth)
+        elif method == 'removeLiquidity':
+            args = (_amount(rng, eth), limit(eth, 1), limit(tokens, 1), deadline)
+        elif method == 'createExchange':
+            args = (('token', symbol),)
+        elif method == 'approve':
+            args = (('exchange', symbol), limit(tokens, MAX))
+        else:
+            args = (('exchange', symbol), _amount(rng, tokens))
+        ops.append(Op(method, symbol, rng.randrange(SCENARIO['accounts']), args, value))
+    return ops
+
+
+class EvmWorld(object):
+    """ Unsigned transactions applied to a py-evm state, reverted to a snapshot between sequences. """
+
+    def __init__(self, tester, addresses):
+        from eth_utils import ValidationError
+        from eth.utils.spoof import SpoofTransaction
+        self._invalid = ValidationError
+        self._spoof = SpoofTransaction
+        self.vm = tester.backend.chain.get_vm()
+        self.state = self.vm.state
+        self.timestamp = self.state.timestamp
+        self.accounts = [to_canonical_address(a) for a in addresses['accounts']]
+        self.tokens = {s: to_canonical_address(a) for s, a in addresses['tokens'].items()}
+        self.factory = to_canonical_address(addresses['factory'])
+        self._snapshot = self.state.snapshot()
+
+    def reset(self):
+        self.state.revert(self._snapshot)
+        self._snapshot = self.state.snapshot()
+
+    def _storage(self, address, slot):
+        return self.state.account_db.get_storage(address, slot)
+
+    def exchange(self, symbol):
+        value = self._storage(self.factory, genesis.slot(genesis.FACTORY, 'token_to_exchange', self.tokens[symbol]))
+        return value.to_bytes(20, 'big') if value else None
+
+    def _resolve(self, arg):
+        if not isinstance(arg, tuple):
+            return arg
+        kind, symbol = arg
+        address = self.tokens[symbol] if kind == 'token' else self.exchange(symbol)
+        return None if address is None else to_checksum_address(address)
+
+    def apply(self, op):
+        """ ('ok', result), ('revert', None), or ('skip', None) for an exchange that does not exist. """
+        path = METHODS[op.method][0]
+        if path == genesis.EXCHANGE:
+            to = self.exchange(op.target)
+        elif path == genesis.TOKEN:
+            to = self.tokens[op.target]
+        else:
+            to = self.factory
+        args = [self._resolve(a) for a in op.args]
+        if to is None or None in args:
+            return 'skip', None
+        selector, inputs, outputs = _function(op.method)
+        sender = self.accounts[op.sender]
+        transaction = self.vm.create_unsigned_transaction(
+            nonce=self.state.account_db.get_nonce(sender), gas_price=0, gas=GAS, to=to, value=op.value,
+            data=selector + encode_abi(inputs, args))
+        try:
+            computation = self.state.execute_transaction(self._spoof(transaction, from_=sender))
+        except self._invalid:
+            # the sender cannot pay the value
+            return 'revert', None
+        if computation.is_error:
+            return 'revert', None
+        # an exchange's forwarder returns a fixed-size buffer that starts with the result
+        result = decode_abi(outputs, computation.output[:32 * len(outputs)])
+        return 'ok', self._normalize(op, result)
+
+    def _normalize(self, op, result):
+        result = [('exchange', op.target) if isinstance(r, str) else r for r in result]
+        return tuple(result) if len(result) > 1 else result[0]
+
+    def pool(self, symbol):
+        """ (eth_reserve, token_reserve, total_supply), or None without an exchange. """
+        exchange = self.exchange(symbol)
+        if exchange is None:
+            return None
+        return (self.state.account_db.get_balance(exchange),
+                self._storage(self.tokens[symbol], genesis.slot(genesis.TOKEN, 'balances', exchange)),
+                self._storage(exchange, genesis.slot(genesis.EXCHANGE, 'totalSupply')))
+
+    def account(self, index):
+        """ ETH, then per token its balance, allowance to its exchange and UNI of its exchange. """
+        account = self.accounts[index]
+        values = [self.state.account_db.get_balance(account)]
+        for symbol, token in sorted(self.tokens.items()):
+            exchange = self.exchange(symbol)
+            values.append(self._storage(token, genesis.slot(genesis.TOKEN, 'balances', account)))
+            if exchange is None:
+                values.extend((None, None))
+            else:
+                values.append(self._storage(token, genesis.slot(genesis.TOKEN, 'allowances', account, exchange)))
+                values.append(self._storage(exchange, genesis.slot(genesis.EXCHANGE, 'balances', account)))
+        return tuple(values)
+
+
+class ModelWorld(object):
+    """ The scenario rebuilt on uniswap.model, with the same accounts. """
+
+    def __init__(self, scenario, accounts, timestamp):
+        self.accounts = accounts
+        self.chain = chain = model.Chain(timestamp=timestamp)
+        self.timestamp = timestamp
+        owner = accounts[0]
+        eth = {int(a): v for a, v in scenario.get('eth', {}).items()}
+        for i, account in enumerate(accounts):
+            chain.fund(account, eth.get(i, genesis.ACCOUNT_ETH))
+        pools = {pool['token']: pool for pool in scenario.get('pools', ())}
+        self.factory = model.Factory(chain)
+        self.factory.initializeFactory(model.Exchange(chain).address, sender=owner)
+        self.tokens = {}
+        for spec in scenario['tokens']:
+            symbol = spec['symbol']
+            balances = {int(a): v for a, v in spec.get('balances', {}).items()}
+            pool = pools.get(symbol, {})
+            if 'liquidity' in pool:
+                raise ValueError('pools with explicit liquidity are not mirrored')
+            reserve = pool.get('token_reserve', 0)
+            token = model.Token(chain, symbol.encode(), symbol.encode(), spec.get('decimals', 18),
+                                sum(balances.values()) + reserve, sender=owner)
+            self.tokens[symbol] = token
+            for i, amount in balances.items():
+                if i:
+                    token.transfer(accounts[i], amount, sender=owner)
+        for symbol in pools:
+            # the genesis pool, as addLiquidity leaves it: all UNI to account 0
+            token, pool = self.tokens[symbol], pools[symbol]
+            exchange = chain.contract(self.factory.createExchange(token.address, sender=owner), model.Exchange)
+            chain.fund(owner, pool['eth_reserve'])
+            token.approve(exchange.address, pool['token_reserve'], sender=owner)
+            exchange.addLiquidity(0, pool['token_reserve'], timestamp + 1, sender=owner, value=pool['eth_reserve'])
+        for spec in scenario['tokens']:
+            for i, amount in spec.get('allowances', {}).items():
+                exchange = self.factory.getExchange(self.tokens[spec['symbol']].address)
+                self.tokens[spec['symbol']].approve(exchange, amount, sender=accounts[int(i)])
+        self._snapshot = chain.take_snapshot()
+
+    def reset(self):
+        self.chain.revert_to_snapshot(self._snapshot)
+
+    def exchange(self, symbol):
+        address = self.factory.getExchange(self.tokens[symbol].address)
+        return None if address == model.ZERO_ADDRESS else self.chain.contract(address, model.Exchange)
+
+    def _resolve(self, arg):
+        if not isinstance(arg, tuple):
+            return arg
+        kind, symbol = arg
+        if kind == 'token':
+            return self.tokens[symbol].address
+        exchange = self.exchange(symbol)
+        return None if exchange is None else exchange.address
+
+    def apply(self, op):
+        path, payable = METHODS[op.method]
+        if path == genesis.EXCHANGE:
+            target = self.exchange(op.target)
+        elif path == genesis.TOKEN:
+            target = self.tokens[op.target]
+        else:
+            target = self.factory
+        args = [self._resolve(a) for a in op.args]
+        if target is None or None in args:
+            return 'skip', None
+        kwargs = {'sender': self.accounts[op.sender]}
+        if payable:
+            kwargs['value'] = op.value
+        try:
+            result = getattr(target, op.method)(*args, **kwargs)
+        except model.Revert:
+            return 'revert', None
+        if op.method == 'createExchange':
+            return 'ok', ('exchange', op.target)
+        return 'ok', result
+
+    def pool(self, symbol):
+        exchange = self.exchange(symbol)
+        if exchange is None:
+            return None
+        return (self.chain.balance(exchange.address), self.tokens[symbol].balanceOf(exchange.address),
+                exchange.totalSupply)
+
+    def account(self, index):
+        account = self.accounts[index]
+        values = [self.chain.balance(account)]
+        for symbol, token in sorted(self.tokens.items()):
+            exchange = self.exchange(symbol)
+            values.append(token.balanceOf(account))
+            if exchange is None:
+                values.extend((None, None))
+            else:
+                values.append(token.allowance(account, exchange.address))
+                values.append(exchange.balances.get(account, 0))
+        return tuple(values)
+
+
+def _touched(op):
+    return [op.target] + [a[1] for a in op.args if isinstance(a, tuple)]
+
+
+def _invariant(op, before, after):
+    """ What an op broke in a pool, (eth, tokens, supply) before and after it, or None. """
+    if before is None or after is None:
+        return None
+    eth, tokens, supply = before
+    eth_after, tokens_after, supply_after = after
+    if 'Swap' in op.method and eth_after * tokens_after < eth * tokens:
+        return 'k decreased from %d to %d' % (eth * tokens, eth_after * tokens_after)
+    if op.method in ('addLiquidity', 'removeLiquidity') and supply and supply_after:
+        if eth_after * supply < eth * supply_after or tokens_after * supply < tokens * supply_after:
+            return 'value per UNI decreased from %r to %r' % (before, after)
+    return None
+
+
+class Fuzzer(object):
+
+    def __init__(self, tester, addresses, scenario=SCENARIO, evm=True):
+        self.evm = EvmWorld(tester, addresses) if evm else None
+        self.timestamp = tester.backend.chain.get_vm().state.timestamp
+        self.model = ModelWorld(scenario, addresses['accounts'], self.timestamp)
+        self.symbols = sorted(self.model.tokens)
+        self.outcomes = Counter()
+
+    def run(self, ops, seed=None):
+        """ Run ops on both sides from the genesis state; the first Failure, or None. """
+        evm, reference = self.evm, self.model
+        reference.reset()
+        if evm is not None:
+            evm.reset()
+        for step, op in enumerate(ops):
+            touched = [s for s in self.symbols if s in _touched(op)]
+            before = {s: reference.pool(s) for s in touched}
+            outcome = reference.apply(op)
+            self.outcomes[outcome[0]] += 1
+            if evm is not None:
+                actual = evm.apply(op)
+                if actual != outcome:
+                    return Failure(seed, ops, step, 'outcome', 'model %r, evm %r' % (outcome, actual))
+                for symbol in touched:
+                    if evm.pool(symbol) != reference.pool(symbol):
+                        return Failure(seed, ops, step, 'pool %s' % symbol, 'model %r, evm %r' % (
+                            reference.pool(symbol), evm.pool(symbol)))
+                if evm.account(op.sender) != reference.account(op.sender):
+                    return Failure(seed, ops, step, 'account %d' % op.sender, 'model %r, evm %r' % (
+                        reference.account(op.sender), evm.account(op.sender)))
+            if outcome[0] == 'ok':
+                for symbol in touched:
+                    broken = _invariant(op, before[symbol], reference.pool(symbol))
+                    if broken:
+                        return Failure(seed, ops, step, 'invariant %s' % symbol, broken)
+        if evm is not None and ops:
+            for index in range(len(reference.accounts)):
+                if evm.account(index) != reference.account(index):
+                    return Failure(seed, ops, len(ops) - 1, 'account %d' % index, 'model %r, evm %r' % (
+                        reference.account(index), evm.account(index)))
+        return None
+
+    def _fails(self, ops, kind):
+        failure = self.run(ops)
+        return failure is not None and failure.kind == kind
+
+    def shrink(self, failure):
+        """ The Failure of the fewest, smallest ops that fail the same way. """
+        ops = list(failure.ops[:failure.step + 1])
+        kind = failure.kind
+        changed = True
+        while changed:
+            changed = False
+            for i in reversed(range(len(ops))):
+                candidate = ops[:i] + ops[i + 1:]
+                if candidate and self._fails(candidate, kind):
+                    ops, changed = candidate, True
+        for i in range(len(ops)):
+            for field in ['value'] + list(range(len(ops[i].args))):
+                ops = self._shrink_number(ops, i, field, kind)
+        shrunk = self.run(ops)
+        return shrunk._replace(seed=failure.seed)
+
+    def _shrink_number(self, ops, i, field, kind):
+        op = ops[i]
+        number = op.value if field == 'value' else op.args[field]
+        if isinstance(number, tuple) or not number:
+            return ops
+
+        def attempt(candidate):
+            if field == 'value':
+                changed = op._replace(value=candidate)
+            else:
+                changed = op._replace(args=op.args[:field] + (candidate,) + op.args[field + 1:])
+            return ops[:i] + [changed] + ops[i + 1:]
+        # the first of 0, 1, 2, 4, ... number >> 1 that still fails, then bisect down from it
+        passing = None
+        for candidate in [0, 1] + [number >> shift for shift in range(number.bit_length() - 1, 0, -1)]:
+            if candidate >= number:
+                break
+            if self._fails(attempt(candidate), kind):
+                number = candidate
+                break
+            passing = candidate
+        if passing is None:
+            return attempt(number)
+        while number - passing > 1:
+            middle = (passing + number) // 2
+            if self._fails(attempt(middle), kind):
+                number = middle
+            else:
+                passing = middle
+        return attempt(number)
+
+    def batch(self, seed, count, length=LENGTH):
+        """ Run count sequences from seed; a Batch with the shrunk Failures. """
+        self.outcomes = Counter()
+        failures = []
+        for n in range(count):
+            ops = sequence(random.Random('%d/%d' % (seed, n)), self.timestamp, length)
+            failure = self.run(ops, seed=(seed, n))
+            if failure is not None:
+                failures.append(self.shrink(failure))
+        return Batch(count, count * length, dict(self.outcomes), failures)
+
+
+_fuzzer = None
+
+
+def _batch(world, params):
+    # uniswap.runner's simulate: one Fuzzer per worker process
+    global _fuzzer
+    seed, count, length, evm = params
+    if _fuzzer is None or (_fuzzer.evm is not None) != evm:
+        _fuzzer = Fuzzer(world.tester, world.addresses, evm=evm)
+    return _fuzzer.batch(seed, count, length)
+
+
+def fuzz(sequences, batch_size=20, length=LENGTH, seed=0, processes=None, evm=True, cache_dir=artifacts.CACHE_DIR):
+    """ Yield a Batch per batch_size sequences, run by worker processes. """
+    from uniswap.runner import Runner
+    items = [(seed + i, min(batch_size, sequences - i * batch_size), length, evm)
+             for i in range((sequences + batch_size - 1) // batch_size)]
+    with Runner(_batch, SCENARIO, processes=processes, cache_dir=cache_dir) as runner:
+        for result in runner.run(items):
+            if result.error:
+                raise RuntimeError(result.error)
+            yield result.value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fuzz the contracts against uniswap.model.')
+    parser.add_argument('--sequences', type=int, default=1000)
+    parser.add_argument('--length', type=int, default=LENGTH)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-evm', action='store_true', help='check the model invariants only')
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    sequences = 0
+    outcomes = Counter()
+    failures = []
+    for batch in fuzz(args.sequences, args.batch_size, args.length, args.seed, args.processes, not args.no_evm):
+        sequences += batch.sequences
+        outcomes.update(batch.outcomes)
+        failures.extend(batch.failures)
+    elapsed = time.perf_counter() - start
+    print('%d sequences of %d ops in %.1f s, %.0f sequences/minute; ops %s' % (
+        sequences, args.length, elapsed, sequences / elapsed * 60,
+        ', '.join('%s %d' % item for item in sorted(outcomes.items()))))
+    for failure in failures:
+        print('\nseed %r, step %d: %s: %s' % (failure.seed, failure.step, failure.kind, failure.detail))
+        for op in failure.ops:
+            print('  %r' % (op,))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import struct
+import time
+from collections import OrderedDict
+
+from eth_utils import big_endian_to_int, int_to_big_endian, keccak
+from web3 import Web3
+
+from uniswap import artifacts
+
+'''
+Worlds with many exchanges, built once into a chain-state image and loaded as
+a py-evm genesis instead of being deployed transaction by transaction.
+
+    scenario = {
+        'tokens': [{'symbol': 'HAY', 'balances': {1: 100*10**18}, 'allowances': {1: 100*10**18}}],
+        'pools': [{'token': 'HAY', 'eth_reserve': 5*10**18, 'token_reserve': 10*10**18}],
+    }
+    image = cached(scenario)          # built on the first call, then read from the cache directory
+    tester = image.load()             # an EthereumTester at block 0 with the scenario deployed
+    image.addresses['exchanges']['HAY']
+
+A scenario is plain JSON data:
+
+    accounts    number of tester accounts (keys 1..accounts), default 10
+    eth         {account: wei} overriding each account's 1,000,000 ether
+    tokens      [{symbol, name, decimals, balances {account: amount},
+                  allowances {account: amount approved to the token's exchange}}]
+    pools       [{token (a symbol), eth_reserve, token_reserve,
+                  liquidity {account: UNI}, by default {0: eth_reserve} as addLiquidity mints}]
+
+Accounts are indices into the tester accounts. Every pool gets an exchange
+from the factory, in list order (token id 1 is the first pool); a token's
+total supply is its balances plus its pool's token reserve.
+
+The storage is written as the contracts would have left it: slots are the
+variable positions vyper assigns (GlobalContext), a mapping entry lives at
+keccak(slot + key), and exchanges hold the create_with_code_of forwarder to
+the template. build() applies that state to an empty py-evm database once;
+the image is the resulting key/value store, so load() only copies a dict.
+'''
+
+FACTORY = 'contracts/uniswap_factory.vy'
+EXCHANGE = 'contracts/uniswap_exchange.vy'
+TOKEN = 'contracts/test_contracts/ERC20.vy'
+
+ACCOUNTS = 10
+ACCOUNT_ETH = 10**24
+# the genesis values uniswap.world patches into eth-tester
+GAS_LIMIT = 10**9
+DIFFICULTY = 1
+
+MAGIC = b'UNISWAP-IMAGE\x00\x00\x01'
+
+# 0x<kind><index>: exchange template, factory, tokens and exchanges (1-based)
+TEMPLATE_ADDRESS = 0xe0
+FACTORY_ADDRESS = 0xfa
+TOKEN_ADDRESS = 0x70
+EXCHANGE_ADDRESS = 0xe1
+
+_layouts = {}
+
+
+def address(kind, index=0):
+    return Web3.toChecksumAddress('0x%02x%038x' % (kind, index))
+
+
+def layout(path):
+    """ {variable: storage slot} of a contract, as vyper assigns them. """
+    if path not in _layouts:
+        from vyper.parser.global_context import GlobalContext
+        from vyper.parser.parser import parse
+        context = GlobalContext.get_global_context(parse(artifacts._read(path)))
+        _layouts[path] = {name: record.pos for name, record in context._globals.items()}
+    return _layouts[path]
+
+
+def _word(key):
+    if isinstance(key, str):
+        key = Web3.toBytes(hexstr=key)
+    if isinstance(key, bytes):
+        return key.rjust(32, b'\x00')
+    return int_to_big_endian(key).rjust(32, b'\x00')
+
+
+def slot(path, name, *keys):
+    """ Storage slot of a variable, or of the entry at keys of a (nested) mapping. """
+    position = layout(path)[name]
+    for key in keys:
+        position = big_endian_to_int(keccak(_word(position) + _word(key)))
+    return position
+
+
+def bytes32(text):
+    return big_endian_to_int(text.encode().ljust(32, b'\x00'))
+
+
+def forwarder(template):
+    """ Runtime code create_with_code_of gives a contract: a delegatecall to template. """
+    return (bytes.fromhex('366000600037611000600036600073') + Web3.toBytes(hexstr=template) +
+            bytes.fromhex('5af41558576110006000f3'))
+
+
+def _by_account(amounts):
+    return OrderedDict((int(account), amount) for account, amount in (amounts or {}).items())
+
+
+def _contract(code, storage, balance=0, nonce=1):
+    return {'balance': balance, 'nonce': nonce, 'code': code,
+            'storage': {key: value for key, value in storage.items() if value}}
+
+
+def genesis_state(scenario):
+    """ Return (py-evm genesis state, addresses) for a scenario. """
+    from eth_tester.backends.pyevm.main import get_default_account_keys
+    keys = get_default_account_keys(scenario.get('accounts', ACCOUNTS))
+    accounts = [key.public_key.to_canonical_address() for key in keys]
+    eth = _by_account(scenario.get('eth'))
+    state = OrderedDict((a, {'balance': eth.get(i, ACCOUNT_ETH), 'nonce': 0, 'code': b'', 'storage': {}})
+                        for i, a in enumerate(accounts))
+
+    tokens = OrderedDict()
+    for i, token in enumerate(scenario.get('tokens', ()), 1):
+        if token['symbol'] in tokens:
+            raise ValueError('token %s is declared twice' % token['symbol'])
+        tokens[token['symbol']] = address(TOKEN_ADDRESS, i)
+    pools = OrderedDict()
+    for pool in scenario.get('pools', ()):
+        if pool['token'] not in tokens:
+            raise ValueError('pool for undeclared token %s' % pool['token'])
+        if pool['token'] in pools:
+            raise ValueError('token %s has two pools' % pool['token'])
+        pools[pool['token']] = pool
+    exchanges = OrderedDict((symbol, address(EXCHANGE_ADDRESS, i)) for i, symbol in enumerate(pools, 1))
+    template = address(TEMPLATE_ADDRESS)
+    factory = address(FACTORY_ADDRESS)
+
+    storage = {
+        slot(FACTORY, 'exchangeTemplate'): big_endian_to_int(Web3.toBytes(hexstr=template)),
+        slot(FACTORY, 'tokenCount'): len(pools),
+    }
+    for token_id, symbol in enumerate(pools, 1):
+        token, exchange = tokens[symbol], exchanges[symbol]
+        storage[slot(FACTORY, 'token_to_exchange', token)] = big_endian_to_int(Web3.toBytes(hexstr=exchange))
+        storage[slot(FACTORY, 'exchange_to_token', exchange)] = big_endian_to_int(Web3.toBytes(hexstr=token))
+        storage[slot(FACTORY, 'id_to_token', token_id)] = big_endian_to_int(Web3.toBytes(hexstr=token))
+    # every createExchange bumps the factory's nonce
+    state[Web3.toBytes(hexstr=factory)] = _contract(artifacts.runtime(FACTORY), storage, nonce=1 + len(pools))
+    state[Web3.toBytes(hexstr=template)] = _contract(artifacts.runtime(EXCHANGE), {})
+
+    exchange_code = forwarder(template)
+    for symbol, pool in pools.items():
+        eth_reserve, token_reserve = pool.get('eth_reserve', 0), pool.get('token_reserve', 0)
+        liquidity = _by_account(pool.get('liquidity', {0: eth_reserve} if eth_reserve else {}))
+        if bool(eth_reserve) != bool(token_reserve) or bool(eth_reserve) != bool(sum(liquidity.values())):
+            raise ValueError('pool %s needs eth_reserve, token_reserve and liquidity together' % symbol)
+        storage = {
+            slot(EXCHANGE, 'name'): bytes32('Uniswap V1'),
+            slot(EXCHANGE, 'symbol'): bytes32('UNI-V1'),
+            slot(EXCHANGE, 'decimals'): 18,
+            slot(EXCHANGE, 'totalSupply'): sum(liquidity.values()),
+            slot(EXCHANGE, 'token'): big_endian_to_int(Web3.toBytes(hexstr=tokens[symbol])),
+            slot(EXCHANGE, 'factory'): big_endian_to_int(Web3.toBytes(hexstr=factory)),
+        }
+        for account, amount in liquidity.items():
+            storage[slot(EXCHANGE, 'balances', accounts[account])] = amount
+        state[Web3.toBytes(hexstr=exchanges[symbol])] = _contract(exchange_code, storage, balance=eth_reserve)
+
+    token_code = artifacts.runtime(TOKEN)
+    for token in scenario.get('tokens', ()):
+        symbol = token['symbol']
+        balances = _by_account(token.get('balances'))
+        storage = {
+            slot(TOKEN, 'name'): bytes32(token.get('name', '%s Token' % symbol)),
+            slot(TOKEN, 'symbol'): bytes32(symbol),
+            slot(TOKEN, 'decimals'): token.get('decimals', 18),
+        }
+        for account, amount in balances.items():
+            storage[slot(TOKEN, 'balances', accounts[account])] = amount
+        for account, amount in _by_account(token.get('allowances')).items():
+            if symbol not in exchanges:
+                raise ValueError('allowance for %s, which has no exchange' % symbol)
+            storage[slot(TOKEN, 'allowances', accounts[account], exchanges[symbol])] = amount
+        reserve = pools[symbol].get('token_reserve', 0) if symbol in pools else 0
+        if reserve:
+            storage[slot(TOKEN, 'balances', exchanges[symbol])] = reserve
+        storage[slot(TOKEN, 'total_supply')] = sum(balances.values()) + reserve
+        state[Web3.toBytes(hexstr=tokens[symbol])] = _contract(token_code, storage)
+
+    addresses = OrderedDict([
+        ('accounts', [Web3.toChecksumAddress(a) for a in accounts]),
+        ('exchange_template', template),
+        ('factory', factory),
+        ('tokens', tokens),
+        ('exchanges', exchanges),
+    ])
+    return state, addresses
+
+
+def scenario_key(scenario):
+    """ sha256 of the scenario and of the contract code it deploys. """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(scenario, sort_keys=True).encode())
+    for path in (FACTORY, EXCHANGE, TOKEN):
+        digest.update(artifacts.source_key(artifacts._read(path)).encode())
+    return digest.hexdigest()
+
+
+def _chain_class():
+    from eth_tester.backends.pyevm.main import setup_tester_chain
+    return type(setup_tester_chain(num_accounts=1)[1])
+
+
+class Image(object):
+    """ The key/value store of a py-evm database holding a scenario's genesis block. """
+
+    def __init__(self, meta, kv_store):
+        self.meta = meta
+        self.addresses = meta['addresses']
+        self.kv_store = kv_store
+
+    @classmethod
+    def build(cls, scenario):
+        from eth.db.atomic import AtomicDB
+        from eth.db.backends.memory import MemoryDB
+        from eth_tester.backends.pyevm.main import get_default_genesis_params
+        state, addresses = genesis_state(scenario)
+        params = get_default_genesis_params({
+            'gas_limit': scenario.get('gas_limit', GAS_LIMIT),
+            'difficulty': DIFFICULTY,
+            'timestamp': int(time.time()),
+        })
+        kv_store = {}
+        _chain_class().from_genesis(AtomicDB(MemoryDB(kv_store)), params, state)
+        meta = OrderedDict([('key', scenario_key(scenario)), ('addresses', addresses)])
+        return cls(meta, kv_store)
+
+    def save(self, path):
+        meta = json.dumps(self.meta).encode()
+        chunks = [MAGIC, struct.pack('>I', len(meta)), meta]
+        for key, value in self.kv_store.items():
+            chunks.append(struct.pack('>HI', len(key), len(value)))
+            chunks.append(key)
+            chunks.append(value)
+        # write-then-rename so concurrent sessions never read a partial image
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(chunks))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError('%s is not a chain-state image' % path)
+        offset = len(MAGIC)
+        meta_length, = struct.unpack_from('>I', data, offset)
+        offset += 4
+        meta = json.loads(data[offset:offset + meta_length].decode(), object_pairs_hook=OrderedDict)
+        offset += meta_length
+        kv_store = {}
+        unpack = struct.Struct('>HI').unpack_from
+        while offset < len(data):
+            key_length, value_length = unpack(data, offset)
+            offset += 6
+            key = data[offset:offset + key_length]
+            offset += key_length
+            kv_store[key] = data[offset:offset + value_length]
+            offset += value_length
+        return cls(meta, kv_store)
+
+    def load(self):
+        """ A fresh EthereumTester whose chain starts at this image's genesis block. """
+        from eth.db.atomic import AtomicDB
+        from eth.db.backends.memory import MemoryDB
+        from eth_tester import EthereumTester, PyEVMBackend
+        from eth_tester.backends.pyevm.main import get_default_account_keys
+        backend = PyEVMBackend()
+        backend.chain = type(backend.chain)(AtomicDB(MemoryDB(dict(self.kv_store))))
+        backend.account_keys = get_default_account_keys(len(self.addresses['accounts']))
+        return EthereumTester(backend=backend)
+
+
+class World(object):
+    """ A loaded image: tester, web3 and contracts, with a snapshot to return to. """
+
+    def __init__(self, image):
+        self.addresses = image.addresses
+        self.tester = image.load()
+        self.w3 = Web3(Web3.EthereumTesterProvider(self.tester))
+        self.w3.eth.setGasPriceStrategy(lambda web3, params: 0)
+        self.w3.eth.defaultAccount = self.w3.eth.accounts[0]
+        self.factory = self.w3.eth.contract(address=image.addresses['factory'], abi=artifacts.load(FACTORY).abi)
+        self._snapshot = None
+
+    def token(self, symbol):
+        return self.w3.eth.contract(address=self.addresses['tokens'][symbol], abi=artifacts.load(TOKEN).abi)
+
+    def exchange(self, symbol):
+        return self.w3.eth.contract(address=self.addresses['exchanges'][symbol], abi=artifacts.load(EXCHANGE).abi)
+
+    def snapshot(self):
+        # as in uniswap.world, an empty block makes the revert's re-import nearly free
+        self.tester.mine_blocks()
+        self._snapshot = self.tester.take_snapshot()
+
+    def revert(self):
+        self.tester.revert_to_snapshot(self._snapshot)
+
+
+def image_path(scenario, cache_dir=artifacts.CACHE_DIR):
+    return os.path.join(cache_dir, 'genesis-%s.img' % scenario_key(scenario))
+
+
+def cached(scenario, cache_dir=artifacts.CACHE_DIR):
+    """ The Image of a scenario, read from cache_dir or built and saved there. """
+    path = image_path(scenario, cache_dir)
+    try:
+        return Image.read(path)
+    except (IOError, ValueError):
+        image = Image.build(scenario)
+        os.makedirs(cache_dir, exist_ok=True)
+        image.save(path)
+        return image
@@ -0,0 +1,236 @@
+import json
+import os
+import sqlite3
+from collections import namedtuple
+
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from web3.utils.events import get_event_data
+
+from uniswap import artifacts
+
+'''
+Index factory and exchange events into SQLite.
+
+    indexer = Indexer(w3, factory_address, 'uniswap.sqlite')
+    indexer.sync()
+    indexer.events(exchange=address, start=t0, end=t1)
+
+sync() pulls logs in ranges of batch_size blocks and keeps the factory's
+NewExchange logs and the TokenPurchase, EthPurchase, AddLiquidity,
+RemoveLiquidity and Transfer logs of its exchanges, decoded with the committed
+abi/ files. Each eth_getLogs asks only for those topics, and for the factory
+and the exchanges known so far while there are at most MAX_ADDRESSES of them;
+the logs of exchanges created in a range are fetched for that range after
+it. Each range is written in one transaction together with the cursor
+(the next block to fetch), so a crash loses at most the range in flight, and
+the next sync() starts again from the cursor.
+
+Amounts are uint256 and do not fit SQLite's 64-bit INTEGER, so they are stored
+as decimal TEXT and converted back to int on the way out.
+'''
+
+BATCH_SIZE = 1000
+# the most addresses an eth_getLogs filter lists; past that, only topics are filtered
+MAX_ADDRESSES = 1000
+EVENTS = ('TokenPurchase', 'EthPurchase', 'AddLiquidity', 'RemoveLiquidity', 'Transfer')
+
+# One row per exchange log. Columns are shared between events:
+#   TokenPurchase    account=buyer     eth=eth_sold     tokens=tokens_bought
+#   EthPurchase      account=buyer     eth=eth_bought   tokens=tokens_sold
+#   AddLiquidity     account=provider  eth=eth_amount   tokens=token_amount
+#   RemoveLiquidity  account=provider  eth=eth_amount   tokens=token_amount
+#   Transfer         account=_from     recipient=_to    tokens=_value (UNI)
+Event = namedtuple('Event', ['block', 'log_index', 'timestamp', 'tx_hash', 'exchange', 'event',
+                             'account', 'recipient', 'eth', 'tokens'])
+Exchange = namedtuple('Exchange', ['token', 'exchange', 'block'])
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exchanges (
+    token TEXT NOT NULL UNIQUE,
+    exchange TEXT PRIMARY KEY,
+    block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    event TEXT NOT NULL,
+    account TEXT,
+    recipient TEXT,
+    eth TEXT,
+    tokens TEXT,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_by_exchange ON events (exchange, timestamp);
+CREATE INDEX IF NOT EXISTS events_by_time ON events (timestamp);
+CREATE INDEX IF NOT EXISTS events_by_exchange_block ON events (exchange, block, log_index);
+'''
+
+
+def event_abis(path):
+    """ Map topic 0 to event ABI for a committed abi/ file. """
+    with open(os.path.join(artifacts.ROOT, path)) as f:
+        abi = json.load(f)
+    return {event_abi_to_log_topic(e): e for e in abi if e['type'] == 'event'}
+
+
+def _hex(value):
+    return value if isinstance(value, str) else Web3.toHex(value)
+
+
+def _columns(name, args):
+    if name == 'TokenPurchase':
+        return args['buyer'], None, args['eth_sold'], args['tokens_bought']
+    if name == 'EthPurchase':
+        return args['buyer'], None, args['eth_bought'], args['tokens_sold']
+    if name in ('AddLiquidity', 'RemoveLiquidity'):
+        return args['provider'], None, args['eth_amount'], args['token_amount']
+    return args['_from'], args['_to'], None, args['_value']
+
+
+def _text(amount):
+    return None if amount is None else str(amount)
+
+
+def _event(row):
+    block, log_index, timestamp, tx_hash, exchange, name, account, recipient, eth, tokens = row
+    return Event(block, log_index, timestamp, tx_hash, exchange, name, account, recipient,
+                 None if eth is None else int(eth), None if tokens is None else int(tokens))
+
+
+class Indexer(object):
+
+    def __init__(self, w3, factory_address, path, batch_size=BATCH_SIZE):
+        self.w3 = w3
+        self.factory = Web3.toChecksumAddress(factory_address)
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.db.execute('INSERT OR IGNORE INTO cursor VALUES (0, 0)')
+        self.db.commit()
+        self.factory_abis = event_abis(artifacts.COMMITTED['contracts/uniswap_factory.vy'][1])
+        self.exchange_abis = {topic: abi for topic, abi in
+                              event_abis(artifacts.COMMITTED['contracts/uniswap_exchange.vy'][1]).items()
+                              if abi['name'] in EVENTS}
+        self._topics = [Web3.toHex(topic) for topic in list(self.factory_abis) + list(self.exchange_abis)]
+        self._exchanges = {row[0] for row in self.db.execute('SELECT exchange FROM exchanges')}
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def cursor(self):
+        """ The next block sync() will fetch. """
+        return self.db.execute('SELECT block FROM cursor').fetchone()[0]
+
+    def sync(self, to_block=None):
+        """ Index every block from the cursor up to to_block (default: latest). Returns the number of rows written. """
+        if to_block is None:
+            to_block = self.w3.eth.blockNumber
+        written = 0
+        start = self.cursor
+        while start <= to_block:
+            end = min(start + self.batch_size - 1, to_block)
+            written += self._index_range(start, end)
+            start = end + 1
+        return written
+
+    def _logs(self, start, end, addresses=None):
+        params = {'fromBlock': start, 'toBlock': end, 'topics': [self._topics]}
+        if addresses is not None:
+            params['address'] = sorted(addresses)
+        return self.w3.eth.getLogs(params)
+
+    def _fetch(self, start, end):
+        addresses = [self.factory] + sorted(self._exchanges)
+        if len(addresses) > MAX_ADDRESSES:
+            return self._logs(start, end)
+        logs = self._logs(start, end, addresses)
+        # exchanges created in the range were not in the filter: fetch theirs from their creation on
+        created = []
+        for log in logs:
+            if Web3.toChecksumAddress(log['address']) == self.factory and log['topics'] and \
+                    bytes(log['topics'][0]) in self.factory_abis:
+                args = get_event_data(self.factory_abis[bytes(log['topics'][0])], log)['args']
+                created.append((log['blockNumber'], Web3.toChecksumAddress(args['exchange'])))
+        for i in range(0, len(created), MAX_ADDRESSES):
+            chunk = created[i:i + MAX_ADDRESSES]
+            logs.extend(self._logs(min(block for block, _ in chunk), end, [exchange for _, exchange in chunk]))
+        return logs
+
+    def _index_range(self, start, end):
+        logs = self._fetch(start, end)
+        known = set(self._exchanges)
+        exchanges = []
+        events = []
+        timestamps = {}
+        for log in sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex'])):
+            address = Web3.toChecksumAddress(log['address'])
+            topics = log['topics']
+            if not topics:
+                continue
+            topic = bytes(topics[0])
+            block = log['blockNumber']
+            if address == self.factory and topic in self.factory_abis:
+                args = get_event_data(self.factory_abis[topic], log)['args']
+                exchange = Web3.toChecksumAddress(args['exchange'])
+                exchanges.append((Web3.toChecksumAddress(args['token']), exchange, block))
+                known.add(exchange)
+            elif address in known and topic in self.exchange_abis:
+                name = self.exchange_abis[topic]['name']
+                account, recipient, eth, tokens = _columns(name, get_event_data(self.exchange_abis[topic], log)['args'])
+                if block not in timestamps:
+                    timestamps[block] = self.w3.eth.getBlock(block)['timestamp']
+                events.append((block, log['logIndex'], timestamps[block], _hex(log['transactionHash']), address, name,
+                               account and Web3.toChecksumAddress(account),
+                               recipient and Web3.toChecksumAddress(recipient), _text(eth), _text(tokens)))
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO exchanges VALUES (?, ?, ?)', exchanges)
+            self.db.executemany('INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', events)
+            self.db.execute('UPDATE cursor SET block = ?', (end + 1,))
+        self._exchanges = known
+        return len(exchanges) + len(events)
+
+    def exchanges(self):
+        """ Every indexed exchange, in creation order. """
+        rows = self.db.execute('SELECT token, exchange, block FROM exchanges ORDER BY block, rowid')
+        return [Exchange(*row) for row in rows]
+
+    def events(self, exchange=None, names=None, start=None, end=None):
+        """ Indexed exchange events in chain order, filtered by exchange, event names and timestamp range [start, end). """
+        return list(self.iter_events(exchange, names, start, end))
+
+    def iter_events(self, exchange=None, names=None, start=None, end=None, from_block=None, to_block=None):
+        """ events() as a generator reading rows as they are consumed, also filtered by blocks [from_block, to_block]. """
+        where = []
+        params = []
+        if exchange is not None:
+            where.append('exchange = ?')
+            params.append(Web3.toChecksumAddress(exchange))
+        if names is not None:
+            where.append('event IN (%s)' % ', '.join('?' * len(names)))
+            params.extend(names)
+        if start is not None:
+            where.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            where.append('timestamp < ?')
+            params.append(end)
+        if from_block is not None:
+            where.append('block >= ?')
+            params.append(from_block)
+        if to_block is not None:
+            where.append('block <= ?')
+            params.append(to_block)
+        query = 'SELECT * FROM events'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        for row in self.db.execute(query + ' ORDER BY block, log_index', params):
+            yield _event(row)
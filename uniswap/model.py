@@ -0,0 +1,651 @@
+import copy
+import functools
+import time
+
+'''
+Pure-Python model of uniswap_exchange.vy, uniswap_factory.vy and the test ERC20.vy.
+
+Every public function of the contracts has a method of the same name taking the
+same arguments, followed by msg.sender (`sender`) and, for payable functions,
+msg.value (`value`). Public storage (totalSupply, tokenCount, ...) is a plain
+attribute of the same name. Arithmetic is checked like vyper's uint256: overflow,
+underflow and division by zero raise Revert, as does every failed assert.
+
+A call that raises Revert leaves the Chain exactly as it was: every write goes
+through a journal that is rolled back when the outermost call fails. Nested
+contract calls (the factory lookup in tokenToToken*, the second exchange in
+tokenToExchange*) share the outer call's journal, as they share a transaction
+on chain.
+'''
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+UINT256_MAX = 2**256 - 1
+
+# uniswap_exchange.vy
+MIN_INITIAL_ETH = 1000000000
+NAME = b'Uniswap V1' + b'\x00' * 22
+SYMBOL = b'UNI-V1' + b'\x00' * 26
+
+_MISSING = object()
+
+
+class Revert(Exception):
+    """ The contract would throw; state is left unchanged. """
+
+
+def _add(a, b):
+    c = a + b
+    if c > UINT256_MAX:
+        raise Revert('uint256 overflow')
+    return c
+
+
+def _sub(a, b):
+    if b > a:
+        raise Revert('uint256 underflow')
+    return a - b
+
+
+def _mul(a, b):
+    c = a * b
+    if c > UINT256_MAX:
+        raise Revert('uint256 overflow')
+    return c
+
+
+def _div(a, b):
+    if b == 0:
+        raise Revert('division by zero')
+    return a // b
+
+
+def get_input_price(input_amount, input_reserve, output_reserve):
+    """ uniswap_exchange.vy getInputPrice. """
+    if not (input_reserve > 0 and output_reserve > 0):
+        raise Revert('empty reserve')
+    input_amount_with_fee = _mul(input_amount, 997)
+    numerator = _mul(input_amount_with_fee, output_reserve)
+    denominator = _add(_mul(input_reserve, 1000), input_amount_with_fee)
+    return numerator // denominator
+
+
+def get_output_price(output_amount, input_reserve, output_reserve):
+    """ uniswap_exchange.vy getOutputPrice. """
+    if not (input_reserve > 0 and output_reserve > 0):
+        raise Revert('empty reserve')
+    numerator = _mul(_mul(input_reserve, output_amount), 1000)
+    denominator = _mul(_sub(output_reserve, output_amount), 997)
+    return _add(_div(numerator, denominator), 1)
+
+
+def external(fn):
+    """ Run a public contract function as a transaction, or inside the current one if nested. """
+    @functools.wraps(fn)
+    def call(self, *args, **kwargs):
+        chain = self.chain
+        if chain.journal is not None:
+            return fn(self, *args, **kwargs)
+        chain.journal = []
+        log_count = len(chain.logs) if chain.logs is not None else 0
+        try:
+            return fn(self, *args, **kwargs)
+        except Revert:
+            chain.rollback(log_count)
+            raise
+        finally:
+            chain.journal = None
+    return call
+
+
+class Chain(object):
+    """ ETH balances, deployed contracts, block timestamp and the undo journal. """
+    __slots__ = ('timestamp', 'eth', 'contracts', 'journal', 'logs', '_next_address', '_snapshots')
+
+    def __init__(self, timestamp=None, record_logs=False):
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+        self.eth = {}
+        self.contracts = {}
+        self.journal = None
+        self.logs = [] if record_logs else None
+        self._next_address = 1
+        self._snapshots = []
+
+    def deploy(self, contract):
+        contract.address = '0x%040x' % (0xc0de << 128 | self._next_address)
+        self.set_attr(self, '_next_address', self._next_address + 1)
+        self.set_item(self.contracts, contract.address, contract)
+        return contract
+
+    def contract(self, address, kind):
+        contract = self.contracts.get(address)
+        if not isinstance(contract, kind):
+            raise Revert('no %s at %s' % (kind.__name__, address))
+        return contract
+
+    def balance(self, address):
+        return self.eth.get(address, 0)
+
+    def set_item(self, mapping, key, value):
+        if self.journal is not None:
+            self.journal.append((mapping, key, mapping.get(key, _MISSING)))
+        mapping[key] = value
+
+    def set_attr(self, obj, name, value):
+        if self.journal is not None:
+            self.journal.append((obj, name, getattr(obj, name), None))
+        setattr(obj, name, value)
+
+    def rollback(self, log_count=0):
+        for entry in reversed(self.journal):
+            if len(entry) == 4:
+                setattr(entry[0], entry[1], entry[2])
+            elif entry[2] is _MISSING:
+                del entry[0][entry[1]]
+            else:
+                entry[0][entry[1]] = entry[2]
+        self.journal = []
+        if self.logs is not None:
+            del self.logs[log_count:]
+
+    def log(self, address, event, *args):
+        if self.logs is not None:
+            self.logs.append((address, event, args))
+
+    def transfer_eth(self, sender, recipient, value):
+        if value == 0:
+            return
+        eth = self.eth
+        self.set_item(eth, sender, _sub(eth.get(sender, 0), value))
+        self.set_item(eth, recipient, _add(eth.get(recipient, 0), value))
+
+    def send(self, sender, recipient, value):
+        # vyper's send() forwards only the 2300 gas stipend, which is not enough
+        # for any function of these contracts, so sending ETH to one throws.
+        if recipient in self.contracts:
+            raise Revert('send to contract')
+        self.transfer_eth(sender, recipient, value)
+
+    def fund(self, address, value):
+        self.eth[address] = self.eth.get(address, 0) + value
+
+    # Snapshot API, named after EthereumTester's
+    def take_snapshot(self):
+        memo = {id(self): self}
+        self._snapshots.append(copy.deepcopy((self.timestamp, self.eth, self.contracts, self.logs, self._next_address), memo))
+        return len(self._snapshots) - 1
+
+    def revert_to_snapshot(self, snapshot_id):
+        memo = {id(self): self}
+        self.timestamp, self.eth, contracts, self.logs, self._next_address = copy.deepcopy(self._snapshots[snapshot_id], memo)
+        # Restore into the live objects so references held by callers stay valid
+        for address, saved in contracts.items():
+            current = self.contracts.get(address)
+            if current is not None:
+                for name in saved.__slots__:
+                    setattr(current, name, getattr(saved, name))
+                contracts[address] = current
+        self.contracts = contracts
+
+
+class Token(object):
+    """ contracts/test_contracts/ERC20.vy """
+    __slots__ = ('chain', 'address', 'name', 'symbol', 'decimals', 'balances', 'allowances', 'total_supply')
+
+    def __init__(self, chain, name, symbol, decimals, supply, sender):
+        self.chain = chain
+        self.name = name
+        self.symbol = symbol
+        self.decimals = decimals
+        self.balances = {sender: supply}
+        self.allowances = {}
+        self.total_supply = supply
+        chain.deploy(self)
+        chain.log(self.address, 'Transfer', ZERO_ADDRESS, sender, supply)
+
+    def totalSupply(self):
+        return self.total_supply
+
+    def balanceOf(self, _owner):
+        return self.balances.get(_owner, 0)
+
+    def allowance(self, _owner, _spender):
+        return self.allowances.get((_owner, _spender), 0)
+
+    @external
+    def transfer(self, _to, _value, sender):
+        balances = self.balances
+        set_item = self.chain.set_item
+        set_item(balances, sender, _sub(balances.get(sender, 0), _value))
+        set_item(balances, _to, _add(balances.get(_to, 0), _value))
+        self.chain.log(self.address, 'Transfer', sender, _to, _value)
+        return True
+
+    @external
+    def transferFrom(self, _from, _to, _value, sender):
+        balances = self.balances
+        set_item = self.chain.set_item
+        allowance = self.allowances.get((_from, sender), 0)
+        set_item(balances, _from, _sub(balances.get(_from, 0), _value))
+        set_item(balances, _to, _add(balances.get(_to, 0), _value))
+        set_item(self.allowances, (_from, sender), _sub(allowance, _value))
+        self.chain.log(self.address, 'Transfer', _from, _to, _value)
+        return True
+
+    @external
+    def approve(self, _spender, _value, sender):
+        self.chain.set_item(self.allowances, (sender, _spender), _value)
+        self.chain.log(self.address, 'Approval', sender, _spender, _value)
+        return True
+
+
+class Exchange(object):
+    """ contracts/uniswap_exchange.vy """
+    __slots__ = ('chain', 'address', 'name', 'symbol', 'decimals', 'totalSupply', 'balances', 'allowances', 'token', 'factory')
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.name = b'\x00' * 32
+        self.symbol = b'\x00' * 32
+        self.decimals = 0
+        self.totalSupply = 0
+        self.balances = {}
+        self.allowances = {}
+        self.token = ZERO_ADDRESS
+        self.factory = ZERO_ADDRESS
+        chain.deploy(self)
+
+    def _token(self):
+        return self.chain.contract(self.token, Token)
+
+    def _token_reserve(self):
+        return self._token().balances.get(self.address, 0)
+
+    def _check_deadline(self, deadline):
+        if deadline < self.chain.timestamp:
+            raise Revert('deadline passed')
+
+    @external
+    def setup(self, token_addr, sender):
+        if not (self.factory == ZERO_ADDRESS and self.token == ZERO_ADDRESS and token_addr != ZERO_ADDRESS):
+            raise Revert('already set up')
+        set_attr = self.chain.set_attr
+        set_attr(self, 'factory', sender)
+        set_attr(self, 'token', token_addr)
+        set_attr(self, 'name', NAME)
+        set_attr(self, 'symbol', SYMBOL)
+        set_attr(self, 'decimals', 18)
+
+    @external
+    def addLiquidity(self, min_liquidity, max_tokens, deadline, sender, value=0):
+        chain = self.chain
+        chain.transfer_eth(sender, self.address, value)
+        if not (deadline > chain.timestamp and max_tokens > 0 and value > 0):
+            raise Revert('addLiquidity')
+        total_liquidity = self.totalSupply
+        if total_liquidity > 0:
+            if not min_liquidity > 0:
+                raise Revert('min_liquidity')
+            eth_reserve = _sub(chain.balance(self.address), value)
+            token_reserve = self._token_reserve()
+            token_amount = _add(_div(_mul(value, token_reserve), eth_reserve), 1)
+            liquidity_minted = _div(_mul(value, total_liquidity), eth_reserve)
+            if not (max_tokens >= token_amount and liquidity_minted >= min_liquidity):
+                raise Revert('addLiquidity limits')
+            chain.set_item(self.balances, sender, _add(self.balances.get(sender, 0), liquidity_minted))
+            chain.set_attr(self, 'totalSupply', _add(total_liquidity, liquidity_minted))
+            self._token().transferFrom(sender, self.address, token_amount, sender=self.address)
+            chain.log(self.address, 'AddLiquidity', sender, value, token_amount)
+            chain.log(self.address, 'Transfer', ZERO_ADDRESS, sender, liquidity_minted)
+            return liquidity_minted
+        else:
+            if not (self.factory != ZERO_ADDRESS and self.token != ZERO_ADDRESS and value >= MIN_INITIAL_ETH):
+                raise Revert('addLiquidity initial')
+            if chain.contract(self.factory, Factory).getExchange(self.token) != self.address:
+                raise Revert('not the factory exchange')
+            token_amount = max_tokens
+            initial_liquidity = chain.balance(self.address)
+            chain.set_attr(self, 'totalSupply', initial_liquidity)
+            chain.set_item(self.balances, sender, initial_liquidity)
+            self._token().transferFrom(sender, self.address, token_amount, sender=self.address)
+            chain.log(self.address, 'AddLiquidity', sender, value, token_amount)
+            chain.log(self.address, 'Transfer', ZERO_ADDRESS, sender, initial_liquidity)
+            return initial_liquidity
+
+    @external
+    def removeLiquidity(self, amount, min_eth, min_tokens, deadline, sender):
+        chain = self.chain
+        if not (amount > 0 and deadline > chain.timestamp and min_eth > 0 and min_tokens > 0):
+            raise Revert('removeLiquidity')
+        total_liquidity = self.totalSupply
+        if not total_liquidity > 0:
+            raise Revert('no liquidity')
+        token_reserve = self._token_reserve()
+        eth_amount = _div(_mul(amount, chain.balance(self.address)), total_liquidity)
+        token_amount = _div(_mul(amount, token_reserve), total_liquidity)
+        if not (eth_amount >= min_eth and token_amount >= min_tokens):
+            raise Revert('removeLiquidity limits')
+        chain.set_item(self.balances, sender, _sub(self.balances.get(sender, 0), amount))
+        chain.set_attr(self, 'totalSupply', _sub(total_liquidity, amount))
+        chain.send(self.address, sender, eth_amount)
+        self._token().transfer(sender, token_amount, sender=self.address)
+        chain.log(self.address, 'RemoveLiquidity', sender, eth_amount, token_amount)
+        chain.log(self.address, 'Transfer', sender, ZERO_ADDRESS, amount)
+        return eth_amount, token_amount
+
+    def _eth_to_token_input(self, eth_sold, min_tokens, deadline, buyer, recipient):
+        self._check_deadline(deadline)
+        if not (eth_sold > 0 and min_tokens > 0):
+            raise Revert('ethToTokenInput')
+        token = self._token()
+        token_reserve = token.balances.get(self.address, 0)
+        tokens_bought = get_input_price(eth_sold, self.chain.balance(self.address) - eth_sold, token_reserve)
+        if not tokens_bought >= min_tokens:
+            raise Revert('min_tokens')
+        token.transfer(recipient, tokens_bought, sender=self.address)
+        self.chain.log(self.address, 'TokenPurchase', buyer, eth_sold, tokens_bought)
+        return tokens_bought
+
+    @external
+    def __default__(self, sender, value=0):
+        self.chain.transfer_eth(sender, self.address, value)
+        self._eth_to_token_input(value, 1, self.chain.timestamp, sender, sender)
+
+    @external
+    def ethToTokenSwapInput(self, min_tokens, deadline, sender, value=0):
+        self.chain.transfer_eth(sender, self.address, value)
+        return self._eth_to_token_input(value, min_tokens, deadline, sender, sender)
+
+    @external
+    def ethToTokenTransferInput(self, min_tokens, deadline, recipient, sender, value=0):
+        self.chain.transfer_eth(sender, self.address, value)
+        if not (recipient != self.address and recipient != ZERO_ADDRESS):
+            raise Revert('recipient')
+        return self._eth_to_token_input(value, min_tokens, deadline, sender, recipient)
+
+    def _eth_to_token_output(self, tokens_bought, max_eth, deadline, buyer, recipient):
+        self._check_deadline(deadline)
+        if not (tokens_bought > 0 and max_eth > 0):
+            raise Revert('ethToTokenOutput')
+        token = self._token()
+        token_reserve = token.balances.get(self.address, 0)
+        eth_sold = get_output_price(tokens_bought, self.chain.balance(self.address) - max_eth, token_reserve)
+        eth_refund = _sub(max_eth, eth_sold)
+        if eth_refund > 0:
+            self.chain.send(self.address, buyer, eth_refund)
+        token.transfer(recipient, tokens_bought, sender=self.address)
+        self.chain.log(self.address, 'TokenPurchase', buyer, eth_sold, tokens_bought)
+        return eth_sold
+
+    @external
+    def ethToTokenSwapOutput(self, tokens_bought, deadline, sender, value=0):
+        self.chain.transfer_eth(sender, self.address, value)
+        return self._eth_to_token_output(tokens_bought, value, deadline, sender, sender)
+
+    @external
+    def ethToTokenTransferOutput(self, tokens_bought, deadline, recipient, sender, value=0):
+        self.chain.transfer_eth(sender, self.address, value)
+        if not (recipient != self.address and recipient != ZERO_ADDRESS):
+            raise Revert('recipient')
+        return self._eth_to_token_output(tokens_bought, value, deadline, sender, recipient)
+
+    def _token_to_eth_input(self, tokens_sold, min_eth, deadline, buyer, recipient):
+        self._check_deadline(deadline)
+        if not (tokens_sold > 0 and min_eth > 0):
+            raise Revert('tokenToEthInput')
+        token = self._token()
+        token_reserve = token.balances.get(self.address, 0)
+        eth_bought = get_input_price(tokens_sold, token_reserve, self.chain.balance(self.address))
+        if not eth_bought >= min_eth:
+            raise Revert('min_eth')
+        self.chain.send(self.address, recipient, eth_bought)
+        token.transferFrom(buyer, self.address, tokens_sold, sender=self.address)
+        self.chain.log(self.address, 'EthPurchase', buyer, tokens_sold, eth_bought)
+        return eth_bought
+
+    @external
+    def tokenToEthSwapInput(self, tokens_sold, min_eth, deadline, sender):
+        return self._token_to_eth_input(tokens_sold, min_eth, deadline, sender, sender)
+
+    @external
+    def tokenToEthTransferInput(self, tokens_sold, min_eth, deadline, recipient, sender):
+        if not (recipient != self.address and recipient != ZERO_ADDRESS):
+            raise Revert('recipient')
+        return self._token_to_eth_input(tokens_sold, min_eth, deadline, sender, recipient)
+
+    def _token_to_eth_output(self, eth_bought, max_tokens, deadline, buyer, recipient):
+        self._check_deadline(deadline)
+        if not eth_bought > 0:
+            raise Revert('tokenToEthOutput')
+        token = self._token()
+        token_reserve = token.balances.get(self.address, 0)
+        tokens_sold = get_output_price(eth_bought, token_reserve, self.chain.balance(self.address))
+        if not max_tokens >= tokens_sold:
+            raise Revert('max_tokens')
+        self.chain.send(self.address, recipient, eth_bought)
+        token.transferFrom(buyer, self.address, tokens_sold, sender=self.address)
+        self.chain.log(self.address, 'EthPurchase', buyer, tokens_sold, eth_bought)
+        return tokens_sold
+
+    @external
+    def tokenToEthSwapOutput(self, eth_bought, max_tokens, deadline, sender):
+        return self._token_to_eth_output(eth_bought, max_tokens, deadline, sender, sender)
+
+    @external
+    def tokenToEthTransferOutput(self, eth_bought, max_tokens, deadline, recipient, sender):
+        if not (recipient != self.address and recipient != ZERO_ADDRESS):
+            raise Revert('recipient')
+        return self._token_to_eth_output(eth_bought, max_tokens, deadline, sender, recipient)
+
+    def _token_to_token_input(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, buyer, recipient, exchange_addr):
+        self._check_deadline(deadline)
+        if not (tokens_sold > 0 and min_tokens_bought > 0 and min_eth_bought > 0):
+            raise Revert('tokenToTokenInput')
+        if not (exchange_addr != self.address and exchange_addr != ZERO_ADDRESS):
+            raise Revert('exchange_addr')
+        token = self._token()
+        token_reserve = token.balances.get(self.address, 0)
+        eth_bought = get_input_price(tokens_sold, token_reserve, self.chain.balance(self.address))
+        if not eth_bought >= min_eth_bought:
+            raise Revert('min_eth_bought')
+        token.transferFrom(buyer, self.address, tokens_sold, sender=self.address)
+        exchange = self.chain.contract(exchange_addr, Exchange)
+        tokens_bought = exchange.ethToTokenTransferInput(min_tokens_bought, deadline, recipient, sender=self.address, value=eth_bought)
+        self.chain.log(self.address, 'EthPurchase', buyer, tokens_sold, eth_bought)
+        return tokens_bought
+
+    def _exchange_for(self, token_addr):
+        return self.chain.contract(self.factory, Factory).getExchange(token_addr)
+
+    @external
+    def tokenToTokenSwapInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, token_addr, sender):
+        exchange_addr = self._exchange_for(token_addr)
+        return self._token_to_token_input(tokens_sold, min_tokens_bought, min_eth_bought, deadline, sender, sender, exchange_addr)
+
+    @external
+    def tokenToTokenTransferInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, recipient, token_addr, sender):
+        exchange_addr = self._exchange_for(token_addr)
+        return self._token_to_token_input(tokens_sold, min_tokens_bought, min_eth_bought, deadline, sender, recipient, exchange_addr)
+
+    def _token_to_token_output(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, buyer, recipient, exchange_addr):
+        self._check_deadline(deadline)
+        if not (tokens_bought > 0 and max_eth_sold > 0):
+            raise Revert('tokenToTokenOutput')
+        if not (exchange_addr != self.address and exchange_addr != ZERO_ADDRESS):
+            raise Revert('exchange_addr')
+        exchange = self.chain.contract(exchange_addr, Exchange)
+        eth_bought = exchange.getEthToTokenOutputPrice(tokens_bought)
+        token = self._token()
+        token_reserve = token.balances.get(self.address, 0)
+        tokens_sold = get_output_price(eth_bought, token_reserve, self.chain.balance(self.address))
+        if not (max_tokens_sold >= tokens_sold and max_eth_sold >= eth_bought):
+            raise Revert('max_tokens_sold')
+        token.transferFrom(buyer, self.address, tokens_sold, sender=self.address)
+        exchange.ethToTokenTransferOutput(tokens_bought, deadline, recipient, sender=self.address, value=eth_bought)
+        self.chain.log(self.address, 'EthPurchase', buyer, tokens_sold, eth_bought)
+        return tokens_sold
+
+    @external
+    def tokenToTokenSwapOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, token_addr, sender):
+        exchange_addr = self._exchange_for(token_addr)
+        return self._token_to_token_output(tokens_bought, max_tokens_sold, max_eth_sold, deadline, sender, sender, exchange_addr)
+
+    @external
+    def tokenToTokenTransferOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, recipient, token_addr, sender):
+        exchange_addr = self._exchange_for(token_addr)
+        return self._token_to_token_output(tokens_bought, max_tokens_sold, max_eth_sold, deadline, sender, recipient, exchange_addr)
+
+    @external
+    def tokenToExchangeSwapInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, exchange_addr, sender):
+        return self._token_to_token_input(tokens_sold, min_tokens_bought, min_eth_bought, deadline, sender, sender, exchange_addr)
+
+    @external
+    def tokenToExchangeTransferInput(self, tokens_sold, min_tokens_bought, min_eth_bought, deadline, recipient, exchange_addr, sender):
+        if not recipient != self.address:
+            raise Revert('recipient')
+        return self._token_to_token_input(tokens_sold, min_tokens_bought, min_eth_bought, deadline, sender, recipient, exchange_addr)
+
+    @external
+    def tokenToExchangeSwapOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, exchange_addr, sender):
+        return self._token_to_token_output(tokens_bought, max_tokens_sold, max_eth_sold, deadline, sender, sender, exchange_addr)
+
+    @external
+    def tokenToExchangeTransferOutput(self, tokens_bought, max_tokens_sold, max_eth_sold, deadline, recipient, exchange_addr, sender):
+        if not recipient != self.address:
+            raise Revert('recipient')
+        return self._token_to_token_output(tokens_bought, max_tokens_sold, max_eth_sold, deadline, sender, recipient, exchange_addr)
+
+    def getEthToTokenInputPrice(self, eth_sold):
+        if not eth_sold > 0:
+            raise Revert('eth_sold')
+        return get_input_price(eth_sold, self.chain.balance(self.address), self._token_reserve())
+
+    def getEthToTokenOutputPrice(self, tokens_bought):
+        if not tokens_bought > 0:
+            raise Revert('tokens_bought')
+        return get_output_price(tokens_bought, self.chain.balance(self.address), self._token_reserve())
+
+    def getTokenToEthInputPrice(self, tokens_sold):
+        if not tokens_sold > 0:
+            raise Revert('tokens_sold')
+        return get_input_price(tokens_sold, self._token_reserve(), self.chain.balance(self.address))
+
+    def getTokenToEthOutputPrice(self, eth_bought):
+        if not eth_bought > 0:
+            raise Revert('eth_bought')
+        return get_output_price(eth_bought, self._token_reserve(), self.chain.balance(self.address))
+
+    def tokenAddress(self):
+        return self.token
+
+    def factoryAddress(self):
+        return self.factory
+
+    def balanceOf(self, _owner):
+        return self.balances.get(_owner, 0)
+
+    def allowance(self, _owner, _spender):
+        return self.allowances.get((_owner, _spender), 0)
+
+    @external
+    def transfer(self, _to, _value, sender):
+        balances = self.balances
+        set_item = self.chain.set_item
+        set_item(balances, sender, _sub(balances.get(sender, 0), _value))
+        set_item(balances, _to, _add(balances.get(_to, 0), _value))
+        self.chain.log(self.address, 'Transfer', sender, _to, _value)
+        return True
+
+    @external
+    def transferFrom(self, _from, _to, _value, sender):
+        balances = self.balances
+        set_item = self.chain.set_item
+        set_item(balances, _from, _sub(balances.get(_from, 0), _value))
+        set_item(balances, _to, _add(balances.get(_to, 0), _value))
+        set_item(self.allowances, (_from, sender), _sub(self.allowances.get((_from, sender), 0), _value))
+        self.chain.log(self.address, 'Transfer', _from, _to, _value)
+        return True
+
+    @external
+    def approve(self, _spender, _value, sender):
+        self.chain.set_item(self.allowances, (sender, _spender), _value)
+        self.chain.log(self.address, 'Approval', sender, _spender, _value)
+        return True
+
+
+class Factory(object):
+    """ contracts/uniswap_factory.vy """
+    __slots__ = ('chain', 'address', 'exchangeTemplate', 'tokenCount', 'token_to_exchange', 'exchange_to_token', 'id_to_token')
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.exchangeTemplate = ZERO_ADDRESS
+        self.tokenCount = 0
+        self.token_to_exchange = {}
+        self.exchange_to_token = {}
+        self.id_to_token = {}
+        chain.deploy(self)
+
+    @external
+    def initializeFactory(self, template, sender):
+        if not (self.exchangeTemplate == ZERO_ADDRESS and template != ZERO_ADDRESS):
+            raise Revert('initializeFactory')
+        self.chain.set_attr(self, 'exchangeTemplate', template)
+
+    @external
+    def createExchange(self, token, sender):
+        if not (token != ZERO_ADDRESS and self.exchangeTemplate != ZERO_ADDRESS):
+            raise Revert('createExchange')
+        if self.token_to_exchange.get(token, ZERO_ADDRESS) != ZERO_ADDRESS:
+            raise Revert('exchange exists')
+        chain = self.chain
+        exchange = Exchange(chain)
+        exchange.setup(token, sender=self.address)
+        chain.set_item(self.token_to_exchange, token, exchange.address)
+        chain.set_item(self.exchange_to_token, exchange.address, token)
+        token_id = _add(self.tokenCount, 1)
+        chain.set_attr(self, 'tokenCount', token_id)
+        chain.set_item(self.id_to_token, token_id, token)
+        chain.log(self.address, 'NewExchange', token, exchange.address)
+        return exchange.address
+
+    @external
+    def createExchanges(self, tokens, sender):
+        if not (tokens[0] != ZERO_ADDRESS and self.exchangeTemplate != ZERO_ADDRESS):
+            raise Revert('createExchanges')
+        chain = self.chain
+        exchanges = [ZERO_ADDRESS] * len(tokens)
+        token_id = self.tokenCount
+        for i, token in enumerate(tokens):
+            if token == ZERO_ADDRESS:
+                break
+            if self.token_to_exchange.get(token, ZERO_ADDRESS) != ZERO_ADDRESS:
+                raise Revert('exchange exists')
+            exchange = Exchange(chain)
+            exchange.setup(token, sender=self.address)
+            chain.set_item(self.token_to_exchange, token, exchange.address)
+            chain.set_item(self.exchange_to_token, exchange.address, token)
+            token_id = _add(token_id, 1)
+            chain.set_item(self.id_to_token, token_id, token)
+            chain.log(self.address, 'NewExchange', token, exchange.address)
+            exchanges[i] = exchange.address
+        chain.set_attr(self, 'tokenCount', token_id)
+        return exchanges
+
+    def getExchange(self, token):
+        return self.token_to_exchange.get(token, ZERO_ADDRESS)
+
+    def getToken(self, exchange):
+        return self.exchange_to_token.get(exchange, ZERO_ADDRESS)
+
+    def getTokenWithId(self, token_id):
+        return self.id_to_token.get(token_id, ZERO_ADDRESS)
+
+    def getExchangesWithIds(self, start, count):
+        if not (start > 0 and count <= 100):
+            raise Revert('getExchangesWithIds')
+        pairs = [ZERO_ADDRESS] * 200
+        for i in range(min(count, max(self.tokenCount - start + 1, 0))):
+            token = self.id_to_token[start + i]
+            pairs[2 * i] = token
+            pairs[2 * i + 1] = self.token_to_exchange[token]
+        return pairs
@@ -0,0 +1,276 @@
+import itertools
+import math
+import random
+from collections import namedtuple
+
+from uniswap import artifacts, genesis, model
+from uniswap.fuzz import EvmWorld, ModelWorld
+
+'''
+What the transactions around one of ours in a block do to what it gets.
+
+    scenario = fork({'HAY': (eth_reserve, token_reserve), 'DEN': (...)})    # e.g. from reader Pools
+    ours = Op('ethToTokenSwapInput', 'HAY', 0, (min_tokens, FAR), 10**18)   # uniswap.fuzz Ops: method, symbol,
+    pending = [Op('ethToTokenSwapInput', 'HAY', 1, (1, FAR), 5 * 10**18),    # sender, args, value
+               Op('tokenToEthSwapInput', 'HAY', 2, (2 * 10**19, 1, FAR), 0)]
+    report = simulate(scenario, ours, pending, processes=8)
+    report.baseline, report.worst.quote, report.slippage, report.reverts
+    ours = with_limit(ours, limit(report, 0.99))   # the min_tokens 99% of the orderings fill
+
+fork() turns exchange reserves into a uniswap.genesis scenario in which every
+account holds plenty of every token, already approved to its exchange, so the
+pending Ops only fail the way they would on chain. ours and pending are Ops as
+uniswap.fuzz runs them; ours must be a swap.
+
+An ordering puts ours and the pending Ops in one block in some order: every
+ordering if there are at most samples of them, otherwise samples random ones,
+ours first, and the one an adversary picks, which greedily puts first each
+pending Op that leaves ours the worst quote until none makes it worse (a
+sandwich's front-run). Only the Ops before ours change what ours gets, so
+each distinct prefix is run once, on uniswap.model, from the model world's
+snapshot; the model computes what the contracts do to the wei. Each
+ordering's Outcome has the quote (what ours buys for an exact input swap, or
+sells for an exact output one, at its place, whatever its limits) and
+whether ours went through or its limits or deadline reverted it. simulate()
+spreads the orderings over worker processes with uniswap.runner, like
+uniswap.fuzz.
+
+The `confirm` worst orderings, one per distinct prefix, are then run in full
+on py-evm from the same genesis. Every Op's outcome and every pool must agree
+with the model, or simulate() raises RuntimeError. limit(report, fraction)
+is the tightest limit ours could set and still fill in that fraction of the
+orderings.
+
+# benchmark with:             python -m benchmarks.bench_ordering
+'''
+
+OURS = 0
+SAMPLES = 10000
+CONFIRM = 10
+CHUNK = 1000
+ACCOUNTS = 4
+# each account's holding of every token
+HOLDING = 2**128
+
+Outcome = namedtuple('Outcome', ['order', 'quote', 'status'])
+Report = namedtuple('Report', ['ours', 'baseline', 'outcomes', 'reverts', 'worst', 'slippage', 'confirmed'])
+
+
+def fork(reserves, accounts=ACCOUNTS, holding=HOLDING):
+    """ A genesis scenario of the pools reserves {symbol: (eth_reserve, token_reserve)}, every account funded. """
+    everyone = {account: holding for account in range(accounts)}
+    approved = {account: 2**256 - 1 for account in range(accounts)}
+    return {
+        'accounts': accounts,
+        'eth': everyone,
+        'tokens': [{'symbol': symbol, 'balances': everyone, 'allowances': approved} for symbol in sorted(reserves)],
+        'pools': [{'token': symbol, 'eth_reserve': eth, 'token_reserve': tokens}
+                  for symbol, (eth, tokens) in sorted(reserves.items())],
+    }
+
+
+def _output(op):
+    return op.method.endswith('Output')
+
+
+def _quote(world, op):
+    """ What op buys (exact input) or sells (exact output) on world's reserves, limits aside; None if it cannot. """
+    pool = world.pool(op.target)
+    if pool is None:
+        return None
+    eth, tokens = pool[:2]
+    try:
+        if op.method == 'ethToTokenSwapInput':
+            return model.get_input_price(op.value, eth, tokens)
+        if op.method == 'ethToTokenSwapOutput':
+            return model.get_output_price(op.args[0], eth, tokens)
+        if op.method == 'tokenToEthSwapInput':
+            return model.get_input_price(op.args[0], tokens, eth)
+        if op.method == 'tokenToEthSwapOutput':
+            return model.get_output_price(op.args[0], tokens, eth)
+        other = world.pool(op.args[4][1])
+        if other is None:
+            return None
+        if op.method == 'tokenToTokenSwapInput':
+            return model.get_input_price(model.get_input_price(op.args[0], tokens, eth), other[0], other[1])
+        return model.get_output_price(model.get_output_price(op.args[0], other[0], other[1]), tokens, eth)
+    except model.Revert:
+        return None
+
+
+def _rank(op):
+    """ Sort key of a quote, worst first: None, then the least bought or the most sold. """
+    if _output(op):
+        return lambda quote: (quote is not None, -(quote or 0))
+    return lambda quote: (quote is not None, quote or 0)
+
+
+def with_limit(op, limit):
+    """ op, a swap, with its least bought (exact input) or most sold (exact output) set to limit. """
+    if op.method == 'ethToTokenSwapOutput':
+        return op._replace(value=limit)
+    index = 0 if op.method == 'ethToTokenSwapInput' else 1
+    return op._replace(args=op.args[:index] + (limit,) + op.args[index + 1:])
+
+
+def sampled(pending, samples=SAMPLES):
+    """ Whether ours and pending Ops have more orderings than samples. """
+    return math.factorial(pending + 1) > samples
+
+
+def orders(pending, samples=SAMPLES, seed=0):
+    """ Every ordering of ours (OURS) and pending (1..pending) if at most samples, else samples random ones and ours first. """
+    count = pending + 1
+    if not sampled(pending, samples):
+        return list(itertools.permutations(range(count)))
+    rng = random.Random(seed)
+    result = [tuple(range(count))]
+    for _ in range(samples):
+        order = list(range(count))
+        rng.shuffle(order)
+        result.append(tuple(order))
+    return result
+
+
+def limit(report, fraction):
+    """ The tightest limit ours fills with in at least fraction of report's orderings; None if none is. """
+    quotes = [outcome.quote for outcome in report.outcomes]
+    return quotes[len(quotes) - max(int(math.ceil(fraction * len(quotes))), 1)]
+
+
+class Simulator(object):
+
+    def __init__(self, tester, addresses, scenario, evm=True):
+        self.evm = EvmWorld(tester, addresses) if evm else None
+        self.timestamp = tester.backend.chain.get_vm().state.timestamp
+        self.model = ModelWorld(scenario, addresses['accounts'], self.timestamp)
+
+    def _prefix(self, ours, pending, prefix):
+        world = self.model
+        world.reset()
+        for i in prefix:
+            world.apply(pending[i - 1])
+        quote = _quote(world, ours)
+        return quote, world.apply(ours)[0]
+
+    def evaluate(self, ours, pending, orders):
+        """ The model's Outcome of each order, each distinct prefix before ours run once. """
+        prefixes = {}
+        outcomes = []
+        for order in orders:
+            prefix = tuple(order[:order.index(OURS)])
+            if prefix not in prefixes:
+                prefixes[prefix] = self._prefix(ours, pending, prefix)
+            outcomes.append(Outcome(tuple(order), *prefixes[prefix]))
+        return outcomes
+
+    def adversary(self, ours, pending):
+        """ The order that greedily puts first the pending Op leaving ours the worst quote, while one does. """
+        rank = _rank(ours)
+        prefix = []
+        worst = rank(self._prefix(ours, pending, prefix)[0])
+        left = list(range(1, len(pending) + 1))
+        while left:
+            ranked = min((rank(self._prefix(ours, pending, prefix + [i])[0]), i) for i in left)
+            if ranked[0] >= worst:
+                break
+            worst = ranked[0]
+            prefix.append(ranked[1])
+            left.remove(ranked[1])
+        return tuple(prefix + [OURS] + left)
+
+    def confirm(self, ours, pending, order):
+        """ The Outcome of order on py-evm, every Op and pool checked against the model. """
+        ops = [ours if i == OURS else pending[i - 1] for i in order]
+        quotes = []
+        for world in (self.model, self.evm):
+            world.reset()
+            results = []
+            for i, op in zip(order, ops):
+                if i == OURS:
+                    quote = _quote(world, op)
+                results.append(world.apply(op))
+            pools = [world.pool(symbol) for symbol in sorted(self.model.tokens)]
+            quotes.append((quote, results, pools))
+        if quotes[0] != quotes[1]:
+            raise RuntimeError('the model and py-evm disagree on order %r: model %r, evm %r' % (
+                order, quotes[0], quotes[1]))
+        quote, results, _ = quotes[1]
+        return Outcome(tuple(order), quote, results[order.index(OURS)][0])
+
+    def run(self, ours, pending, samples=SAMPLES, seed=0, confirm=CONFIRM):
+        """ The Report of ours among pending, in this process. """
+        candidates = orders(len(pending), samples, seed)
+        if sampled(len(pending), samples):
+            candidates.append(self.adversary(ours, pending))
+        outcomes = self.evaluate(ours, pending, candidates)
+        confirmed = [self.confirm(ours, pending, order) for order in _worst(ours, outcomes, confirm)]
+        return _report(ours, outcomes, confirmed)
+
+
+def _worst(ours, outcomes, count):
+    # the worst orderings, one per distinct prefix
+    rank = _rank(ours)
+    chosen = []
+    seen = set()
+    for outcome in sorted(outcomes, key=lambda outcome: rank(outcome.quote)):
+        prefix = outcome.order[:outcome.order.index(OURS)]
+        if len(chosen) == count:
+            break
+        if prefix not in seen:
+            seen.add(prefix)
+            chosen.append(outcome.order)
+    return chosen
+
+
+def _report(ours, outcomes, confirmed):
+    rank = _rank(ours)
+    outcomes = sorted(outcomes, key=lambda outcome: rank(outcome.quote))
+    # ours alone, first in the block
+    baseline = next(outcome.quote for outcome in outcomes if outcome.order[0] == OURS)
+    worst = outcomes[0]
+    slippage = None
+    if baseline and worst.quote is not None:
+        slippage = abs(worst.quote - baseline) / baseline
+    reverts = sum(1 for outcome in outcomes if outcome.status != 'ok')
+    return Report(ours, baseline, outcomes, reverts, worst, slippage, confirmed)
+
+
+_simulator = None
+
+
+def _task(world, params):
+    # uniswap.runner's simulate: one Simulator per worker process and scenario
+    global _simulator
+    kind, scenario, ours, pending, payload = params
+    key = genesis.scenario_key(scenario)
+    if _simulator is None or _simulator[0] != key:
+        _simulator = (key, Simulator(world.tester, world.addresses, scenario))
+    simulator = _simulator[1]
+    if kind == 'evaluate':
+        return simulator.evaluate(ours, pending, payload)
+    if kind == 'adversary':
+        return simulator.adversary(ours, pending)
+    return simulator.confirm(ours, pending, payload)
+
+
+def simulate(scenario, ours, pending, samples=SAMPLES, seed=0, confirm=CONFIRM, processes=None, chunk=CHUNK,
+             cache_dir=artifacts.CACHE_DIR):
+    """ The Report of ours among pending, the orderings run chunk per task by worker processes. """
+    from uniswap.runner import Runner
+    candidates = orders(len(pending), samples, seed)
+    with Runner(_task, scenario, processes=processes, cache_dir=cache_dir) as runner:
+
+        def run(items):
+            for result in runner.run(items):
+                if result.error:
+                    raise RuntimeError(result.error)
+                yield result.value
+        if sampled(len(pending), samples):
+            candidates.extend(run([('adversary', scenario, ours, pending, None)]))
+        items = [('evaluate', scenario, ours, pending, candidates[i:i + chunk])
+                 for i in range(0, len(candidates), chunk)]
+        outcomes = [outcome for outcomes in run(items) for outcome in outcomes]
+        items = [('confirm', scenario, ours, pending, order) for order in _worst(ours, outcomes, confirm)]
+        confirmed = list(run(items))
+    return _report(ours, outcomes, confirmed)
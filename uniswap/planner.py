@@ -0,0 +1,241 @@
+from collections import namedtuple
+from fractions import Fraction
+
+from uniswap.model import Revert, get_input_price
+
+'''
+Split a large swap into child orders over several blocks.
+
+    planner = Planner([(eth, tokens)])                        # ethToTokenSwapInput on one exchange
+    planner = Planner([(eth_a, token_a), (eth_b, token_b)])   # tokenToTokenSwapInput from A's token to B's
+    for plan in planner.compare(size, horizon=10, now=block.timestamp):
+        plan.strategy, plan.output                            # most output first
+    best = planner.optimal(size, horizon=10, now=block.timestamp)
+    for child in best.children:
+        exchange.ethToTokenSwapInput(child.min_tokens, child.deadline, value=child.amount)
+        # or tokenToTokenSwapInput(child.amount, child.min_tokens, child.min_eth, child.deadline, token_b)
+
+A swap moves the price against the next one, and arbitrageurs refill the
+exchange between blocks. Refill(rate) is the expected refill: after each block
+every reserve moves back towards where the plan found it by rate of the
+distance. A plan sells amount in each of horizon blocks and is evaluated with
+the integer getInputPrice of uniswap_exchange.vy on the reserves the refill
+model predicts, so a child's expected output is what the contract would pay
+if the prediction holds. min_tokens and min_eth give up tolerance of that;
+deadline is now plus block_time per block up to the child's, plus slack
+blocks.
+
+Strategies:
+
+    twap      equal slices
+    vwap      each block's slice in proportion to the input reserve it finds,
+              against the reference reserve for each block left: the plan
+              trades more where the exchange is deeper
+    optimal   a large first slice, equal middle slices and a large last one,
+              sized by golden-section search on a floating-point copy of
+              the model, the shape that is optimal for a price impact that
+              decays between trades; the plan is then evaluated exactly, and
+              twap or vwap returned instead where they pay more
+
+A ten-block optimal plan takes under a millisecond, about a quarter of it for
+the vwap plan it is checked against.
+
+# benchmark with:             python -m benchmarks.bench_planner
+'''
+
+TOLERANCE = 0.005
+BLOCK_TIME = 15
+SLACK = 2
+# golden-section steps per parameter and coordinate rounds
+SEARCH_STEPS = 12
+SEARCH_ROUNDS = 2
+
+Child = namedtuple('Child', ['block', 'amount', 'min_tokens', 'min_eth', 'deadline', 'tokens', 'eth'])
+Plan = namedtuple('Plan', ['strategy', 'method', 'children', 'output'])
+
+_GOLDEN = (5 ** 0.5 - 1) / 2
+
+
+class Refill(object):
+
+    def __init__(self, rate):
+        if not 0 <= rate <= 1:
+            raise ValueError('rate must be between 0 and 1')
+        self.rate = rate
+        self._keep = Fraction(1 - Fraction(rate)).limit_denominator(10**9)
+
+    def __call__(self, reserve, reference):
+        """ The reserve a block later. """
+        keep = self._keep
+        return reference + (reserve - reference) * keep.numerator // keep.denominator
+
+
+def _swap(hops, amount):
+    # the reserves after selling amount along hops, and each hop's output
+    moved = []
+    outputs = []
+    for input_reserve, output_reserve in hops:
+        output = get_input_price(amount, input_reserve, output_reserve)
+        moved.append((input_reserve + amount, output_reserve - output))
+        outputs.append(output)
+        amount = output
+    return moved, outputs
+
+
+class Planner(object):
+
+    def __init__(self, reserves, refill=Refill(0.5), tolerance=TOLERANCE, block_time=BLOCK_TIME, slack=SLACK):
+        if len(reserves) == 1:
+            # ETH in, tokens out
+            self.method = 'ethToTokenSwapInput'
+            self.hops = [(reserves[0][0], reserves[0][1])]
+        elif len(reserves) == 2:
+            # tokens of A for ETH, ETH for tokens of B
+            self.method = 'tokenToTokenSwapInput'
+            self.hops = [(reserves[0][1], reserves[0][0]), (reserves[1][0], reserves[1][1])]
+        else:
+            raise ValueError('reserves of one or two exchanges')
+        self._reference = [(float(i), float(o)) for i, o in self.hops]
+        self.refill = refill
+        self.tolerance = tolerance
+        self._keep = Fraction(1 - Fraction(tolerance)).limit_denominator(10**9)
+        self.block_time = block_time
+        self.slack = slack
+
+    def _fill(self, hops):
+        refill = self.refill
+        return [(refill(i, i0), refill(o, o0)) for (i, o), (i0, o0) in zip(hops, self.hops)]
+
+    def evaluate(self, sizes):
+        """ The exact (tokens, eth) of each child selling sizes, eth None for a single exchange; None if one reverts. """
+        hops = self.hops
+        results = []
+        for block, amount in enumerate(sizes):
+            if block:
+                hops = self._fill(hops)
+            try:
+                hops, outputs = _swap(hops, amount)
+            except Revert:
+                return None
+            results.append((outputs[-1], outputs[0] if len(outputs) == 2 else None))
+        return results
+
+    def _output(self, first, last, horizon, size):
+        # the floating-point model of evaluate() on _shape(first, last, horizon), for the search
+        fractions = self._shape(first, last, horizon)
+        keep = 1 - self.refill.rate
+        total = 0.0
+        if len(self.hops) == 1:
+            reference_in, reference_out = self._reference[0]
+            input_reserve, output_reserve = reference_in, reference_out
+            for fraction in fractions:
+                amount = fraction * size
+                output = 997 * amount * output_reserve / (1000 * input_reserve + 997 * amount)
+                total += output
+                input_reserve = reference_in + (input_reserve + amount - reference_in) * keep
+                output_reserve = reference_out + (output_reserve - output - reference_out) * keep
+            return total
+        (reference_a, reference_eth_a), (reference_eth_b, reference_b) = self._reference
+        tokens_a, eth_a, eth_b, tokens_b = reference_a, reference_eth_a, reference_eth_b, reference_b
+        for fraction in fractions:
+            amount = fraction * size
+            eth = 997 * amount * eth_a / (1000 * tokens_a + 997 * amount)
+            output = 997 * eth * tokens_b / (1000 * eth_b + 997 * eth)
+            total += output
+            tokens_a = reference_a + (tokens_a + amount - reference_a) * keep
+            eth_a = reference_eth_a + (eth_a - eth - reference_eth_a) * keep
+            eth_b = reference_eth_b + (eth_b + eth - reference_eth_b) * keep
+            tokens_b = reference_b + (tokens_b - output - reference_b) * keep
+        return total
+
+    def plan(self, strategy, sizes, now=0):
+        """ The Plan that sells sizes, one per block from now, with its limits and deadlines filled in. """
+        results = self.evaluate(sizes)
+        if results is None:
+            return None
+        keep = self._keep
+        children = []
+        for block, (amount, (tokens, eth)) in enumerate(zip(sizes, results)):
+            if amount == 0:
+                continue
+            children.append(Child(block, amount, max(tokens * keep.numerator // keep.denominator, 1),
+                                  None if eth is None else max(eth * keep.numerator // keep.denominator, 1),
+                                  now + (block + 1 + self.slack) * self.block_time, tokens, eth))
+        return Plan(strategy, self.method, children, sum(child.tokens for child in children))
+
+    def twap(self, size, horizon, now=0):
+        """ Equal slices, the remainder in the first. """
+        sizes = [size // horizon] * horizon
+        sizes[0] += size - sum(sizes)
+        return self.plan('twap', sizes, now)
+
+    def vwap(self, size, horizon, now=0):
+        """ Slices in proportion to the input reserve of each block. """
+        sizes = []
+        remaining = size
+        reference = self.hops[0][0]
+        hops = self.hops
+        for block in range(horizon):
+            if block:
+                hops = self._fill(hops)
+            depth = hops[0][0]
+            amount = remaining * depth // (depth + (horizon - block - 1) * reference)
+            sizes.append(amount)
+            remaining -= amount
+            try:
+                hops = _swap(hops, amount)[0]
+            except Revert:
+                return None
+        return self.plan('vwap', sizes, now)
+
+    def _shape(self, first, last, horizon):
+        if horizon == 1:
+            return [1.0]
+        if horizon == 2:
+            return [first, 1 - first]
+        middle = (1 - first - last) / (horizon - 2)
+        return [first] + [middle] * (horizon - 2) + [last]
+
+    def _golden(self, objective, lo, hi):
+        a, b = hi - _GOLDEN * (hi - lo), lo + _GOLDEN * (hi - lo)
+        fa, fb = objective(a), objective(b)
+        for _ in range(SEARCH_STEPS):
+            if fa >= fb:
+                hi, b, fb = b, a, fa
+                a = hi - _GOLDEN * (hi - lo)
+                fa = objective(a)
+            else:
+                lo, a, fa = a, b, fb
+                b = lo + _GOLDEN * (hi - lo)
+                fb = objective(b)
+        return (lo + hi) / 2
+
+    def _sizes(self, fractions, size):
+        # integer slices from the cumulative fractions: none negative, and they add up to size
+        bounds = []
+        total = 0.0
+        for fraction in fractions:
+            total += fraction
+            bounds.append(min(max(int(total * size), bounds[-1] if bounds else 0), size))
+        bounds[-1] = size
+        return [b - a for a, b in zip([0] + bounds[:-1], bounds)]
+
+    def optimal(self, size, horizon, now=0):
+        """ The searched shape, or twap or vwap if one does better exactly. """
+        first = last = 1 / horizon
+        if horizon > 1:
+            for _ in range(SEARCH_ROUNDS):
+                first = self._golden(lambda f: self._output(f, last, horizon, size), 0, 1 - last)
+                if horizon > 2:
+                    last = self._golden(lambda l: self._output(first, l, horizon, size), 0, 1 - first)
+        sizes = self._sizes(self._shape(first, last, horizon), size)
+        plans = [self.plan('optimal', sizes, now), self.twap(size, horizon, now), self.vwap(size, horizon, now)]
+        plans = [p for p in plans if p is not None]
+        if not plans:
+            return None
+        return max(plans, key=lambda p: p.output)._replace(strategy='optimal')
+
+    def compare(self, size, horizon, now=0):
+        """ The twap, vwap and optimal Plans, most output first. """
+        plans = [self.twap(size, horizon, now), self.vwap(size, horizon, now), self.optimal(size, horizon, now)]
+        return sorted((p for p in plans if p is not None), key=lambda p: p.output, reverse=True)
@@ -0,0 +1,195 @@
+import bisect
+import os
+from collections import OrderedDict
+
+from eth.vm.computation import BaseComputation
+from web3 import Web3
+
+from uniswap import artifacts
+
+'''
+Gas profile of transactions run on the py-evm backend, by contract source line.
+
+    with Profiler(names={exchange.address: 'HAY_exchange'}) as profile:
+        exchange.ethToTokenSwapInput(1, deadline, transact={'value': 10**18})
+    print(profile.tree())
+    profile.write_folded('swap.folded')      # flamegraph.pl swap.folded > swap.svg
+
+While active, every opcode py-evm executes is timed in gas (gas remaining
+before and after) and attributed to a stack of frames: for each message, the
+contract that runs it (a name from names, or its address, plus the source file
+when the code is known), then the source line of the current opcode. A CALL's
+line is charged for the call itself; the gas the callee uses appears below it,
+so totals are inclusive and self gas is never counted twice.
+
+Program counters are mapped to source lines with the pc_pos_map that vyper's
+compile_lll.assembly_to_evm returns for the runtime code. Exchanges created
+by the factory are create_with_code_of forwarders, so their frame delegatecalls
+into the template's code, which is where the lines come from.
+
+Each top-level message (estimateGas, then the transaction itself) is a
+separate run; reports use the last one. A frame that fails reports the gas
+used up to the failing opcode, not the gas the failure burns.
+'''
+
+SOURCES = (
+    'contracts/uniswap_exchange.vy',
+    'contracts/uniswap_exchange_lean.vy',
+    'contracts/uniswap_factory.vy',
+    'contracts/uniswap_reader.vy',
+    'contracts/uniswap_router.vy',
+    'contracts/test_contracts/ERC20.vy',
+)
+
+_source_maps = {}
+
+
+class SourceMap(object):
+    """ Runtime bytecode of a contract and the source line of each program counter. """
+
+    def __init__(self, path):
+        from vyper import compile_lll, optimizer
+        from vyper.parser import parser
+        with open(os.path.join(artifacts.ROOT, path)) as f:
+            source = f.read()
+        lll = optimizer.optimize(parser.parse_tree_to_lll(parser.parse(source), source, runtime_only=True))
+        self.code, line_number_map = compile_lll.assembly_to_evm(compile_lll.compile_to_assembly(lll))
+        # assembly_to_evm also notes every instruction at the end of the code
+        pc_pos_map = {pc: pos for pc, pos in line_number_map['pc_pos_map'].items() if pc < len(self.code)}
+        self.path = path
+        self.name = os.path.basename(path)
+        self.lines = source.splitlines()
+        self._pcs = sorted(pc_pos_map)
+        self._linenos = [pc_pos_map[pc][0] for pc in self._pcs]
+
+    def lineno(self, pc):
+        """ Source line of the instruction at pc, or None for code before the first mapped instruction. """
+        i = bisect.bisect_right(self._pcs, pc) - 1
+        return self._linenos[i] if i >= 0 else None
+
+    def function(self, lineno):
+        """ Name of the function whose body holds lineno. """
+        for line in reversed(self.lines[:lineno]):
+            if line.startswith('def '):
+                return line[4:line.index('(')]
+        return None
+
+    def label(self, pc):
+        lineno = self.lineno(pc)
+        if lineno is None:
+            return '%s:dispatch' % self.name
+        function = self.function(lineno)
+        return '%s:%d %s' % (self.name, lineno, function) if function else '%s:%d' % (self.name, lineno)
+
+
+def source_map(path):
+    if path not in _source_maps:
+        _source_maps[path] = SourceMap(path)
+    return _source_maps[path]
+
+
+class Profiler(object):
+
+    def __init__(self, sources=SOURCES, names=None):
+        self.source_maps = {m.code: m for m in (source_map(path) for path in sources)}
+        self.names = {Web3.toChecksumAddress(a): name for a, name in (names or {}).items()}
+        # One {stack: self gas} per top-level message, in order of first execution
+        self.runs = []
+        self._wrapped = {}
+        self._path = []
+        self._nested = []
+        self._top = None
+
+    def __enter__(self):
+        self._get_opcode_fn = BaseComputation.get_opcode_fn
+        profiler = self
+
+        def get_opcode_fn(computation, opcode):
+            return profiler._wrap(profiler._get_opcode_fn(computation, opcode))
+        BaseComputation.get_opcode_fn = get_opcode_fn
+        return self
+
+    def __exit__(self, *exc_info):
+        BaseComputation.get_opcode_fn = self._get_opcode_fn
+
+    def _wrap(self, opcode_fn):
+        if opcode_fn not in self._wrapped:
+            def traced(computation):
+                self._trace(opcode_fn, computation)
+            traced.mnemonic = opcode_fn.mnemonic
+            self._wrapped[opcode_fn] = traced
+        return self._wrapped[opcode_fn]
+
+    def _frame(self, computation, source):
+        storage = Web3.toChecksumAddress(computation.msg.storage_address)
+        name = self.names.get(storage, storage)
+        return '%s (%s)' % (name, source.name) if source else name
+
+    def _trace(self, opcode_fn, computation):
+        if computation.msg.depth == 0 and computation is not self._top:
+            self._top = computation
+            self.runs.append(OrderedDict())
+        pc = computation.code.pc - 1
+        source = self.source_maps.get(computation.msg.code)
+        self._path.append(self._frame(computation, source))
+        self._path.append(source.label(pc) if source else 'pc %d %s' % (pc, opcode_fn.mnemonic))
+        self._nested.append(0)
+        before = computation.get_gas_remaining()
+        try:
+            opcode_fn(computation=computation)
+        finally:
+            inclusive = before - computation.get_gas_remaining()
+            nested = self._nested.pop()
+            stack = tuple(self._path)
+            self.runs[-1][stack] = self.runs[-1].get(stack, 0) + inclusive - nested
+            del self._path[-2:]
+            if self._nested:
+                self._nested[-1] += inclusive
+
+    def stacks(self, run=-1):
+        """ {stack of frame and line labels: self gas} for one run. """
+        return self.runs[run]
+
+    def total(self, run=-1):
+        """ Gas used by opcodes, which excludes the intrinsic and calldata gas of the transaction. """
+        return sum(self.runs[run].values())
+
+    def folded(self, run=-1):
+        """ Folded stacks ("frame;line;frame;line gas") for flamegraph.pl, inferno or speedscope. """
+        return '\n'.join('%s %d' % (';'.join(stack), gas) for stack, gas in sorted(self.runs[run].items()) if gas > 0)
+
+    def write_folded(self, path, run=-1):
+        with open(path, 'w') as f:
+            f.write(self.folded(run) + '\n')
+
+    def lines(self, run=-1):
+        """ {(frame, line): [self gas, inclusive gas]} for every line that ran. """
+        lines = OrderedDict()
+        for stack, gas in self.runs[run].items():
+            seen = set()
+            for i in range(0, len(stack), 2):
+                key = stack[i], stack[i + 1]
+                entry = lines.setdefault(key, [0, 0])
+                if key not in seen:
+                    entry[1] += gas
+                    seen.add(key)
+            lines[stack[-2], stack[-1]][0] += gas
+        return lines
+
+    def tree(self, run=-1, min_gas=0):
+        """ Call tree of inclusive gas, one frame or line per row, in order of first execution. """
+        root = [0, OrderedDict()]
+        for stack, gas in self.runs[run].items():
+            node = root
+            for label in stack:
+                node = node[1].setdefault(label, [0, OrderedDict()])
+                node[0] += gas
+        rows = []
+
+        def walk(children, depth):
+            for label, (gas, grandchildren) in children.items():
+                if gas >= min_gas:
+                    rows.append('%10d  %s%s' % (gas, '  ' * depth, label))
+                    walk(grandchildren, depth + 1)
+        walk(root[1], 0)
+        return '\n'.join(rows)
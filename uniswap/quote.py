@@ -0,0 +1,259 @@
+import itertools
+import numbers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+Batch quotes with the exact integer formulas of uniswap_exchange.vy.
+
+Every function takes equal-length columns (lists, tuples or NumPy integer
+arrays; a plain int is broadcast) and returns a list with one result per row,
+or None where the contract would throw (empty reserve, output >= reserve,
+uint256 overflow).
+
+NumPy integer columns take a vectorized path for the rows whose intermediate
+products fit in 64 bits. The other rows take the wide path: the same formulas
+as whole-column operations on object arrays of Python ints, which are exact at
+any size and which NumPy runs in C without a Python call per row. Wei-sized
+quotes (1e18 * 997 * 1e24) overflow 128 bits, which NumPy has no type for
+anyway, so a uint64 column of wei amounts takes the wide path for nearly every
+row, and columns past 64 bits are passed as object arrays, which take it for
+all of them:
+
+    quote.input_prices(numpy.array(amounts, dtype=object), eth_reserves, token_reserves)
+
+The big-int products and divisions cost about as much there as row by row, so
+the wide path gains little over lists; what it saves is the per-row fallback.
+A float64 estimate of the quotient with an exact correction is slower than
+the object floor division itself at these sizes. Non-NumPy input uses Python
+ints row by row.
+
+# benchmark with:             python -m benchmarks.bench_quote
+'''
+
+UINT256_MAX = 2**256 - 1
+# Row limit for the uint64 path, checked in float64 with a 4x safety margin
+_UINT64_LIMIT = 2.0**62
+
+
+def _input_price(input_amount, input_reserve, output_reserve):
+    if input_reserve <= 0 or output_reserve <= 0:
+        return None
+    input_amount_with_fee = input_amount * 997
+    numerator = input_amount_with_fee * output_reserve
+    denominator = input_reserve * 1000 + input_amount_with_fee
+    if numerator > UINT256_MAX or denominator > UINT256_MAX:
+        return None
+    return numerator // denominator
+
+
+def _output_price(output_amount, input_reserve, output_reserve):
+    if input_reserve <= 0 or output_reserve <= output_amount:
+        return None
+    numerator = input_reserve * output_amount * 1000
+    denominator = (output_reserve - output_amount) * 997
+    if numerator > UINT256_MAX or denominator > UINT256_MAX:
+        return None
+    return numerator // denominator + 1
+
+
+def _token_to_token_input(tokens_sold, input_token_reserve, input_eth_reserve, output_eth_reserve, output_token_reserve):
+    eth_bought = _input_price(tokens_sold, input_token_reserve, input_eth_reserve)
+    if not eth_bought:
+        return None, None
+    tokens_bought = _input_price(eth_bought, output_eth_reserve, output_token_reserve)
+    if tokens_bought is None:
+        return None, None
+    return eth_bought, tokens_bought
+
+
+def _token_to_token_output(tokens_bought, input_token_reserve, input_eth_reserve, output_eth_reserve, output_token_reserve):
+    if not tokens_bought:
+        return None, None
+    eth_bought = _output_price(tokens_bought, output_eth_reserve, output_token_reserve)
+    if eth_bought is None:
+        return None, None
+    tokens_sold = _output_price(eth_bought, input_token_reserve, input_eth_reserve)
+    if tokens_sold is None:
+        return None, None
+    return eth_bought, tokens_sold
+
+
+def _rows(columns):
+    # NumPy scalars promote to float64 when mixed with Python ints
+    columns = [c.tolist() if numpy is not None and isinstance(c, numpy.ndarray) else c for c in columns]
+    size = None
+    for column in columns:
+        if not isinstance(column, numbers.Integral):
+            size = len(column)
+            break
+    if size is None:
+        size = 1
+    return zip(*[itertools.repeat(c, size) if isinstance(c, numbers.Integral) else c for c in columns])
+
+
+def _numpy_columns(columns):
+    """
+    Broadcast the columns to uint64 arrays, or to object arrays if a column is
+    an object array or does not fit uint64. Returns (arrays, wide), or None if
+    they are not NumPy input.
+    """
+    if numpy is None or not any(isinstance(c, numpy.ndarray) for c in columns):
+        return None
+    wide = False
+    for column in columns:
+        if isinstance(column, numbers.Integral):
+            wide |= not 0 <= int(column) < 2**64
+        elif isinstance(column, numpy.ndarray) and column.dtype.kind in 'uiO':
+            wide |= column.dtype.kind == 'O' or (column.dtype.kind == 'i' and not (column >= 0).all())
+        else:
+            return None
+    dtype = object if wide else numpy.uint64
+    return numpy.broadcast_arrays(*[numpy.asarray(column).astype(dtype) for column in columns]), wide
+
+
+def _numpy_input_price(amount, input_reserve, output_reserve):
+    amount_f = amount.astype(float)
+    fee_f = amount_f * 997
+    fits = ((input_reserve > 0) & (output_reserve > 0) &
+            (fee_f * output_reserve.astype(float) < _UINT64_LIMIT) &
+            (input_reserve.astype(float) * 1000 + fee_f < _UINT64_LIMIT))
+    input_amount_with_fee = amount * numpy.uint64(997)
+    denominator = input_reserve * numpy.uint64(1000) + input_amount_with_fee
+    numerator = input_amount_with_fee * output_reserve
+    return numerator // numpy.where(fits, denominator, numpy.uint64(1)), fits
+
+
+def _numpy_output_price(amount, input_reserve, output_reserve):
+    fits = ((input_reserve > 0) & (output_reserve > amount) &
+            (input_reserve.astype(float) * amount.astype(float) * 1000 < _UINT64_LIMIT) &
+            (output_reserve.astype(float) * 997 < _UINT64_LIMIT))
+    numerator = input_reserve * amount * numpy.uint64(1000)
+    denominator = (output_reserve - amount) * numpy.uint64(997)
+    return numerator // numpy.where(fits, denominator, numpy.uint64(1)) + numpy.uint64(1), fits
+
+
+def _wide_input_price(amount, input_reserve, output_reserve):
+    input_amount_with_fee = amount * 997
+    numerator = input_amount_with_fee * output_reserve
+    denominator = input_reserve * 1000 + input_amount_with_fee
+    valid = ((input_reserve > 0) & (output_reserve > 0) &
+             (numerator <= UINT256_MAX) & (denominator <= UINT256_MAX))
+    return numpy.where(valid, numerator // numpy.where(valid, denominator, 1), None), valid
+
+
+def _wide_output_price(amount, input_reserve, output_reserve):
+    numerator = input_reserve * amount * 1000
+    denominator = (output_reserve - amount) * 997
+    valid = ((input_reserve > 0) & (output_reserve > amount) &
+             (numerator <= UINT256_MAX) & (denominator <= UINT256_MAX))
+    return numpy.where(valid, numerator // numpy.where(valid, denominator, 1) + 1, None), valid
+
+
+def _wide_token_to_token_input(sold, token_in, eth_in, eth_out, token_out):
+    eth_bought, valid = _wide_input_price(sold, token_in, eth_in)
+    valid &= eth_bought != 0
+    tokens_bought, valid_out = _wide_input_price(numpy.where(valid, eth_bought, 0), eth_out, token_out)
+    valid &= valid_out
+    return numpy.where(valid, eth_bought, None), numpy.where(valid, tokens_bought, None)
+
+
+def _wide_token_to_token_output(bought, token_in, eth_in, eth_out, token_out):
+    eth_bought, valid = _wide_output_price(bought, eth_out, token_out)
+    valid &= bought != 0
+    tokens_sold, valid_in = _wide_output_price(numpy.where(valid, eth_bought, 0), token_in, eth_in)
+    valid &= valid_in
+    return numpy.where(valid, eth_bought, None), numpy.where(valid, tokens_sold, None)
+
+
+def _with_fallback(results, fits, arrays, wide):
+    """ Replace the rows that did not fit in 64 bits with what wide, the same quote on object arrays, gives them. """
+    rows = numpy.flatnonzero(~fits)
+    if not rows.size:
+        return [result.tolist() for result in results]
+    # wide returns a column per result, and may return more (a price's valid mask)
+    exact = wide(*[a[rows].astype(object) for a in arrays])
+    out = []
+    for result, column in zip(results, exact):
+        result = result.astype(object)
+        result[rows] = column
+        out.append(result.tolist())
+    return out
+
+
+def input_prices(input_amounts, input_reserves, output_reserves):
+    """ getInputPrice for each row. """
+    columns = (input_amounts, input_reserves, output_reserves)
+    found = _numpy_columns(columns)
+    if found is None:
+        return [_input_price(a, i, o) for a, i, o in _rows(columns)]
+    arrays, wide = found
+    if wide:
+        return _wide_input_price(*arrays)[0].tolist()
+    result, fits = _numpy_input_price(*arrays)
+    return _with_fallback([result], fits, arrays, _wide_input_price)[0]
+
+
+def output_prices(output_amounts, input_reserves, output_reserves):
+    """ getOutputPrice for each row. """
+    columns = (output_amounts, input_reserves, output_reserves)
+    found = _numpy_columns(columns)
+    if found is None:
+        return [_output_price(a, i, o) for a, i, o in _rows(columns)]
+    arrays, wide = found
+    if wide:
+        return _wide_output_price(*arrays)[0].tolist()
+    result, fits = _numpy_output_price(*arrays)
+    return _with_fallback([result], fits, arrays, _wide_output_price)[0]
+
+
+def _unzip(pairs, size):
+    if size == 0:
+        return [], []
+    eth, tokens = zip(*pairs)
+    return list(eth), list(tokens)
+
+
+def token_to_token_input_prices(tokens_sold, input_token_reserves, input_eth_reserves, output_eth_reserves, output_token_reserves):
+    """
+    tokenToTokenInput priced through both exchanges.
+    Returns (eth_bought, tokens_bought): the intermediate ETH, which is the
+    most min_eth_bought can be, and the output tokens.
+    """
+    columns = (tokens_sold, input_token_reserves, input_eth_reserves, output_eth_reserves, output_token_reserves)
+    found = _numpy_columns(columns)
+    if found is None:
+        pairs = [_token_to_token_input(*row) for row in _rows(columns)]
+        return _unzip(pairs, len(pairs))
+    arrays, wide = found
+    if wide:
+        return tuple(column.tolist() for column in _wide_token_to_token_input(*arrays))
+    sold, token_in, eth_in, eth_out, token_out = arrays
+    eth_bought, fits = _numpy_input_price(sold, token_in, eth_in)
+    tokens_bought, fits_out = _numpy_input_price(eth_bought, eth_out, token_out)
+    fits &= fits_out & (eth_bought > 0)
+    return tuple(_with_fallback([eth_bought, tokens_bought], fits, arrays, _wide_token_to_token_input))
+
+
+def token_to_token_output_prices(tokens_bought, input_token_reserves, input_eth_reserves, output_eth_reserves, output_token_reserves):
+    """
+    tokenToTokenOutput priced through both exchanges.
+    Returns (eth_bought, tokens_sold): the intermediate ETH, which is the
+    least max_eth_sold can be, and the input tokens.
+    """
+    columns = (tokens_bought, input_token_reserves, input_eth_reserves, output_eth_reserves, output_token_reserves)
+    found = _numpy_columns(columns)
+    if found is None:
+        pairs = [_token_to_token_output(*row) for row in _rows(columns)]
+        return _unzip(pairs, len(pairs))
+    arrays, wide = found
+    if wide:
+        return tuple(column.tolist() for column in _wide_token_to_token_output(*arrays))
+    bought, token_in, eth_in, eth_out, token_out = arrays
+    eth_bought, fits = _numpy_output_price(bought, eth_out, token_out)
+    tokens_sold, fits_in = _numpy_output_price(eth_bought, token_in, eth_in)
+    fits &= fits_in & (bought > 0)
+    return tuple(_with_fallback([eth_bought, tokens_sold], fits, arrays, _wide_token_to_token_output))
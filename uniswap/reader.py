@@ -0,0 +1,128 @@
+from collections import namedtuple
+
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput
+
+from uniswap import artifacts
+from uniswap.model import ZERO_ADDRESS
+
+'''
+Read the reserves of every exchange of a factory with contracts/uniswap_reader.vy.
+
+One getReserves eth_call returns up to MAX_PAGE_SIZE exchanges, so a factory
+with N exchanges is read in 1 + N / page_size calls instead of about 5 * N
+(lower page_size for nodes with a tight eth_call gas cap). All pages are read
+at the same block number, so the result is one consistent snapshot.
+
+    reader = ReserveReader(w3, factory_address, deploy(w3))
+    for pool in reader.pools():
+        ...
+    reader.unreadable                 # (token, exchange) pairs the last pools() or read() skipped
+
+The factory creates an exchange for any address, so a "token" without code,
+or whose balanceOf throws, makes the reader contract throw for its whole
+page. pools() and read() then split the page in halves until each such
+exchange is read alone, skip it and record it in unreadable. A page with k
+of them costs about 2 * k * log2(page_size) more calls; the other pages are
+unaffected.
+'''
+
+try:
+    from eth_tester.exceptions import TransactionFailed
+except ImportError:
+    TransactionFailed = ValueError
+
+READER = 'contracts/uniswap_reader.vy'
+FACTORY = 'contracts/uniswap_factory.vy'
+# Rows and words per row returned by getReserves
+MAX_PAGE_SIZE = 100
+ROW_SIZE = 5
+
+Pool = namedtuple('Pool', ['token', 'exchange', 'eth_reserve', 'token_reserve', 'total_supply'])
+
+# what a thrown eth_call raises: from eth-tester, a node's error response, or a node's empty output
+CALL_ERRORS = (TransactionFailed, ValueError, BadFunctionCallOutput)
+
+
+def _address(word):
+    return Web3.toChecksumAddress('0x%040x' % word)
+
+
+def decode(words):
+    """ Split the packed getReserves output into Pools, dropping the empty rows past tokenCount. """
+    pools = []
+    for i in range(0, len(words), ROW_SIZE):
+        token, exchange, eth_reserve, token_reserve, total_supply = words[i:i + ROW_SIZE]
+        if token == 0:
+            break
+        pools.append(Pool(_address(token), _address(exchange), eth_reserve, token_reserve, total_supply))
+    return pools
+
+
+def deploy(w3):
+    """ Deploy the reader contract and return its address. """
+    artifact = artifacts.load(READER)
+    tx_hash = w3.eth.contract(abi=artifact.abi, bytecode=artifact.bytecode).constructor().transact()
+    return w3.eth.getTransactionReceipt(tx_hash).contractAddress
+
+
+class ReserveReader(object):
+
+    def __init__(self, w3, factory_address, reader_address, page_size=MAX_PAGE_SIZE):
+        assert 0 < page_size <= MAX_PAGE_SIZE
+        self.w3 = w3
+        self.page_size = page_size
+        self.factory = w3.eth.contract(address=factory_address, abi=artifacts.load(FACTORY).abi)
+        self.reader = w3.eth.contract(address=reader_address, abi=artifacts.load(READER).abi)
+        self.unreadable = []
+
+    def page(self, start, block_identifier='latest', count=None):
+        """ Read the exchanges with token ids start to start + count - 1 (default page_size); throws as the contract does. """
+        words = self.reader.functions.getReserves(self.factory.address, start, count or self.page_size).call(
+            block_identifier=block_identifier)
+        return decode(words)
+
+    def _ids(self, start, count, block_identifier):
+        # a page, or its halves if it throws, down to the single exchanges that throw
+        try:
+            return self.page(start, block_identifier, count)
+        except CALL_ERRORS:
+            if count > 1:
+                half = count // 2
+                return self._ids(start, half, block_identifier) + self._ids(start + half, count - half, block_identifier)
+            token = self.factory.functions.getTokenWithId(start).call(block_identifier=block_identifier)
+            exchange = self.factory.functions.getExchange(token).call(block_identifier=block_identifier)
+            self.unreadable.append((token, exchange))
+            return []
+
+    def _exchanges(self, exchanges, block_identifier):
+        # as _ids, for a list of exchange addresses
+        page = list(exchanges) + [ZERO_ADDRESS] * (MAX_PAGE_SIZE - len(exchanges))
+        try:
+            return decode(self.reader.functions.getExchangeReserves(page).call(block_identifier=block_identifier))
+        except CALL_ERRORS:
+            if len(exchanges) > 1:
+                half = len(exchanges) // 2
+                return (self._exchanges(exchanges[:half], block_identifier) +
+                        self._exchanges(exchanges[half:], block_identifier))
+            token = self.factory.functions.getToken(exchanges[0]).call(block_identifier=block_identifier)
+            self.unreadable.append((None if token == ZERO_ADDRESS else token, exchanges[0]))
+            return []
+
+    def read(self, exchanges, block_identifier='latest'):
+        """ Read the given exchange addresses, page_size per call, skipping the unreadable ones. """
+        self.unreadable = []
+        pools = []
+        for i in range(0, len(exchanges), self.page_size):
+            pools.extend(self._exchanges(list(exchanges[i:i + self.page_size]), block_identifier))
+        return pools
+
+    def pools(self, block_identifier=None):
+        """ Yield a Pool for every readable exchange of the factory, in token id order. """
+        self.unreadable = []
+        if block_identifier is None:
+            block_identifier = self.w3.eth.blockNumber
+        token_count = self.factory.functions.tokenCount().call(block_identifier=block_identifier)
+        for start in range(1, token_count + 1, self.page_size):
+            for pool in self._ids(start, min(self.page_size, token_count + 1 - start), block_identifier):
+                yield pool
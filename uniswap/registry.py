@@ -0,0 +1,192 @@
+import sqlite3
+from collections import namedtuple
+
+from web3 import Web3
+from web3.utils.events import get_event_data
+
+from uniswap import artifacts
+from uniswap.indexer import Exchange, event_abis
+
+'''
+Resolve tokens and exchanges of a factory locally, from its NewExchange logs.
+
+    registry = Registry(w3, factory_address, 'registry.sqlite')
+    registry.sync()                               # after a restart: only the blocks since the last sync
+    registry.exchange_of(token)                   # or None, like factory.getExchange returns zero
+    registry.token_of(exchange)
+    reader.read([e.exchange for e in registry.exchanges()])
+
+The factory never overwrites an exchange once created, so its NewExchange logs
+are the whole token <-> exchange mapping. sync() fetches only the factory's
+logs with that topic, batch_size blocks per eth_getLogs, and writes each range
+together with the cursor (the next block to fetch) in one transaction. Both
+directions are kept in dicts loaded when the registry opens, so a lookup is a
+dict lookup instead of an eth_call, and a restart reads the file once and syncs
+from the cursor.
+
+The hashes of the last depth blocks synced are kept too. Every sync() first
+checks the newest of them against the chain; if it was replaced, it walks back
+to the newest block still on the chain and drops the exchanges and hashes
+after it, so they are fetched again from the new branch. A reorg deeper than
+depth blocks leaves no hash to match, and the registry starts over from block
+0. A reorg while a range is fetched shows as a log or parent hash that does
+not match, and the range is fetched again after the check.
+
+Keep the registry in its own file: its cursor and exchanges tables are not the
+Indexer's.
+
+# benchmark with:             python -m benchmarks.bench_registry
+'''
+
+BATCH_SIZE = 1000
+# blocks kept for rolling back a reorg
+DEPTH = 64
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exchanges (
+    token TEXT NOT NULL UNIQUE,
+    exchange TEXT PRIMARY KEY,
+    block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    block INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+'''
+
+Header = namedtuple('Header', ['hash', 'parent'])
+
+
+def _hex(value):
+    return value if isinstance(value, str) else Web3.toHex(value)
+
+
+class Registry(object):
+
+    def __init__(self, w3, factory_address, path, batch_size=BATCH_SIZE, depth=DEPTH):
+        assert batch_size > 0 and depth > 0
+        self.w3 = w3
+        self.factory = Web3.toChecksumAddress(factory_address)
+        self.batch_size = batch_size
+        self.depth = depth
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.db.execute('INSERT OR IGNORE INTO cursor VALUES (0, 0)')
+        self.db.commit()
+        abis = event_abis(artifacts.COMMITTED['contracts/uniswap_factory.vy'][1])
+        self._topic, self._abi = next((topic, abi) for topic, abi in abis.items() if abi['name'] == 'NewExchange')
+        self._load()
+
+    def close(self):
+        self.db.close()
+
+    def _load(self):
+        # both directions keyed by lowercase address, so lookups skip the checksum
+        self._exchange_of = {}
+        self._token_of = {}
+        for token, exchange in self.db.execute('SELECT token, exchange FROM exchanges'):
+            self._add(token, exchange)
+
+    def _add(self, token, exchange):
+        self._exchange_of[token.lower()] = exchange
+        self._token_of[exchange.lower()] = token
+
+    @property
+    def cursor(self):
+        """ The next block sync() will fetch. """
+        return self.db.execute('SELECT block FROM cursor').fetchone()[0]
+
+    def __len__(self):
+        return len(self._exchange_of)
+
+    def exchange_of(self, token):
+        """ The exchange of token, or None if it had none at the last sync. """
+        return self._exchange_of.get(token.lower())
+
+    def token_of(self, exchange):
+        """ The token of exchange, or None if it was not an exchange of the factory at the last sync. """
+        return self._token_of.get(exchange.lower())
+
+    def exchanges(self):
+        """ Every exchange, in creation order. """
+        rows = self.db.execute('SELECT token, exchange, block FROM exchanges ORDER BY block, rowid')
+        return [Exchange(*row) for row in rows]
+
+    def _header(self, block):
+        header = self.w3.eth.getBlock(block)
+        if header is None:
+            return None
+        return Header(_hex(header['hash']), _hex(header['parentHash']))
+
+    def rollback(self):
+        """ Drop what sync() read from blocks no longer on the chain. Returns the first block dropped, or None. """
+        rows = self.db.execute('SELECT block, hash FROM blocks ORDER BY block DESC').fetchall()
+        fork = 0
+        for i, (block, block_hash) in enumerate(rows):
+            header = self._header(block)
+            if header is not None and header.hash == block_hash:
+                if i == 0:
+                    return None
+                fork = block + 1
+                break
+        if not rows and self.cursor == 0:
+            return None
+        with self.db:
+            self.db.execute('DELETE FROM exchanges WHERE block >= ?', (fork,))
+            self.db.execute('DELETE FROM blocks WHERE block >= ?', (fork,))
+            self.db.execute('UPDATE cursor SET block = ?', (fork,))
+        self._load()
+        return fork
+
+    def sync(self, to_block=None):
+        """ Roll back a reorg, then add the exchanges created from the cursor up to to_block (default: latest). Returns the number added. """
+        added = 0
+        while True:
+            self.rollback()
+            last = self.w3.eth.blockNumber
+            if to_block is not None:
+                last = min(to_block, last)
+            start = self.cursor
+            while start <= last:
+                end = min(start + self.batch_size - 1, last)
+                rows = self._sync_range(start, end, last)
+                if rows is None:
+                    # the chain changed under the range: check again and go on from the cursor
+                    break
+                added += rows
+                start = end + 1
+            else:
+                return added
+
+    def _sync_range(self, start, end, last):
+        logs = self.w3.eth.getLogs({'fromBlock': start, 'toBlock': end, 'address': self.factory,
+                                    'topics': [Web3.toHex(self._topic)]})
+        hashes = {}
+        for block in range(max(start, last - self.depth + 1), end + 1):
+            header = self._header(block)
+            if header is None:
+                return None
+            if not hashes and block > 0:
+                known = self.db.execute('SELECT hash FROM blocks WHERE block = ?', (block - 1,)).fetchone()
+                if known is not None and known[0] != header.parent:
+                    return None
+            hashes[block] = header.hash
+        exchanges = []
+        for log in sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex'])):
+            block = log['blockNumber']
+            if block in hashes and _hex(log['blockHash']) != hashes[block]:
+                return None
+            args = get_event_data(self._abi, log)['args']
+            exchanges.append((Web3.toChecksumAddress(args['token']), Web3.toChecksumAddress(args['exchange']), block))
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO exchanges VALUES (?, ?, ?)', exchanges)
+            self.db.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?)', sorted(hashes.items()))
+            self.db.execute('DELETE FROM blocks WHERE block <= ?', (end - self.depth,))
+            self.db.execute('UPDATE cursor SET block = ?', (end + 1,))
+        for token, exchange, _ in exchanges:
+            self._add(token, exchange)
+        return len(exchanges)
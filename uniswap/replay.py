@@ -0,0 +1,220 @@
+import bisect
+import random
+from collections import namedtuple
+
+from uniswap.model import Revert, ZERO_ADDRESS, get_input_price, get_output_price
+from uniswap.reserves import Reserves
+
+'''
+Per-exchange reserves at any point in history, rebuilt from indexed events.
+
+    replay = Replay(indexer)                      # a synced uniswap.indexer.Indexer
+    for state in replay.states():                 # every event, in chain order
+        state.exchange, state.block, state.eth_reserve, state.token_reserve, state.total_supply
+    replay.at(exchange, block)                    # Reserves after block, from the nearest checkpoint
+    replay.verify(reader, replay.sample_blocks(20))
+
+Each event moves its exchange's state as the contract moved it:
+
+    TokenPurchase     eth_reserve += eth_sold, token_reserve -= tokens_bought
+    EthPurchase       eth_reserve -= eth_bought, token_reserve += tokens_sold
+    AddLiquidity      both reserves += the amounts
+    RemoveLiquidity   both reserves -= the amounts
+    Transfer (UNI)    total_supply += minted from the zero address, -= burned to it
+
+and is checked against the exact integer model of uniswap_exchange.vy on the
+reserves before it: a swap's amounts must be getInputPrice or getOutputPrice
+of each other, a deposit's token amount and UNI minted what addLiquidity
+computes, a withdrawal's amounts what removeLiquidity pays for the UNI burned.
+State.exact is False where they are not, which means the exchange's balances
+moved without an event (tokens or ETH sent to it directly).
+
+states() streams rows from SQLite and keeps one small state per exchange, so
+history of any length replays in constant memory. Every interval events of an
+exchange it records a checkpoint; at() bisects the exchange's checkpoints and
+replays at most interval events from the database, O(log n + interval).
+Blocks after the last replayed one are replayed from the last checkpoint.
+
+verify() reads the reserves of every exchange at the given blocks with
+uniswap.reader (a page of exchanges per eth_call) and lists what differs; the
+blocks must come after the reader contract was deployed.
+'''
+
+CHECKPOINT_INTERVAL = 1000
+
+State = namedtuple('State', ['block', 'log_index', 'exchange', 'event', 'eth_reserve', 'token_reserve',
+                             'total_supply', 'exact'])
+Difference = namedtuple('Difference', ['block', 'exchange', 'field', 'replayed', 'chain'])
+
+
+def _is_swap(amount_in, amount_out, reserve_in, reserve_out):
+    # an Input swap priced amount_out, an Output swap amount_in
+    try:
+        return (amount_out == get_input_price(amount_in, reserve_in, reserve_out) or
+                amount_in == get_output_price(amount_out, reserve_in, reserve_out))
+    except Revert:
+        return False
+
+
+class _Pool(object):
+    __slots__ = ('eth_reserve', 'token_reserve', 'total_supply', 'pending', 'count')
+
+    def __init__(self, eth_reserve=0, token_reserve=0, total_supply=0, pending=None):
+        self.eth_reserve = eth_reserve
+        self.token_reserve = token_reserve
+        self.total_supply = total_supply
+        # what the next UNI mint or burn should be, after AddLiquidity or RemoveLiquidity
+        self.pending = pending
+        self.count = 0
+
+    def checkpoint(self):
+        return (self.eth_reserve, self.token_reserve, self.total_supply, self.pending)
+
+    def apply(self, event):
+        """ Apply one event; True if its amounts agree with the model. """
+        name, eth, tokens = event.event, event.eth, event.tokens
+        exact = True
+        if name == 'TokenPurchase':
+            exact = _is_swap(eth, tokens, self.eth_reserve, self.token_reserve)
+            self.eth_reserve += eth
+            self.token_reserve -= tokens
+        elif name == 'EthPurchase':
+            exact = _is_swap(tokens, eth, self.token_reserve, self.eth_reserve)
+            self.eth_reserve -= eth
+            self.token_reserve += tokens
+        elif name == 'AddLiquidity':
+            if self.total_supply > 0 and self.eth_reserve > 0:
+                exact = tokens == eth * self.token_reserve // self.eth_reserve + 1
+                self.pending = ('mint', eth * self.total_supply // self.eth_reserve)
+            else:
+                # the first deposit mints the exchange's whole ETH balance
+                self.pending = ('mint', self.eth_reserve + eth)
+            self.eth_reserve += eth
+            self.token_reserve += tokens
+        elif name == 'RemoveLiquidity':
+            self.pending = ('burn', eth, tokens, self.eth_reserve, self.token_reserve, self.total_supply)
+            self.eth_reserve -= eth
+            self.token_reserve -= tokens
+        elif name == 'Transfer':
+            pending, self.pending = self.pending, None
+            if event.account == ZERO_ADDRESS:
+                exact = pending is None or pending == ('mint', tokens)
+                self.total_supply += tokens
+            elif event.recipient == ZERO_ADDRESS:
+                if pending is not None and pending[0] == 'burn':
+                    _, eth_amount, token_amount, eth_reserve, token_reserve, total_supply = pending
+                    exact = (total_supply > 0 and eth_amount == tokens * eth_reserve // total_supply and
+                             token_amount == tokens * token_reserve // total_supply)
+                self.total_supply -= tokens
+        return exact
+
+    def reserves(self):
+        return Reserves(self.eth_reserve, self.token_reserve, self.total_supply)
+
+
+class Replay(object):
+
+    def __init__(self, indexer, interval=CHECKPOINT_INTERVAL):
+        self.indexer = indexer
+        self.interval = interval
+        # the last event states() replayed, as (block, log_index)
+        self.position = None
+        self._pools = {}
+        # exchange: [(block, log_index)] and the matching [_Pool.checkpoint()]
+        self._keys = {}
+        self._checkpoints = {}
+
+    @property
+    def block(self):
+        """ The block of the last event replayed, or None. """
+        return self.position and self.position[0]
+
+    def states(self, to_block=None):
+        """ Replay the events after the last one replayed up to to_block, yielding the State after each. """
+        from_block = self.block
+        for event in self.indexer.iter_events(from_block=from_block, to_block=to_block):
+            key = (event.block, event.log_index)
+            if self.position is not None and key <= self.position:
+                continue
+            exchange = event.exchange
+            pool = self._pools.get(exchange)
+            if pool is None:
+                pool = self._pools[exchange] = _Pool()
+                self._keys[exchange] = []
+                self._checkpoints[exchange] = []
+            exact = pool.apply(event)
+            pool.count += 1
+            if pool.count % self.interval == 0:
+                self._keys[exchange].append(key)
+                self._checkpoints[exchange].append(pool.checkpoint())
+            self.position = key
+            yield State(event.block, event.log_index, exchange, event.event, pool.eth_reserve, pool.token_reserve,
+                        pool.total_supply, exact)
+
+    def run(self, to_block=None):
+        """ Replay up to to_block without keeping the states; returns the number of events and of inexact ones. """
+        events = inexact = 0
+        for state in self.states(to_block):
+            events += 1
+            inexact += not state.exact
+        return events, inexact
+
+    def history(self, exchange, from_block=None, to_block=None):
+        """ Yield the States of one exchange from from_block to to_block, starting at the nearest checkpoint. """
+        keys = self._keys.get(exchange, [])
+        i = bisect.bisect_left(keys, (from_block, -1)) - 1 if from_block is not None else -1
+        if i >= 0:
+            start = keys[i]
+            pool = _Pool(*self._checkpoints[exchange][i])
+        else:
+            start = None
+            pool = _Pool()
+        events = self.indexer.iter_events(exchange=exchange, from_block=start and start[0], to_block=to_block)
+        for event in events:
+            key = (event.block, event.log_index)
+            if start is not None and key <= start:
+                continue
+            exact = pool.apply(event)
+            if from_block is None or event.block >= from_block:
+                yield State(event.block, event.log_index, exchange, event.event, pool.eth_reserve,
+                            pool.token_reserve, pool.total_supply, exact)
+
+    def at(self, exchange, block):
+        """ Reserves of exchange after every event up to and including block. """
+        keys = self._keys.get(exchange, [])
+        i = bisect.bisect_right(keys, (block, float('inf'))) - 1
+        if i >= 0:
+            start = keys[i]
+            pool = _Pool(*self._checkpoints[exchange][i])
+        else:
+            start = None
+            pool = _Pool()
+        for event in self.indexer.iter_events(exchange=exchange, from_block=start and start[0], to_block=block):
+            if start is None or (event.block, event.log_index) > start:
+                pool.apply(event)
+        return pool.reserves()
+
+    def sample_blocks(self, count, first=None, seed=0):
+        """ count distinct blocks from first (default: the first indexed exchange) to the last replayed event. """
+        exchanges = self.indexer.exchanges()
+        if not exchanges or self.block is None:
+            return []
+        if first is None:
+            first = min(e.block for e in exchanges)
+        population = range(first, self.block + 1)
+        return sorted(random.Random(seed).sample(population, min(count, len(population))))
+
+    def verify(self, reader, blocks):
+        """ Compare at() with the reserves reader reads on chain at each block; returns the Differences. """
+        differences = []
+        exchanges = self.indexer.exchanges()
+        for block in blocks:
+            live = [e.exchange for e in exchanges if e.block <= block]
+            for pool in reader.read(live, block):
+                replayed = self.at(pool.exchange, block)
+                for field, chain in (('eth', pool.eth_reserve), ('token', pool.token_reserve),
+                                     ('total_supply', pool.total_supply)):
+                    value = getattr(replayed, field)
+                    if value != chain:
+                        differences.append(Difference(block, pool.exchange, field, value, chain))
+        return differences
@@ -0,0 +1,179 @@
+from collections import namedtuple
+
+from web3 import Web3
+from web3.utils.events import get_event_data
+
+from uniswap import artifacts
+from uniswap.indexer import event_abis
+from uniswap.model import (
+    Revert,
+    ZERO_ADDRESS,
+    get_input_price,
+    get_output_price,
+)
+
+'''
+Client-side exchange reserves, kept current from logs instead of RPC reads.
+
+    cache = ReserveCache(ReserveReader(w3, factory_address, reader_address))
+    cache.load(exchanges)                           # optional: read many in one call
+    cache.sync()                                    # once per new block
+    cache.eth_to_token_input_price(exchange, 10**18)
+
+The first get() of an exchange reads its ETH balance, token balance and UNI
+totalSupply at the cache's block with one uniswap_reader.vy call (a miss;
+load() reads up to a page of exchanges per call). After that, sync() applies the
+deltas in each new block's logs, so quotes are answered from memory (hits):
+
+    ETH reserve     TokenPurchase, EthPurchase, AddLiquidity, RemoveLiquidity
+    token reserve   the token's Transfer logs to and from the exchange
+    totalSupply     the exchange's UNI Transfer logs from/to the zero address
+
+ETH can reach a contract without a log (selfdestruct, block rewards), so an
+entry read more than max_age blocks ago is read again (a stale read). If
+sync() falls more than max_gap blocks behind, it drops every entry instead of
+fetching the whole gap.
+'''
+
+MAX_AGE = 100
+MAX_GAP = 1000
+
+Reserves = namedtuple('Reserves', ['eth', 'token', 'total_supply'])
+
+
+class _Entry(object):
+    __slots__ = ('eth_reserve', 'token_reserve', 'total_supply', 'read_block')
+
+    def __init__(self, pool, block):
+        self.eth_reserve = pool.eth_reserve
+        self.token_reserve = pool.token_reserve
+        self.total_supply = pool.total_supply
+        self.read_block = block
+
+
+class ReserveCache(object):
+
+    def __init__(self, reader, max_age=MAX_AGE, max_gap=MAX_GAP):
+        self.reader = reader
+        self.w3 = reader.w3
+        self.max_age = max_age
+        self.max_gap = max_gap
+        self.block = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._entries = {}
+        self._token_to_exchange = {}
+        self._abis = event_abis(artifacts.COMMITTED['contracts/uniswap_exchange.vy'][1])
+
+    def clear(self):
+        self._entries = {}
+        self._token_to_exchange = {}
+
+    def load(self, exchanges):
+        """ Read every exchange in exchanges that is not cached or is stale, a page per call. """
+        if self.block is None:
+            self.block = self.w3.eth.blockNumber
+        missing = [Web3.toChecksumAddress(e) for e in exchanges]
+        missing = [e for e in missing if e not in self._entries or self._is_stale(self._entries[e])]
+        for pool in self.reader.read(missing, self.block):
+            if pool.exchange in self._entries:
+                self.stale += 1
+            else:
+                self.misses += 1
+            self._entries[pool.exchange] = _Entry(pool, self.block)
+            self._token_to_exchange[pool.token] = pool.exchange
+
+    def _is_stale(self, entry):
+        return self.max_age is not None and self.block - entry.read_block > self.max_age
+
+    def get(self, exchange):
+        """ Reserves of an exchange as of self.block; ValueError if the reader cannot read it. """
+        exchange = Web3.toChecksumAddress(exchange)
+        entry = self._entries.get(exchange)
+        if entry is None or self._is_stale(entry):
+            self.load([exchange])
+            if exchange not in self._entries:
+                raise ValueError('the reserves of %s cannot be read (see reader.unreadable)' % exchange)
+            entry = self._entries[exchange]
+        else:
+            self.hits += 1
+        return Reserves(entry.eth_reserve, entry.token_reserve, entry.total_supply)
+
+    def sync(self, to_block=None):
+        """ Apply the logs of every block after self.block up to to_block (default: latest). """
+        if to_block is None:
+            to_block = self.w3.eth.blockNumber
+        if self.block is not None and to_block <= self.block:
+            return
+        if self.block is None or to_block - self.block > self.max_gap:
+            self.clear()
+        elif self._entries:
+            addresses = list(self._entries) + list(self._token_to_exchange)
+            logs = self.w3.eth.getLogs({'fromBlock': self.block + 1, 'toBlock': to_block, 'address': addresses})
+            for log in logs:
+                self._apply(log)
+        self.block = to_block
+
+    def _apply(self, log):
+        if not log['topics'] or bytes(log['topics'][0]) not in self._abis:
+            return
+        event_abi = self._abis[bytes(log['topics'][0])]
+        address = Web3.toChecksumAddress(log['address'])
+        args = get_event_data(event_abi, log)['args']
+        name = event_abi['name']
+        if address in self._token_to_exchange:
+            if name != 'Transfer':
+                return
+            exchange = self._token_to_exchange[address]
+            entry = self._entries[exchange]
+            if Web3.toChecksumAddress(args['_to']) == exchange:
+                entry.token_reserve += args['_value']
+            if Web3.toChecksumAddress(args['_from']) == exchange:
+                entry.token_reserve -= args['_value']
+            return
+        entry = self._entries[address]
+        if name == 'TokenPurchase':
+            entry.eth_reserve += args['eth_sold']
+        elif name == 'EthPurchase':
+            entry.eth_reserve -= args['eth_bought']
+        elif name == 'AddLiquidity':
+            entry.eth_reserve += args['eth_amount']
+        elif name == 'RemoveLiquidity':
+            entry.eth_reserve -= args['eth_amount']
+        elif name == 'Transfer':
+            if args['_from'] == ZERO_ADDRESS:
+                entry.total_supply += args['_value']
+            if args['_to'] == ZERO_ADDRESS:
+                entry.total_supply -= args['_value']
+
+    def stats(self):
+        """ Hit, miss and stale-read counts, and the age in blocks of the oldest direct read. """
+        oldest = max((self.block - e.read_block for e in self._entries.values()), default=None)
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale, 'block': self.block, 'oldest': oldest}
+
+    # The getXPrice views of uniswap_exchange.vy; like the contract they raise Revert.
+
+    def eth_to_token_input_price(self, exchange, eth_sold):
+        if not eth_sold > 0:
+            raise Revert('eth_sold')
+        reserves = self.get(exchange)
+        return get_input_price(eth_sold, reserves.eth, reserves.token)
+
+    def eth_to_token_output_price(self, exchange, tokens_bought):
+        if not tokens_bought > 0:
+            raise Revert('tokens_bought')
+        reserves = self.get(exchange)
+        return get_output_price(tokens_bought, reserves.eth, reserves.token)
+
+    def token_to_eth_input_price(self, exchange, tokens_sold):
+        if not tokens_sold > 0:
+            raise Revert('tokens_sold')
+        reserves = self.get(exchange)
+        return get_input_price(tokens_sold, reserves.token, reserves.eth)
+
+    def token_to_eth_output_price(self, exchange, eth_bought):
+        if not eth_bought > 0:
+            raise Revert('eth_bought')
+        reserves = self.get(exchange)
+        return get_output_price(eth_bought, reserves.token, reserves.eth)
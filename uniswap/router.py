@@ -0,0 +1,215 @@
+from collections import namedtuple
+from fractions import Fraction
+
+from uniswap import artifacts
+from uniswap.model import get_input_price, get_output_price
+
+'''
+Build and quote batches for uniswap_router.vy.
+
+    address = router.deploy(w3, factory.address)              # owned by the deploying account
+    HAY_token.transfer(address, 10**21)                       # deposit what the batches trade
+    batch = BatchBuilder.from_pools(reader_client.pools())
+    batch.token_to_eth(HAY, 10**18)                           # each call returns the leg's quote
+    batch.token_to_token_output(DEN, HAY, 5 * 10**17)
+    batch.eth_to_token(DAI, 10**17)
+    plan = batch.build(deadline=block.timestamp + 300)
+    plan.eth, plan.tokens                                     # what the router must hold for it
+    contract.functions.batchSwap(*plan.args).transact()      # or with value= to top up ETH
+    router.send(w3, HAY_exchange_address, plan.legs[0], deadline)   # or a leg alone, without the router
+
+    # or sell some tokens and spread the ETH over others
+    plan = BatchBuilder.from_pools(pools).rebalance({HAY: 10**18}, {DEN: 1, DAI: 3}, deadline)
+
+A rebalancing cycle that sends each swap as its own transaction pays the 21000
+base gas per leg, and waits for every leg to be mined before it knows the next
+one will still make sense. The router runs up to MAX_LEGS legs in one
+transaction, all or none, with a limit on each. It trades with the ETH and
+tokens its owner keeps in it: exchanges only take tokens from whoever calls
+them, so a router that pulled tokens from the caller for every leg would pay
+for an extra token transfer, more than the base gas it saves.
+
+Legs are quoted in order with the integer prices of uniswap_exchange.vy on
+reserves that earlier legs have already moved, so two legs on one exchange
+quote what the second one will really get. Limits give up tolerance of the
+quote: the least bought for exact input legs, the most sold for exact output
+ones. eth and tokens are the most of each the batch can spend beyond what
+earlier legs are sure to have bought, so a router holding them cannot run
+short when every leg hits its limit; changes is what the router's balances
+move by when every leg gets its quote, ETH under None.
+
+# benchmark with:             python -m benchmarks.bench_router
+'''
+
+ROUTER = 'contracts/uniswap_router.vy'
+EXCHANGE = 'contracts/uniswap_exchange.vy'
+MAX_LEGS = 8
+TOLERANCE = 0.005
+
+# leg kinds, as batchSwap numbers them
+ETH_TO_TOKEN_INPUT = 0
+ETH_TO_TOKEN_OUTPUT = 1
+TOKEN_TO_ETH_INPUT = 2
+TOKEN_TO_ETH_OUTPUT = 3
+TOKEN_TO_TOKEN_INPUT = 4
+TOKEN_TO_TOKEN_OUTPUT = 5
+
+ZERO_ADDRESS = '0x' + '00' * 20
+
+Leg = namedtuple('Leg', ['kind', 'token', 'target', 'amount', 'limit', 'quote'])
+Batch = namedtuple('Batch', ['legs', 'eth', 'tokens', 'changes', 'deadline', 'args'])
+
+
+def deploy(w3, factory_address):
+    """ Deploy a router for the exchanges of factory_address, owned by the sender, and return its address. """
+    artifact = artifacts.load(ROUTER)
+    tx_hash = w3.eth.contract(abi=artifact.abi, bytecode=artifact.bytecode).constructor(factory_address).transact()
+    return w3.eth.getTransactionReceipt(tx_hash).contractAddress
+
+
+def send(w3, exchange_address, leg, deadline, max_eth=2**255):
+    """ Send one leg as its own transaction to exchange_address, its token's exchange, without a router. """
+    functions = w3.eth.contract(address=exchange_address, abi=artifacts.load(EXCHANGE).abi).functions
+    if leg.kind == ETH_TO_TOKEN_INPUT:
+        return functions.ethToTokenSwapInput(leg.limit, deadline).transact({'value': leg.amount})
+    if leg.kind == ETH_TO_TOKEN_OUTPUT:
+        return functions.ethToTokenSwapOutput(leg.amount, deadline).transact({'value': leg.limit})
+    if leg.kind == TOKEN_TO_ETH_INPUT:
+        return functions.tokenToEthSwapInput(leg.amount, leg.limit, deadline).transact()
+    if leg.kind == TOKEN_TO_ETH_OUTPUT:
+        return functions.tokenToEthSwapOutput(leg.amount, leg.limit, deadline).transact()
+    if leg.kind == TOKEN_TO_TOKEN_INPUT:
+        return functions.tokenToTokenSwapInput(leg.amount, leg.limit, 1, deadline, leg.target).transact()
+    return functions.tokenToTokenSwapOutput(leg.amount, leg.limit, max_eth, deadline, leg.target).transact()
+
+
+class BatchBuilder(object):
+
+    def __init__(self, reserves, tolerance=TOLERANCE):
+        # token -> (eth_reserve, token_reserve), moved by every leg added
+        self.reserves = dict(reserves)
+        self.tolerance = tolerance
+        self._keep = Fraction(1 - Fraction(tolerance)).limit_denominator(10**9)
+        self.legs = []
+
+    @classmethod
+    def from_pools(cls, pools, tolerance=TOLERANCE):
+        """ A builder on the reserves of reader Pools. """
+        return cls({p.token: (p.eth_reserve, p.token_reserve) for p in pools}, tolerance)
+
+    def _least(self, quote):
+        keep = self._keep
+        return max(quote * keep.numerator // keep.denominator, 1)
+
+    def _most(self, quote):
+        keep = self._keep
+        return -(-quote * keep.denominator // keep.numerator)
+
+    def _add(self, kind, token, target, amount, limit, quote, moves):
+        if len(self.legs) == MAX_LEGS:
+            raise ValueError('a batch has at most %d legs' % MAX_LEGS)
+        if amount <= 0:
+            raise ValueError('amount must be positive')
+        for moved, eth, tokens in moves:
+            eth_reserve, token_reserve = self.reserves[moved]
+            self.reserves[moved] = (eth_reserve + eth, token_reserve + tokens)
+        self.legs.append(Leg(kind, token, target, amount, limit, quote))
+        return quote
+
+    def eth_to_token(self, token, eth_sold):
+        """ Sell eth_sold for token; the tokens bought. """
+        eth_reserve, token_reserve = self.reserves[token]
+        tokens_bought = get_input_price(eth_sold, eth_reserve, token_reserve)
+        return self._add(ETH_TO_TOKEN_INPUT, token, None, eth_sold, self._least(tokens_bought), tokens_bought,
+                         [(token, eth_sold, -tokens_bought)])
+
+    def eth_to_token_output(self, token, tokens_bought):
+        """ Buy tokens_bought of token with ETH; the ETH sold. """
+        eth_reserve, token_reserve = self.reserves[token]
+        eth_sold = get_output_price(tokens_bought, eth_reserve, token_reserve)
+        return self._add(ETH_TO_TOKEN_OUTPUT, token, None, tokens_bought, self._most(eth_sold), eth_sold,
+                         [(token, eth_sold, -tokens_bought)])
+
+    def token_to_eth(self, token, tokens_sold):
+        """ Sell tokens_sold of token for ETH; the ETH bought. """
+        eth_reserve, token_reserve = self.reserves[token]
+        eth_bought = get_input_price(tokens_sold, token_reserve, eth_reserve)
+        return self._add(TOKEN_TO_ETH_INPUT, token, None, tokens_sold, self._least(eth_bought), eth_bought,
+                         [(token, -eth_bought, tokens_sold)])
+
+    def token_to_eth_output(self, token, eth_bought):
+        """ Buy eth_bought with token; the tokens sold. """
+        eth_reserve, token_reserve = self.reserves[token]
+        tokens_sold = get_output_price(eth_bought, token_reserve, eth_reserve)
+        return self._add(TOKEN_TO_ETH_OUTPUT, token, None, eth_bought, self._most(tokens_sold), tokens_sold,
+                         [(token, -eth_bought, tokens_sold)])
+
+    def token_to_token(self, token, target, tokens_sold):
+        """ Sell tokens_sold of token for target through ETH; the target tokens bought. """
+        eth_reserve, token_reserve = self.reserves[token]
+        eth_bought = get_input_price(tokens_sold, token_reserve, eth_reserve)
+        target_eth, target_tokens = self.reserves[target]
+        tokens_bought = get_input_price(eth_bought, target_eth, target_tokens)
+        return self._add(TOKEN_TO_TOKEN_INPUT, token, target, tokens_sold, self._least(tokens_bought), tokens_bought,
+                         [(token, -eth_bought, tokens_sold), (target, eth_bought, -tokens_bought)])
+
+    def token_to_token_output(self, token, target, tokens_bought):
+        """ Buy tokens_bought of target with token through ETH; the tokens sold. """
+        target_eth, target_tokens = self.reserves[target]
+        eth_sold = get_output_price(tokens_bought, target_eth, target_tokens)
+        eth_reserve, token_reserve = self.reserves[token]
+        tokens_sold = get_output_price(eth_sold, token_reserve, eth_reserve)
+        return self._add(TOKEN_TO_TOKEN_OUTPUT, token, target, tokens_bought, self._most(tokens_sold), tokens_sold,
+                         [(token, -eth_sold, tokens_sold), (target, eth_sold, -tokens_bought)])
+
+    def build(self, deadline):
+        """ The Batch of the legs added so far, with what it needs, what it changes and its batchSwap arguments. """
+        if not self.legs:
+            raise ValueError('no legs')
+        # each asset held if every leg hits its limit, and if every leg gets its quote; ETH under None
+        worst = {}
+        changes = {}
+        needs = {}
+        for leg in self.legs:
+            if leg.kind == ETH_TO_TOKEN_INPUT:
+                moves = [(None, -leg.amount, -leg.amount), (leg.token, leg.limit, leg.quote)]
+            elif leg.kind == ETH_TO_TOKEN_OUTPUT:
+                moves = [(None, -leg.limit, -leg.quote), (leg.token, leg.amount, leg.amount)]
+            elif leg.kind == TOKEN_TO_ETH_INPUT:
+                moves = [(leg.token, -leg.amount, -leg.amount), (None, leg.limit, leg.quote)]
+            elif leg.kind == TOKEN_TO_ETH_OUTPUT:
+                moves = [(leg.token, -leg.limit, -leg.quote), (None, leg.amount, leg.amount)]
+            elif leg.kind == TOKEN_TO_TOKEN_INPUT:
+                moves = [(leg.token, -leg.amount, -leg.amount), (leg.target, leg.limit, leg.quote)]
+            else:
+                moves = [(leg.token, -leg.limit, -leg.quote), (leg.target, leg.amount, leg.amount)]
+            for asset, least, expected in moves:
+                worst[asset] = worst.get(asset, 0) + least
+                changes[asset] = changes.get(asset, 0) + expected
+                needs[asset] = max(needs.get(asset, 0), -worst[asset])
+        padding = MAX_LEGS - len(self.legs)
+        args = (
+            [leg.kind for leg in self.legs] + [0] * padding,
+            [leg.token for leg in self.legs] + [ZERO_ADDRESS] * padding,
+            [leg.target or ZERO_ADDRESS for leg in self.legs] + [ZERO_ADDRESS] * padding,
+            [leg.amount for leg in self.legs] + [0] * padding,
+            [leg.limit for leg in self.legs] + [0] * padding,
+            deadline,
+        )
+        eth = needs.pop(None, 0)
+        tokens = {token: need for token, need in needs.items() if need}
+        return Batch(list(self.legs), eth, tokens, changes, deadline, args)
+
+    def rebalance(self, sells, buys, deadline, eth=0):
+        """ Sell sells {token: tokens_sold} for ETH, then spend it and eth on buys {token: weight}, pro rata. """
+        # only the ETH every sale is sure to buy, so the buys never run short
+        budget = eth
+        for token, tokens_sold in sorted(sells.items()):
+            self.token_to_eth(token, tokens_sold)
+            budget += self.legs[-1].limit
+        total = sum(buys.values())
+        for token, weight in sorted(buys.items()):
+            eth_sold = budget * weight // total
+            if eth_sold:
+                self.eth_to_token(token, eth_sold)
+        return self.build(deadline)
@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import websockets
+from eth.utils.spoof import SpoofTransaction
+from eth_tester import EthereumTester
+from eth_tester.backends.pyevm.main import _execute_and_revert_transaction
+from eth_tester.exceptions import TransactionFailed
+from web3 import Web3
+from web3.providers.eth_tester.defaults import API_ENDPOINTS
+
+from uniswap import genesis
+
+'''
+A local JSON-RPC endpoint in front of an EthereumTester.
+
+    server = Server(tester, ws_port=0).start()     # port 0 picks a free port
+    w3 = Web3(Web3.HTTPProvider(server.url))
+    ...                                            # server.ws_url for WebSocket clients
+    server.stop()
+
+    # a uniswap.genesis world (by default just the factory) on the truffle development port
+    python -m uniswap.rpc --port 8545 [--scenario scenario.json] [--latency 20 --jitter 5]
+
+Requests go through the same EthereumTesterProvider (and its middlewares)
+the in-process tests use, so a client sees the tester's behaviour plus the
+cost of serialization and a round trip. Quantities in results are hex
+encoded as a node would send them.
+
+HTTP connections are kept alive (HTTP/1.1) and served on a thread each. A body
+may be a JSON-RPC batch, a list of requests answered with a list of responses
+in one round trip. Calls run one at a time, whichever connection they came on.
+
+With ws_port set, the same methods are served over WebSocket, plus
+eth_subscribe('logs', {address, topics}) and eth_subscribe('newHeads'): after
+every call that mined blocks, each subscription gets an eth_subscription
+notification per matching log or new block, on its own connection.
+
+Latency knobs, all in seconds: latency (plus up to jitter, uniformly) is added
+once per HTTP request or WebSocket message, like a network round trip, and
+call_latency once per call in it, like the node's own work. A batch of n calls
+pays latency once and call_latency n times.
+
+Besides the tester's eth_, net_, web3_ and evm_ methods, miner_stop and
+miner_start switch mining off and on. While it is off, eth_sendTransaction and
+eth_sendRawTransaction apply transactions to py-evm's pending block, and
+evm_mine mines them all in one block. (EthereumTester's own pending mode keeps
+one transaction per sender.) The provider drops the nonce of an
+eth_sendTransaction, so the server numbers them as a node does: the sender's
+nonce in the last mined block plus its transactions pending since.
+
+eth_call runs the call unsigned, as a node does. EthereumTester.call signs it
+with the sender's key first, in pure Python, which is most of the cost of a
+view call. Send a gas limit with eth_call: without one the provider runs
+eth_estimateGas first, a search of about 18 executions.
+'''
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+SERVER_ERROR = -32000
+
+
+def encode(value):
+    """ A provider result as JSON-RPC sends it: ints as hex quantities, bytes as hex data. """
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, bytes):
+        return Web3.toHex(value)
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    return value
+
+
+def _error(code, message, id=None):
+    return {'jsonrpc': '2.0', 'id': id, 'error': {'code': code, 'message': message}}
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Server(object):
+
+    def __init__(self, tester, host='127.0.0.1', port=0, ws_port=None, latency=0.0, jitter=0.0,
+                 call_latency=0.0, seed=None):
+        endpoints = dict(API_ENDPOINTS)
+        endpoints['eth'] = dict(API_ENDPOINTS['eth'], call=self._call,
+                                sendTransaction=self._sender('send_transaction'),
+                                sendRawTransaction=self._sender('send_raw_transaction'))
+        endpoints['miner'] = dict(API_ENDPOINTS['miner'], start=self._miner(True), stop=self._miner(False))
+        endpoints['evm'] = dict(API_ENDPOINTS['evm'], mine=self._mine)
+        provider = Web3.EthereumTesterProvider(tester, api_endpoints=endpoints)
+        self.tester = tester
+        self.mining = True
+        self.latency = latency
+        self.jitter = jitter
+        self.call_latency = call_latency
+        self._rng = random.Random(seed)
+        self._pending = Counter()
+        self._request = provider.request_func(Web3(provider), [])
+        self._lock = threading.Lock()
+        # subscription id: (send, kind, filter)
+        self._subscriptions = {}
+        self._head = None
+        self._ids = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+            # TCP_NODELAY, as nodes set it: headers and body are separate writes, and with
+            # Nagle's algorithm the body of a kept-alive response waits for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers['Content-Length'])
+                except (TypeError, ValueError):
+                    length = -1
+                if length < 0:
+                    # chunked or malformed: the body cannot be delimited, so answer and close
+                    self.send_error(411)
+                    return
+                message = self.rfile.read(length)
+                body = json.dumps(server.handle_message(message)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _HTTPServer((host, port), Handler)
+        self.url = 'http://%s:%d' % self.httpd.server_address
+        self.host = host
+        self.ws_port = ws_port
+        self.ws_url = None
+        self._threads = []
+        self._ws_loop = None
+        self._ws_stop = None
+
+    def _sender(self, name):
+        send = getattr(EthereumTester, name)
+
+        def endpoint(tester, params):
+            if self.mining:
+                return send(tester, *params)
+            if name == 'send_transaction':
+                transaction = dict(params[0])
+                sender = transaction['from']
+                transaction['nonce'] = tester.get_nonce(sender) + self._pending[sender]
+                params = [transaction]
+            # the undecorated method: applied to the pending block, not mined
+            transaction_hash = send.__wrapped__(tester, *params)
+            if name == 'send_transaction':
+                self._pending[sender] += 1
+            return transaction_hash
+        return endpoint
+
+    def _call(self, tester, params):
+        transaction, block_number = params[0], params[1] if len(params) > 1 else 'latest'
+        tester.validator.validate_inbound_transaction(transaction, txn_type='call')
+        tester.validator.validate_inbound_block_number(block_number)
+        raw_transaction = tester.normalizer.normalize_inbound_transaction(transaction)
+        raw_block_number = tester.normalizer.normalize_inbound_block_number(block_number)
+        backend = tester.backend
+        if 'gas' not in raw_transaction:
+            raw_transaction['gas'] = backend._max_available_gas()
+        evm_transaction = backend._get_normalized_and_unsigned_evm_transaction(raw_transaction, raw_block_number)
+        computation = _execute_and_revert_transaction(
+            backend.chain, SpoofTransaction(evm_transaction, from_=raw_transaction['from']), raw_block_number)
+        if computation.is_error:
+            raise TransactionFailed(str(computation._error))
+        return tester.normalizer.normalize_outbound_return_data(computation.output)
+
+    def _miner(self, mining):
+        def endpoint(tester, params):
+            self.mining = mining
+            return True
+        return endpoint
+
+    def _mine(self, tester, params):
+        self._pending.clear()
+        return tester.mine_blocks(*params)
+
+    def _block_number(self):
+        return self.tester.get_block_by_number('latest')['number']
+
+    def _subscribe(self, send, params):
+        kind = params[0] if params else None
+        if kind not in ('logs', 'newHeads'):
+            raise ValueError('unsupported subscription %r (logs or newHeads)' % kind)
+        if not self._subscriptions:
+            self._head = self._block_number()
+        self._ids += 1
+        subscription = hex(self._ids)
+        self._subscriptions[subscription] = (send, kind, dict(params[1]) if len(params) > 1 else {})
+        return subscription
+
+    def _notify(self):
+        number = self._block_number()
+        if number <= self._head:
+            # evm_revert can move the head back
+            self._head = number
+            return
+        for subscription, (send, kind, log_filter) in self._subscriptions.items():
+            if kind == 'logs':
+                log_filter = dict(log_filter, fromBlock=self._head + 1, toBlock=number)
+                results = self._request('eth_getLogs', [log_filter])['result']
+            else:
+                results = [self._request('eth_getBlockByNumber', [n, False])['result']
+                           for n in range(self._head + 1, number + 1)]
+            for result in results:
+                send({'jsonrpc': '2.0', 'method': 'eth_subscription',
+                      'params': {'subscription': subscription, 'result': encode(result)}})
+        self._head = number
+
+    def call(self, request, send=None):
+        """ The JSON-RPC response to one request; send delivers this connection's notifications. """
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return _error(INVALID_REQUEST, 'invalid request', request.get('id') if isinstance(request, dict) else None)
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        method, params = request['method'], request.get('params', [])
+        if self.call_latency:
+            time.sleep(self.call_latency)
+        try:
+            with self._lock:
+                if method == 'eth_subscribe':
+                    if send is None:
+                        raise ValueError('subscriptions need a WebSocket connection')
+                    result = {'result': self._subscribe(send, params)}
+                elif method == 'eth_unsubscribe':
+                    result = {'result': self._subscriptions.pop(params[0], None) is not None}
+                else:
+                    result = self._request(method, params)
+                    if self._subscriptions:
+                        self._notify()
+        except Exception as e:
+            result = {'error': '%s: %s' % (type(e).__name__, e)}
+        if 'error' in result:
+            error = result['error']
+            response['error'] = error if isinstance(error, dict) else {'code': SERVER_ERROR, 'message': str(error)}
+        else:
+            response['result'] = encode(result['result'])
+        return response
+
+    def handle(self, request, send=None):
+        """ The response to a request, or the list of responses to a batch. """
+        if not isinstance(request, list):
+            return self.call(request, send)
+        if not request:
+            return _error(INVALID_REQUEST, 'empty batch')
+        return [self.call(item, send) for item in request]
+
+    def handle_message(self, message, send=None):
+        """ handle() for a message as it arrives, after the configured round-trip latency. """
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        try:
+            request = json.loads(message if isinstance(message, str) else message.decode())
+        except ValueError as e:
+            return _error(PARSE_ERROR, 'parse error: %s' % e)
+        return self.handle(request, send)
+
+    def _close_subscriptions(self, send):
+        with self._lock:
+            for subscription, (target, _, _) in list(self._subscriptions.items()):
+                if target is send:
+                    del self._subscriptions[subscription]
+
+    async def _connection(self, websocket, path):
+        loop = asyncio.get_event_loop()
+
+        def send(notification):
+            asyncio.run_coroutine_threadsafe(websocket.send(json.dumps(notification)), loop)
+
+        try:
+            async for message in websocket:
+                # calls block on py-evm, so they run off the event loop
+                response = await loop.run_in_executor(None, self.handle_message, message, send)
+                await websocket.send(json.dumps(response))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._close_subscriptions(send)
+
+    def _serve_ws(self, started):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._ws_loop = loop
+        self._ws_stop = asyncio.Event(loop=loop)
+        ws_server = loop.run_until_complete(websockets.serve(self._connection, self.host, self.ws_port, loop=loop))
+        self.ws_url = 'ws://%s:%d' % ws_server.sockets[0].getsockname()[:2]
+        started.set()
+        loop.run_until_complete(self._ws_stop.wait())
+        ws_server.close()
+        loop.run_until_complete(ws_server.wait_closed())
+        loop.close()
+
+    def start(self):
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        if self.ws_port is not None:
+            started = threading.Event()
+            thread = threading.Thread(target=self._serve_ws, args=(started,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            started.wait()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._ws_loop is not None:
+            self._ws_loop.call_soon_threadsafe(self._ws_stop.set)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='A JSON-RPC node backed by EthereumTester.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--ws-port', type=int, default=8546)
+    parser.add_argument('--scenario', help='a uniswap.genesis scenario as JSON (default: the factory alone)')
+    parser.add_argument('--latency', type=float, default=0.0, help='milliseconds per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more milliseconds per request')
+    parser.add_argument('--call-latency', type=float, default=0.0, help='milliseconds per call, batched or not')
+    args = parser.parse_args(argv)
+    scenario = {}
+    if args.scenario:
+        with open(args.scenario) as f:
+            scenario = json.load(f)
+    image = genesis.cached(scenario)
+    server = Server(image.load(), args.host, args.port, args.ws_port, args.latency / 1000, args.jitter / 1000,
+                    args.call_latency / 1000)
+    server.start()
+    print('%s %s' % (server.url, server.ws_url))
+    print(json.dumps(image.addresses, indent=2))
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import time
+import traceback
+from collections import namedtuple
+
+from uniswap import artifacts, genesis
+
+'''
+Independent EVM simulations spread over a pool of worker processes.
+
+    def simulate(world, params):         # module level, so workers can find it
+        exchange = world.exchange('HAY')
+        exchange.functions.ethToTokenSwapInput(1, deadline).transact({'value': params, 'gas': 10**6})
+        return exchange.functions.getEthToTokenInputPrice(10**18).call()
+
+    with Runner(simulate, scenario, processes=8) as runner:
+        for result in runner.run(params_list):
+            print(result.index, result.value, result.error)
+
+The parent builds (or finds in the cache) the uniswap.genesis image of the
+scenario once. Each worker reads it into its own EthereumTester, loads the
+compiled artifacts, snapshots the chain and runs warmup(world) if given, all
+once per process. Every simulation then starts from that snapshot and the
+chain is reverted after it, so no simulation sees state another one left,
+whichever worker ran it.
+
+run() yields one Result per item, in input order, as soon as the item and
+every item before it are done. An exception raised by simulate is returned as
+the Result's error (the formatted traceback) instead of stopping the run.
+Workers are replaced after tasks_per_worker simulations, which bounds the
+memory py-evm's in-memory databases accumulate across reverts.
+
+Simulations share nothing, so throughput grows with the number of processes
+up to the number of cores; benchmarks/bench_runner.py measures it.
+'''
+
+TASKS_PER_WORKER = 200
+
+Result = namedtuple('Result', ['index', 'value', 'error', 'worker', 'seconds'])
+
+_worker = None
+
+
+def _init(path, simulate, warmup):
+    global _worker
+    for contract in (genesis.FACTORY, genesis.EXCHANGE, genesis.TOKEN):
+        artifacts.load(contract)
+    world = genesis.World(genesis.Image.read(path))
+    world.snapshot()
+    if warmup is not None:
+        warmup(world)
+        world.revert()
+    _worker = (world, simulate)
+
+
+def _run(item):
+    index, params = item
+    world, simulate = _worker
+    start = time.perf_counter()
+    try:
+        value, error = simulate(world, params), None
+    except Exception:
+        value, error = None, traceback.format_exc()
+    finally:
+        world.revert()
+    return Result(index, value, error, os.getpid(), time.perf_counter() - start)
+
+
+class Runner(object):
+
+    def __init__(self, simulate, scenario, processes=None, tasks_per_worker=TASKS_PER_WORKER, warmup=None,
+                 chunksize=1, cache_dir=artifacts.CACHE_DIR):
+        genesis.cached(scenario, cache_dir)
+        self.processes = processes or os.cpu_count()
+        self.chunksize = chunksize
+        path = genesis.image_path(scenario, cache_dir)
+        self._pool = multiprocessing.Pool(self.processes, _init, (path, simulate, warmup),
+                                          maxtasksperchild=tasks_per_worker)
+
+    def run(self, items):
+        """ Yield a Result for every item, in order. """
+        return self._pool.imap(_run, enumerate(items), self.chunksize)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.terminate()
@@ -0,0 +1,122 @@
+import random
+
+from web3 import Web3
+
+from uniswap import model
+from uniswap.indexer import EVENTS
+
+'''
+A synthetic exchange history, as uniswap.indexer would have stored it.
+
+    last = write(indexer, pools=20, events=10**6)      # the rows, into an indexer's database
+    for block, rows, reserves, tokens in history(pools=20):
+        ...
+
+history() runs random swaps and liquidity changes on uniswap.model exchanges,
+one per block, and yields each block's indexer rows with the reserves every
+exchange truly has after it, so what uniswap.replay rebuilds from the rows can
+be checked against the model's.
+'''
+
+POOLS = 20
+DEADLINE = 2**40
+
+ACTIONS = ('eth_to_token_input', 'eth_to_token_output', 'token_to_eth_input', 'token_to_eth_output',
+           'add_liquidity', 'remove_liquidity')
+
+
+_checksums = {}
+
+
+def _address(address):
+    # memoized: checksumming hashes the address, and history() sees the same few again and again
+    checksum = _checksums.get(address)
+    if checksum is None:
+        checksum = _checksums[address] = Web3.toChecksumAddress(address)
+    return checksum
+
+
+def history(pools=POOLS, seed=0):
+    """ Yield (block, rows, reserves, tokens) per block: its indexer rows, each exchange's true (eth, token,
+    total_supply) after it, and each exchange's token. The exchanges are created in block 0. """
+    rng = random.Random(seed)
+    chain = model.Chain(timestamp=0, record_logs=True)
+    trader = '0x%040x' % 0xacc
+    chain.fund(trader, 10**40)
+    factory = model.Factory(chain)
+    factory.initializeFactory(model.Exchange(chain).address, sender=trader)
+    exchanges = []
+    for _ in range(pools):
+        token = model.Token(chain, b'T', b'T', 18, 10**40, trader)
+        exchange = chain.contract(factory.createExchange(token.address, sender=trader), model.Exchange)
+        token.approve(exchange.address, 2**256 - 1, sender=trader)
+        exchange.addLiquidity(0, rng.randrange(10**20, 10**22), DEADLINE, sender=trader,
+                              value=rng.randrange(10**19, 10**21))
+        exchanges.append((exchange, token))
+    tokens = {_address(e.address): _address(t.address) for e, t in exchanges}
+    addresses = {e.address for e, _ in exchanges}
+    block = 0
+    while True:
+        if block > 0:
+            _act(rng, chain, trader, rng.choice(exchanges)[0])
+        rows = []
+        for log_index, (address, name, args) in enumerate(chain.logs):
+            if address not in addresses or name not in EVENTS:
+                continue
+            if name == 'Transfer':
+                account, recipient, eth_amount, amount = _address(args[0]), _address(args[1]), None, args[2]
+            elif name == 'EthPurchase':
+                # EthPurchase(buyer, tokens_sold, eth_bought)
+                account, recipient, eth_amount, amount = _address(args[0]), None, args[2], args[1]
+            else:
+                account, recipient, eth_amount, amount = _address(args[0]), None, args[1], args[2]
+            rows.append((block, log_index, block, '0x%064x' % block, _address(address), name, account, recipient,
+                         None if eth_amount is None else str(eth_amount), str(amount)))
+        del chain.logs[:]
+        reserves = {_address(e.address): (chain.balance(e.address), t.balanceOf(e.address), e.totalSupply)
+                    for e, t in exchanges}
+        yield block, rows, reserves, tokens
+        block += 1
+        chain.timestamp = block
+
+
+def _act(rng, chain, trader, exchange):
+    eth = chain.balance(exchange.address)
+    action = rng.choice(ACTIONS)
+    try:
+        if action == 'eth_to_token_input':
+            exchange.ethToTokenSwapInput(1, DEADLINE, sender=trader, value=rng.randrange(1, eth // 100))
+        elif action == 'eth_to_token_output':
+            exchange.ethToTokenSwapOutput(rng.randrange(1, exchange._token_reserve() // 100), DEADLINE,
+                                          sender=trader, value=eth)
+        elif action == 'token_to_eth_input':
+            exchange.tokenToEthSwapInput(rng.randrange(1, exchange._token_reserve() // 100), 1, DEADLINE,
+                                         sender=trader)
+        elif action == 'token_to_eth_output':
+            exchange.tokenToEthSwapOutput(rng.randrange(1, eth // 100), 2**255, DEADLINE, sender=trader)
+        elif action == 'add_liquidity':
+            exchange.addLiquidity(1, 2**255, DEADLINE, sender=trader, value=rng.randrange(1, eth // 10))
+        else:
+            exchange.removeLiquidity(rng.randrange(1, exchange.totalSupply // 10), 1, 1, DEADLINE,
+                                     sender=trader)
+    except model.Revert:
+        pass
+
+
+def write(indexer, pools, events, seed=0):
+    """ Store at least events rows of history(pools, seed) in the indexer's database; returns the last block. """
+    written = 0
+    batch = []
+    for block, rows, _, tokens in history(pools, seed):
+        if block == 0:
+            with indexer.db:
+                indexer.db.executemany('INSERT INTO exchanges VALUES (?, ?, 0)',
+                                       [(token, exchange) for exchange, token in tokens.items()])
+        batch.extend(rows)
+        written += len(rows)
+        if len(batch) >= 10000 or written >= events:
+            with indexer.db:
+                indexer.db.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+            batch = []
+        if written >= events:
+            return block
@@ -0,0 +1,108 @@
+from web3 import Web3
+from web3.contract import ConciseContract
+import eth_tester
+from eth_tester import EthereumTester, PyEVMBackend
+
+from uniswap import artifacts, genesis
+
+'''
+The HAY and DEN world the tests and benchmarks deploy on py-evm.
+
+    world = World()                        # or World('contracts/uniswap_exchange_lean.vy')
+    world.HAY_exchange.ethToTokenSwapInput(1, DEADLINE, transact={'value': 10**18})
+    world.revert(['HAY_exchange'])         # back to the snapshot right after HAY_exchange was created
+
+Importing this module raises eth-tester's genesis gas limit to
+genesis.GAS_LIMIT, so a block fits several factory and router transactions,
+and lowers the difficulty to genesis.DIFFICULTY; tests/conftest.py relies on
+that. Contracts are ConciseContracts, as the tests call them.
+'''
+
+# exchange templates with the same ABI; tests/exchange runs against each of them
+EXCHANGES = ('contracts/uniswap_exchange.vy', 'contracts/uniswap_exchange_lean.vy')
+TOKEN = 'contracts/test_contracts/ERC20.vy'
+
+ETH_RESERVE = 5*10**18
+HAY_RESERVE = 10*10**18
+DEN_RESERVE = 20*10**18
+# a deadline every test block is before
+DEADLINE = 1742680400
+
+setattr(eth_tester.backends.pyevm.main, 'GENESIS_GAS_LIMIT', genesis.GAS_LIMIT)
+setattr(eth_tester.backends.pyevm.main, 'GENESIS_DIFFICULTY', genesis.DIFFICULTY)
+
+
+def make_w3(tester):
+    w3 = Web3(Web3.EthereumTesterProvider(tester))
+    w3.eth.setGasPriceStrategy(lambda web3, params: 0)
+    w3.eth.defaultAccount = w3.eth.accounts[0]
+    return w3
+
+
+def create_contract(w3, path):
+    artifact = artifacts.load(path)
+    return w3.eth.contract(abi=artifact.abi, bytecode=artifact.bytecode)
+
+
+def deploy_contract(w3, path, *args):
+    deploy = create_contract(w3, path)
+    tx_hash = deploy.constructor(*args).transact()
+    tx_receipt = w3.eth.getTransactionReceipt(tx_hash)
+    return ConciseContract(w3.eth.contract(
+        address=tx_receipt.contractAddress,
+        abi=deploy.abi
+    ))
+
+
+def deploy_factory(w3, exchange_template):
+    contract = deploy_contract(w3, 'contracts/uniswap_factory.vy')
+    contract.initializeFactory(exchange_template.address, transact={})
+    return contract
+
+
+def deploy_exchange(w3, factory, token, token_reserve):
+    factory.createExchange(token.address, transact={})
+    exchange_address = factory.getExchange(token.address)
+    exchange = ConciseContract(w3.eth.contract(
+        address=exchange_address,
+        abi=artifacts.load('contracts/uniswap_exchange.vy').abi
+    ))
+    token.approve(exchange_address, token_reserve, transact={})
+    exchange.addLiquidity(0, token_reserve, DEADLINE, transact={'value': ETH_RESERVE})
+    return exchange
+
+
+class World(object):
+    """ Contracts deployed once, with a chain snapshot after each stage. """
+
+    def __init__(self, exchange=EXCHANGES[0]):
+        self.tester = EthereumTester(backend=PyEVMBackend())
+        self.w3 = make_w3(self.tester)
+        self.snapshots = {}
+        self.exchange_template = deploy_contract(self.w3, exchange)
+        self.factory = deploy_factory(self.w3, self.exchange_template)
+        self.HAY_token = deploy_contract(self.w3, TOKEN, b'HAY Token', b'HAY', 18, 100000*10**18)
+        self.DEN_token = deploy_contract(self.w3, TOKEN, b'DEN Token', b'DEN', 18, 100000*10**18)
+        self.snapshot('contracts')
+        self.HAY_exchange = deploy_exchange(self.w3, self.factory, self.HAY_token, HAY_RESERVE)
+        self.snapshot('HAY_exchange')
+        self.DEN_exchange = deploy_exchange(self.w3, self.factory, self.DEN_token, DEN_RESERVE)
+        self.snapshot('DEN_exchange')
+
+    def snapshot(self, stage):
+        # PyEVMBackend re-imports the snapshot block on every revert; an empty
+        # block makes that re-import nearly free.
+        self.tester.mine_blocks()
+        self.snapshots[stage] = self.tester.take_snapshot()
+
+    def revert(self, fixturenames):
+        # Exchanges are created in a fixed order (HAY then DEN), so a test that
+        # asks for DEN_exchange also sees HAY_exchange, as it would have in a
+        # per-test build that created HAY first.
+        if 'DEN_exchange' in fixturenames:
+            stage = 'DEN_exchange'
+        elif 'HAY_exchange' in fixturenames:
+            stage = 'HAY_exchange'
+        else:
+            stage = 'contracts'
+        self.tester.revert_to_snapshot(self.snapshots[stage])